@@ -10,6 +10,7 @@ import sys
 from pathlib import Path
 
 from database import get_db
+from services.execucao_banco import rota_banco
 from database.models import EmpresasRecomendadas
 from sqlalchemy import func
 
@@ -17,7 +18,8 @@ router = APIRouter(prefix="/api/analise", tags=["análise"])
 
 
 @router.post("/executar-analise-empresas")
-async def executar_analise_empresas(db: Session = Depends(get_db)):
+@rota_banco
+def executar_analise_empresas(db: Session = Depends(get_db)):
     """
     Executa a análise de empresas recomendadas e cria a tabela consolidada.
     Pode ser chamado via HTTP sem precisar do Shell do Render.
@@ -70,7 +72,8 @@ async def executar_analise_empresas(db: Session = Depends(get_db)):
 
 
 @router.get("/status-analise")
-async def status_analise(db: Session = Depends(get_db)):
+@rota_banco
+def status_analise(db: Session = Depends(get_db)):
     """
     Retorna o status da análise de empresas recomendadas.
     
@@ -120,7 +123,8 @@ async def status_analise(db: Session = Depends(get_db)):
 
 
 @router.get("/verificar-dados")
-async def verificar_dados(db: Session = Depends(get_db)):
+@rota_banco
+def verificar_dados(db: Session = Depends(get_db)):
     """
     Verifica dados em todas as tabelas.
     
@@ -176,7 +180,8 @@ async def verificar_dados(db: Session = Depends(get_db)):
 
 
 @router.post("/correlacionar-empresas-operacoes")
-async def executar_correlacao_empresas_operacoes(db: Session = Depends(get_db)):
+@rota_banco
+def executar_correlacao_empresas_operacoes(db: Session = Depends(get_db)):
     """
     Correlaciona empresas da tabela 'empresas' com operações de 'comercio_exterior' e 'operacoes_comex'.
     Atualiza valores de importação/exportação nas empresas baseado nas operações.
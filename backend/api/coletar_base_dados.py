@@ -10,6 +10,9 @@ from datetime import datetime
 
 from database import get_db
 from database.models import Empresa
+from services.execucao_banco import rota_banco
+from services.busca_empresas import FONTE_EMPRESAS, sincronizar_indice_cadastro
+from services.versoes import TABELA_EMPRESAS, registrar_alteracao
 from sqlalchemy import func
 import json
 import os
@@ -206,6 +209,8 @@ def importar_para_postgresql(df: pd.DataFrame, db: Session):
                 continue
         
         db.commit()
+        registrar_alteracao(db, TABELA_EMPRESAS)
+        sincronizar_indice_cadastro(db, FONTE_EMPRESAS)
         logger.success(f"✅ {registros_inseridos:,} empresas inseridas")
         logger.success(f"✅ {registros_atualizados:,} empresas atualizadas")
         
@@ -223,7 +228,8 @@ def importar_para_postgresql(df: pd.DataFrame, db: Session):
 
 
 @router.post("/coletar-empresas-base-dados")
-async def coletar_empresas_base_dados(db: Session = Depends(get_db)):
+@rota_banco
+def coletar_empresas_base_dados(db: Session = Depends(get_db)):
     """
     Coleta dados de empresas exportadoras/importadoras da Base dos Dados (BigQuery)
     e importa automaticamente para PostgreSQL.
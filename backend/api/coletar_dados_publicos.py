@@ -8,6 +8,7 @@ from typing import Dict, Any, Optional, List
 from pydantic import BaseModel
 
 from database import get_db
+from services.execucao_banco import rota_banco
 
 try:
     from data_collector.public_company_collector import PublicCompanyCollector
@@ -29,7 +30,8 @@ class ColetaRequest(BaseModel):
 
 
 @router.post("/coletar-dados-publicos")
-async def coletar_dados_publicos(
+@rota_banco
+def coletar_dados_publicos(
     request: ColetaRequest,
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
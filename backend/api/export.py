@@ -1,101 +1,76 @@
 """
 Endpoints de exportação de relatórios.
+
+Exportam as operações com os mesmos filtros do POST /buscar, sem limite de
+linhas: a consulta é lida em lotes (yield_per, cursor do servidor no
+PostgreSQL) e o arquivo é enviado em blocos numa StreamingResponse, com
+memória constante.
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import datetime
+from typing import Callable, Iterator
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from loguru import logger
 from sqlalchemy.orm import Session
-from typing import Optional
-from pathlib import Path
 
-from database import get_db, OperacaoComex
-from utils.export import ReportExporter
+from database import get_db
+from services.busca_operacoes import COLUNAS_EXPORTACAO, BuscaFiltros, condicoes_busca, iterar_operacoes
+from services.execucao_banco import iterar_no_banco
+from utils.export import OPENPYXL_AVAILABLE, csv_em_blocos, xlsx_em_blocos
 
 router = APIRouter(prefix="/export", tags=["export"])
 
+TIPOS_CONTEUDO = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def _exportar(filtros: BuscaFiltros, db: Session, extensao: str, escritor: Callable[..., Iterator[bytes]]):
+    """StreamingResponse com o arquivo das operações dos filtros."""
+    try:
+        condicoes_busca(filtros)
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"via_transporte inválida: {filtros.via_transporte}")
+
+    def blocos() -> Iterator[bytes]:
+        # Sessão própria: o arquivo é gerado depois que a rota retornou
+        with Session(bind=db.get_bind()) as sessao:
+            linhas = iterar_operacoes(sessao, filtros)
+            try:
+                yield from escritor(COLUNAS_EXPORTACAO, linhas)
+            except Exception as e:
+                logger.error(f"❌ Erro ao exportar {extensao}: {e}")
+                raise
+
+    filename = f"relatorio_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extensao}"
+    return StreamingResponse(
+        iterar_no_banco(blocos(), db),
+        media_type=TIPOS_CONTEUDO[extensao],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
 
 @router.post("/excel")
 async def export_to_excel(
-    filtros: dict,
+    filtros: BuscaFiltros,
     db: Session = Depends(get_db)
 ):
     """
-    Exporta resultados de busca para Excel.
+    Exporta resultados de busca para Excel (filtros do /buscar; page e page_size são ignorados).
     """
-    try:
-        # Aplicar filtros (mesma lógica da busca)
-        query = db.query(OperacaoComex)
-        
-        # TODO: Aplicar filtros aqui (reutilizar lógica de busca)
-        
-        # Limitar a 10000 registros para exportação
-        operacoes = query.limit(10000).all()
-        
-        # Converter para dicionários
-        data = [
-            {
-                "id": op.id,
-                "ncm": op.ncm,
-                "descricao_produto": op.descricao_produto,
-                "tipo_operacao": op.tipo_operacao.value,
-                "pais_origem_destino": op.pais_origem_destino,
-                "uf": op.uf,
-                "valor_fob": op.valor_fob,
-                "peso_liquido_kg": op.peso_liquido_kg,
-                "data_operacao": op.data_operacao.isoformat(),
-            }
-            for op in operacoes
-        ]
-        
-        exporter = ReportExporter()
-        filepath = exporter.export_to_excel(data)
-        
-        return {
-            "success": True,
-            "filepath": str(filepath),
-            "filename": filepath.name,
-            "records": len(data),
-        }
-    
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao exportar: {str(e)}")
+    if not OPENPYXL_AVAILABLE:
+        raise HTTPException(status_code=501, detail="openpyxl é necessário para exportação em Excel")
+    return _exportar(filtros, db, "xlsx", xlsx_em_blocos)
 
 
 @router.post("/csv")
 async def export_to_csv(
-    filtros: dict,
+    filtros: BuscaFiltros,
     db: Session = Depends(get_db)
 ):
     """
-    Exporta resultados de busca para CSV.
+    Exporta resultados de busca para CSV (filtros do /buscar; page e page_size são ignorados).
     """
-    try:
-        query = db.query(OperacaoComex)
-        operacoes = query.limit(10000).all()
-        
-        data = [
-            {
-                "id": op.id,
-                "ncm": op.ncm,
-                "descricao_produto": op.descricao_produto,
-                "tipo_operacao": op.tipo_operacao.value,
-                "pais_origem_destino": op.pais_origem_destino,
-                "uf": op.uf,
-                "valor_fob": op.valor_fob,
-                "peso_liquido_kg": op.peso_liquido_kg,
-                "data_operacao": op.data_operacao.isoformat(),
-            }
-            for op in operacoes
-        ]
-        
-        exporter = ReportExporter()
-        filepath = exporter.export_to_csv(data)
-        
-        return {
-            "success": True,
-            "filepath": str(filepath),
-            "filename": filepath.name,
-            "records": len(data),
-        }
-    
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao exportar: {str(e)}")
-
+    return _exportar(filtros, db, "csv", csv_em_blocos)
@@ -3,7 +3,7 @@ Configurações da aplicação.
 """
 import os
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional
 try:
     # Pydantic v2
     from pydantic_settings import BaseSettings
@@ -27,6 +27,9 @@ class Settings(BaseSettings):
     
     # Database (será construído dinamicamente se não definido)
     database_url: Optional[str] = Field(default="")
+    # Threads que executam as rotas que usam o banco (services.execucao_banco);
+    # manter <= pool de conexões do SQLAlchemy (5 + 10 de overflow por padrão); 0 = no event loop
+    db_executor_threads: int = Field(default=8)
     
     # API Comex Stat
     comex_stat_api_url: Optional[str] = Field(default="https://api-comexstat.mdic.gov.br")
@@ -37,6 +40,39 @@ class Settings(BaseSettings):
     months_to_fetch: int = Field(default=3)
     retry_attempts: int = Field(default=3)
     retry_delay_seconds: int = Field(default=5)
+    # Coleta por NCM na API: requisições simultâneas e limite de requisições por segundo
+    coleta_concorrencia: int = Field(default=8)
+    coleta_requisicoes_por_segundo: float = Field(default=5.0)
+    # Clientes HTTP compartilhados (services.clientes_http): pool de conexões e keep-alive
+    http_max_conexoes: int = Field(default=100)
+    http_conexoes_por_host: int = Field(default=10)
+    http_keepalive_segundos: float = Field(default=30.0)
+    # Downloads dos CSVs mensais do MDIC: arquivos simultâneos e tamanho do bloco gravado em disco
+    download_concorrencia: int = Field(default=4)
+    download_bloco_bytes: int = Field(default=1024 * 1024)
+    
+    # Dashboard: ler agregados dos rollups mensais (operacoes_comex_mensal)
+    dashboard_use_rollups: bool = Field(default=True)
+    # Minutos entre as sincronizações agendadas dos rollups/versões com linhas inseridas
+    # fora dos fluxos de importação (0 = desativado)
+    rollups_sync_minutes: int = Field(default=15)
+    
+    # Cache de respostas: "memory" (por processo) ou "sqlite" (arquivo compartilhado entre workers)
+    cache_backend: str = Field(default="memory")
+    cache_sqlite_path: Optional[Path] = Field(default=None)
+    cache_max_entries: int = Field(default=1000)
+    cache_max_bytes: int = Field(default=64 * 1024 * 1024)
+    cache_ttl_seconds: Dict[str, int] = Field(default_factory=dict)  # ex.: {"dashboard_stats": 600}
+    
+    # Importação de planilhas: linhas lidas/transformadas/inseridas por lote
+    import_batch_rows: int = Field(default=20000)
+    
+    # Planilha CNAE (CNPJ -> CNAE/classificação) usada nas sinergias e sugestões.
+    # Padrão: data_dir / "NOVO CNAE.xlsx"; outro caminho pela variável CNAE_ARQUIVO
+    cnae_arquivo: Optional[Path] = Field(default=None)
+    
+    # Autocomplete: orçamento de tempo para as etapas de complemento (BigQuery, MDIC)
+    autocomplete_budget_ms: int = Field(default=150)
     
     # Logging
     log_level: str = Field(default="INFO")
@@ -56,12 +92,30 @@ class Settings(BaseSettings):
             'debug': {'env': 'DEBUG'},
             'data_dir': {'env': 'DATA_DIR'},
             'database_url': {'env': 'DATABASE_URL'},
+            'db_executor_threads': {'env': 'DB_EXECUTOR_THREADS'},
             'comex_stat_api_url': {'env': 'COMEX_STAT_API_URL'},
             'comex_stat_api_key': {'env': 'COMEX_STAT_API_KEY'},
             'update_interval_hours': {'env': 'UPDATE_INTERVAL_HOURS'},
             'months_to_fetch': {'env': 'MONTHS_TO_FETCH'},
             'retry_attempts': {'env': 'RETRY_ATTEMPTS'},
             'retry_delay_seconds': {'env': 'RETRY_DELAY_SECONDS'},
+            'coleta_concorrencia': {'env': 'COLETA_CONCORRENCIA'},
+            'coleta_requisicoes_por_segundo': {'env': 'COLETA_REQUISICOES_POR_SEGUNDO'},
+            'http_max_conexoes': {'env': 'HTTP_MAX_CONEXOES'},
+            'http_conexoes_por_host': {'env': 'HTTP_CONEXOES_POR_HOST'},
+            'http_keepalive_segundos': {'env': 'HTTP_KEEPALIVE_SEGUNDOS'},
+            'download_concorrencia': {'env': 'DOWNLOAD_CONCORRENCIA'},
+            'download_bloco_bytes': {'env': 'DOWNLOAD_BLOCO_BYTES'},
+            'dashboard_use_rollups': {'env': 'DASHBOARD_USE_ROLLUPS'},
+            'rollups_sync_minutes': {'env': 'ROLLUPS_SYNC_MINUTES'},
+            'cache_backend': {'env': 'CACHE_BACKEND'},
+            'cache_sqlite_path': {'env': 'CACHE_SQLITE_PATH'},
+            'cache_max_entries': {'env': 'CACHE_MAX_ENTRIES'},
+            'cache_max_bytes': {'env': 'CACHE_MAX_BYTES'},
+            'cache_ttl_seconds': {'env': 'CACHE_TTL_SECONDS'},
+            'import_batch_rows': {'env': 'IMPORT_BATCH_ROWS'},
+            'cnae_arquivo': {'env': 'CNAE_ARQUIVO'},
+            'autocomplete_budget_ms': {'env': 'AUTOCOMPLETE_BUDGET_MS'},
             'log_level': {'env': 'LOG_LEVEL'},
             'log_dir': {'env': 'LOG_DIR'},
             'secret_key': {'env': 'SECRET_KEY'},
@@ -85,6 +139,10 @@ class Settings(BaseSettings):
         
         # Criar diretórios necessários
         self._create_directories()
+
+        # Planilha CNAE dentro do diretório de dados (definido acima, inclusive o fallback)
+        if self.cnae_arquivo is None:
+            self.cnae_arquivo = self.data_dir / "NOVO CNAE.xlsx"
     
     def _create_directories(self):
         """Cria os diretórios necessários se não existirem."""
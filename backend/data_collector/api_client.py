@@ -13,6 +13,7 @@ from datetime import datetime, timedelta
 from loguru import logger
 
 from config import settings
+from services.clientes_http import obter_cliente_httpx, obter_sessao
 
 if not HTTPX_AVAILABLE:
     logger.warning("httpx não disponível, usando aiohttp")
@@ -21,6 +22,7 @@ if not HTTPX_AVAILABLE:
 class ComexStatAPIClient:
     """
     Cliente para consumir a API oficial do Comex Stat.
+    As requisições usam os clientes HTTP compartilhados (services.clientes_http).
     """
     
     def __init__(self):
@@ -50,39 +52,38 @@ class ComexStatAPIClient:
             mes_teste = datetime.now().strftime("%Y-%m")
             
             if HTTPX_AVAILABLE:
-                async with httpx.AsyncClient(timeout=self.timeout, verify=False) as client:
-                    # Tentar buscar dados de um mês recente como teste
-                    params = {
-                        "mes_inicio": mes_teste,
-                        "mes_fim": mes_teste,
-                        "tipo_operacao": "Importação"
-                    }
-                    response = await client.get(
-                        f"{self.base_url}/dados",
-                        params=params,
-                        timeout=self.timeout
-                    )
-                    # Aceitar qualquer resposta (200, 404, etc) como indicação de que a API está acessível
-                    if response.status_code < 500:  # Não é erro de servidor
-                        logger.info(f"API do Comex Stat acessível (status: {response.status_code})")
-                        return True
+                client = obter_cliente_httpx()
+                # Tentar buscar dados de um mês recente como teste
+                params = {
+                    "mes_inicio": mes_teste,
+                    "mes_fim": mes_teste,
+                    "tipo_operacao": "Importação"
+                }
+                response = await client.get(
+                    f"{self.base_url}/dados",
+                    params=params,
+                    timeout=self.timeout
+                )
+                # Aceitar qualquer resposta (200, 404, etc) como indicação de que a API está acessível
+                if response.status_code < 500:  # Não é erro de servidor
+                    logger.info(f"API do Comex Stat acessível (status: {response.status_code})")
+                    return True
             else:
                 # Fallback para aiohttp
-                timeout = aiohttp.ClientTimeout(total=self.timeout)
-                connector = aiohttp.TCPConnector(ssl=False)
-                async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
-                    params = {
-                        "mes_inicio": mes_teste,
-                        "mes_fim": mes_teste,
-                        "tipo_operacao": "Importação"
-                    }
-                    async with session.get(
-                        f"{self.base_url}/dados",
-                        params=params
-                    ) as response:
-                        if response.status < 500:
-                            logger.info(f"API do Comex Stat acessível (status: {response.status})")
-                            return True
+                session = obter_sessao()
+                params = {
+                    "mes_inicio": mes_teste,
+                    "mes_fim": mes_teste,
+                    "tipo_operacao": "Importação"
+                }
+                async with session.get(
+                    f"{self.base_url}/dados",
+                    params=params,
+                    timeout=aiohttp.ClientTimeout(total=self.timeout)
+                ) as response:
+                    if response.status < 500:
+                        logger.info(f"API do Comex Stat acessível (status: {response.status})")
+                        return True
         except Exception as e:
             logger.warning(f"Erro ao testar conexão com API: {e}")
             # Não retornar False imediatamente - pode ser que a API funcione mas o teste falhe
@@ -144,57 +145,57 @@ class ComexStatAPIClient:
         
         try:
             if HTTPX_AVAILABLE:
-                async with httpx.AsyncClient(timeout=self.timeout, verify=False) as client:
-                    response = await client.get(
-                        f"{self.base_url}/dados",
-                        params=params,
-                        headers=headers
-                    )
+                client = obter_cliente_httpx()
+                response = await client.get(
+                    f"{self.base_url}/dados",
+                    params=params,
+                    headers=headers,
+                    timeout=self.timeout
+                )
+                response.raise_for_status()
+                
+                # Verificar se a resposta é JSON
+                content_type = response.headers.get("content-type", "").lower()
+                if "text/html" in content_type:
+                    logger.warning(f"API retornou HTML ao invés de JSON. URL: {response.url}")
+                    logger.warning(f"Resposta (primeiros 500 chars): {response.text[:500]}")
+                    # Tentar diferentes endpoints ou formatos
+                    return await self._try_alternative_endpoints(params, headers)
+                
+                data = response.json()
+                
+                logger.info(
+                    f"Dados coletados via API: {len(data.get('registros', []))} registros"
+                )
+                
+                return data.get("registros", [])
+            else:
+                # Fallback para aiohttp
+                session = obter_sessao()
+                async with session.get(
+                    f"{self.base_url}/dados",
+                    params=params,
+                    headers=headers,
+                    timeout=aiohttp.ClientTimeout(total=self.timeout)
+                ) as response:
                     response.raise_for_status()
                     
                     # Verificar se a resposta é JSON
                     content_type = response.headers.get("content-type", "").lower()
                     if "text/html" in content_type:
                         logger.warning(f"API retornou HTML ao invés de JSON. URL: {response.url}")
-                        logger.warning(f"Resposta (primeiros 500 chars): {response.text[:500]}")
+                        text = await response.text()
+                        logger.warning(f"Resposta (primeiros 500 chars): {text[:500]}")
                         # Tentar diferentes endpoints ou formatos
                         return await self._try_alternative_endpoints(params, headers)
                     
-                    data = response.json()
+                    data = await response.json()
                     
                     logger.info(
                         f"Dados coletados via API: {len(data.get('registros', []))} registros"
                     )
                     
                     return data.get("registros", [])
-            else:
-                # Fallback para aiohttp
-                timeout = aiohttp.ClientTimeout(total=self.timeout)
-                connector = aiohttp.TCPConnector(ssl=False)
-                async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
-                    async with session.get(
-                        f"{self.base_url}/dados",
-                        params=params,
-                        headers=headers
-                    ) as response:
-                        response.raise_for_status()
-                        
-                        # Verificar se a resposta é JSON
-                        content_type = response.headers.get("content-type", "").lower()
-                        if "text/html" in content_type:
-                            logger.warning(f"API retornou HTML ao invés de JSON. URL: {response.url}")
-                            text = await response.text()
-                            logger.warning(f"Resposta (primeiros 500 chars): {text[:500]}")
-                            # Tentar diferentes endpoints ou formatos
-                            return await self._try_alternative_endpoints(params, headers)
-                        
-                        data = await response.json()
-                        
-                        logger.info(
-                            f"Dados coletados via API: {len(data.get('registros', []))} registros"
-                        )
-                        
-                        return data.get("registros", [])
         
         except Exception as e:
             logger.error(f"Erro ao buscar dados da API: {e}")
@@ -229,31 +230,29 @@ class ComexStatAPIClient:
                 url = f"{base_url_http}{endpoint}"
                 logger.info(f"Tentando endpoint: {url}")
                 if HTTPX_AVAILABLE:
-                    async with httpx.AsyncClient(timeout=self.timeout, verify=False) as client:
-                        response = await client.get(
-                            url,
-                            params=params,
-                            headers=headers
-                        )
+                    response = await obter_cliente_httpx().get(
+                        url,
+                        params=params,
+                        headers=headers,
+                        timeout=self.timeout
+                    )
+                    content_type = response.headers.get("content-type", "").lower()
+                    if "application/json" in content_type:
+                        data = response.json()
+                        logger.success(f"✅ Endpoint funcionou: {url}")
+                        return data.get("registros", []) if isinstance(data, dict) else data
+                else:
+                    async with obter_sessao().get(
+                        url,
+                        params=params,
+                        headers=headers,
+                        timeout=aiohttp.ClientTimeout(total=self.timeout)
+                    ) as response:
                         content_type = response.headers.get("content-type", "").lower()
                         if "application/json" in content_type:
-                            data = response.json()
+                            data = await response.json()
                             logger.success(f"✅ Endpoint funcionou: {url}")
                             return data.get("registros", []) if isinstance(data, dict) else data
-                else:
-                    timeout = aiohttp.ClientTimeout(total=self.timeout)
-                    connector = aiohttp.TCPConnector(ssl=False)
-                    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
-                        async with session.get(
-                            url,
-                            params=params,
-                            headers=headers
-                        ) as response:
-                            content_type = response.headers.get("content-type", "").lower()
-                            if "application/json" in content_type:
-                                data = await response.json()
-                                logger.success(f"✅ Endpoint funcionou: {url}")
-                                return data.get("registros", []) if isinstance(data, dict) else data
             except Exception as e:
                 logger.debug(f"Endpoint {url} não funcionou: {e}")
                 continue
@@ -277,28 +276,26 @@ class ComexStatAPIClient:
                 headers["Authorization"] = f"Bearer {self.api_key}"
             
             if HTTPX_AVAILABLE:
-                async with httpx.AsyncClient(timeout=self.timeout, verify=False) as client:
-                    response = await client.get(
-                        f"{self.base_url}/meses-disponiveis",
-                        headers=headers
-                    )
+                response = await obter_cliente_httpx().get(
+                    f"{self.base_url}/meses-disponiveis",
+                    headers=headers,
+                    timeout=self.timeout
+                )
+                response.raise_for_status()
+                data = response.json()
+                
+                return data.get("meses", [])
+            else:
+                # Fallback para aiohttp
+                async with obter_sessao().get(
+                    f"{self.base_url}/meses-disponiveis",
+                    headers=headers,
+                    timeout=aiohttp.ClientTimeout(total=self.timeout)
+                ) as response:
                     response.raise_for_status()
-                    data = response.json()
+                    data = await response.json()
                     
                     return data.get("meses", [])
-            else:
-                # Fallback para aiohttp
-                timeout = aiohttp.ClientTimeout(total=self.timeout)
-                connector = aiohttp.TCPConnector(ssl=False)
-                async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
-                    async with session.get(
-                        f"{self.base_url}/meses-disponiveis",
-                        headers=headers
-                    ) as response:
-                        response.raise_for_status()
-                        data = await response.json()
-                        
-                        return data.get("meses", [])
         
         except Exception as e:
             logger.error(f"Erro ao buscar meses disponíveis: {e}")
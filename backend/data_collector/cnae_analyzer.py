@@ -1,12 +1,21 @@
 """
 Analisador de CNAE e integração com empresas do MDIC.
 Lê arquivo Excel com classificação CNAE e relaciona com empresas.
+
+O Excel é lido uma vez e os registros vão para um snapshot JSON em
+data_dir/cnae (validado pelo tamanho e data de modificação do arquivo), que
+dispensa o pandas nas cargas seguintes. Uma instância carregada por processo
+fica em services.cnae.obter_cnae_analyzer.
 """
+import json
 import sys
+from bisect import bisect_left
 from pathlib import Path
 from typing import List, Dict, Any, Optional, TYPE_CHECKING
 from loguru import logger
 
+from config import settings
+
 # Tentar importar pandas/openpyxl
 try:
     import pandas as pd
@@ -45,24 +54,31 @@ class CNAEAnalyzer:
             arquivo_cnae = Path("C:/Users/User/Desktop/Cursor/NOVO CNAE.xlsx")
         
         self.arquivo_cnae = Path(arquivo_cnae)
-        self.cnae_data: Dict[str, Dict[str, Any]] = {}
+        self.cnae_data: Dict[str, List[Dict[str, Any]]] = {}
         self.empresas_cnae: Dict[str, Dict[str, Any]] = {}
+        # Registros na ordem de leitura (conteúdo do snapshot)
+        self._registros: List[Dict[str, Any]] = []
+        # Códigos de cnae_data ordenados, para busca por prefixo (refeito quando muda)
+        self._codigos_ordenados: Optional[List[str]] = None
         
     def carregar_cnae_excel(self) -> bool:
         """
-        Carrega dados do arquivo Excel CNAE.
+        Carrega dados do arquivo Excel CNAE (ou do snapshot, se o arquivo não mudou).
         
         Returns:
             True se carregou com sucesso
         """
-        if not PANDAS_AVAILABLE:
-            logger.error("pandas não disponível - não é possível ler Excel")
-            return False
-        
         if not self.arquivo_cnae.exists():
             logger.warning(f"Arquivo CNAE não encontrado: {self.arquivo_cnae}")
             return False
         
+        if self._carregar_snapshot():
+            return True
+        
+        if not PANDAS_AVAILABLE:
+            logger.error("pandas não disponível - não é possível ler Excel")
+            return False
+        
         try:
             # Ler Excel - tentar diferentes sheets
             excel_file = pd.ExcelFile(self.arquivo_cnae)
@@ -80,6 +96,7 @@ class CNAEAnalyzer:
                 self._processar_dataframe_cnae(df, sheet_name)
             
             logger.success(f"✅ CNAE carregado: {len(self.cnae_data)} registros")
+            self._salvar_snapshot()
             return True
             
         except Exception as e:
@@ -110,42 +127,52 @@ class CNAEAnalyzer:
         logger.info(f"Colunas Empresa: {colunas_empresa}")
         logger.info(f"Colunas Classificação: {colunas_classificacao}")
         
-        # Processar cada linha
-        for idx, row in df.iterrows():
+        # Processar cada linha (tuplas + matriz de nulos: sem uma Series por linha)
+        colunas = list(df.columns)
+        posicao = {col: i for i, col in enumerate(colunas)}
+        pos_cnae = [posicao[col] for col in colunas_cnae]
+        pos_cnpj = [posicao[col] for col in colunas_cnpj]
+        pos_empresa = [posicao[col] for col in colunas_empresa]
+        pos_classificacao = [posicao[col] for col in colunas_classificacao]
+        extras = [
+            (i, col) for i, col in enumerate(colunas)
+            if col not in ['cnae', 'cnpj', 'razao_social', 'classificacao']
+        ]
+        nulos = df.isna().to_numpy()
+        
+        for n, (idx, valores) in enumerate(zip(df.index, df.itertuples(index=False, name=None))):
             try:
+                nulo = nulos[n]
+                
                 # Extrair CNAE
                 cnae = None
-                for col in colunas_cnae:
-                    valor = row.get(col)
-                    if pd.notna(valor):
-                        cnae = str(valor).strip().replace('.', '').replace('-', '')
+                for i in pos_cnae:
+                    if not nulo[i]:
+                        cnae = str(valores[i]).strip().replace('.', '').replace('-', '')
                         if len(cnae) >= 4:  # CNAE tem pelo menos 4 dígitos
                             break
                 
                 # Extrair CNPJ
                 cnpj = None
-                for col in colunas_cnpj:
-                    valor = row.get(col)
-                    if pd.notna(valor):
-                        cnpj = str(valor).strip().replace('.', '').replace('/', '').replace('-', '')
+                for i in pos_cnpj:
+                    if not nulo[i]:
+                        cnpj = str(valores[i]).strip().replace('.', '').replace('/', '').replace('-', '')
                         if len(cnpj) == 14:
                             break
                 
                 # Extrair nome da empresa
                 razao_social = None
-                for col in colunas_empresa:
-                    valor = row.get(col)
-                    if pd.notna(valor):
-                        razao_social = str(valor).strip()
+                for i in pos_empresa:
+                    if not nulo[i]:
+                        razao_social = str(valores[i]).strip()
                         if razao_social:
                             break
                 
                 # Extrair classificação
                 classificacao = None
-                for col in colunas_classificacao:
-                    valor = row.get(col)
-                    if pd.notna(valor):
-                        classificacao = str(valor).strip()
+                for i in pos_classificacao:
+                    if not nulo[i]:
+                        classificacao = str(valores[i]).strip()
                         if classificacao:
                             break
                 
@@ -160,24 +187,71 @@ class CNAEAnalyzer:
                 }
                 
                 # Adicionar dados adicionais da linha
-                for col, valor in row.items():
-                    if pd.notna(valor) and col not in ['cnae', 'cnpj', 'razao_social', 'classificacao']:
-                        registro[col] = str(valor).strip()
+                for i, col in extras:
+                    if not nulo[i]:
+                        registro[col] = str(valores[i]).strip()
                 
-                # Indexar por CNAE
-                if cnae:
-                    if cnae not in self.cnae_data:
-                        self.cnae_data[cnae] = []
-                    self.cnae_data[cnae].append(registro)
-                
-                # Indexar por CNPJ
-                if cnpj:
-                    self.empresas_cnae[cnpj] = registro
+                self._indexar(registro)
                     
             except Exception as e:
                 logger.debug(f"Erro ao processar linha {idx}: {e}")
                 continue
     
+    def _indexar(self, registro: Dict[str, Any]) -> None:
+        """Indexa um registro por CNAE e por CNPJ."""
+        self._registros.append(registro)
+        cnae = registro.get("cnae")
+        if cnae:
+            if cnae not in self.cnae_data:
+                self.cnae_data[cnae] = []
+                self._codigos_ordenados = None
+            self.cnae_data[cnae].append(registro)
+        cnpj = registro.get("cnpj")
+        if cnpj:
+            self.empresas_cnae[cnpj] = registro
+    
+    # ------------------------------------------------------------------ snapshot
+    
+    def _caminho_snapshot(self) -> Path:
+        return settings.data_dir / "cnae" / f"{self.arquivo_cnae.stem}.snapshot.json"
+    
+    def _assinatura_arquivo(self) -> Dict[str, Any]:
+        info = self.arquivo_cnae.stat()
+        return {"arquivo": str(self.arquivo_cnae), "tamanho": info.st_size, "mtime_ns": info.st_mtime_ns}
+    
+    def _carregar_snapshot(self) -> bool:
+        """Carrega os registros do snapshot se ele corresponde ao arquivo atual."""
+        caminho = self._caminho_snapshot()
+        if not caminho.exists():
+            return False
+        try:
+            snapshot = json.loads(caminho.read_text(encoding="utf-8"))
+            if snapshot.get("origem") != self._assinatura_arquivo():
+                return False
+            for registro in snapshot["registros"]:
+                self._indexar(registro)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"⚠️ Snapshot CNAE ilegível ({caminho}), relendo o Excel: {e}")
+            self.cnae_data, self.empresas_cnae, self._registros = {}, {}, []
+            self._codigos_ordenados = None
+            return False
+        logger.info(f"✅ CNAE carregado do snapshot: {len(self.cnae_data)} registros")
+        return True
+    
+    def _salvar_snapshot(self) -> None:
+        caminho = self._caminho_snapshot()
+        try:
+            caminho.parent.mkdir(parents=True, exist_ok=True)
+            temporario = caminho.with_suffix(".tmp")
+            temporario.write_text(
+                json.dumps({"origem": self._assinatura_arquivo(), "registros": self._registros}, ensure_ascii=False),
+                encoding="utf-8",
+            )
+            temporario.replace(caminho)
+            logger.info(f"💾 Snapshot CNAE gravado: {caminho}")
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"⚠️ Não foi possível gravar o snapshot CNAE: {e}")
+    
     def buscar_cnae_empresa(self, cnpj: str) -> Optional[Dict[str, Any]]:
         """
         Busca CNAE de uma empresa por CNPJ.
@@ -191,6 +265,20 @@ class CNAEAnalyzer:
         cnpj_limpo = cnpj.replace('.', '').replace('/', '').replace('-', '')
         return self.empresas_cnae.get(cnpj_limpo)
     
+    # Nome usado pelo enriquecimento de operações
+    buscar_por_cnpj = buscar_cnae_empresa
+    
+    def codigos_com_prefixo(self, prefixo: str) -> List[str]:
+        """Códigos de cnae_data que começam com `prefixo` (busca binária nos códigos ordenados)."""
+        if self._codigos_ordenados is None:
+            self._codigos_ordenados = sorted(self.cnae_data)
+        codigos = self._codigos_ordenados
+        inicio = bisect_left(codigos, prefixo)
+        fim = inicio
+        while fim < len(codigos) and codigos[fim].startswith(prefixo):
+            fim += 1
+        return codigos[inicio:fim]
+    
     def buscar_empresas_por_cnae(self, cnae: str) -> List[Dict[str, Any]]:
         """
         Busca empresas por CNAE.
@@ -207,11 +295,10 @@ class CNAEAnalyzer:
         if cnae_limpo in self.cnae_data:
             return self.cnae_data[cnae_limpo]
         
-        # Busca parcial (prefixo)
+        # Busca parcial (prefixo dos primeiros 4 dígitos)
         resultados = []
-        for cnae_key, empresas in self.cnae_data.items():
-            if cnae_key.startswith(cnae_limpo[:4]):  # Primeiros 4 dígitos
-                resultados.extend(empresas)
+        for cnae_key in self.codigos_com_prefixo(cnae_limpo[:4]):
+            resultados.extend(self.cnae_data[cnae_key])
         
         return resultados
     
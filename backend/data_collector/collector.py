@@ -6,10 +6,11 @@ from typing import List, Dict, Any, Optional
 from pathlib import Path
 from loguru import logger
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
 
 from config import settings
 from database import get_db, OperacaoComex, ColetaLog, TipoOperacao
+from services.carga_operacoes import CargaOperacoes
+from services.rollups import atualizar_rollups
 from .api_client import ComexStatAPIClient
 from .transformer import DataTransformer
 
@@ -163,10 +164,8 @@ class DataCollector:
                     filepath = await self.csv_scraper.download_month_csv(ano, mes, tipo)
                     
                     if filepath:
-                        # Parse do arquivo CSV
-                        raw_data = self.csv_scraper.parse_csv_file(filepath)
-                        
-                        if raw_data:
+                        # Parse do arquivo CSV em lotes (transformados e salvos um a um)
+                        for raw_data in self.csv_scraper.iterar_lotes_csv(filepath):
                             # Transformar dados
                             transformed = self.transformer.transform_csv_data(
                                 raw_data,
@@ -274,45 +273,21 @@ class DataCollector:
     ) -> int:
         """
         Salva registros no banco de dados.
-        Implementa atualização incremental (não duplica dados).
+        Implementa atualização incremental (não duplica dados): a chave natural
+        (NCM, tipo, data, país, UF) é conferida para o lote inteiro de uma vez e
+        só os registros novos são gravados pela carga em massa
+        (services.carga_operacoes).
         
         Returns:
             Número de registros salvos
         """
-        saved_count = 0
+        carga = CargaOperacoes(db, f"comexstat_{tipo}_{mes}")
+        saved_count = carga.carregar(records, deduplicar=True)
+        carga.relatorio()
+        logger.info(f"{saved_count} novos registros salvos para {mes} - {tipo}")
         
-        for record in records:
-            try:
-                # Verificar se já existe (evitar duplicatas)
-                existing = db.query(OperacaoComex).filter(
-                    and_(
-                        OperacaoComex.ncm == record.get("ncm"),
-                        OperacaoComex.tipo_operacao == record.get("tipo_operacao"),
-                        OperacaoComex.data_operacao == record.get("data_operacao"),
-                        OperacaoComex.pais_origem_destino == record.get("pais_origem_destino"),
-                        OperacaoComex.uf == record.get("uf"),
-                    )
-                ).first()
-                
-                if existing:
-                    continue  # Já existe, pular
-                
-                # Criar novo registro
-                operacao = OperacaoComex(**record)
-                db.add(operacao)
-                saved_count += 1
-            
-            except Exception as e:
-                logger.error(f"Erro ao salvar registro: {e}")
-                continue
-        
-        try:
-            db.commit()
-            logger.info(f"{saved_count} novos registros salvos para {mes} - {tipo}")
-        except Exception as e:
-            db.rollback()
-            logger.error(f"Erro ao commitar transação: {e}")
-            raise
+        if saved_count > 0:
+            atualizar_rollups(db, [mes])
         
         return saved_count
     
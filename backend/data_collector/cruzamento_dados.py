@@ -8,7 +8,8 @@ from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 
 from database import OperacaoComex
-from .empresas_mdic_scraper import EmpresasMDICScraper
+from services.empresas_mdic import indice_empresas_mdic
+from services.resolucao_empresas import IndiceNomesEmpresas, indice_nomes_empresas
 
 
 class CruzamentoDados:
@@ -17,35 +18,37 @@ class CruzamentoDados:
     """
     
     def __init__(self):
-        self.empresas_scraper = EmpresasMDICScraper()
         self.cache_empresas: Dict[str, Dict[str, Any]] = {}
+        # (índice por CNPJ, índice de nomes montado a partir dele)
+        self._nomes: Optional[tuple] = None
     
-    async def carregar_empresas_mdic(self, ano: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+    async def carregar_empresas_mdic(
+        self, ano: Optional[int] = None, db: Optional[Session] = None
+    ) -> Dict[str, Dict[str, Any]]:
         """
-        Carrega lista de empresas do MDIC e cria índice por CNPJ.
+        Carrega o índice de empresas do MDIC por CNPJ (tabela local empresas_mdic,
+        atualizada em segundo plano por services.empresas_mdic).
         
         Args:
-            ano: Ano específico (None = ano atual)
+            ano: Mantido por compatibilidade; o índice tem a última lista sincronizada
+            db: Sessão do banco (None = abre uma própria)
         
         Returns:
-            Dicionário indexado por CNPJ
+            Dicionário indexado por CNPJ (compartilhado; não alterar)
         """
-        empresas = await self.empresas_scraper.coletar_empresas(ano)
-        
-        # Criar índice por CNPJ
-        indice = {}
-        for empresa in empresas:
-            cnpj = empresa.get("cnpj")
-            if cnpj:
-                # Pode haver múltiplas empresas com mesmo CNPJ (exportadora e importadora)
-                if cnpj not in indice:
-                    indice[cnpj] = []
-                indice[cnpj].append(empresa)
-        
+        indice = indice_empresas_mdic(db)
         self.cache_empresas = indice
+        if db is not None:
+            self._nomes = (indice, indice_nomes_empresas(db))
         logger.info(f"✅ {len(indice)} CNPJs únicos carregados do MDIC")
         return indice
     
+    def _indice_nomes(self, empresas_mdic: Dict[str, Dict[str, Any]]) -> IndiceNomesEmpresas:
+        """Índice de nomes do dicionário de empresas (montado uma vez por dicionário)."""
+        if self._nomes is None or self._nomes[0] is not empresas_mdic:
+            self._nomes = (empresas_mdic, IndiceNomesEmpresas(empresas_mdic))
+        return self._nomes[1]
+    
     def cruzar_operacao_com_empresa(
         self,
         operacao: OperacaoComex,
@@ -102,15 +105,12 @@ class CruzamentoDados:
                 razao_social = operacao.razao_social_exportador
             
             if razao_social:
-                # Buscar por nome (busca parcial)
-                for cnpj, empresas_lista in empresas_mdic.items():
-                    for empresa in empresas_lista:
-                        if razao_social.lower() in empresa.get("razao_social", "").lower():
-                            empresa_encontrada = empresas_lista
-                            resultado["confianca"] = "media"  # Nome = confiança média
-                            break
-                    if empresa_encontrada:
-                        break
+                # Buscar por nome no índice invertido (tokens do nome, sem percorrer todas as empresas)
+                encontrado = self._indice_nomes(empresas_mdic).resolver(razao_social)
+                if encontrado:
+                    empresa_encontrada = empresas_mdic.get(encontrado[0])
+                    resultado["confianca"] = "media"  # Nome = confiança média
+                    resultado["pontuacao_nome"] = encontrado[1]
         
         if empresa_encontrada:
             resultado["empresa_identificada"] = True
@@ -145,7 +145,7 @@ class CruzamentoDados:
             Lista de operações cruzadas
         """
         # Carregar empresas do MDIC
-        await self.carregar_empresas_mdic()
+        await self.carregar_empresas_mdic(db=db)
         
         # Buscar operações
         query = db.query(OperacaoComex)
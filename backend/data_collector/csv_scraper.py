@@ -6,13 +6,14 @@ e baixa os arquivos CSV disponíveis.
 import aiohttp
 import asyncio
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional
 from datetime import datetime, timedelta
 from loguru import logger
-import csv
-import io
 
 from config import settings
+from services.clientes_http import obter_sessao
+from services.gerenciador_downloads import GerenciadorDownloads
+from services.leitura_csv import ler_registros_em_lotes
 
 
 class CSVDataScraper:
@@ -32,6 +33,21 @@ class CSVDataScraper:
         self.data_dir = settings.data_dir / "csv_downloads"
         self.data_dir.mkdir(parents=True, exist_ok=True)
         self.timeout = aiohttp.ClientTimeout(total=300)  # 5 minutos para downloads grandes
+        self.downloads = GerenciadorDownloads(self.data_dir)
+    
+    def _urls_mes(self, ano: int, mes: int, tipo_operacao: str):
+        """URLs candidatas e caminho local do CSV de um mês."""
+        tipo = "importacao" if tipo_operacao.lower() == "importação" else "exportacao"
+        mes_str = f"{mes:02d}"
+        
+        # Tentar diferentes formatos de URL
+        urls_to_try = [
+            f"https://balanca.economia.gov.br/balanca/bd/comexstat-bd/ncm/{tipo.upper()}_{ano}_{mes_str}.csv",
+            f"https://balanca.economia.gov.br/balanca/bd/comexstat-bd/ncm/{tipo.upper()}_{ano}{mes_str}.csv",
+            f"https://balanca.economia.gov.br/balanca/bd/comexstat-bd/ncm/{tipo}_{ano}_{mes_str}.csv",
+            f"https://balanca.economia.gov.br/balanca/bd/comexstat-bd/ncm/{tipo}_{ano}{mes_str}.csv",
+        ]
+        return urls_to_try, self.data_dir / f"{tipo}_{ano}_{mes_str}.csv"
         
     async def download_month_csv(
         self,
@@ -50,50 +66,9 @@ class CSVDataScraper:
         Returns:
             Caminho do arquivo baixado ou None
         """
-        tipo = "importacao" if tipo_operacao.lower() == "importação" else "exportacao"
-        mes_str = f"{mes:02d}"
-        
-        # Tentar diferentes formatos de URL
-        urls_to_try = [
-            f"https://balanca.economia.gov.br/balanca/bd/comexstat-bd/ncm/{tipo.upper()}_{ano}_{mes_str}.csv",
-            f"https://balanca.economia.gov.br/balanca/bd/comexstat-bd/ncm/{tipo.upper()}_{ano}{mes_str}.csv",
-            f"https://balanca.economia.gov.br/balanca/bd/comexstat-bd/ncm/{tipo}_{ano}_{mes_str}.csv",
-            f"https://balanca.economia.gov.br/balanca/bd/comexstat-bd/ncm/{tipo}_{ano}{mes_str}.csv",
-        ]
-        
-        filename = f"{tipo}_{ano}_{mes_str}.csv"
-        filepath = self.data_dir / filename
-        
-        # Se já existe, retornar
-        if filepath.exists() and filepath.stat().st_size > 0:
-            logger.info(f"Arquivo já existe: {filepath}")
-            return filepath
-        
-        connector = aiohttp.TCPConnector(ssl=False, limit=10)
-        async with aiohttp.ClientSession(timeout=self.timeout, connector=connector) as session:
-            for url in urls_to_try:
-                try:
-                    logger.info(f"Tentando baixar: {url}")
-                    async with session.get(url, headers={"User-Agent": "Mozilla/5.0"}) as response:
-                        if response.status == 200:
-                            content_type = response.headers.get("content-type", "").lower()
-                            if "csv" in content_type or "text" in content_type:
-                                # Baixar arquivo
-                                content = await response.read()
-                                if len(content) > 100:  # Arquivo válido deve ter mais de 100 bytes
-                                    filepath.write_bytes(content)
-                                    logger.success(f"✅ Arquivo baixado: {filepath} ({len(content)} bytes)")
-                                    return filepath
-                                else:
-                                    logger.warning(f"Arquivo muito pequeno: {len(content)} bytes")
-                        else:
-                            logger.debug(f"Status {response.status} para {url}")
-                except Exception as e:
-                    logger.debug(f"Erro ao baixar {url}: {e}")
-                    continue
-        
-        logger.warning(f"⚠️ Não foi possível baixar CSV para {tipo} {ano}-{mes_str}")
-        return None
+        # Arquivo já baixado só é baixado de novo se mudou no servidor (ETag/tamanho)
+        urls_to_try, filepath = self._urls_mes(ano, mes, tipo_operacao)
+        return await self.downloads.baixar(urls_to_try, filepath)
     
     async def download_recent_months(
         self,
@@ -108,32 +83,49 @@ class CSVDataScraper:
         Returns:
             Lista de caminhos dos arquivos baixados
         """
-        downloaded_files = []
         hoje = datetime.now()
         
         tipos = ["Importação", "Exportação"]
         
+        # Downloads em paralelo (settings.download_concorrencia arquivos por vez)
+        itens = []
         for i in range(meses):
             data = hoje - timedelta(days=30 * i)
-            ano = data.year
-            mes = data.month
-            
             for tipo in tipos:
-                try:
-                    filepath = await self.download_month_csv(ano, mes, tipo)
-                    if filepath:
-                        downloaded_files.append(filepath)
-                    # Pequeno delay entre downloads
-                    await asyncio.sleep(1)
-                except Exception as e:
-                    logger.error(f"Erro ao baixar {tipo} {ano}-{mes:02d}: {e}")
+                itens.append(self._urls_mes(data.year, data.month, tipo))
+        
+        downloaded_files = await self.downloads.baixar_varios(itens)
         
         logger.info(f"✅ Total de arquivos baixados: {len(downloaded_files)}")
         return downloaded_files
     
+    def iterar_lotes_csv(
+        self,
+        filepath: Path,
+        tamanho_lote: Optional[int] = None
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Lê um arquivo CSV em lotes de registros, sem carregar o arquivo inteiro.
+        
+        Args:
+            filepath: Caminho do arquivo CSV
+            tamanho_lote: Registros por lote (padrão: settings.import_batch_rows)
+        
+        Yields:
+            Listas de dicionários (colunas em minúsculas, espaços viram _; vazios = None)
+        """
+        try:
+            yield from ler_registros_em_lotes(
+                filepath, tamanho_lote, separador=";",
+                normalizar=lambda chave: chave.strip().lower().replace(' ', '_')
+            )
+        except Exception as e:
+            logger.error(f"Erro ao processar CSV {filepath}: {e}")
+    
     def parse_csv_file(self, filepath: Path) -> List[Dict[str, Any]]:
         """
         Processa um arquivo CSV e retorna lista de registros.
+        Para arquivos grandes, prefira iterar_lotes_csv (memória limitada ao lote).
         
         Args:
             filepath: Caminho do arquivo CSV
@@ -141,43 +133,7 @@ class CSVDataScraper:
         Returns:
             Lista de dicionários com os dados
         """
-        registros = []
-        
-        try:
-            # Tentar diferentes encodings
-            encodings = ['utf-8', 'latin-1', 'iso-8859-1', 'cp1252']
-            content = None
-            
-            for encoding in encodings:
-                try:
-                    content = filepath.read_text(encoding=encoding)
-                    break
-                except UnicodeDecodeError:
-                    continue
-            
-            if content is None:
-                logger.error(f"Não foi possível ler {filepath} com nenhum encoding")
-                return []
-            
-            # Ler CSV
-            reader = csv.DictReader(io.StringIO(content), delimiter=';')
-            
-            for row in reader:
-                # Normalizar nomes das colunas (remover espaços, converter para minúsculas)
-                registro = {}
-                for key, value in row.items():
-                    # Normalizar chave
-                    key_normalized = key.strip().lower().replace(' ', '_')
-                    registro[key_normalized] = value.strip() if value else None
-                
-                registros.append(registro)
-            
-            logger.info(f"✅ Processados {len(registros)} registros de {filepath.name}")
-            return registros
-            
-        except Exception as e:
-            logger.error(f"Erro ao processar CSV {filepath}: {e}")
-            return []
+        return [registro for lote in self.iterar_lotes_csv(filepath) for registro in lote]
     
     async def get_available_files(self) -> List[Dict[str, Any]]:
         """
@@ -187,35 +143,35 @@ class CSVDataScraper:
         Returns:
             Lista de dicionários com informações dos arquivos disponíveis
         """
-        available_files = []
         hoje = datetime.now()
-        
-        # Verificar últimos 24 meses
+        session = obter_sessao()
+        timeout = aiohttp.ClientTimeout(total=10)
+        
+        async def verificar(ano: int, mes: int, tipo: str) -> Optional[Dict[str, Any]]:
+            url = f"https://balanca.economia.gov.br/balanca/bd/comexstat-bd/ncm/{tipo.upper()}_{ano}_{mes:02d}.csv"
+            try:
+                async with session.head(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=timeout) as response:
+                    if response.status == 200:
+                        size = response.headers.get("content-length", "unknown")
+                        return {
+                            "url": url,
+                            "tipo": tipo,
+                            "ano": ano,
+                            "mes": mes,
+                            "size": size
+                        }
+            except Exception:
+                pass
+            return None
+        
+        # Verificar últimos 24 meses (em paralelo; a sessão limita as conexões por host)
+        sondagens = []
         for i in range(24):
             data = hoje - timedelta(days=30 * i)
-            ano = data.year
-            mes = data.month
-            
             for tipo in ["importacao", "exportacao"]:
-                url = f"https://balanca.economia.gov.br/balanca/bd/comexstat-bd/ncm/{tipo.upper()}_{ano}_{mes:02d}.csv"
-                
-                try:
-                    connector = aiohttp.TCPConnector(ssl=False)
-                    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10), connector=connector) as session:
-                        async with session.head(url, headers={"User-Agent": "Mozilla/5.0"}) as response:
-                            if response.status == 200:
-                                size = response.headers.get("content-length", "unknown")
-                                available_files.append({
-                                    "url": url,
-                                    "tipo": tipo,
-                                    "ano": ano,
-                                    "mes": mes,
-                                    "size": size
-                                })
-                except:
-                    pass
-        
-        return available_files
+                sondagens.append(verificar(data.year, data.month, tipo))
+        
+        return [arquivo for arquivo in await asyncio.gather(*sondagens) if arquivo]
 
 
 
@@ -10,9 +10,11 @@ from datetime import datetime
 from loguru import logger
 import csv
 import io
+import json
 import re
 
 from config import settings
+from services.clientes_http import obter_sessao
 
 
 class EmpresasMDICScraper:
@@ -28,10 +30,31 @@ class EmpresasMDICScraper:
         "https://www.gov.br/mdic/pt-br/assuntos/comercio-exterior/estatisticas/base-de-dados-bruta",
     ]
     
+    # Validadores HTTP (ETag/Last-Modified) dos arquivos baixados, por URL
+    SNAPSHOT_ARQUIVO = "snapshot.json"
+    
     def __init__(self):
         self.data_dir = settings.data_dir / "empresas_mdic"
         self.data_dir.mkdir(parents=True, exist_ok=True)
         self.timeout = aiohttp.ClientTimeout(total=300)
+        # Arquivos efetivamente baixados (novos ou alterados) na última coleta
+        self.arquivos_alterados: List[Path] = []
+    
+    def _carregar_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        caminho = self.data_dir / self.SNAPSHOT_ARQUIVO
+        if not caminho.exists():
+            return {}
+        try:
+            return json.loads(caminho.read_text(encoding="utf-8"))
+        except Exception as e:
+            logger.warning(f"⚠️ Snapshot de empresas MDIC ilegível, ignorando: {e}")
+            return {}
+    
+    def _salvar_snapshot(self, snapshot: Dict[str, Dict[str, Any]]) -> None:
+        caminho = self.data_dir / self.SNAPSHOT_ARQUIVO
+        temporario = caminho.with_suffix(".tmp")
+        temporario.write_text(json.dumps(snapshot, ensure_ascii=False, indent=2), encoding="utf-8")
+        temporario.replace(caminho)
         
     async def buscar_urls_arquivos(self, ano: Optional[int] = None) -> List[Dict[str, Any]]:
         """
@@ -48,52 +71,55 @@ class EmpresasMDICScraper:
         
         arquivos_encontrados = []
         
-        connector = aiohttp.TCPConnector(ssl=False)
-        async with aiohttp.ClientSession(timeout=self.timeout, connector=connector) as session:
-            for base_url in self.LISTA_EMPRESAS_URLS:
-                try:
-                    async with session.get(base_url, headers={"User-Agent": "Mozilla/5.0"}) as response:
-                        if response.status == 200:
-                            html = await response.text()
-                            
-                            # Procurar links para arquivos CSV/XLSX
-                            # Padrões comuns: empresas_exportadoras_2024.csv, lista_empresas_2024.xlsx
-                            patterns = [
-                                rf'href=["\']([^"\']*empresas?[^"\']*{ano}[^"\']*\.(csv|xlsx|xls))["\']',
-                                rf'href=["\']([^"\']*lista[^"\']*empresas?[^"\']*{ano}[^"\']*\.(csv|xlsx|xls))["\']',
-                                rf'href=["\']([^"\']*exportadoras?[^"\']*{ano}[^"\']*\.(csv|xlsx|xls))["\']',
-                                rf'href=["\']([^"\']*importadoras?[^"\']*{ano}[^"\']*\.(csv|xlsx|xls))["\']',
-                            ]
-                            
-                            for pattern in patterns:
-                                matches = re.findall(pattern, html, re.IGNORECASE)
-                                for match in matches:
-                                    url = match[0] if isinstance(match, tuple) else match
-                                    # Converter URL relativa para absoluta
-                                    if url.startswith('/'):
-                                        from urllib.parse import urljoin
-                                        url = urljoin(base_url, url)
-                                    elif not url.startswith('http'):
-                                        url = f"{base_url}/{url}"
-                                    
-                                    arquivos_encontrados.append({
-                                        "url": url,
-                                        "ano": ano,
-                                        "tipo": "empresas_mdic",
-                                        "fonte": base_url
-                                    })
-                except Exception as e:
-                    logger.debug(f"Erro ao buscar em {base_url}: {e}")
+        session = obter_sessao()
+        for base_url in self.LISTA_EMPRESAS_URLS:
+            try:
+                async with session.get(base_url, headers={"User-Agent": "Mozilla/5.0"}, timeout=self.timeout) as response:
+                    if response.status == 200:
+                        html = await response.text()
+                        
+                        # Procurar links para arquivos CSV/XLSX
+                        # Padrões comuns: empresas_exportadoras_2024.csv, lista_empresas_2024.xlsx
+                        patterns = [
+                            rf'href=["\']([^"\']*empresas?[^"\']*{ano}[^"\']*\.(csv|xlsx|xls))["\']',
+                            rf'href=["\']([^"\']*lista[^"\']*empresas?[^"\']*{ano}[^"\']*\.(csv|xlsx|xls))["\']',
+                            rf'href=["\']([^"\']*exportadoras?[^"\']*{ano}[^"\']*\.(csv|xlsx|xls))["\']',
+                            rf'href=["\']([^"\']*importadoras?[^"\']*{ano}[^"\']*\.(csv|xlsx|xls))["\']',
+                        ]
+                        
+                        for pattern in patterns:
+                            matches = re.findall(pattern, html, re.IGNORECASE)
+                            for match in matches:
+                                url = match[0] if isinstance(match, tuple) else match
+                                # Converter URL relativa para absoluta
+                                if url.startswith('/'):
+                                    from urllib.parse import urljoin
+                                    url = urljoin(base_url, url)
+                                elif not url.startswith('http'):
+                                    url = f"{base_url}/{url}"
+                                
+                                arquivos_encontrados.append({
+                                    "url": url,
+                                    "ano": ano,
+                                    "tipo": "empresas_mdic",
+                                    "fonte": base_url
+                                })
+            except Exception as e:
+                logger.debug(f"Erro ao buscar em {base_url}: {e}")
         
         return arquivos_encontrados
     
-    async def download_arquivo(self, url: str, tipo: str = "exportadoras") -> Optional[Path]:
+    async def download_arquivo(
+        self, url: str, tipo: str = "exportadoras", condicional: bool = False
+    ) -> Optional[Path]:
         """
         Baixa um arquivo de lista de empresas.
         
         Args:
             url: URL do arquivo
             tipo: Tipo ('exportadoras' ou 'importadoras')
+            condicional: Se o arquivo já existe, revalida com If-None-Match/If-Modified-Since
+                em vez de reaproveitá-lo sem consultar o servidor
         
         Returns:
             Caminho do arquivo baixado ou None
@@ -103,27 +129,51 @@ class EmpresasMDICScraper:
             filename = f"empresas_{tipo}_{datetime.now().year}.csv"
         
         filepath = self.data_dir / filename
+        existe = filepath.exists() and filepath.stat().st_size > 0
         
         # Se já existe, retornar
-        if filepath.exists() and filepath.stat().st_size > 0:
+        if existe and not condicional:
             logger.info(f"Arquivo já existe: {filepath}")
             return filepath
         
+        snapshot = self._carregar_snapshot()
+        headers = {"User-Agent": "Mozilla/5.0"}
+        validadores = snapshot.get(url) or {}
+        if existe:
+            if validadores.get("etag"):
+                headers["If-None-Match"] = validadores["etag"]
+            if validadores.get("last_modified"):
+                headers["If-Modified-Since"] = validadores["last_modified"]
+        
         try:
-            connector = aiohttp.TCPConnector(ssl=False)
-            async with aiohttp.ClientSession(timeout=self.timeout, connector=connector) as session:
-                async with session.get(url, headers={"User-Agent": "Mozilla/5.0"}) as response:
-                    if response.status == 200:
-                        content = await response.read()
-                        filepath.write_bytes(content)
-                        logger.success(f"✅ Arquivo baixado: {filepath} ({len(content)} bytes)")
-                        return filepath
-                    else:
-                        logger.warning(f"Status {response.status} para {url}")
+            session = obter_sessao()
+            async with session.get(url, headers=headers, timeout=self.timeout) as response:
+                if response.status == 304 and existe:
+                    logger.info(f"Arquivo sem alterações no servidor: {filepath}")
+                    return filepath
+                if response.status == 200:
+                    content = await response.read()
+                    temporario = filepath.with_suffix(filepath.suffix + ".tmp")
+                    temporario.write_bytes(content)
+                    temporario.replace(filepath)
+                    snapshot[url] = {
+                        "arquivo": filename,
+                        "etag": response.headers.get("ETag"),
+                        "last_modified": response.headers.get("Last-Modified"),
+                        "tamanho": len(content),
+                        "baixado_em": datetime.now().isoformat(),
+                    }
+                    self._salvar_snapshot(snapshot)
+                    self.arquivos_alterados.append(filepath)
+                    logger.success(f"✅ Arquivo baixado: {filepath} ({len(content)} bytes)")
+                    return filepath
+                else:
+                    logger.warning(f"Status {response.status} para {url}")
         except Exception as e:
             logger.error(f"Erro ao baixar {url}: {e}")
         
-        return None
+        # Falha na revalidação: a cópia em disco continua valendo
+        return filepath if existe else None
     
     def parse_csv_empresas(self, filepath: Path) -> List[Dict[str, Any]]:
         """
@@ -193,15 +243,17 @@ class EmpresasMDICScraper:
         cnpj_limpo = re.sub(r'[^\d]', '', str(cnpj))
         return cnpj_limpo[:14]  # CNPJ tem 14 dígitos
     
-    async def coletar_empresas(self, ano: Optional[int] = None) -> List[Dict[str, Any]]:
+    async def baixar_arquivos(self, ano: Optional[int] = None, condicional: bool = False) -> List[Path]:
         """
-        Coleta lista completa de empresas.
+        Localiza e baixa os arquivos da lista de empresas.
         
         Args:
             ano: Ano específico (None = ano atual)
+            condicional: Revalida os arquivos já baixados (ETag/Last-Modified);
+                os que mudaram ficam em self.arquivos_alterados
         
         Returns:
-            Lista de empresas
+            Caminhos dos arquivos em disco
         """
         logger.info(f"Coletando lista de empresas do MDIC para {ano or 'ano atual'}")
         
@@ -225,19 +277,35 @@ class EmpresasMDICScraper:
                     "fonte": "url_conhecida"
                 })
         
-        todas_empresas = []
+        caminhos = []
+        self.arquivos_alterados = []
         
         for arquivo_info in arquivos:
             url = arquivo_info["url"]
             tipo = "exportadoras" if "exportadora" in url.lower() else "importadoras"
             
-            filepath = await self.download_arquivo(url, tipo)
-            if filepath:
-                empresas = self.parse_csv_empresas(filepath)
-                todas_empresas.extend(empresas)
+            filepath = await self.download_arquivo(url, tipo, condicional=condicional)
+            if filepath and filepath not in caminhos:
+                caminhos.append(filepath)
+        
+        return caminhos
+    
+    async def coletar_empresas(self, ano: Optional[int] = None, condicional: bool = False) -> List[Dict[str, Any]]:
+        """
+        Coleta lista completa de empresas direto dos arquivos do MDIC.
+        Para consultas use services.empresas_mdic.indice_empresas_mdic (tabela local).
+        
+        Args:
+            ano: Ano específico (None = ano atual)
+            condicional: Revalida os arquivos já baixados (ETag/Last-Modified);
+                os que mudaram ficam em self.arquivos_alterados
+        
+        Returns:
+            Lista de empresas
+        """
+        todas_empresas = []
+        for filepath in await self.baixar_arquivos(ano, condicional=condicional):
+            todas_empresas.extend(self.parse_csv_empresas(filepath))
         
         logger.info(f"✅ Total de empresas coletadas: {len(todas_empresas)}")
         return todas_empresas
-
-
-
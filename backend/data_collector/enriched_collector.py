@@ -6,13 +6,15 @@ from typing import List, Dict, Any, Optional
 from pathlib import Path
 from loguru import logger
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from sqlalchemy import or_, func
 
 from database import OperacaoComex
+from services.carga_operacoes import CargaOperacoes
+from services.cnae import obter_cnae_analyzer
+from services.empresas_mdic import indice_empresas_mdic
+from services.rollups import atualizar_rollups
 from .mdic_csv_collector import MDICCSVCollector
 from .transformer import DataTransformer
-from .cnae_analyzer import CNAEAnalyzer
-from .empresas_mdic_scraper import EmpresasMDICScraper
 from config import settings
 
 # Import opcional do scraper automático
@@ -33,7 +35,6 @@ class EnrichedDataCollector:
         self.csv_collector = MDICCSVCollector()
         self.transformer = DataTransformer()
         self.cnae_analyzer = None
-        self.empresas_scraper = EmpresasMDICScraper()
         
         # Inicializar scraper automático se disponível
         self.comexstat_scraper = None
@@ -44,12 +45,10 @@ class EnrichedDataCollector:
             except Exception as e:
                 logger.warning(f"Scraper automático não pôde ser inicializado: {e}")
         
-        # Tentar carregar CNAE
+        # CNAE compartilhado pelo processo (carregado uma vez)
         try:
-            arquivo_cnae = Path("C:/Users/User/Desktop/Cursor/NOVO CNAE.xlsx")
-            if arquivo_cnae.exists():
-                self.cnae_analyzer = CNAEAnalyzer(arquivo_cnae)
-                self.cnae_analyzer.carregar_cnae_excel()
+            self.cnae_analyzer = obter_cnae_analyzer()
+            if self.cnae_analyzer:
                 logger.info("✅ CNAE carregado para enriquecimento")
         except Exception as e:
             logger.warning(f"CNAE não disponível: {e}")
@@ -195,35 +194,40 @@ class EnrichedDataCollector:
                         tipo_operacao = "Importação" if tipo_op == "IMP" else "Exportação"
                         mes_str = f"{ano}-{mes:02d}"
                         
-                        # Processar CSV
+                        # Processar CSV em lotes (ler, transformar e salvar um lote por vez)
                         try:
-                            registros_raw = self.csv_collector.parse_csv_file(filepath)
-                            
-                            if registros_raw:
+                            lidos = transformados = novos = atualizados = 0
+                            for registros_raw in self.csv_collector.iterar_lotes_csv(filepath):
+                                lidos += len(registros_raw)
                                 # Transformar para formato do banco
                                 registros_transformados = self.transformer.transform_csv_data(
                                     registros_raw,
                                     mes_str,
                                     tipo_operacao
                                 )
+                                if not registros_transformados:
+                                    continue
+                                # Salvar no banco
+                                salvos = self._save_to_database(db, registros_transformados, mes_str, tipo_operacao)
+                                transformados += len(registros_transformados)
+                                novos += salvos["novos"]
+                                atualizados += salvos["atualizados"]
+                            
+                            if transformados:
+                                stats["total_registros"] += transformados
+                                stats["registros_novos"] += novos
+                                stats["registros_atualizados"] += atualizados
+                                
+                                if mes_str not in stats["meses_processados"]:
+                                    stats["meses_processados"].append(mes_str)
                                 
-                                if registros_transformados:
-                                    # Salvar no banco
-                                    salvos = self._save_to_database(db, registros_transformados, mes_str, tipo_operacao)
-                                    stats["total_registros"] += len(registros_transformados)
-                                    stats["registros_novos"] += salvos["novos"]
-                                    stats["registros_atualizados"] += salvos["atualizados"]
-                                    
-                                    if mes_str not in stats["meses_processados"]:
-                                        stats["meses_processados"].append(mes_str)
-                                    
-                                    logger.info(
-                                        f"✅ {tipo_operacao} {mes_str}: "
-                                        f"{len(registros_transformados)} registros "
-                                        f"({salvos['novos']} novos, {salvos['atualizados']} atualizados)"
-                                    )
-                                else:
-                                    logger.warning(f"⚠️ Nenhum registro transformado de {filepath.name}")
+                                logger.info(
+                                    f"✅ {tipo_operacao} {mes_str}: "
+                                    f"{transformados} registros "
+                                    f"({novos} novos, {atualizados} atualizados)"
+                                )
+                            elif lidos:
+                                logger.warning(f"⚠️ Nenhum registro transformado de {filepath.name}")
                             else:
                                 logger.warning(f"⚠️ Arquivo vazio ou inválido: {filepath.name}")
                         except Exception as e:
@@ -265,47 +269,20 @@ class EnrichedDataCollector:
     ) -> Dict[str, int]:
         """
         Salva registros no banco de dados, evitando duplicatas.
+        Chave única: NCM + Data + Tipo + País + UF, conferida para o lote inteiro
+        de uma vez; existentes são atualizados e novos gravados pela carga em
+        massa (services.carga_operacoes).
         
         Returns:
             Dicionário com contagem de novos e atualizados
         """
-        novos = 0
-        atualizados = 0
+        carga = CargaOperacoes(db, f"mdic_csv_{tipo_operacao}_{mes}")
+        novos = carga.carregar(registros, deduplicar=True, atualizar=True)
+        atualizados = carga.atualizados
+        carga.relatorio()
         
-        for registro in registros:
-            try:
-                # Verificar se já existe (usar chave única: NCM + Data + Tipo + País + UF)
-                existing = db.query(OperacaoComex).filter(
-                    and_(
-                        OperacaoComex.ncm == registro.get("ncm"),
-                        OperacaoComex.data_operacao == registro.get("data_operacao"),
-                        OperacaoComex.tipo_operacao == registro.get("tipo_operacao"),
-                        OperacaoComex.pais_origem_destino == registro.get("pais_origem_destino"),
-                        OperacaoComex.uf == registro.get("uf")
-                    )
-                ).first()
-                
-                if existing:
-                    # Atualizar registro existente
-                    for key, value in registro.items():
-                        if value is not None:
-                            setattr(existing, key, value)
-                    atualizados += 1
-                else:
-                    # Criar novo registro
-                    nova_operacao = OperacaoComex(**registro)
-                    db.add(nova_operacao)
-                    novos += 1
-                
-            except Exception as e:
-                logger.error(f"Erro ao salvar registro: {e}")
-                continue
-        
-        try:
-            db.commit()
-        except Exception as e:
-            logger.error(f"Erro ao commitar: {e}")
-            db.rollback()
+        if novos or atualizados:
+            atualizar_rollups(db, [mes])
         
         return {"novos": novos, "atualizados": atualizados}
     
@@ -317,8 +294,8 @@ class EnrichedDataCollector:
             Número de operações enriquecidas
         """
         try:
-            # Carregar empresas do MDIC
-            empresas_mdic = await self.empresas_scraper.coletar_empresas()
+            # Empresas do MDIC (tabela local, índice compartilhado)
+            empresas_mdic = list(indice_empresas_mdic(db).values())
             
             # Criar índice por CNPJ e Razão Social
             empresas_index = {}
@@ -343,6 +320,7 @@ class EnrichedDataCollector:
             ).limit(10000).all()
             
             enriquecidas = 0
+            meses_enriquecidos = set()
             
             for op in operacoes_sem_empresa:
                 atualizada = False
@@ -365,10 +343,12 @@ class EnrichedDataCollector:
                 
                 if atualizada:
                     enriquecidas += 1
+                    meses_enriquecidos.add(op.mes_referencia)
             
             if enriquecidas > 0:
                 db.commit()
                 logger.info(f"✅ {enriquecidas} operações enriquecidas com empresas do MDIC")
+                atualizar_rollups(db, meses_enriquecidos)
             
             return enriquecidas
             
@@ -403,7 +383,7 @@ class EnrichedDataCollector:
         
         try:
             # 1. Buscar empresas do MDIC que operam com esse NCM
-            empresas_mdic = await self.empresas_scraper.coletar_empresas()
+            empresas_mdic = list(indice_empresas_mdic(db).values())
             
             # 2. Buscar operações no banco para identificar padrões
             query = db.query(OperacaoComex)
@@ -6,7 +6,7 @@ https://www.gov.br/mdic/pt-br/assuntos/comercio-exterior/estatisticas/base-de-da
 import aiohttp
 import asyncio
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional
 from datetime import datetime, timedelta
 from loguru import logger
 import io
@@ -21,6 +21,9 @@ except ImportError:
     logger.warning("pandas não disponível - funcionalidade de tabelas limitada")
 
 from config import settings
+from services.clientes_http import obter_sessao
+from services.gerenciador_downloads import GerenciadorDownloads
+from services.leitura_csv import ler_registros_em_lotes
 
 
 class MDICCSVCollector:
@@ -49,6 +52,24 @@ class MDICCSVCollector:
         self.tables_dir = self.data_dir / "tabelas"
         self.tables_dir.mkdir(parents=True, exist_ok=True)
         self.timeout = aiohttp.ClientTimeout(total=600)  # 10 minutos para downloads grandes
+        # Downloads em paralelo, gravados em blocos, retomáveis e revalidados por ETag/tamanho
+        self._gerenciadores: Dict[Path, GerenciadorDownloads] = {}
+    
+    def _downloads(self, diretorio: Path) -> GerenciadorDownloads:
+        """Gerenciador de downloads de um diretório (metadados em <diretorio>/downloads.json)."""
+        if diretorio not in self._gerenciadores:
+            self._gerenciadores[diretorio] = GerenciadorDownloads(diretorio)
+        return self._gerenciadores[diretorio]
+    
+    def _urls_mes(self, ano: int, mes: int, tipo_op: str):
+        """URLs candidatas e caminho local do CSV de um mês ('IMP' ou 'EXP')."""
+        mes_str = f"{mes:02d}"
+        # Tentar diferentes formatos de URL
+        urls = [
+            f"{self.BASE_URL}/ncm/{tipo_op}_{ano}_{mes_str}.csv",
+            f"{self.BASE_URL}/ncm/{tipo_op}_{ano}{mes_str}.csv",
+        ]
+        return urls, self.data_dir / f"{tipo_op}_{ano}_{mes_str}.csv"
         
     async def download_file(
         self,
@@ -62,58 +83,13 @@ class MDICCSVCollector:
         Args:
             url: URL do arquivo
             filepath: Caminho onde salvar
-            session: Sessão HTTP (opcional)
+            session: Sessão HTTP (padrão: a sessão compartilhada)
         
         Returns:
-            True se baixou com sucesso
+            True se o arquivo está disponível (baixado agora ou inalterado no servidor)
         """
-        close_session = False
-        if session is None:
-            connector = aiohttp.TCPConnector(ssl=False, limit=10)
-            session = aiohttp.ClientSession(timeout=self.timeout, connector=connector)
-            close_session = True
-        
-        try:
-            # Se arquivo já existe e tem tamanho válido, não baixar novamente
-            if filepath.exists() and filepath.stat().st_size > 1000:
-                logger.debug(f"Arquivo já existe: {filepath}")
-                return True
-            
-            logger.info(f"Baixando: {url}")
-            async with session.get(
-                url,
-                headers={"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
-            ) as response:
-                if response.status == 200:
-                    # Verificar Content-Type para garantir que é CSV, não HTML
-                    content_type = response.headers.get('Content-Type', '').lower()
-                    if 'html' in content_type:
-                        logger.warning(f"⚠️ URL retornou HTML em vez de CSV: {url} (Content-Type: {content_type})")
-                        return False
-                    
-                    content = await response.read()
-                    
-                    # Verificar se o conteúdo não é HTML (começa com <!DOCTYPE ou <html)
-                    content_start = content[:100].decode('utf-8', errors='ignore').strip().lower()
-                    if content_start.startswith('<!doctype') or content_start.startswith('<html'):
-                        logger.warning(f"⚠️ Arquivo baixado parece ser HTML, não CSV: {url}")
-                        return False
-                    
-                    if len(content) > 100:  # Arquivo válido
-                        filepath.write_bytes(content)
-                        logger.success(f"✅ Baixado: {filepath.name} ({len(content):,} bytes)")
-                        return True
-                    else:
-                        logger.warning(f"Arquivo muito pequeno: {len(content)} bytes")
-                else:
-                    logger.warning(f"Status {response.status} para {url} - arquivo não baixado")
-        except Exception as e:
-            logger.error(f"Erro ao baixar {url}: {e}")
-        finally:
-            if close_session:
-                await session.close()
-        
-        return False
+        filepath = Path(filepath)
+        return await self._downloads(filepath.parent).baixar([url], filepath, session) is not None
     
     async def download_correlation_tables(self) -> Dict[str, Path]:
         """
@@ -124,21 +100,15 @@ class MDICCSVCollector:
         """
         logger.info("Baixando tabelas de correlação do MDIC...")
         
-        downloaded = {}
-        connector = aiohttp.TCPConnector(ssl=False, limit=10)
-        async with aiohttp.ClientSession(timeout=self.timeout, connector=connector) as session:
-            tasks = []
-            for nome, url in self.CORRELATION_TABLES.items():
-                filepath = self.tables_dir / f"{nome}.csv"
-                task = self.download_file(url, filepath, session)
-                tasks.append((nome, task))
-            
-            # Executar downloads em paralelo
-            for nome, task in tasks:
-                success = await task
-                if success:
-                    downloaded[nome] = self.tables_dir / f"{nome}.csv"
-                    await asyncio.sleep(0.5)  # Pequeno delay entre downloads
+        # Executar downloads em paralelo
+        baixados = set(await self._downloads(self.tables_dir).baixar_varios(
+            ([url], self.tables_dir / f"{nome}.csv") for nome, url in self.CORRELATION_TABLES.items()
+        ))
+        downloaded = {
+            nome: self.tables_dir / f"{nome}.csv"
+            for nome in self.CORRELATION_TABLES
+            if self.tables_dir / f"{nome}.csv" in baixados
+        }
         
         logger.info(f"✅ Baixadas {len(downloaded)} tabelas de correlação")
         return downloaded
@@ -160,9 +130,6 @@ class MDICCSVCollector:
         Returns:
             Lista de arquivos baixados
         """
-        downloaded = []
-        mes_str = f"{mes:02d}"
-        
         tipos = []
         if tipo == "both":
             tipos = ["IMP", "EXP"]
@@ -171,26 +138,9 @@ class MDICCSVCollector:
         elif tipo == "exportacao":
             tipos = ["EXP"]
         
-        connector = aiohttp.TCPConnector(ssl=False, limit=10)
-        async with aiohttp.ClientSession(timeout=self.timeout, connector=connector) as session:
-            for tipo_op in tipos:
-                # Tentar diferentes formatos de URL
-                urls = [
-                    f"{self.BASE_URL}/ncm/{tipo_op}_{ano}_{mes_str}.csv",
-                    f"{self.BASE_URL}/ncm/{tipo_op}_{ano}{mes_str}.csv",
-                ]
-                
-                filename = f"{tipo_op}_{ano}_{mes_str}.csv"
-                filepath = self.data_dir / filename
-                
-                for url in urls:
-                    if await self.download_file(url, filepath, session):
-                        downloaded.append(filepath)
-                        break
-                
-                await asyncio.sleep(1)  # Delay entre downloads
-        
-        return downloaded
+        return await self._downloads(self.data_dir).baixar_varios(
+            self._urls_mes(ano, mes, tipo_op) for tipo_op in tipos
+        )
     
     async def download_recent_months(
         self,
@@ -207,105 +157,62 @@ class MDICCSVCollector:
         """
         logger.info(f"Baixando dados dos últimos {meses} meses...")
         
-        downloaded = []
         hoje = datetime.now()
         
-        connector = aiohttp.TCPConnector(ssl=False, limit=10)
-        async with aiohttp.ClientSession(timeout=self.timeout, connector=connector) as session:
-            for i in range(meses):
-                data = hoje - timedelta(days=30 * i)
-                ano = data.year
-                mes = data.month
-                
-                files = await self.download_monthly_data(ano, mes, "both")
-                downloaded.extend(files)
-                
-                # Delay progressivo para não sobrecarregar servidor
-                await asyncio.sleep(2)
+        # Downloads em paralelo (settings.download_concorrencia arquivos por vez);
+        # o limite por host da sessão compartilhada substitui as pausas entre arquivos
+        itens = []
+        for i in range(meses):
+            data = hoje - timedelta(days=30 * i)
+            for tipo_op in ["IMP", "EXP"]:
+                itens.append(self._urls_mes(data.year, data.month, tipo_op))
+        
+        downloaded = await self._downloads(self.data_dir).baixar_varios(itens)
         
         logger.info(f"✅ Total de arquivos baixados: {len(downloaded)}")
         return downloaded
     
-    def parse_csv_file(
+    def iterar_lotes_csv(
         self,
         filepath: Path,
-        delimiter: str = ";"
-    ) -> List[Dict[str, Any]]:
+        tamanho_lote: Optional[int] = None,
+        delimiter: Optional[str] = None
+    ) -> Iterator[List[Dict[str, Any]]]:
         """
-        Processa um arquivo CSV e retorna lista de registros.
+        Lê um arquivo CSV em lotes de registros, sem carregar o arquivo inteiro.
         
         Args:
             filepath: Caminho do arquivo CSV
-            delimiter: Delimitador (padrão: ;)
+            tamanho_lote: Registros por lote (padrão: settings.import_batch_rows)
+            delimiter: Delimitador (padrão: detectado no início do arquivo)
         
-        Returns:
-            Lista de dicionários com os dados
+        Yields:
+            Listas de dicionários com colunas normalizadas (valores vazios = None)
         """
-        registros = []
-        
         try:
-            # Tentar diferentes encodings
-            encodings = ['utf-8', 'latin-1', 'iso-8859-1', 'cp1252', 'windows-1252']
-            content = None
-            
-            for encoding in encodings:
-                try:
-                    content = filepath.read_text(encoding=encoding)
-                    break
-                except UnicodeDecodeError:
-                    continue
-            
-            if content is None:
-                logger.error(f"Não foi possível ler {filepath}")
-                return []
-            
-            # Verificar se o conteúdo não é HTML
-            content_start = content[:200].strip().lower()
-            if content_start.startswith('<!doctype') or content_start.startswith('<html'):
-                logger.error(f"⚠️ Arquivo parece ser HTML, não CSV: {filepath.name}")
-                logger.error(f"Primeiras linhas: {content[:500]}")
-                return []
-            
-            # Ler CSV
-            reader = csv.DictReader(io.StringIO(content), delimiter=delimiter)
-            
-            # Verificar se o reader tem campos válidos (não é HTML)
-            if not reader.fieldnames:
-                logger.warning(f"⚠️ CSV sem cabeçalhos válidos: {filepath.name}")
-                return []
-            
-            # Verificar se os campos não são tags HTML
-            first_field = list(reader.fieldnames)[0] if reader.fieldnames else ""
-            if first_field and ('<' in first_field or 'html' in first_field.lower()):
-                logger.error(f"⚠️ CSV parece conter HTML: {filepath.name} (primeiro campo: {first_field})")
-                return []
-            
-            # Resetar o reader após verificação
-            reader = csv.DictReader(io.StringIO(content), delimiter=delimiter)
-            
-            for row in reader:
-                # Normalizar nomes das colunas
-                registro = {}
-                for key, value in row.items():
-                    if key:
-                        key_normalized = key.strip().lower().replace(' ', '_').replace('-', '_')
-                        # Tratar valores: manter como string, None para vazios
-                        if value:
-                            registro[key_normalized] = value.strip()
-                        else:
-                            registro[key_normalized] = None
-                
-                if registro:  # Só adicionar se não estiver vazio
-                    registros.append(registro)
-            
-            logger.info(f"✅ Processados {len(registros)} registros de {filepath.name}")
-            return registros
-            
+            yield from ler_registros_em_lotes(filepath, tamanho_lote, separador=delimiter)
         except Exception as e:
             logger.error(f"Erro ao processar CSV {filepath}: {e}")
             import traceback
             logger.error(traceback.format_exc())
-            return []
+    
+    def parse_csv_file(
+        self,
+        filepath: Path,
+        delimiter: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Processa um arquivo CSV e retorna lista de registros.
+        Para arquivos grandes, prefira iterar_lotes_csv (memória limitada ao lote).
+        
+        Args:
+            filepath: Caminho do arquivo CSV
+            delimiter: Delimitador (padrão: detectado; os arquivos do MDIC usam ;)
+        
+        Returns:
+            Lista de dicionários com os dados
+        """
+        return [registro for lote in self.iterar_lotes_csv(filepath, delimiter=delimiter) for registro in lote]
     
     def load_correlation_table(self, table_name: str):
         """
@@ -364,41 +271,37 @@ class MDICCSVCollector:
         Returns:
             Lista de dicionários com informações dos arquivos
         """
-        available = []
         hoje = datetime.now()
-        
-        connector = aiohttp.TCPConnector(ssl=False)
+        session = obter_sessao()
         timeout = aiohttp.ClientTimeout(total=10)
         
-        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
-            # Verificar últimos 24 meses
-            for i in range(24):
-                data = hoje - timedelta(days=30 * i)
-                ano = data.year
-                mes = data.month
-                mes_str = f"{mes:02d}"
-                
-                for tipo in ["IMP", "EXP"]:
-                    url = f"{self.BASE_URL}/ncm/{tipo}_{ano}_{mes_str}.csv"
-                    
-                    try:
-                        async with session.head(
-                            url,
-                            headers={"User-Agent": "Mozilla/5.0"}
-                        ) as response:
-                            if response.status == 200:
-                                size = response.headers.get("content-length", "unknown")
-                                available.append({
-                                    "url": url,
-                                    "tipo": tipo,
-                                    "ano": ano,
-                                    "mes": mes,
-                                    "size": size
-                                })
-                    except:
-                        pass
-                
-                await asyncio.sleep(0.1)  # Pequeno delay
+        async def verificar(ano: int, mes: int, tipo: str) -> Optional[Dict[str, Any]]:
+            url = f"{self.BASE_URL}/ncm/{tipo}_{ano}_{mes:02d}.csv"
+            try:
+                async with session.head(
+                    url,
+                    headers={"User-Agent": "Mozilla/5.0"},
+                    timeout=timeout
+                ) as response:
+                    if response.status == 200:
+                        size = response.headers.get("content-length", "unknown")
+                        return {
+                            "url": url,
+                            "tipo": tipo,
+                            "ano": ano,
+                            "mes": mes,
+                            "size": size
+                        }
+            except Exception:
+                pass
+            return None
+        
+        # Verificar últimos 24 meses (em paralelo; a sessão limita as conexões por host)
+        sondagens = []
+        for i in range(24):
+            data = hoje - timedelta(days=30 * i)
+            for tipo in ["IMP", "EXP"]:
+                sondagens.append(verificar(data.year, data.month, tipo))
         
-        return available
+        return [arquivo for arquivo in await asyncio.gather(*sondagens) if arquivo]
 
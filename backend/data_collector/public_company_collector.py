@@ -18,7 +18,7 @@ import json
 backend_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_dir))
 
-from database.models import OperacaoComex
+from services.carga_operacoes import CargaOperacoes
 
 
 class PublicCompanyCollector:
@@ -335,6 +335,7 @@ class PublicCompanyCollector:
         
         logger.info(f"🔄 Integrando {stats['total_registros']} registros no banco de dados...")
         
+        operacoes = []
         for registro in self.dados_coletados:
             try:
                 ncm = registro.get("ncm")
@@ -353,39 +354,34 @@ class PublicCompanyCollector:
                 elif not isinstance(data_operacao, date):
                     data_operacao = date.today()
                 
-                operacao = OperacaoComex(
-                    ncm=ncm,
-                    descricao_produto=registro.get("descricao_ncm", ""),
-                    tipo_operacao=tipo_operacao,
-                    razao_social_importador=empresa_nome if tipo_operacao == "Importação" else None,
-                    razao_social_exportador=empresa_nome if tipo_operacao == "Exportação" else None,
-                    cnpj_importador=registro.get("cnpj") if tipo_operacao == "Importação" else None,
-                    cnpj_exportador=registro.get("cnpj") if tipo_operacao == "Exportação" else None,
-                    uf=registro.get("estado", ""),
-                    pais_origem_destino=registro.get("pais_origem_destino", ""),
-                    valor_fob=registro.get("valor_fob", 0.0),
-                    quantidade_estatistica=registro.get("quantidade"),
-                    data_operacao=data_operacao,
-                    mes_referencia=data_operacao.strftime("%Y-%m"),
-                    arquivo_origem=registro.get("fonte", "public_collector"),
-                    via_transporte="Outras",
-                )
-                
-                db.add(operacao)
-                stats["registros_inseridos"] += 1
+                # Tipo e via como texto ("Importação", "Outras"): a carga converte para o enum
+                operacoes.append({
+                    "ncm": ncm,
+                    "descricao_produto": registro.get("descricao_ncm", ""),
+                    "tipo_operacao": tipo_operacao,
+                    "razao_social_importador": empresa_nome if tipo_operacao == "Importação" else None,
+                    "razao_social_exportador": empresa_nome if tipo_operacao == "Exportação" else None,
+                    "cnpj_importador": registro.get("cnpj") if tipo_operacao == "Importação" else None,
+                    "cnpj_exportador": registro.get("cnpj") if tipo_operacao == "Exportação" else None,
+                    "uf": registro.get("estado", ""),
+                    "pais_origem_destino": registro.get("pais_origem_destino", ""),
+                    "valor_fob": registro.get("valor_fob", 0.0),
+                    "quantidade_estatistica": registro.get("quantidade"),
+                    "data_operacao": data_operacao,
+                    "mes_referencia": data_operacao.strftime("%Y-%m"),
+                    "arquivo_origem": registro.get("fonte", "public_collector"),
+                    "via_transporte": "Outras",
+                })
                 
             except Exception as e:
                 logger.error(f"❌ Erro ao integrar registro: {e}")
                 stats["erros"] += 1
                 continue
         
-        try:
-            db.commit()
-            logger.info(f"✅ Integração concluída: {stats['registros_inseridos']} inseridos")
-        except Exception as e:
-            db.rollback()
-            logger.error(f"❌ Erro ao commitar: {e}")
-            stats["erros"] += stats["registros_inseridos"]
-            stats["registros_inseridos"] = 0
+        carga = CargaOperacoes(db, "public_collector")
+        stats["registros_inseridos"] = carga.carregar(operacoes)
+        stats["erros"] += carga.rejeitados
+        carga.relatorio()
+        logger.info(f"✅ Integração concluída: {stats['registros_inseridos']} inseridos")
         
         return stats
@@ -5,7 +5,7 @@ Identifica oportunidades de negócio baseado em padrões de dados.
 from typing import List, Dict, Any, Optional
 from loguru import logger
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_, case
 
 from database import OperacaoComex, TipoOperacao
 from .cnae_analyzer import CNAEAnalyzer
@@ -25,109 +25,142 @@ class SinergiaAnalyzer:
         """
         self.cnae_analyzer = cnae_analyzer
     
-    def analisar_sinergias_por_estado(
+    def totais_por_estado(
         self,
         db: Session,
         uf: Optional[str] = None
-    ) -> Dict[str, Any]:
+    ) -> Dict[Optional[str], Dict[str, Dict[str, Any]]]:
         """
-        Analisa sinergias de importação/exportação por estado.
-        
-        Args:
-            db: Sessão do banco de dados
-            uf: UF específica (None = todos)
+        Totais de importação e exportação por UF, numa única consulta agrupada.
         
         Returns:
-            Dicionário com análise de sinergias
+            {uf: {"importacoes": {...}, "exportacoes": {...}}} com total, valor_total e peso_total
         """
-        logger.info(f"Analisando sinergias por estado: {uf or 'Todos'}")
-        
-        # Filtros
-        filtros = []
-        if uf:
-            filtros.append(OperacaoComex.uf == uf)
-        
-        # Importações por estado
-        importacoes = db.query(
-            OperacaoComex.uf,
-            func.count(OperacaoComex.id).label('total'),
-            func.sum(OperacaoComex.valor_fob).label('valor_total'),
-            func.sum(OperacaoComex.peso_liquido_kg).label('peso_total')
-        ).filter(
-            and_(
-                OperacaoComex.tipo_operacao == TipoOperacao.IMPORTACAO,
-                *filtros
-            )
-        ).group_by(OperacaoComex.uf).all()
-        
-        # Exportações por estado
-        exportacoes = db.query(
+        consulta = db.query(
             OperacaoComex.uf,
+            OperacaoComex.tipo_operacao,
             func.count(OperacaoComex.id).label('total'),
             func.sum(OperacaoComex.valor_fob).label('valor_total'),
             func.sum(OperacaoComex.peso_liquido_kg).label('peso_total')
-        ).filter(
-            and_(
-                OperacaoComex.tipo_operacao == TipoOperacao.EXPORTACAO,
-                *filtros
-            )
-        ).group_by(OperacaoComex.uf).all()
+        )
+        if uf:
+            consulta = consulta.filter(OperacaoComex.uf == uf)
         
-        # Criar dicionários
-        imp_por_uf = {
-            uf: {
+        totais: Dict[Optional[str], Dict[str, Dict[str, Any]]] = {}
+        for estado, tipo, total, valor_total, peso_total in consulta.group_by(
+            OperacaoComex.uf, OperacaoComex.tipo_operacao
+        ):
+            por_tipo = totais.setdefault(estado, {
+                "importacoes": {"total": 0, "valor_total": 0.0, "peso_total": 0.0},
+                "exportacoes": {"total": 0, "valor_total": 0.0, "peso_total": 0.0},
+            })
+            por_tipo["importacoes" if tipo == TipoOperacao.IMPORTACAO else "exportacoes"] = {
                 "total": int(total),
                 "valor_total": float(valor_total) if valor_total else 0.0,
                 "peso_total": float(peso_total) if peso_total else 0.0
             }
-            for uf, total, valor_total, peso_total in importacoes
+        return totais
+    
+    def sinergia_estado(
+        self,
+        estado: Optional[str],
+        imp: Dict[str, Any],
+        exp: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """Sinergia de um estado a partir dos totais (None se não importa e exporta)."""
+        # Estados que fazem ambos têm maior sinergia
+        if imp["total"] <= 0 or exp["total"] <= 0:
+            return None
+        maior = max(imp["valor_total"], exp["valor_total"])
+        indice_sinergia = min(imp["valor_total"], exp["valor_total"]) / maior if maior > 0 else 0
+        return {
+            "uf": estado,
+            "importacoes": imp,
+            "exportacoes": exp,
+            "indice_sinergia": indice_sinergia,
+            "sugestao": self._gerar_sugestao_estado(imp, exp, indice_sinergia)
         }
+    
+    def analisar_sinergias_por_estado(
+        self,
+        db: Session,
+        uf: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Analisa sinergias de importação/exportação por estado.
         
-        exp_por_uf = {
-            uf: {
-                "total": int(total),
-                "valor_total": float(valor_total) if valor_total else 0.0,
-                "peso_total": float(peso_total) if peso_total else 0.0
-            }
-            for uf, total, valor_total, peso_total in exportacoes
-        }
+        Args:
+            db: Sessão do banco de dados
+            uf: UF específica (None = todos)
         
-        # Calcular sinergias
-        sinergias = []
-        todos_ufs = set(list(imp_por_uf.keys()) + list(exp_por_uf.keys()))
+        Returns:
+            Dicionário com análise de sinergias
+        """
+        logger.info(f"Analisando sinergias por estado: {uf or 'Todos'}")
         
-        for estado in todos_ufs:
-            imp = imp_por_uf.get(estado, {"total": 0, "valor_total": 0.0, "peso_total": 0.0})
-            exp = exp_por_uf.get(estado, {"total": 0, "valor_total": 0.0, "peso_total": 0.0})
-            
-            # Calcular índice de sinergia
-            # Estados que fazem ambos têm maior sinergia
-            if imp["total"] > 0 and exp["total"] > 0:
-                indice_sinergia = min(imp["valor_total"], exp["valor_total"]) / max(imp["valor_total"], exp["valor_total"]) if max(imp["valor_total"], exp["valor_total"]) > 0 else 0
-                
-                sinergias.append({
-                    "uf": estado,
-                    "importacoes": imp,
-                    "exportacoes": exp,
-                    "indice_sinergia": indice_sinergia,
-                    "sugestao": self._gerar_sugestao_estado(imp, exp, indice_sinergia)
-                })
+        totais = self.totais_por_estado(db, uf)
+        sinergias = [
+            sinergia
+            for sinergia in (
+                self.sinergia_estado(estado, t["importacoes"], t["exportacoes"])
+                for estado, t in totais.items()
+            )
+            if sinergia
+        ]
         
         # Ordenar por índice de sinergia
         sinergias.sort(key=lambda x: x["indice_sinergia"], reverse=True)
         
         return {
             "uf_filtrada": uf,
-            "total_estados": len(todos_ufs),
+            "total_estados": len(totais),
             "estados_com_sinergia": len(sinergias),
             "sinergias": sinergias[:20]  # Top 20
         }
     
+    def totais_por_empresa(self, db: Session) -> Dict[str, Dict[str, Any]]:
+        """
+        Totais de importação (como importador) e exportação (como exportador) por CNPJ,
+        numa única consulta agrupada sobre operacoes_comex.
+        
+        Returns:
+            {cnpj_limpo: {"uf", "importacoes": {...}, "exportacoes": {...}}}
+            com total_operacoes e valor_total
+        """
+        cnpj = case(
+            (OperacaoComex.tipo_operacao == TipoOperacao.IMPORTACAO, OperacaoComex.cnpj_importador),
+            else_=OperacaoComex.cnpj_exportador
+        )
+        linhas = db.query(
+            cnpj.label('cnpj'),
+            OperacaoComex.tipo_operacao,
+            func.count(OperacaoComex.id).label('total'),
+            func.sum(OperacaoComex.valor_fob).label('valor_total'),
+            func.max(OperacaoComex.uf).label('uf')
+        ).filter(cnpj.isnot(None)).group_by(cnpj, OperacaoComex.tipo_operacao)
+        
+        totais: Dict[str, Dict[str, Any]] = {}
+        for cnpj_operacao, tipo, total, valor_total, uf in linhas:
+            cnpj_limpo = cnpj_operacao.replace('.', '').replace('/', '').replace('-', '')
+            if not cnpj_limpo:
+                continue
+            empresa = totais.setdefault(cnpj_limpo, {
+                "uf": uf,
+                "importacoes": {"total_operacoes": 0, "valor_total": 0.0},
+                "exportacoes": {"total_operacoes": 0, "valor_total": 0.0},
+            })
+            # CNPJ gravado com e sem formatação cai na mesma empresa
+            lado = empresa["importacoes" if tipo == TipoOperacao.IMPORTACAO else "exportacoes"]
+            lado["total_operacoes"] += int(total)
+            lado["valor_total"] += float(valor_total) if valor_total else 0.0
+            empresa["uf"] = empresa["uf"] or uf
+        return totais
+    
     def analisar_sinergias_por_empresa(
         self,
         db: Session,
         empresas_mdic: Dict[str, Dict[str, Any]],
-        limite: int = 100
+        limite: Optional[int] = 100
     ) -> List[Dict[str, Any]]:
         """
         Analisa sinergias por empresa usando dados do MDIC.
@@ -135,7 +168,7 @@ class SinergiaAnalyzer:
         Args:
             db: Sessão do banco de dados
             empresas_mdic: Dicionário de empresas do MDIC indexado por CNPJ
-            limite: Limite de empresas a analisar
+            limite: Quantidade de empresas retornadas, as de maior potencial (None = todas)
         
         Returns:
             Lista de empresas com análise de sinergia
@@ -143,48 +176,21 @@ class SinergiaAnalyzer:
         logger.info(f"Analisando sinergias por empresa (limite: {limite})")
         
         resultados = []
+        for cnpj, totais in self.totais_por_empresa(db).items():
+            empresa_mdic = empresas_mdic.get(cnpj)
+            if empresa_mdic:
+                resultados.append(self._sinergia_empresa(cnpj, empresa_mdic, totais["uf"], totais))
         
-        # Buscar empresas que têm CNPJ nas operações
-        empresas_com_cnpj = db.query(
-            OperacaoComex.cnpj_importador,
-            OperacaoComex.cnpj_exportador,
-            OperacaoComex.uf
-        ).filter(
-            or_(
-                OperacaoComex.cnpj_importador.isnot(None),
-                OperacaoComex.cnpj_exportador.isnot(None)
-            )
-        ).distinct().limit(limite).all()
-        
-        cnpjs_processados = set()
-        
-        for cnpj_imp, cnpj_exp, uf in empresas_com_cnpj:
-            # Processar importador
-            if cnpj_imp and cnpj_imp not in cnpjs_processados:
-                cnpj_limpo = cnpj_imp.replace('.', '').replace('/', '').replace('-', '')
-                empresa_mdic = empresas_mdic.get(cnpj_limpo)
-                
-                if empresa_mdic:
-                    sinergia = self._analisar_empresa_individual(db, cnpj_limpo, empresa_mdic, uf)
-                    if sinergia:
-                        resultados.append(sinergia)
-                        cnpjs_processados.add(cnpj_imp)
-            
-            # Processar exportador
-            if cnpj_exp and cnpj_exp not in cnpjs_processados:
-                cnpj_limpo = cnpj_exp.replace('.', '').replace('/', '').replace('-', '')
-                empresa_mdic = empresas_mdic.get(cnpj_limpo)
-                
-                if empresa_mdic:
-                    sinergia = self._analisar_empresa_individual(db, cnpj_limpo, empresa_mdic, uf)
-                    if sinergia:
-                        resultados.append(sinergia)
-                        cnpjs_processados.add(cnpj_exp)
-        
-        # Ordenar por potencial de sinergia
-        resultados.sort(key=lambda x: x.get("potencial_sinergia", 0), reverse=True)
+        # Ordenar por potencial de sinergia (empate: maior valor movimentado)
+        resultados.sort(
+            key=lambda x: (
+                x.get("potencial_sinergia", 0),
+                x["importacoes"]["valor_total"] + x["exportacoes"]["valor_total"]
+            ),
+            reverse=True
+        )
         
-        return resultados
+        return resultados if limite is None else resultados[:limite]
     
     def _analisar_empresa_individual(
         self,
@@ -217,11 +223,30 @@ class SinergiaAnalyzer:
             )
         ).first()
         
-        imp_total = importacoes.total or 0
-        imp_valor = float(importacoes.valor_total) if importacoes.valor_total else 0.0
-        
-        exp_total = exportacoes.total or 0
-        exp_valor = float(exportacoes.valor_total) if exportacoes.valor_total else 0.0
+        totais = {
+            "importacoes": {
+                "total_operacoes": importacoes.total or 0,
+                "valor_total": float(importacoes.valor_total) if importacoes.valor_total else 0.0
+            },
+            "exportacoes": {
+                "total_operacoes": exportacoes.total or 0,
+                "valor_total": float(exportacoes.valor_total) if exportacoes.valor_total else 0.0
+            },
+        }
+        return self._sinergia_empresa(cnpj, empresa_mdic, uf, totais)
+    
+    def _sinergia_empresa(
+        self,
+        cnpj: str,
+        empresa_mdic: Dict[str, Any],
+        uf: Optional[str],
+        totais: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Resultado de uma empresa a partir dos totais de importação/exportação."""
+        imp_total = totais["importacoes"]["total_operacoes"]
+        imp_valor = totais["importacoes"]["valor_total"]
+        exp_total = totais["exportacoes"]["total_operacoes"]
+        exp_valor = totais["exportacoes"]["valor_total"]
         
         # Buscar CNAE se disponível
         cnae_info = None
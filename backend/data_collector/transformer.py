@@ -1,18 +1,326 @@
 """
 Transformador de dados brutos para formato do banco de dados.
+
+Os campos de origem variam conforme a fonte (API, CSVs do scraper, CSVs brutos do
+MDIC com CO_NCM/VL_FOB...). Em vez de procurar, registro a registro, cada alias em
+quatro variações de maiúsculas, o transformador monta um plano de colunas
+(_PlanoTransformacao) a partir das chaves do primeiro registro de um lote e o
+aplica coluna a coluna aos registros que têm as mesmas chaves. Os planos ficam em
+cache por conjunto de chaves (um arquivo CSV = um plano).
 """
 import math
-from datetime import datetime
-from typing import List, Dict, Any, Optional
+from datetime import date, datetime
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 from loguru import logger
 
 from database import TipoOperacao, ViaTransporte
 
+# Aliases de origem de cada campo, em ordem de preferência (os do MDIC por último)
+ALIASES_NCM = ("ncm", "NCM", "codigo_ncm", "co_ncm", "CO_NCM")
+ALIASES_UF = ("uf", "estado", "sg_uf_ncm", "sg_uf")
+ALIASES_CNPJ_IMPORTADOR = ("cnpj_importador", "cnpj_imp")
+ALIASES_CNPJ_EXPORTADOR = ("cnpj_exportador", "cnpj_exp")
+ALIASES_DESCRICAO = ("descricao", "produto")
+ALIASES_PAIS = ("pais", "pais_origem", "pais_destino")
+ALIASES_PORTO = ("porto", "aeroporto")
+ALIASES_UNIDADE = ("unidade", "unidade_medida")
+ALIASES_RAZAO_IMPORTADOR = (
+    "razao_social_importador", "razao_social_imp", "importador", "nome_importador", "empresa_importadora"
+)
+ALIASES_RAZAO_EXPORTADOR = (
+    "razao_social_exportador", "razao_social_exp", "exportador", "nome_exportador", "empresa_exportadora"
+)
+ALIASES_VIA = ("via", "via_transporte", "modal", "VIA", "VIA_TRANSPORTE", "MODAL")
+CAMPOS_DATA = ("data", "data_operacao", "data_emissao", "data_movimentacao")
+FORMATOS_DATA = ("%Y-%m-%d", "%d/%m/%Y", "%Y-%m-%d %H:%M:%S")
+
+# Campo numérico do banco -> aliases de origem
+CAMPOS_NUMERICOS = {
+    "valor_fob": ("valor_fob", "fob", "valor", "vl_fob"),
+    "valor_frete": ("frete", "valor_frete", "vl_frete"),
+    "valor_seguro": ("seguro", "valor_seguro", "vl_seguro"),
+    "peso_liquido_kg": ("peso_liquido", "peso_liq", "kg_liquido"),
+    "peso_bruto_kg": ("peso_bruto", "peso_brt"),
+    "quantidade_estatistica": ("quantidade", "qtd", "qt_estat"),
+}
+
+VIA_MAPPING = {
+    "marítima": ViaTransporte.MARITIMA,
+    "maritima": ViaTransporte.MARITIMA,
+    "mar": ViaTransporte.MARITIMA,
+    "aérea": ViaTransporte.AEREA,
+    "aerea": ViaTransporte.AEREA,
+    "ar": ViaTransporte.AEREA,
+    "rodoviária": ViaTransporte.RODOVIARIA,
+    "rodoviaria": ViaTransporte.RODOVIARIA,
+    "rod": ViaTransporte.RODOVIARIA,
+    "ferroviária": ViaTransporte.FERROVIARIA,
+    "ferroviaria": ViaTransporte.FERROVIARIA,
+    "fer": ViaTransporte.FERROVIARIA,
+    "dutoviária": ViaTransporte.DUTOVIARIA,
+    "dutoviaria": ViaTransporte.DUTOVIARIA,
+    "postal": ViaTransporte.POSTAL,
+}
+
+# Planos guardados por transformador (conjuntos de chaves distintos)
+MAX_PLANOS = 64
+
+
+def _variantes(chave: str) -> List[str]:
+    """Variações de maiúsculas tentadas para uma chave, sem repetição."""
+    variantes = []
+    for variante in (chave, chave.upper(), chave.lower(), chave.capitalize()):
+        if variante not in variantes:
+            variantes.append(variante)
+    return variantes
+
+
+def _texto(valor: Any) -> str:
+    """DataTransformer._safe_str(valor, "") com atalho para str."""
+    if valor.__class__ is str:
+        return valor.strip()
+    return DataTransformer._safe_str(valor, "")
+
+
+def _numero(valor: Any) -> Optional[float]:
+    """Número no formato brasileiro (1.234,56) ou None se vazio/inválido."""
+    if not valor:
+        return None
+    try:
+        return float(str(valor).replace(".", "").replace(",", "."))
+    except (ValueError, TypeError):
+        return None
+
+
+def _ncm(valor: Any) -> str:
+    """NCM com 8 dígitos (cortado ou completado com zeros)."""
+    if valor.__class__ is not str:
+        if isinstance(valor, float):
+            valor = "" if math.isnan(valor) else str(int(valor))
+        else:
+            valor = str(valor)
+    ncm = valor
+    if "." in ncm or "-" in ncm:
+        ncm = ncm.replace(".", "").replace("-", "")
+    ncm = ncm.strip()
+    return ncm[:8] if len(ncm) > 8 else ncm.zfill(8)
+
+
+def _cnpj(valor: str) -> str:
+    return valor.replace('.', '').replace('/', '').replace('-', '')[:14]
+
+
+def _data_fallback(mes_referencia: str) -> Optional[date]:
+    """Primeiro dia do mês de referência (None se o mês for inválido)."""
+    try:
+        return datetime.strptime(f"{mes_referencia}-01", "%Y-%m-%d").date()
+    except Exception:
+        return None
+
+
+class _PlanoTransformacao:
+    """
+    Colunas de origem de cada campo, resolvidas uma vez para um conjunto de chaves.
+
+    Cada campo guarda as colunas presentes em ordem de preferência; aplicar() lê
+    só essas colunas, campo a campo, para o lote inteiro.
+    """
+
+    def __init__(self, chaves):
+        self.chaves = frozenset(chaves)
+        self.ncm = [chave for chave in ALIASES_NCM if chave in self.chaves]
+        self.uf = self._colunas_texto(ALIASES_UF)
+        self.cnpj_importador = self._colunas_texto(ALIASES_CNPJ_IMPORTADOR)
+        self.cnpj_exportador = self._colunas_texto(ALIASES_CNPJ_EXPORTADOR)
+        self.descricao = self._colunas_texto(ALIASES_DESCRICAO)
+        self.pais = self._colunas_texto(ALIASES_PAIS)
+        self.porto = self._colunas_texto(ALIASES_PORTO)
+        self.unidade = self._colunas_texto(ALIASES_UNIDADE)
+        self.razao_importador = self._colunas_texto(ALIASES_RAZAO_IMPORTADOR)
+        self.razao_exportador = self._colunas_texto(ALIASES_RAZAO_EXPORTADOR)
+        self.via = next((chave for chave in ALIASES_VIA if chave in self.chaves), None)
+        self.numericos = {
+            campo: [self._presentes((alias, alias.upper(), alias.lower())) for alias in aliases]
+            for campo, aliases in CAMPOS_NUMERICOS.items()
+        }
+        self.datas = [self._presentes((campo, campo.upper())) for campo in CAMPOS_DATA]
+        self.datas = [colunas for colunas in self.datas if colunas]
+        # Formato da última data reconhecida (tentado primeiro) e datas já convertidas
+        self.formato_data: Optional[str] = None
+        self._datas_convertidas: Dict[str, Optional[date]] = {}
+
+    def _presentes(self, variantes: Sequence[str]) -> List[str]:
+        presentes = []
+        for variante in variantes:
+            if variante in self.chaves and variante not in presentes:
+                presentes.append(variante)
+        return presentes
+
+    def _colunas_texto(self, aliases: Sequence[str]) -> List[str]:
+        """Para cada alias, a primeira variação presente (como em _extract_string)."""
+        colunas = []
+        for alias in aliases:
+            coluna = next((v for v in _variantes(alias) if v in self.chaves), None)
+            if coluna is not None:
+                colunas.append(coluna)
+        return colunas
+
+    # ------------------------------------------------------------------ colunas
+
+    @staticmethod
+    def _texto(lote: List[Dict[str, Any]], colunas: List[str]) -> List[str]:
+        """Primeiro valor não vazio entre as colunas, por registro."""
+        if not colunas:
+            return [""] * len(lote)
+        coluna = colunas[0]
+        valores = [_texto(registro[coluna]) for registro in lote]
+        for coluna in colunas[1:]:
+            if all(valores):
+                break
+            valores = [v or _texto(registro[coluna]) for v, registro in zip(valores, lote)]
+        return valores
+
+    @staticmethod
+    def _numerico(lote: List[Dict[str, Any]], grupos: List[List[str]]) -> List[float]:
+        """Primeiro alias com número válido, por registro (0.0 se nenhum)."""
+        valores: List[Optional[float]] = [None] * len(lote)
+        for grupo in grupos:
+            if not grupo:
+                continue
+            if len(grupo) == 1:
+                coluna = grupo[0]
+                lidos = [_numero(registro[coluna]) for registro in lote]
+            else:
+                lidos = [_numero(next((registro[c] for c in grupo if registro[c]), None)) for registro in lote]
+            valores = [v if v is not None else lido for v, lido in zip(valores, lidos)]
+            if None not in valores:
+                break
+        return [0.0 if v is None else v for v in valores]
+
+    def _converter_data(self, valor: str) -> Optional[date]:
+        convertida = self._datas_convertidas.get(valor, False)
+        if convertida is not False:
+            return convertida
+        formatos = FORMATOS_DATA
+        if self.formato_data:
+            formatos = (self.formato_data,) + tuple(f for f in FORMATOS_DATA if f != self.formato_data)
+        convertida = None
+        for formato in formatos:
+            try:
+                convertida = datetime.strptime(valor, formato).date()
+                self.formato_data = formato
+                break
+            except ValueError:
+                continue
+        if len(self._datas_convertidas) < 10000:
+            self._datas_convertidas[valor] = convertida
+        return convertida
+
+    def _data(self, valor: Any) -> Optional[date]:
+        if not valor:
+            return None
+        if isinstance(valor, str):
+            return self._converter_data(valor)
+        if isinstance(valor, datetime):
+            return valor.date()
+        return None
+
+    def _datas(self, lote: List[Dict[str, Any]], fallback: Optional[date]) -> List[Optional[date]]:
+        if not self.datas:
+            return [fallback] * len(lote)
+        valores: List[Optional[date]] = [None] * len(lote)
+        for colunas in self.datas:
+            if len(colunas) == 1:
+                coluna = colunas[0]
+                lidas = [self._data(registro[coluna]) for registro in lote]
+            else:
+                lidas = [self._data(registro[colunas[0]] or registro[colunas[1]]) for registro in lote]
+            valores = [v or lida for v, lida in zip(valores, lidas)]
+            if all(valores):
+                break
+        return [v or fallback for v in valores]
+
+    # ------------------------------------------------------------------ aplicação
+
+    def aplicar(self, lote: List[Dict[str, Any]], mes: str, tipo: str) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Transforma registros com as chaves do plano.
+
+        Returns:
+            (registros transformados, registros descartados por NCM ou data inválidos)
+        """
+        n = len(lote)
+        importacao = tipo == "Importação"
+        exportacao = tipo == "Exportação"
+
+        if len(self.ncm) == 1:
+            coluna = self.ncm[0]
+            ncms = [_ncm(registro[coluna] or "") for registro in lote]
+        elif self.ncm:
+            colunas_ncm = self.ncm
+            ncms = [_ncm(next((registro[c] for c in colunas_ncm if registro[c]), "")) for registro in lote]
+        else:
+            ncms = ["00000000"] * n
+        ufs = [uf.upper()[:2] for uf in self._texto(lote, self.uf)]
+        vazios = [None] * n
+        cnpjs_imp = [_cnpj(v) if v else "" for v in self._texto(lote, self.cnpj_importador)] if importacao else vazios
+        cnpjs_exp = [_cnpj(v) if v else "" for v in self._texto(lote, self.cnpj_exportador)] if exportacao else vazios
+        razoes_imp = self._texto(lote, self.razao_importador) if importacao else vazios
+        razoes_exp = self._texto(lote, self.razao_exportador) if exportacao else vazios
+        if self.via is None:
+            vias = [ViaTransporte.OUTRAS] * n
+        else:
+            coluna = self.via
+            vias = [VIA_MAPPING.get(_texto(registro[coluna]).lower(), ViaTransporte.OUTRAS) for registro in lote]
+        if "arquivo_origem" in self.chaves:
+            origens = [_texto(registro["arquivo_origem"] or "") for registro in lote]
+        else:
+            origens = [""] * n
+        numericos = {campo: self._numerico(lote, grupos) for campo, grupos in self.numericos.items()}
+
+        colunas = {
+            "ncm": ncms,
+            "descricao_produto": self._texto(lote, self.descricao),
+            "pais_origem_destino": self._texto(lote, self.pais),
+            "uf": ufs,
+            "porto_aeroporto": self._texto(lote, self.porto),
+            "via_transporte": vias,
+            **numericos,
+            "unidade_medida_estatistica": self._texto(lote, self.unidade),
+            "data_operacao": self._datas(lote, _data_fallback(mes)),
+            "arquivo_origem": origens,
+            "razao_social_importador": razoes_imp,
+            "razao_social_exportador": razoes_exp,
+            "cnpj_importador": cnpjs_imp,
+            "cnpj_exportador": cnpjs_exp,
+        }
+        constantes = {
+            "tipo_operacao": TipoOperacao.IMPORTACAO if importacao else TipoOperacao.EXPORTACAO,
+            "mes_referencia": mes,
+        }
+
+        nomes = list(colunas)
+        transformados = []
+        descartados = 0
+        for valores in zip(*colunas.values()):
+            registro = dict(zip(nomes, valores))
+            # Validações básicas (as mesmas de _transform_record)
+            if len(registro["ncm"]) != 8 or not registro["data_operacao"]:
+                descartados += 1
+                continue
+            registro.update(constantes)
+            transformados.append(registro)
+        return transformados, descartados
+
 
 class DataTransformer:
     """
     Transforma dados brutos (API ou CSV) para formato do banco de dados.
     """
+
+    def __init__(self):
+        # Planos de colunas por conjunto de chaves dos registros
+        self._planos: Dict[frozenset, _PlanoTransformacao] = {}
     
     @staticmethod
     def _safe_str(value: Any, default: str = "") -> str:
@@ -62,18 +370,7 @@ class DataTransformer:
         Returns:
             Lista de dicionários no formato do banco
         """
-        transformed = []
-        
-        for record in data:
-            try:
-                transformed_record = self._transform_record(record, mes, tipo)
-                if transformed_record:
-                    transformed.append(transformed_record)
-            except Exception as e:
-                logger.error(f"Erro ao transformar registro da API: {e}")
-                continue
-        
-        return transformed
+        return self._transformar_lote(data, mes, tipo, "da API")
     
     def transform_scraper_data(
         self,
@@ -92,18 +389,7 @@ class DataTransformer:
         Returns:
             Lista de dicionários no formato do banco
         """
-        transformed = []
-        
-        for record in data:
-            try:
-                transformed_record = self._transform_record(record, mes, tipo)
-                if transformed_record:
-                    transformed.append(transformed_record)
-            except Exception as e:
-                logger.error(f"Erro ao transformar registro do CSV: {e}")
-                continue
-        
-        return transformed
+        return self._transformar_lote(data, mes, tipo, "do CSV")
     
     def transform_csv_data(
         self,
@@ -123,17 +409,55 @@ class DataTransformer:
         Returns:
             Lista de dicionários no formato do banco
         """
+        return self._transformar_lote(data, mes, tipo, "CSV")
+
+    def _plano(self, chaves) -> _PlanoTransformacao:
+        """Plano de colunas em cache para o conjunto de chaves."""
+        chaves = frozenset(chaves)
+        plano = self._planos.get(chaves)
+        if plano is None:
+            if len(self._planos) >= MAX_PLANOS:
+                self._planos.clear()
+            plano = self._planos[chaves] = _PlanoTransformacao(chaves)
+        return plano
+
+    def _transformar_lote(
+        self,
+        data: List[Dict[str, Any]],
+        mes: str,
+        tipo: str,
+        origem: str
+    ) -> List[Dict[str, Any]]:
+        """
+        Aplica o plano de colunas a cada sequência de registros com as mesmas chaves
+        (mantendo a ordem); se o plano falhar, a sequência é transformada registro a registro.
+        """
         transformed = []
-        
-        for record in data:
+        descartados = 0
+        inicio = 0
+        while inicio < len(data):
+            chaves = data[inicio].keys()
+            fim = inicio + 1
+            while fim < len(data) and data[fim].keys() == chaves:
+                fim += 1
+            trecho = data[inicio:fim]
             try:
-                transformed_record = self._transform_record(record, mes, tipo)
-                if transformed_record:
-                    transformed.append(transformed_record)
+                registros, invalidos = self._plano(chaves).aplicar(trecho, mes, tipo)
+                transformed.extend(registros)
+                descartados += invalidos
             except Exception as e:
-                logger.error(f"Erro ao transformar registro CSV: {e}")
-                continue
-        
+                logger.warning(f"⚠️ Plano de colunas falhou ({e}); transformando registro a registro")
+                for record in trecho:
+                    try:
+                        transformed_record = self._transform_record(record, mes, tipo)
+                        if transformed_record:
+                            transformed.append(transformed_record)
+                    except Exception as e:
+                        logger.error(f"Erro ao transformar registro {origem}: {e}")
+            inicio = fim
+
+        if descartados:
+            logger.warning(f"⚠️ {descartados} registros {origem} descartados (NCM ou data de operação inválidos)")
         return transformed
     
     def _transform_record(
@@ -143,7 +467,7 @@ class DataTransformer:
         tipo: str
     ) -> Optional[Dict[str, Any]]:
         """
-        Transforma um registro individual.
+        Transforma um registro individual (sem plano de colunas; referência do plano).
         
         Args:
             record: Registro bruto
@@ -154,29 +478,18 @@ class DataTransformer:
             Dicionário transformado ou None se inválido
         """
         try:
-            # Mapear campos (ajustar conforme estrutura real dos dados)
             # Extrair UF de forma segura - SEMPRE converter para string antes de .upper()
-            uf_raw = self._extract_string(record, "uf", "estado", "")
+            uf_raw = self._extract_string(record, *ALIASES_UF)
             uf_value = self._safe_str(uf_raw, "").upper()[:2] if uf_raw else ""
             
             # Extrair CNPJ de forma segura - SEMPRE converter para string antes de operações
             cnpj_imp_value = ""
             if tipo == "Importação":
-                cnpj_imp_raw = self._extract_string(
-                    record, 
-                    "cnpj_importador", "cnpj_imp", "cnpj_importador", ""
-                )
-                cnpj_imp_str = self._safe_str(cnpj_imp_raw, "")
-                cnpj_imp_value = cnpj_imp_str.replace('.', '').replace('/', '').replace('-', '')[:14]
+                cnpj_imp_value = _cnpj(self._extract_string(record, *ALIASES_CNPJ_IMPORTADOR))
             
             cnpj_exp_value = ""
             if tipo == "Exportação":
-                cnpj_exp_raw = self._extract_string(
-                    record, 
-                    "cnpj_exportador", "cnpj_exp", "cnpj_exportador", ""
-                )
-                cnpj_exp_str = self._safe_str(cnpj_exp_raw, "")
-                cnpj_exp_value = cnpj_exp_str.replace('.', '').replace('/', '').replace('-', '')[:14]
+                cnpj_exp_value = _cnpj(self._extract_string(record, *ALIASES_CNPJ_EXPORTADOR))
             
             # Extrair arquivo_origem de forma segura
             arquivo_origem_raw = record.get("arquivo_origem") or ""
@@ -184,32 +497,26 @@ class DataTransformer:
             
             transformed = {
                 "ncm": self._extract_ncm(record),
-                "descricao_produto": self._extract_string(record, "descricao", "produto", ""),
+                "descricao_produto": self._extract_string(record, *ALIASES_DESCRICAO),
                 "tipo_operacao": TipoOperacao.IMPORTACAO if tipo == "Importação" else TipoOperacao.EXPORTACAO,
-                "pais_origem_destino": self._extract_string(record, "pais", "pais_origem", "pais_destino", ""),
+                "pais_origem_destino": self._extract_string(record, *ALIASES_PAIS),
                 "uf": uf_value,
-                "porto_aeroporto": self._extract_string(record, "porto", "aeroporto", ""),
+                "porto_aeroporto": self._extract_string(record, *ALIASES_PORTO),
                 "via_transporte": self._extract_via_transporte(record),
-                "valor_fob": self._extract_float(record, "valor_fob", "fob", "valor", 0.0),
-                "valor_frete": self._extract_float(record, "frete", "valor_frete", 0.0),
-                "valor_seguro": self._extract_float(record, "seguro", "valor_seguro", 0.0),
-                "peso_liquido_kg": self._extract_float(record, "peso_liquido", "peso_liq", 0.0),
-                "peso_bruto_kg": self._extract_float(record, "peso_bruto", "peso_brt", 0.0),
-                "quantidade_estatistica": self._extract_float(record, "quantidade", "qtd", 0.0),
-                "unidade_medida_estatistica": self._extract_string(record, "unidade", "unidade_medida", ""),
+                **{
+                    campo: self._extract_float(record, *aliases)
+                    for campo, aliases in CAMPOS_NUMERICOS.items()
+                },
+                "unidade_medida_estatistica": self._extract_string(record, *ALIASES_UNIDADE),
                 "data_operacao": self._extract_date(record, mes),
                 "mes_referencia": mes,
                 "arquivo_origem": arquivo_origem_value,
                 # Campos de empresa
                 "razao_social_importador": self._extract_string(
-                    record, 
-                    "razao_social_importador", "razao_social_imp", "importador", 
-                    "nome_importador", "empresa_importadora", ""
+                    record, *ALIASES_RAZAO_IMPORTADOR
                 ) if tipo == "Importação" else None,
                 "razao_social_exportador": self._extract_string(
-                    record, 
-                    "razao_social_exportador", "razao_social_exp", "exportador", 
-                    "nome_exportador", "empresa_exportadora", ""
+                    record, *ALIASES_RAZAO_EXPORTADOR
                 ) if tipo == "Exportação" else None,
                 "cnpj_importador": cnpj_imp_value if tipo == "Importação" else None,
                 "cnpj_exportador": cnpj_exp_value if tipo == "Exportação" else None,
@@ -231,32 +538,9 @@ class DataTransformer:
             return None
     
     def _extract_ncm(self, record: Dict[str, Any]) -> str:
-        """Extrai NCM do registro."""
-        ncm_value = (
-            record.get("ncm") or
-            record.get("NCM") or
-            record.get("codigo_ncm") or
-            ""
-        )
-        
-        # Converter para string, tratando floats especialmente
-        if isinstance(ncm_value, float):
-            if math.isnan(ncm_value):
-                ncm_value = ""
-            else:
-                # Converter float para int primeiro para evitar decimais
-                ncm_value = str(int(ncm_value)) if ncm_value.is_integer() else str(int(ncm_value))
-        else:
-            ncm_value = str(ncm_value)
-        
-        # Garantir 8 dígitos
-        ncm = ncm_value.replace(".", "").replace("-", "").strip()
-        if len(ncm) > 8:
-            ncm = ncm[:8]
-        elif len(ncm) < 8:
-            ncm = ncm.zfill(8)
-        
-        return ncm
+        """Extrai NCM do registro (8 dígitos)."""
+        ncm_value = next((record.get(chave) for chave in ALIASES_NCM if record.get(chave)), "")
+        return _ncm(ncm_value)
     
     def _extract_string(
         self,
@@ -290,86 +574,37 @@ class DataTransformer:
     ) -> float:
         """Extrai float do registro usando múltiplas chaves possíveis."""
         for key in keys:
-            value = record.get(key) or record.get(key.upper()) or record.get(key.lower())
-            if value:
-                try:
-                    # Remover separadores e converter
-                    value_str = str(value).replace(".", "").replace(",", ".")
-                    return float(value_str)
-                except (ValueError, TypeError):
-                    continue
+            value = _numero(record.get(key) or record.get(key.upper()) or record.get(key.lower()))
+            if value is not None:
+                return value
         return default
     
     def _extract_date(
         self,
         record: Dict[str, Any],
         mes_referencia: str
-    ) -> Optional[datetime]:
+    ) -> Optional[date]:
         """Extrai data do registro."""
-        # Tentar campos de data
-        date_fields = ["data", "data_operacao", "data_emissao", "data_movimentacao"]
-        
-        for field in date_fields:
+        for field in CAMPOS_DATA:
             value = record.get(field) or record.get(field.upper())
             if value:
-                try:
-                    if isinstance(value, str):
-                        # Tentar diferentes formatos
-                        formats = ["%Y-%m-%d", "%d/%m/%Y", "%Y-%m-%d %H:%M:%S"]
-                        for fmt in formats:
-                            try:
-                                return datetime.strptime(value, fmt).date()
-                            except ValueError:
-                                continue
-                    elif isinstance(value, datetime):
-                        return value.date()
-                except Exception:
-                    continue
+                if isinstance(value, str):
+                    # Tentar diferentes formatos
+                    for fmt in FORMATOS_DATA:
+                        try:
+                            return datetime.strptime(value, fmt).date()
+                        except ValueError:
+                            continue
+                elif isinstance(value, datetime):
+                    return value.date()
         
         # Fallback: usar primeiro dia do mês de referência
-        try:
-            return datetime.strptime(f"{mes_referencia}-01", "%Y-%m-%d").date()
-        except Exception:
-            return None
+        return _data_fallback(mes_referencia)
     
     def _extract_via_transporte(self, record: Dict[str, Any]) -> ViaTransporte:
         """Extrai via de transporte do registro."""
-        via_value = None
-        
-        # Tentar diferentes chaves
-        for key in ["via", "via_transporte", "modal", "VIA", "VIA_TRANSPORTE", "MODAL"]:
-            if key in record:
-                via_value = record[key]
-                break
-        
-        # Se não encontrou, tentar com variações
-        if via_value is None:
-            for key in ["via", "via_transporte", "modal"]:
-                value = record.get(key) or record.get(key.upper()) or record.get(key.lower())
-                if value is not None and value != "":
-                    via_value = value
-                    break
+        via_value = next((record[key] for key in ALIASES_VIA if key in record), None)
         
         # Converter para string de forma segura ANTES de usar .lower()
         via = self._safe_str(via_value, "").lower()
-        
-        via_mapping = {
-            "marítima": ViaTransporte.MARITIMA,
-            "maritima": ViaTransporte.MARITIMA,
-            "mar": ViaTransporte.MARITIMA,
-            "aérea": ViaTransporte.AEREA,
-            "aerea": ViaTransporte.AEREA,
-            "ar": ViaTransporte.AEREA,
-            "rodoviária": ViaTransporte.RODOVIARIA,
-            "rodoviaria": ViaTransporte.RODOVIARIA,
-            "rod": ViaTransporte.RODOVIARIA,
-            "ferroviária": ViaTransporte.FERROVIARIA,
-            "ferroviaria": ViaTransporte.FERROVIARIA,
-            "fer": ViaTransporte.FERROVIARIA,
-            "dutoviária": ViaTransporte.DUTOVIARIA,
-            "dutoviaria": ViaTransporte.DUTOVIARIA,
-            "postal": ViaTransporte.POSTAL,
-        }
-        
-        return via_mapping.get(via, ViaTransporte.OUTRAS)
-
+        return VIA_MAPPING.get(via, ViaTransporte.OUTRAS)
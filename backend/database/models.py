@@ -101,6 +101,8 @@ class OperacaoComex(Base):
         Index('idx_mes_tipo', 'mes_referencia', 'tipo_operacao'),
         Index('idx_importador', 'razao_social_importador', 'tipo_operacao'),
         Index('idx_exportador', 'razao_social_exportador', 'tipo_operacao'),
+        # Paginação por cursor do /buscar (ORDER BY data_operacao DESC, id DESC)
+        Index('idx_operacao_data_id', 'data_operacao', 'id'),
     )
     
     def __repr__(self):
@@ -337,3 +339,226 @@ class EmpresasRecomendadas(Base):
     def __repr__(self):
         return f"<EmpresasRecomendadas(id={self.id}, nome={self.nome}, tipo={self.tipo_principal}, peso={self.peso_participacao})>"
 
+
+
+class OperacaoComexMensal(Base):
+    """
+    Rollup mensal pré-agregado de operacoes_comex.
+    Chave: (mes_referencia, mes_operacao, tipo_operacao, ncm, descricao_produto, uf, pais_origem_destino).
+    mes_operacao é o YYYY-MM de data_operacao, usado para recortar o período do dashboard.
+    """
+    __tablename__ = "operacoes_comex_mensal"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    mes_referencia = Column(String(7), nullable=True, index=True, comment="YYYY-MM")
+    mes_operacao = Column(String(7), nullable=True, comment="YYYY-MM de data_operacao")
+    tipo_operacao = Column(SQLEnum(TipoOperacao), nullable=False)
+    ncm = Column(String(8), nullable=True)
+    descricao_produto = Column(Text, nullable=True)
+    uf = Column(String(2), nullable=True)
+    pais_origem_destino = Column(String(100), nullable=True)
+    
+    # Agregados
+    total_operacoes = Column(Integer, default=0, nullable=False)
+    valor_fob = Column(Float, nullable=True)
+    peso_liquido_kg = Column(Float, nullable=True)
+    quantidade_estatistica = Column(Float, nullable=True)
+    
+    __table_args__ = (
+        Index('idx_rollup_mes_op_tipo', 'mes_operacao', 'tipo_operacao'),
+        Index('idx_rollup_ncm_mes_op', 'ncm', 'mes_operacao'),
+    )
+    
+    def __repr__(self):
+        return (
+            f"<OperacaoComexMensal(mes={self.mes_referencia}, tipo={self.tipo_operacao}, "
+            f"ncm={self.ncm}, uf={self.uf}, operacoes={self.total_operacoes})>"
+        )
+
+
+class EmpresaComexMensal(Base):
+    """
+    Rollup mensal por empresa (importador/exportador) de operacoes_comex.
+    Chave: (mes_referencia, mes_operacao, tipo_operacao, ncm, papel, nome).
+    """
+    __tablename__ = "empresas_comex_mensal"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    mes_referencia = Column(String(7), nullable=True, index=True, comment="YYYY-MM")
+    mes_operacao = Column(String(7), nullable=True, comment="YYYY-MM de data_operacao")
+    tipo_operacao = Column(SQLEnum(TipoOperacao), nullable=False)
+    ncm = Column(String(8), nullable=True)
+    papel = Column(String(20), nullable=False, comment="importador ou exportador")
+    nome = Column(String(255), nullable=False)
+    
+    # Agregados
+    total_operacoes = Column(Integer, default=0, nullable=False)
+    valor_fob = Column(Float, nullable=True)
+    peso_liquido_kg = Column(Float, nullable=True)
+    
+    __table_args__ = (
+        Index('idx_rollup_emp_papel_mes_op', 'papel', 'mes_operacao', 'tipo_operacao'),
+    )
+    
+    def __repr__(self):
+        return f"<EmpresaComexMensal(mes={self.mes_referencia}, papel={self.papel}, nome={self.nome})>"
+
+
+class RollupControle(Base):
+    """
+    Controle de atualização dos rollups: guarda o último id de operacoes_comex já agregado.
+    """
+    __tablename__ = "rollup_controle"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    nome = Column(String(50), unique=True, nullable=False, index=True)
+    ultimo_id = Column(Integer, default=0, nullable=False)
+    data_atualizacao = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<RollupControle(nome={self.nome}, ultimo_id={self.ultimo_id})>"
+
+
+class VersaoDados(Base):
+    """
+    Contador de versão dos dados por tabela e mês de referência.
+    Incrementado a cada importação/coleta; entra na chave do cache das respostas.
+    mes_referencia "*" é a versão da tabela inteira.
+    """
+    __tablename__ = "versoes_dados"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    tabela = Column(String(50), nullable=False)
+    mes_referencia = Column(String(7), nullable=False, comment="YYYY-MM, '*' = tabela inteira, '' = sem mês")
+    versao = Column(Integer, default=0, nullable=False)
+    data_atualizacao = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        Index('idx_versao_tabela_mes', 'tabela', 'mes_referencia', unique=True),
+    )
+    
+    def __repr__(self):
+        return f"<VersaoDados(tabela={self.tabela}, mes={self.mes_referencia}, versao={self.versao})>"
+
+
+class EmpresaBusca(Base):
+    """
+    Índice de busca de nomes de empresas para o autocomplete.
+    fonte "operacoes": totais por (papel, nome) agregados de empresas_comex_mensal;
+    fonte "empresas": nomes do cadastro (tabela empresas);
+    fonte "mdic": nomes da lista de empresas do MDIC (tabela empresas_mdic).
+    Busca por substring em nome_normalizado via FTS5 (SQLite) ou pg_trgm (PostgreSQL).
+    """
+    __tablename__ = "empresas_busca"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    fonte = Column(String(20), nullable=False, comment="operacoes, empresas ou mdic")
+    papel = Column(String(20), nullable=False, comment="importador ou exportador")
+    nome = Column(String(255), nullable=False)
+    nome_normalizado = Column(String(255), nullable=False, comment="Sem acentos/pontuação, maiúsculo")
+    total_operacoes = Column(Integer, default=0, nullable=False)
+    valor_fob = Column(Float, default=0, nullable=False)
+    data_atualizacao = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        Index('idx_busca_fonte_papel_nome', 'fonte', 'papel', 'nome', unique=True),
+        Index('idx_busca_fonte_papel_valor', 'fonte', 'papel', 'valor_fob'),
+    )
+    
+    def __repr__(self):
+        return f"<EmpresaBusca(papel={self.papel}, nome={self.nome}, valor_fob={self.valor_fob})>"
+
+
+class EmpresaMDIC(Base):
+    """
+    Lista de empresas exportadoras/importadoras do MDIC, um registro por CNPJ.
+    Carregada em segundo plano a partir dos arquivos do gov.br (services.empresas_mdic).
+    """
+    __tablename__ = "empresas_mdic"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    cnpj = Column(String(14), nullable=False)
+    nome = Column(String(255), nullable=False, comment="Razão social ou, sem ela, nome fantasia")
+    razao_social = Column(String(255))
+    nome_fantasia = Column(String(255))
+    uf = Column(String(2))
+    municipio = Column(String(100))
+    tipo_operacao = Column(String(50))
+    faixa_valor = Column(String(100))
+    ano = Column(String(4))
+    importadora = Column(Integer, default=0, nullable=False, comment="1 se consta como importadora")
+    exportadora = Column(Integer, default=0, nullable=False, comment="1 se consta como exportadora")
+    data_atualizacao = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        Index('idx_mdic_cnpj', 'cnpj', unique=True),
+        Index('idx_mdic_nome', 'nome'),
+    )
+    
+    def __repr__(self):
+        return f"<EmpresaMDIC(cnpj={self.cnpj}, nome={self.nome})>"
+
+
+class CruzamentoEmpresa(Base):
+    """
+    Empresa do MDIC identificada para uma operação (services.resolucao_empresas):
+    pelo CNPJ da operação (confiança alta) ou pelo nome (média, com a pontuação do casamento).
+    """
+    __tablename__ = "cruzamentos_empresas"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    operacao_id = Column(Integer, nullable=False, comment="operacoes_comex.id")
+    papel = Column(String(20), nullable=False, comment="importador ou exportador")
+    cnpj = Column(String(14), nullable=False)
+    metodo = Column(String(10), nullable=False, comment="cnpj ou nome")
+    confianca = Column(String(10), nullable=False, comment="alta ou media")
+    pontuacao = Column(Float, nullable=False, comment="1.0 para CNPJ/nome idêntico")
+    data_atualizacao = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        Index('idx_cruzamento_operacao', 'operacao_id', unique=True),
+        Index('idx_cruzamento_cnpj', 'cnpj'),
+    )
+    
+    def __repr__(self):
+        return f"<CruzamentoEmpresa(operacao_id={self.operacao_id}, cnpj={self.cnpj}, confianca={self.confianca})>"
+
+
+class Sinergia(Base):
+    """
+    Sinergia importação/exportação pré-calculada (services.sinergias), por empresa
+    (chave = CNPJ da lista do MDIC) ou por estado (chave = UF). Recalculada inteira
+    a cada atualização; data_atualizacao é o horário do cálculo.
+    """
+    __tablename__ = "sinergias"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    escopo = Column(String(10), nullable=False, comment="empresa ou estado")
+    chave = Column(String(14), nullable=False, comment="CNPJ ou UF ('' = sem UF)")
+    uf = Column(String(2), nullable=True)
+    razao_social = Column(String(255), nullable=True)
+    nome_fantasia = Column(String(255), nullable=True)
+    municipio = Column(String(100), nullable=True)
+    
+    # Agregados das operações
+    importacoes_total = Column(Integer, default=0, nullable=False)
+    importacoes_valor = Column(Float, default=0.0, nullable=False)
+    importacoes_peso = Column(Float, nullable=True)
+    exportacoes_total = Column(Integer, default=0, nullable=False)
+    exportacoes_valor = Column(Float, default=0.0, nullable=False)
+    exportacoes_peso = Column(Float, nullable=True)
+    
+    # Empresa: potencial (1.0 importa e exporta, 0.5 um dos dois); estado: min/max dos valores
+    indice_sinergia = Column(Float, default=0.0, nullable=False)
+    cnae = Column(String(20), nullable=True)
+    classificacao_cnae = Column(String(255), nullable=True)
+    sugestao = Column(Text, nullable=True)
+    data_atualizacao = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        Index('idx_sinergia_escopo_chave', 'escopo', 'chave', unique=True),
+        Index('idx_sinergia_escopo_indice', 'escopo', 'indice_sinergia'),
+    )
+    
+    def __repr__(self):
+        return f"<Sinergia(escopo={self.escopo}, chave={self.chave}, indice={self.indice_sinergia})>"
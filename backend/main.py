@@ -1,14 +1,13 @@
 """
 Aplicação principal FastAPI.
 """
-from fastapi import FastAPI, Depends, HTTPException, Query, UploadFile, File, BackgroundTasks, Request
+from fastapi import FastAPI, Depends, HTTPException, Query, UploadFile, File, BackgroundTasks, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from sqlalchemy import text, and_, or_, func
 from sqlalchemy.exc import SQLAlchemyError, OperationalError, InterfaceError
-from typing import Optional, List
-from datetime import date, datetime
-from threading import Lock
+from typing import Dict, Optional, List
+from datetime import date, datetime, timedelta
 import time
 import json
 import os
@@ -21,7 +20,7 @@ from loguru import logger
 from config import settings
 from database import get_db, init_db, SessionLocal
 from database.models import (
-    OperacaoComex, TipoOperacao, ViaTransporte,
+    OperacaoComex, TipoOperacao,
     ComercioExterior, Empresa, CNAEHierarquia, EmpresasRecomendadas
 )
 from data_collector import DataCollector
@@ -124,6 +123,12 @@ def _start_auto_import_excel_if_configured() -> None:
             clear_by_file = os.getenv("AUTO_IMPORT_EXCEL_CLEAR_BY_FILE", "false").strip().lower()
             clear_by_file = clear_by_file in {"1", "true", "yes", "y"}
             if clear_by_file:
+                meses_removidos = {
+                    m for (m,) in db.query(OperacaoComex.mes_referencia)
+                    .filter(OperacaoComex.arquivo_origem == source_path.name)
+                    .distinct()
+                    .all()
+                }
                 removidos = (
                     db.query(OperacaoComex)
                     .filter(OperacaoComex.arquivo_origem == source_path.name)
@@ -131,6 +136,9 @@ def _start_auto_import_excel_if_configured() -> None:
                 )
                 db.commit()
                 logger.info(f"Registros removidos para reimportação: {removidos}")
+                if meses_removidos:
+                    from services.rollups import atualizar_rollups
+                    atualizar_rollups(db, meses_removidos)
         except Exception as e:
             logger.warning(f"Falha ao verificar registros existentes: {e}")
             db.rollback()
@@ -200,6 +208,16 @@ async def startup_event():
         # Inicializar banco (cria tabelas se não existirem)
         init_db()
         logger.info("✅ Banco de dados inicializado")
+
+        # Índice da paginação por cursor do /buscar (bancos criados antes dele)
+        # e estruturas de texto da busca de empresas (FTS5/pg_trgm)
+        with SessionLocal() as db:
+            preparar_indice_paginacao(db)
+            preparar_indice_busca(db)
+
+        # Autocomplete de empresas em memória (carrega em segundo plano)
+        from database.database import engine as db_engine
+        iniciar_carregamento(db_engine)
     except Exception as e:
         logger.error(f"Erro ao inicializar banco de dados: {e}")
         # Não interrompe a aplicação, mas loga o erro
@@ -219,6 +237,9 @@ async def startup_event():
                 from utils.data_updater import DataUpdater
                 updater = DataUpdater()
                 logger.info("Iniciando atualização inicial de empresas MDIC e sinergias...")
+                # Índice de busca do cadastro/MDIC (bancos alterados fora dos fluxos de gravação)
+                with SessionLocal() as db:
+                    sincronizar_indices_cadastro(db)
                 await updater.atualizar_empresas_mdic()
                 await updater.atualizar_relacionamentos(limite=500)  # Limite menor na inicialização
                 await updater.atualizar_sinergias(limite_empresas=50)  # Limite menor na inicialização
@@ -232,7 +253,8 @@ async def startup_event():
         def run_initial_update():
             import time
             time.sleep(30)
-            asyncio.run(atualizacao_inicial())
+            from services.clientes_http import com_clientes_http
+            asyncio.run(com_clientes_http(atualizacao_inicial()))
         
         update_thread = threading.Thread(target=run_initial_update, daemon=True)
         update_thread.start()
@@ -242,6 +264,14 @@ async def startup_event():
         # Não interrompe a aplicação se o scheduler falhar
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Fecha os clientes HTTP compartilhados (conexões mantidas em keep-alive) e o executor do banco."""
+    from services.clientes_http import fechar_clientes_http
+    await fechar_clientes_http()
+    encerrar_executor_banco()
+
+
 # Mapeamento de UF para Nome Completo do Estado
 UF_PARA_ESTADO = {
     'AC': 'Acre',
@@ -318,10 +348,29 @@ class DashboardStats(BaseModel):
     aviso_dados_sem_empresa: Optional[bool] = None  # True se filtro por empresa foi usado mas operações não têm nome/CNPJ preenchido
 
 
-# Cache simples em memória para aliviar o /dashboard/stats
-_DASHBOARD_CACHE = {}
-_DASHBOARD_CACHE_LOCK = Lock()
-_DASHBOARD_CACHE_TTL_SECONDS = 300
+# Cache de respostas (LRU em memória ou SQLite compartilhado, TTL por endpoint)
+# As chaves incluem a versão dos dados lidos (services.versoes), invalidada a cada importação
+from services.cache import obter_cache
+from services.busca_empresas import (
+    FONTE_EMPRESAS, buscar_empresas, preparar_indice_busca, sincronizar_indices_cadastro,
+)
+from services.autocomplete_memoria import iniciar_carregamento, motor_em_dia, obter_motor
+from services.empresas_mdic import buscar_empresas_mdic, indice_empresas_mdic, sincronizar_empresas_mdic
+from services.busca_operacoes import (
+    CONTAGENS as CONTAGENS_BUSCA, BuscaFiltros, buscar_pagina, contar_total, preparar_indice_paginacao,
+)
+from services.conjuntos_json import obter_conjunto_json
+from services.execucao_banco import encerrar_executor_banco, rota_banco
+from services.planilha_recomendadas import obter_planilha_recomendadas
+from services.versoes import (
+    TABELA_CNAE, TABELA_EMPRESAS, TABELA_EMPRESAS_MDIC, TABELA_EMPRESAS_RECOMENDADAS, TABELA_OPERACOES,
+    TABELA_SINERGIAS, assinatura_versoes, registrar_alteracao, versao_tabela,
+)
+
+_DASHBOARD_CACHE = obter_cache("dashboard_stats")
+_NCM_ANALISE_CACHE = obter_cache("ncm_analise")
+_AUTOCOMPLETE_CACHE = obter_cache("autocomplete")
+_SINERGIAS_CACHE = obter_cache("sinergias")
 
 
 def _make_dashboard_cache_key(
@@ -344,23 +393,32 @@ def _make_dashboard_cache_key(
     return "|".join(parts)
 
 
+def _chave_cache_versionada(
+    db: Session,
+    chave: str,
+    tabelas: List[str],
+    periodos: Optional[Dict[str, tuple]] = None,
+) -> Optional[str]:
+    """
+    Chave de cache com a assinatura das versões das tabelas lidas (só leitura: as
+    versões sobem nos fluxos de importação e na sincronização agendada dos rollups,
+    utils.scheduler). None = versões indisponíveis (não usar cache).
+    """
+    versao = assinatura_versoes(db, tabelas, periodos)
+    return f"{chave}|{versao}" if versao is not None else None
+
+
+def _orcamento_esgotado(inicio: float) -> bool:
+    """True se o autocomplete já gastou settings.autocomplete_budget_ms desde inicio (perf_counter)."""
+    return (time.perf_counter() - inicio) * 1000 >= settings.autocomplete_budget_ms
+
+
 def _get_cached_dashboard_stats(cache_key: str) -> Optional[dict]:
-    now = time.time()
-    with _DASHBOARD_CACHE_LOCK:
-        cached = _DASHBOARD_CACHE.get(cache_key)
-        if not cached:
-            return None
-        expires_at, payload = cached
-        if expires_at <= now:
-            _DASHBOARD_CACHE.pop(cache_key, None)
-            return None
-        return payload
+    return _DASHBOARD_CACHE.get(cache_key)
 
 
 def _set_cached_dashboard_stats(cache_key: str, payload: dict) -> None:
-    expires_at = time.time() + _DASHBOARD_CACHE_TTL_SECONDS
-    with _DASHBOARD_CACHE_LOCK:
-        _DASHBOARD_CACHE[cache_key] = (expires_at, payload)
+    _DASHBOARD_CACHE.set(cache_key, payload)
 
 
 _BIGQUERY_COMEX_TABLE = os.getenv(
@@ -569,26 +627,6 @@ def _buscar_empresas_bigquery_sugestoes(
             return []
 
 
-class BuscaFiltros(BaseModel):
-    """Filtros de busca."""
-    ncms: Optional[List[str]] = None  # Lista de NCMs
-    ncm: Optional[str] = None  # Mantido para compatibilidade
-    data_inicio: Optional[date] = None
-    data_fim: Optional[date] = None
-    tipo_operacao: Optional[str] = None
-    pais: Optional[str] = None
-    uf: Optional[str] = None
-    via_transporte: Optional[str] = None
-    valor_fob_min: Optional[float] = None
-    valor_fob_max: Optional[float] = None
-    peso_min: Optional[float] = None
-    peso_max: Optional[float] = None
-    empresa_importadora: Optional[str] = None
-    empresa_exportadora: Optional[str] = None
-    page: int = 1
-    page_size: int = 50
-
-
 # Endpoints
 @app.get("/")
 async def root():
@@ -611,7 +649,8 @@ async def health_check():
 
 
 @app.get("/validar-sistema")
-async def validar_sistema_completo(db: Session = Depends(get_db)):
+@rota_banco
+def validar_sistema_completo(db: Session = Depends(get_db)):
     """
     Validação completa do sistema.
     Verifica:
@@ -880,11 +919,6 @@ async def coletar_dados(db: Session = Depends(get_db)):
                     total_saved = 0
                     for filepath in downloaded_files:
                         try:
-                            # Parse CSV
-                            raw_data = csv_scraper.parse_csv_file(filepath)
-                            if not raw_data:
-                                continue
-                            
                             # Extrair mês e tipo do nome do arquivo
                             nome = filepath.stem
                             if "importacao" in nome.lower():
@@ -903,14 +937,15 @@ async def coletar_dados(db: Session = Depends(get_db)):
                             else:
                                 mes_str = datetime.now().strftime("%Y-%m")
                             
-                            # Transformar dados
-                            transformed = transformer.transform_csv_data(raw_data, mes_str, tipo)
-                            
-                            # Salvar no banco
-                            saved = collector._save_to_database(db, transformed, mes_str, tipo)
-                            total_saved += saved
+                            # Parse CSV em lotes: transformar e salvar cada lote antes de ler o próximo
+                            lidos = 0
+                            for raw_data in csv_scraper.iterar_lotes_csv(filepath):
+                                lidos += len(raw_data)
+                                transformed = transformer.transform_csv_data(raw_data, mes_str, tipo)
+                                saved = collector._save_to_database(db, transformed, mes_str, tipo)
+                                total_saved += saved
                             
-                            if mes_str not in stats["meses_processados"]:
+                            if lidos and mes_str not in stats["meses_processados"]:
                                 stats["meses_processados"].append(mes_str)
                                 
                         except Exception as e:
@@ -954,26 +989,9 @@ def processar_excel_comex_task(caminho_temp: str, nome_original: str):
     
     try:
         logger.info(f"🔄 Iniciando processamento de: {nome_original}")
-        import pandas as pd
-        from datetime import date
-        import re
-        from database.models import OperacaoComex, TipoOperacao, ViaTransporte
-        
-        df = pd.read_excel(caminho_temp)
-        logger.info(f"✅ Arquivo lido: {len(df)} linhas")
-        
-        # Detectar ano pelo nome do arquivo
-        ano_match = re.search(r'20\d{2}', nome_original)
-        ano = int(ano_match.group()) if ano_match else date.today().year
-        
-        operacoes_para_inserir = []
-        
-        meses_map = {
-            'janeiro': 1, 'fevereiro': 2, 'março': 3, 'marco': 3,
-            'abril': 4, 'maio': 5, 'junho': 6,
-            'julho': 7, 'agosto': 8, 'setembro': 9,
-            'outubro': 10, 'novembro': 11, 'dezembro': 12
-        }
+        from services.carga_operacoes import CargaOperacoes
+        from services.importacao_comex import ano_do_arquivo, transformar_planilha_comex
+        from services.leitura_planilhas import ler_em_lotes
         
         stats = {
             "total_registros": 0,
@@ -981,162 +999,29 @@ def processar_excel_comex_task(caminho_temp: str, nome_original: str):
             "exportacoes": 0,
             "erros": 0
         }
-        
-        # Processar linhas
-        for idx, row in df.iterrows():
-            try:
-                # Extrair NCM
-                ncm = str(row.get('Código NCM', '')).strip() if pd.notna(row.get('Código NCM')) else None
-                if not ncm or len(ncm) < 4:
-                    continue
-                
-                ncm_normalizado = ncm[:8] if len(ncm) >= 8 else ncm.zfill(8)
-                descricao = str(row.get('Descrição NCM', '')).strip()[:500] if pd.notna(row.get('Descrição NCM')) else ''
-                # Usar "UF Produto" ou "UF do Produto" (prioridade para "UF Produto")
-                uf = (
-                    str(row.get('UF Produto', '')).strip()[:2] if pd.notna(row.get('UF Produto')) else
-                    str(row.get('UF do Produto', '')).strip()[:2] if pd.notna(row.get('UF do Produto')) else
-                    None
-                )
-                pais = str(row.get('Países', '')).strip() if pd.notna(row.get('Países')) else None
-                
-                # Processar mês
-                mes_str = str(row.get('Mês', '')).strip() if pd.notna(row.get('Mês')) else ''
-                mes = None
-                
-                if mes_str:
-                    match = re.search(r'(\d{1,2})', mes_str)
-                    if match:
-                        mes = int(match.group(1))
-                    else:
-                        for nome, num in meses_map.items():
-                            if nome in mes_str.lower():
-                                mes = num
-                                break
-                
-                if not mes or mes < 1 or mes > 12:
-                    mes = 1
-                
-                data_operacao = date(ano, mes, 1)
-                mes_referencia = f"{ano}-{mes:02d}"
-                
-                # Processar EXPORTAÇÃO
-                def _parse_number(value) -> float:
-                    if pd.isna(value):
-                        return 0.0
-                    if isinstance(value, (int, float)):
-                        return float(value)
-                    text = str(value).strip()
-                    if not text:
-                        return 0.0
-                    if "," in text and "." in text:
-                        text = text.replace(".", "").replace(",", ".")
-                    elif "," in text:
-                        text = text.replace(",", ".")
-                    try:
-                        return float(text)
-                    except ValueError:
-                        return 0.0
-
-                valor_exp = _parse_number(
-                    row.get('Exportação - 2025 - Valor US$ FOB', 0) or
-                    row.get('Exportação - Valor US$ FOB', 0) or
-                    row.get('Valor Exportação', 0)
-                )
-                peso_exp = _parse_number(
-                    row.get('Exportação - 2025 - Quilograma Líquido', 0) or
-                    row.get('Exportação - Quilograma Líquido', 0) or
-                    row.get('Peso Exportação', 0)
-                )
-                quantidade_exp = _parse_number(
-                    row.get('Exportação - 2025 - Quantidade Estatística', 0) or
-                    row.get('Exportação - Quantidade Estatística', 0) or
-                    row.get('Quantidade Exportação', 0)
-                )
-                
-                if valor_exp > 0:
-                    operacoes_para_inserir.append({
-                        'ncm': ncm_normalizado,
-                        'descricao_produto': descricao,
-                        'tipo_operacao': TipoOperacao.EXPORTACAO,
-                        'via_transporte': ViaTransporte.OUTRAS,
-                        'uf': uf,
-                        'pais_origem_destino': pais,
-                        'valor_fob': float(valor_exp),
-                        'peso_liquido_kg': float(peso_exp),
-                        'quantidade_estatistica': float(quantidade_exp),
-                        'data_operacao': data_operacao,
-                        'mes_referencia': mes_referencia,
-                        'arquivo_origem': nome_original
-                    })
-                    stats["exportacoes"] += 1
-                    stats["total_registros"] += 1
-                
-                # Processar IMPORTAÇÃO
-                valor_imp = _parse_number(
-                    row.get('Importação - 2025 - Valor US$ FOB', 0) or
-                    row.get('Importação - Valor US$ FOB', 0) or
-                    row.get('Valor Importação', 0)
-                )
-                peso_imp = _parse_number(
-                    row.get('Importação - 2025 - Quilograma Líquido', 0) or
-                    row.get('Importação - Quilograma Líquido', 0) or
-                    row.get('Peso Importação', 0)
-                )
-                quantidade_imp = _parse_number(
-                    row.get('Importação - 2025 - Quantidade Estatística', 0) or
-                    row.get('Importação - Quantidade Estatística', 0) or
-                    row.get('Quantidade Importação', 0)
-                )
-                
-                if valor_imp > 0:
-                    operacoes_para_inserir.append({
-                        'ncm': ncm_normalizado,
-                        'descricao_produto': descricao,
-                        'tipo_operacao': TipoOperacao.IMPORTACAO,
-                        'via_transporte': ViaTransporte.OUTRAS,
-                        'uf': uf,
-                        'pais_origem_destino': pais,
-                        'valor_fob': float(valor_imp),
-                        'peso_liquido_kg': float(peso_imp),
-                        'quantidade_estatistica': float(quantidade_imp),
-                        'data_operacao': data_operacao,
-                        'mes_referencia': mes_referencia,
-                        'arquivo_origem': nome_original
-                    })
-                    stats["importacoes"] += 1
-                    stats["total_registros"] += 1
-            
-            except Exception as e:
-                logger.warning(f"Erro na linha {idx}: {e}")
-                stats["erros"] += 1
-                continue
-        
-        # Bulk Insert em chunks de 1000
-        logger.info(f"💾 Inserindo {len(operacoes_para_inserir)} operações no banco...")
-        
-        for i in range(0, len(operacoes_para_inserir), 1000):
-            chunk = operacoes_para_inserir[i:i + 1000]
-            
-            try:
-                db.bulk_insert_mappings(OperacaoComex, chunk)
-                db.commit()
-                logger.info(f"  ✅ Inseridos {min(i + 1000, len(operacoes_para_inserir))}/{len(operacoes_para_inserir)} registros")
-            
-            except SQLAlchemyError as e:
-                logger.error(f"❌ Erro no chunk {i}-{i+1000}: {e}")
-                db.rollback()
-                
-                # Tentar inserir um por um apenas se o chunk falhar
-                for item in chunk:
-                    try:
-                        db.bulk_insert_mappings(OperacaoComex, [item])
-                        db.commit()
-                    except Exception as e2:
-                        logger.error(f"Registro inválido: {item.get('ncm', 'N/A')} - {e2}")
-                        db.rollback()
-        
+        meses_importados = set()
+        linhas_lidas = 0
+        ano = ano_do_arquivo(nome_original)
+        carga = CargaOperacoes(db, f"excel_{Path(nome_original).stem}")
+        
+        # Leitura em lotes (memória limitada pelo lote, não pelo arquivo); cada lote é
+        # transformado de forma colunar e gravado pela carga em massa antes de o próximo
+        # ser lido (registros inválidos vão para o arquivo de rejeitos)
+        for lote in ler_em_lotes(caminho_temp):
+            linhas_lidas += len(lote)
+            for operacoes_para_inserir in transformar_planilha_comex(lote, nome_original, ano=ano, estatisticas=stats):
+                meses_importados.update(op['mes_referencia'] for op in operacoes_para_inserir)
+                carga.carregar(operacoes_para_inserir)
+            
+            logger.info(f"  ✅ {linhas_lidas} linhas lidas, {carga.inseridos}/{stats['total_registros']} registros inseridos")
+        
+        stats["erros"] += carga.rejeitados
+        carga.relatorio()
         logger.success(f"✅ Importação concluída: {stats['total_registros']} registros ({stats['importacoes']} importações, {stats['exportacoes']} exportações, {stats['erros']} erros)")
+        
+        # Atualizar rollups mensais do dashboard apenas para os meses importados
+        from services.rollups import atualizar_rollups
+        atualizar_rollups(db, meses_importados)
     
     except Exception as e:
         logger.error(f"❌ Falha crítica no processamento: {e}")
@@ -1272,6 +1157,7 @@ def processar_cnae_task(caminho_temp: str, nome_original: str):
                     db.rollback()
         
         logger.success(f"✅ Importação CNAE concluída: {stats['inseridos']} inseridos, {stats['atualizados']} atualizados, {stats['erros']} erros")
+        registrar_alteracao(db, TABELA_CNAE)
     
     except Exception as e:
         logger.error(f"❌ Falha crítica no processamento CNAE: {e}")
@@ -1292,28 +1178,33 @@ def processar_cnae_task(caminho_temp: str, nome_original: str):
 @app.post("/upload-e-importar-excel", tags=["importacao"])
 async def upload_e_importar_excel(
     background_tasks: BackgroundTasks,
-    arquivo: UploadFile = File(..., description="Arquivo Excel (.xlsx ou .xls) para importar")
+    arquivo: UploadFile = File(..., description="Arquivo Excel (.xlsx ou .xls) ou CSV para importar")
 ):
     """
-    Faz upload de um arquivo Excel e importa automaticamente para o banco de dados.
+    Faz upload de um arquivo Excel (ou CSV) e importa automaticamente para o banco de dados.
     OTIMIZADO: Usa BackgroundTasks do FastAPI para processamento assíncrono seguro.
+    O arquivo é gravado e lido em blocos (memória limitada, não depende do tamanho do arquivo).
     """
     import tempfile
     import os
     
     # Validar extensão
-    if not (arquivo.filename.endswith('.xlsx') or arquivo.filename.endswith('.xls')):
-        raise HTTPException(status_code=400, detail="Arquivo deve ser Excel (.xlsx ou .xls)")
+    sufixo = Path(arquivo.filename or "").suffix.lower()
+    if sufixo not in ('.xlsx', '.xls', '.csv'):
+        raise HTTPException(status_code=400, detail="Arquivo deve ser Excel (.xlsx ou .xls) ou CSV")
     
     logger.info(f"📤 Recebendo upload do arquivo: {arquivo.filename}")
     
-    # Criar arquivo temporário de forma segura
-    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    # Criar arquivo temporário de forma segura (extensão define o leitor)
+    fd, path = tempfile.mkstemp(suffix=sufixo)
     
     try:
         with os.fdopen(fd, 'wb') as tmp:
-            conteudo = await arquivo.read()
-            tmp.write(conteudo)
+            while True:
+                bloco = await arquivo.read(1024 * 1024)
+                if not bloco:
+                    break
+                tmp.write(bloco)
         
         logger.info(f"✅ Arquivo salvo temporariamente: {path}")
         
@@ -1339,7 +1230,8 @@ async def upload_e_importar_excel(
 
 
 @app.post("/importar-excel-automatico")
-async def importar_excel_automatico(
+@rota_banco
+def importar_excel_automatico(
     db: Session = Depends(get_db)
 ):
     """
@@ -1349,9 +1241,12 @@ async def importar_excel_automatico(
     """
     try:
         from pathlib import Path
-        import pandas as pd
-        from datetime import date
-        from database.models import OperacaoComex, TipoOperacao, ViaTransporte
+        from database.models import TipoOperacao
+        from services.carga_operacoes import CargaOperacoes
+        from services.importacao_comex import (
+            ano_do_arquivo, filtrar_operacoes_existentes, transformar_planilha_comex
+        )
+        from services.leitura_planilhas import ler_em_lotes
         
         logger.info("Iniciando importação automática de arquivos Excel...")
         
@@ -1409,10 +1304,6 @@ async def importar_excel_automatico(
             try:
                 logger.info(f"📄 Processando arquivo: {arquivo_excel.name}")
                 
-                # Ler Excel
-                df = pd.read_excel(arquivo_excel)
-                logger.info(f"✅ Arquivo lido: {len(df)} linhas, {len(df.columns)} colunas")
-                
                 stats_arquivo = {
                     "arquivo": arquivo_excel.name,
                     "total_registros": 0,
@@ -1420,153 +1311,29 @@ async def importar_excel_automatico(
                     "exportacoes": 0,
                     "erros": []
                 }
-                
-                # Processar cada linha
-                for idx, row in df.iterrows():
-                    try:
-                        # Extrair dados básicos
-                        ncm = str(row.get('Código NCM', '')).strip() if pd.notna(row.get('Código NCM')) else None
-                        if not ncm or len(ncm) < 4:
-                            continue
-                        
-                        descricao = str(row.get('Descrição NCM', '')).strip()[:500] if pd.notna(row.get('Descrição NCM')) else ''
-                        # Usar "UF Produto" ou "UF do Produto" (prioridade para "UF Produto")
-                        uf = (
-                            str(row.get('UF Produto', '')).strip()[:2] if pd.notna(row.get('UF Produto')) else
-                            str(row.get('UF do Produto', '')).strip()[:2] if pd.notna(row.get('UF do Produto')) else
-                            None
-                        )
-                        pais = str(row.get('Países', '')).strip() if pd.notna(row.get('Países')) else None
-                        
-                        # Processar mês
-                        mes_str = str(row.get('Mês', '')).strip() if pd.notna(row.get('Mês')) else ''
-                        mes = None
-                        if mes_str:
-                            import re
-                            match = re.search(r'(\d{1,2})', mes_str)
-                            if match:
-                                mes = int(match.group(1))
-                            else:
-                                meses_map = {
-                                    'janeiro': 1, 'fevereiro': 2, 'março': 3, 'marco': 3,
-                                    'abril': 4, 'maio': 5, 'junho': 6,
-                                    'julho': 7, 'agosto': 8, 'setembro': 9,
-                                    'outubro': 10, 'novembro': 11, 'dezembro': 12
-                                }
-                                for nome, num in meses_map.items():
-                                    if nome in mes_str.lower():
-                                        mes = num
-                                        break
-                        
-                        if not mes:
-                            mes = 1  # Default
-                        
-                        # Tentar detectar ano do nome do arquivo ou usar padrão
-                        ano = 2025  # Default
-                        nome_arquivo_lower = arquivo_excel.name.lower()
-                        ano_match = re.search(r'20\d{2}', arquivo_excel.name)
-                        if ano_match:
-                            ano = int(ano_match.group())
-                        
-                        data_operacao = date(ano, mes, 1)
-                        mes_referencia = f"{ano}-{mes:02d}"
-                        
-                        # Processar EXPORTAÇÃO
-                        valor_exp = row.get('Exportação - 2025 - Valor US$ FOB', 0) or row.get('Exportação - Valor US$ FOB', 0) or row.get('Valor Exportação', 0)
-                        peso_exp = row.get('Exportação - 2025 - Quilograma Líquido', 0) or row.get('Exportação - Quilograma Líquido', 0) or row.get('Peso Exportação', 0)
-                        quantidade_exp = (
-                            row.get('Exportação - 2025 - Quantidade Estatística', 0)
-                            or row.get('Exportação - Quantidade Estatística', 0)
-                            or row.get('Quantidade Exportação', 0)
-                        )
-                        
-                        if pd.notna(valor_exp) and float(valor_exp) > 0:
-                            # Verificar se já existe
-                            existing = db.query(OperacaoComex).filter(
-                                and_(
-                                    OperacaoComex.ncm == ncm[:8] if len(ncm) >= 8 else ncm.zfill(8),
-                                    OperacaoComex.tipo_operacao == TipoOperacao.EXPORTACAO,
-                                    OperacaoComex.data_operacao == data_operacao,
-                                    OperacaoComex.pais_origem_destino == pais,
-                                    OperacaoComex.uf == uf
-                                )
-                            ).first()
-                            
-                            if not existing:
-                                operacao = OperacaoComex(
-                                    ncm=ncm[:8] if len(ncm) >= 8 else ncm.zfill(8),
-                                    descricao_produto=descricao,
-                                    tipo_operacao=TipoOperacao.EXPORTACAO,
-                                    via_transporte=ViaTransporte.OUTRAS,
-                                    uf=uf,
-                                    pais_origem_destino=pais,
-                                    valor_fob=float(valor_exp),
-                                    peso_liquido_kg=float(peso_exp) if pd.notna(peso_exp) else 0,
-                                    quantidade_estatistica=float(quantidade_exp) if pd.notna(quantidade_exp) else 0,
-                                    data_operacao=data_operacao,
-                                    mes_referencia=mes_referencia,
-                                    arquivo_origem=arquivo_excel.name
-                                )
-                                db.add(operacao)
-                                stats_arquivo["exportacoes"] += 1
-                                stats_arquivo["total_registros"] += 1
-                                stats_geral["exportacoes"] += 1
-                                stats_geral["total_registros"] += 1
-                        
-                        # Processar IMPORTAÇÃO
-                        valor_imp = row.get('Importação - 2025 - Valor US$ FOB', 0) or row.get('Importação - Valor US$ FOB', 0) or row.get('Valor Importação', 0)
-                        peso_imp = row.get('Importação - 2025 - Quilograma Líquido', 0) or row.get('Importação - Quilograma Líquido', 0) or row.get('Peso Importação', 0)
-                        quantidade_imp = (
-                            row.get('Importação - 2025 - Quantidade Estatística', 0)
-                            or row.get('Importação - Quantidade Estatística', 0)
-                            or row.get('Quantidade Importação', 0)
-                        )
-                        
-                        if pd.notna(valor_imp) and float(valor_imp) > 0:
-                            # Verificar se já existe
-                            existing = db.query(OperacaoComex).filter(
-                                and_(
-                                    OperacaoComex.ncm == ncm[:8] if len(ncm) >= 8 else ncm.zfill(8),
-                                    OperacaoComex.tipo_operacao == TipoOperacao.IMPORTACAO,
-                                    OperacaoComex.data_operacao == data_operacao,
-                                    OperacaoComex.pais_origem_destino == pais,
-                                    OperacaoComex.uf == uf
-                                )
-                            ).first()
-                            
-                            if not existing:
-                                operacao = OperacaoComex(
-                                    ncm=ncm[:8] if len(ncm) >= 8 else ncm.zfill(8),
-                                    descricao_produto=descricao,
-                                    tipo_operacao=TipoOperacao.IMPORTACAO,
-                                    via_transporte=ViaTransporte.OUTRAS,
-                                    uf=uf,
-                                    pais_origem_destino=pais,
-                                    valor_fob=float(valor_imp),
-                                    peso_liquido_kg=float(peso_imp) if pd.notna(peso_imp) else 0,
-                                    quantidade_estatistica=float(quantidade_imp) if pd.notna(quantidade_imp) else 0,
-                                    data_operacao=data_operacao,
-                                    mes_referencia=mes_referencia,
-                                    arquivo_origem=arquivo_excel.name
-                                )
-                                db.add(operacao)
-                                stats_arquivo["importacoes"] += 1
-                                stats_arquivo["total_registros"] += 1
-                                stats_geral["importacoes"] += 1
-                                stats_geral["total_registros"] += 1
-                        
-                        # Commit a cada 1000 registros
-                        if stats_geral["total_registros"] % 1000 == 0:
-                            db.commit()
-                            logger.info(f"  Processados {stats_geral['total_registros']} registros...")
-                    
-                    except Exception as e:
-                        logger.error(f"Erro ao processar linha {idx} do arquivo {arquivo_excel.name}: {e}")
-                        stats_arquivo["erros"].append(f"Linha {idx}: {str(e)}")
-                        continue
-                
-                # Commit final do arquivo
-                db.commit()
+                ano = ano_do_arquivo(arquivo_excel.name)
+                chaves_vistas = set()
+                linhas_lidas = 0
+                carga = CargaOperacoes(db, f"excel_{arquivo_excel.stem}")
+                
+                # Ler em lotes e transformar de forma colunar; operações já existentes
+                # (mesmo NCM, tipo, data, país e UF) são filtradas por lote e as novas
+                # gravadas pela carga em massa
+                for lote in ler_em_lotes(arquivo_excel):
+                    linhas_lidas += len(lote)
+                    for operacoes in transformar_planilha_comex(lote, arquivo_excel.name, ano=ano):
+                        novas = filtrar_operacoes_existentes(db, operacoes, chaves_vistas)
+                        carga.carregar(novas)
+                        exportacoes = sum(1 for op in novas if op['tipo_operacao'] == TipoOperacao.EXPORTACAO)
+                        stats_arquivo["exportacoes"] += exportacoes
+                        stats_arquivo["importacoes"] += len(novas) - exportacoes
+                        stats_arquivo["total_registros"] += len(novas)
+                        stats_geral["exportacoes"] += exportacoes
+                        stats_geral["importacoes"] += len(novas) - exportacoes
+                        stats_geral["total_registros"] += len(novas)
+                    logger.info(f"  Processadas {linhas_lidas} linhas, {stats_geral['total_registros']} registros...")
+                
+                stats_arquivo["carga"] = carga.relatorio()
                 stats_geral["arquivos_processados"] += 1
                 stats_geral["detalhes_por_arquivo"].append(stats_arquivo)
                 logger.success(f"✅ Arquivo {arquivo_excel.name} processado: {stats_arquivo['total_registros']} registros ({stats_arquivo['importacoes']} importações, {stats_arquivo['exportacoes']} exportações)")
@@ -1575,10 +1342,15 @@ async def importar_excel_automatico(
                 logger.error(f"Erro ao processar arquivo {arquivo_excel.name}: {e}")
                 import traceback
                 logger.error(traceback.format_exc())
+                db.rollback()
                 stats_geral["arquivos_com_erro"] += 1
                 stats_geral["erros"].append(f"Arquivo {arquivo_excel.name}: {str(e)}")
                 continue
         
+        # Atualizar rollups mensais do dashboard (meses das linhas novas)
+        from services.rollups import atualizar_rollups
+        atualizar_rollups(db)
+        
         logger.success(
             f"✅ Importação automática concluída: {stats_geral['arquivos_processados']} arquivo(s) processado(s), "
             f"{stats_geral['total_registros']} registros ({stats_geral['importacoes']} importações, {stats_geral['exportacoes']} exportações)"
@@ -1598,7 +1370,8 @@ async def importar_excel_automatico(
 
 
 @app.post("/importar-excel-manual")
-async def importar_excel_manual(
+@rota_banco
+def importar_excel_manual(
     nome_arquivo: str = Query(..., description="Nome do arquivo Excel (ex: H_EXPORTACAO_E IMPORTACAO_GERAL_2025-01_2025-12_DT20260107.xlsx)"),
     db: Session = Depends(get_db)
 ):
@@ -1609,9 +1382,12 @@ async def importar_excel_manual(
     """
     try:
         from pathlib import Path
-        import pandas as pd
-        from datetime import date
-        from database.models import OperacaoComex, TipoOperacao
+        from database.models import TipoOperacao
+        from services.carga_operacoes import CargaOperacoes
+        from services.importacao_comex import (
+            ano_do_arquivo, filtrar_operacoes_existentes, transformar_planilha_comex
+        )
+        from services.leitura_planilhas import ler_em_lotes
         
         logger.info(f"Iniciando importação manual do arquivo: {nome_arquivo}")
         
@@ -1638,142 +1414,37 @@ async def importar_excel_manual(
         
         logger.info(f"✅ Arquivo encontrado: {arquivo_excel}")
         
-        # Ler Excel
-        df = pd.read_excel(arquivo_excel)
-        logger.info(f"✅ Arquivo lido: {len(df)} linhas, {len(df.columns)} colunas")
-        
         stats = {
             "total_registros": 0,
             "importacoes": 0,
             "exportacoes": 0,
             "erros": []
         }
-        
-        # Processar cada linha
-        for idx, row in df.iterrows():
-            try:
-                # Extrair dados básicos
-                ncm = str(row.get('Código NCM', '')).strip() if pd.notna(row.get('Código NCM')) else None
-                if not ncm or len(ncm) < 4:
-                    continue
-                
-                descricao = str(row.get('Descrição NCM', '')).strip()[:500] if pd.notna(row.get('Descrição NCM')) else ''
-                uf = str(row.get('UF do Produto', '')).strip()[:2] if pd.notna(row.get('UF do Produto')) else None
-                pais = str(row.get('Países', '')).strip() if pd.notna(row.get('Países')) else None
-                
-                # Processar mês
-                mes_str = str(row.get('Mês', '')).strip() if pd.notna(row.get('Mês')) else ''
-                mes = None
-                if mes_str:
-                    # Tentar extrair número do mês
-                    import re
-                    match = re.search(r'(\d{1,2})', mes_str)
-                    if match:
-                        mes = int(match.group(1))
-                    else:
-                        meses_map = {
-                            'janeiro': 1, 'fevereiro': 2, 'março': 3, 'marco': 3,
-                            'abril': 4, 'maio': 5, 'junho': 6,
-                            'julho': 7, 'agosto': 8, 'setembro': 9,
-                            'outubro': 10, 'novembro': 11, 'dezembro': 12
-                        }
-                        for nome, num in meses_map.items():
-                            if nome in mes_str.lower():
-                                mes = num
-                                break
-                
-                if not mes:
-                    mes = 1  # Default
-                
-                ano = 2025  # Ano do arquivo
-                data_operacao = date(ano, mes, 1)
-                mes_referencia = f"{ano}-{mes:02d}"
-                
-                # Processar EXPORTAÇÃO
-                valor_exp = row.get('Exportação - 2025 - Valor US$ FOB', 0)
-                peso_exp = row.get('Exportação - 2025 - Quilograma Líquido', 0)
-                quantidade_exp = row.get('Exportação - 2025 - Quantidade Estatística', 0)
-                
-                if pd.notna(valor_exp) and float(valor_exp) > 0:
-                    # Verificar se já existe
-                    existing = db.query(OperacaoComex).filter(
-                        and_(
-                            OperacaoComex.ncm == ncm[:8] if len(ncm) >= 8 else ncm.zfill(8),
-                            OperacaoComex.tipo_operacao == TipoOperacao.EXPORTACAO,
-                            OperacaoComex.data_operacao == data_operacao,
-                            OperacaoComex.pais_origem_destino == pais,
-                            OperacaoComex.uf == uf
-                        )
-                    ).first()
-                    
-                    if not existing:
-                        operacao = OperacaoComex(
-                            ncm=ncm[:8] if len(ncm) >= 8 else ncm.zfill(8),
-                            descricao_produto=descricao,
-                            tipo_operacao=TipoOperacao.EXPORTACAO,
-                            via_transporte=ViaTransporte.OUTRAS,
-                            uf=uf,
-                            pais_origem_destino=pais,
-                            valor_fob=float(valor_exp),
-                            peso_liquido_kg=float(peso_exp) if pd.notna(peso_exp) else 0,
-                            quantidade_estatistica=float(quantidade_exp) if pd.notna(quantidade_exp) else 0,
-                            data_operacao=data_operacao,
-                            mes_referencia=mes_referencia,
-                            arquivo_origem=nome_arquivo
-                        )
-                        db.add(operacao)
-                        stats["exportacoes"] += 1
-                        stats["total_registros"] += 1
-                
-                # Processar IMPORTAÇÃO
-                valor_imp = row.get('Importação - 2025 - Valor US$ FOB', 0)
-                peso_imp = row.get('Importação - 2025 - Quilograma Líquido', 0)
-                quantidade_imp = row.get('Importação - 2025 - Quantidade Estatística', 0)
-                
-                if pd.notna(valor_imp) and float(valor_imp) > 0:
-                    # Verificar se já existe
-                    existing = db.query(OperacaoComex).filter(
-                        and_(
-                            OperacaoComex.ncm == ncm[:8] if len(ncm) >= 8 else ncm.zfill(8),
-                            OperacaoComex.tipo_operacao == TipoOperacao.IMPORTACAO,
-                            OperacaoComex.data_operacao == data_operacao,
-                            OperacaoComex.pais_origem_destino == pais,
-                            OperacaoComex.uf == uf
-                        )
-                    ).first()
-                    
-                    if not existing:
-                        operacao = OperacaoComex(
-                            ncm=ncm[:8] if len(ncm) >= 8 else ncm.zfill(8),
-                            descricao_produto=descricao,
-                            tipo_operacao=TipoOperacao.IMPORTACAO,
-                            via_transporte=ViaTransporte.OUTRAS,
-                            uf=uf,
-                            pais_origem_destino=pais,
-                            valor_fob=float(valor_imp),
-                            peso_liquido_kg=float(peso_imp) if pd.notna(peso_imp) else 0,
-                            quantidade_estatistica=float(quantidade_imp) if pd.notna(quantidade_imp) else 0,
-                            data_operacao=data_operacao,
-                            mes_referencia=mes_referencia,
-                            arquivo_origem=nome_arquivo
-                        )
-                        db.add(operacao)
-                        stats["importacoes"] += 1
-                        stats["total_registros"] += 1
-                
-                # Commit a cada 1000 registros
-                if stats["total_registros"] % 1000 == 0:
-                    db.commit()
-                    logger.info(f"  Processados {stats['total_registros']} registros...")
-            
-            except Exception as e:
-                logger.error(f"Erro ao processar linha {idx}: {e}")
-                stats["erros"].append(f"Linha {idx}: {str(e)}")
-                continue
-        
-        db.commit()
+        ano = ano_do_arquivo(arquivo_excel.name)
+        chaves_vistas = set()
+        linhas_lidas = 0
+        carga = CargaOperacoes(db, f"excel_{arquivo_excel.stem}")
+        
+        # Mesmo fluxo da importação automática: lotes, transformação colunar,
+        # filtro das operações já existentes e carga em massa
+        for lote in ler_em_lotes(arquivo_excel):
+            linhas_lidas += len(lote)
+            for operacoes in transformar_planilha_comex(lote, arquivo_excel.name, ano=ano):
+                novas = filtrar_operacoes_existentes(db, operacoes, chaves_vistas)
+                carga.carregar(novas)
+                exportacoes = sum(1 for op in novas if op['tipo_operacao'] == TipoOperacao.EXPORTACAO)
+                stats["exportacoes"] += exportacoes
+                stats["importacoes"] += len(novas) - exportacoes
+                stats["total_registros"] += len(novas)
+            logger.info(f"  Processadas {linhas_lidas} linhas, {stats['total_registros']} registros...")
+        
+        stats["carga"] = carga.relatorio()
         logger.success(f"✅ Importação concluída: {stats['total_registros']} registros ({stats['importacoes']} importações, {stats['exportacoes']} exportações)")
         
+        # Atualizar rollups mensais do dashboard (meses das linhas novas)
+        from services.rollups import atualizar_rollups
+        atualizar_rollups(db)
+        
         return {
             "success": True,
             "message": "Importação manual concluída",
@@ -1843,7 +1514,8 @@ async def upload_e_importar_cnae(
 # ============================================================================
 
 @app.post("/testar-upload-banco", tags=["teste"])
-async def testar_upload_banco():
+@rota_banco
+def testar_upload_banco():
     """
     Endpoint de teste para verificar conexão com banco e inserir registro de teste.
     """
@@ -1925,7 +1597,8 @@ async def testar_upload_banco():
 
 
 @app.post("/testar-upload-automatico", tags=["teste"])
-async def testar_upload_automatico():
+@rota_banco
+def testar_upload_automatico():
     """
     Endpoint de teste para verificar se o processamento automático funciona.
     Cria um arquivo Excel de teste em memória e tenta processá-lo.
@@ -1999,7 +1672,8 @@ async def testar_upload_automatico():
 
 
 @app.get("/diagnostico-sistema", tags=["teste"])
-async def diagnostico_sistema():
+@rota_banco
+def diagnostico_sistema():
     """
     Endpoint de diagnóstico completo do sistema.
     """
@@ -2082,7 +1756,8 @@ async def diagnostico_sistema():
 
 
 @app.post("/importar-cnae-automatico")
-async def importar_cnae_automatico(
+@rota_banco
+def importar_cnae_automatico(
     db: Session = Depends(get_db)
 ):
     """
@@ -2247,6 +1922,7 @@ async def importar_cnae_automatico(
             f"✅ Importação automática de CNAE concluída: {stats_geral['arquivos_processados']} arquivo(s) processado(s), "
             f"{stats_geral['inseridos']} inseridos, {stats_geral['atualizados']} atualizados"
         )
+        registrar_alteracao(db, TABELA_CNAE)
         
         return {
             "success": True,
@@ -2262,7 +1938,8 @@ async def importar_cnae_automatico(
 
 
 @app.post("/importar-cnae")
-async def importar_cnae(
+@rota_banco
+def importar_cnae(
     nome_arquivo: str = Query("CNAE.xlsx", description="Nome do arquivo CNAE (ex: CNAE.xlsx)"),
     db: Session = Depends(get_db)
 ):
@@ -2388,6 +2065,7 @@ async def importar_cnae(
         
         db.commit()
         logger.success(f"✅ Importação de CNAE concluída: {stats['inseridos']} inseridos, {stats['atualizados']} atualizados")
+        registrar_alteracao(db, TABELA_CNAE)
         
         return {
             "success": True,
@@ -2405,7 +2083,8 @@ async def importar_cnae(
 
 
 @app.post("/coletar-empresas-bigquery-ultimos-anos")
-async def coletar_empresas_bigquery_ultimos_anos(
+@rota_banco
+def coletar_empresas_bigquery_ultimos_anos(
     db: Session = Depends(get_db)
 ):
     """
@@ -2562,7 +2241,8 @@ async def validar_bigquery():
 
 
 @app.post("/enriquecer-com-cnae-relacionamentos")
-async def enriquecer_com_cnae_relacionamentos(
+@rota_banco
+def enriquecer_com_cnae_relacionamentos(
     db: Session = Depends(get_db)
 ):
     """
@@ -2577,9 +2257,8 @@ async def enriquecer_com_cnae_relacionamentos(
     """
     try:
         from pathlib import Path
-        from data_collector.cnae_analyzer import CNAEAnalyzer
+        from services.cnae import obter_cnae_analyzer
         from data_collector.sinergia_analyzer import SinergiaAnalyzer
-        from data_collector.empresas_mdic_scraper import EmpresasMDICScraper
         from database.models import Empresa, EmpresasRecomendadas
         from sqlalchemy import func
         
@@ -2644,12 +2323,7 @@ async def enriquecer_com_cnae_relacionamentos(
         if resultado["bigquery_validado"]:
             logger.info("2️⃣ Coletando empresas do BigQuery...")
             try:
-                scraper = EmpresasMDICScraper()
-                empresas_lista = await scraper.coletar_empresas()
-                for empresa in empresas_lista:
-                    cnpj = empresa.get("cnpj")
-                    if cnpj:
-                        empresas_mdic[cnpj] = empresa
+                empresas_mdic = indice_empresas_mdic(db)
                 resultado["empresas_coletadas"] = len(empresas_mdic)
                 logger.success(f"✅ {len(empresas_mdic)} empresas coletadas do BigQuery")
             except Exception as e:
@@ -2662,7 +2336,7 @@ async def enriquecer_com_cnae_relacionamentos(
         try:
             # Tentar múltiplos caminhos
             caminhos_cnae = [
-                Path("C:/Users/User/Desktop/Cursor/NOVO CNAE.xlsx"),
+                settings.cnae_arquivo,
                 Path(__file__).parent.parent / "NOVO CNAE.xlsx",
                 Path("/opt/render/project/src/NOVO CNAE.xlsx"),
             ]
@@ -2674,8 +2348,7 @@ async def enriquecer_com_cnae_relacionamentos(
                     break
             
             if arquivo_cnae:
-                cnae_analyzer = CNAEAnalyzer(arquivo_cnae)
-                cnae_analyzer.carregar_cnae_excel()
+                cnae_analyzer = obter_cnae_analyzer(arquivo_cnae)
                 logger.success("✅ CNAE carregado")
             else:
                 logger.warning("⚠️ Arquivo CNAE não encontrado")
@@ -2695,6 +2368,7 @@ async def enriquecer_com_cnae_relacionamentos(
             ).limit(10000).all()
             
             enriquecidas = 0
+            meses_enriquecidos = set()
             for op in operacoes_sem_empresa:
                 atualizada = False
                 
@@ -2719,6 +2393,7 @@ async def enriquecer_com_cnae_relacionamentos(
                 
                 if atualizada:
                     enriquecidas += 1
+                    meses_enriquecidos.add(op.mes_referencia)
                 
                 # Enriquecer com CNAE se disponível
                 if cnae_analyzer:
@@ -2734,6 +2409,7 @@ async def enriquecer_com_cnae_relacionamentos(
             
             if enriquecidas > 0:
                 db.commit()
+                registrar_alteracao(db, TABELA_OPERACOES, meses_enriquecidos)
                 resultado["empresas_enriquecidas_cnae"] = enriquecidas
                 logger.success(f"✅ {enriquecidas} operações enriquecidas")
         except Exception as e:
@@ -2949,6 +2625,7 @@ async def enriquecer_com_cnae_relacionamentos(
                         relacionamentos_criados += 1
             
             db.commit()
+            registrar_alteracao(db, TABELA_EMPRESAS_RECOMENDADAS)
             resultado["relacionamentos_criados"] = relacionamentos_criados
             resultado["recomendacoes_geradas"] = recomendacoes_geradas
             logger.success(f"✅ {relacionamentos_criados} relacionamentos criados, {recomendacoes_geradas} recomendações geradas")
@@ -3064,12 +2741,6 @@ async def coletar_dados_csv_direto(
         total_saved = 0
         for filepath in downloaded_files:
             try:
-                # Parse CSV
-                raw_data = csv_scraper.parse_csv_file(filepath)
-                if not raw_data:
-                    logger.warning(f"⚠️ Arquivo vazio ou inválido: {filepath.name}")
-                    continue
-                
                 # Extrair mês e tipo do nome do arquivo
                 nome = filepath.stem
                 if "importacao" in nome.lower() or "imp" in nome.lower():
@@ -3102,22 +2773,30 @@ async def coletar_dados_csv_direto(
                         mes_str = datetime.now().strftime("%Y-%m")
                         logger.warning(f"⚠️ Não foi possível extrair mês de {nome}, usando mês atual")
                 
-                # Transformar dados
-                transformed = transformer.transform_csv_data(raw_data, mes_str, tipo)
+                # Parse CSV em lotes: transformar e salvar cada lote antes de ler o próximo
+                lidos = processados = saved = 0
+                for raw_data in csv_scraper.iterar_lotes_csv(filepath):
+                    lidos += len(raw_data)
+                    transformed = transformer.transform_csv_data(raw_data, mes_str, tipo)
+                    if not transformed:
+                        continue
+                    processados += len(transformed)
+                    saved += collector._save_to_database(db, transformed, mes_str, tipo)
                 
-                if not transformed:
+                if not lidos:
+                    logger.warning(f"⚠️ Arquivo vazio ou inválido: {filepath.name}")
+                    continue
+                if not processados:
                     logger.warning(f"⚠️ Nenhum registro transformado de {filepath.name}")
                     continue
                 
-                # Salvar no banco
-                saved = collector._save_to_database(db, transformed, mes_str, tipo)
                 total_saved += saved
                 
                 if mes_str not in stats["meses_processados"]:
                     stats["meses_processados"].append(mes_str)
                 
                 logger.info(
-                    f"✅ {tipo} {mes_str}: {len(transformed)} registros processados, "
+                    f"✅ {tipo} {mes_str}: {processados} registros processados, "
                     f"{saved} salvos no banco"
                 )
                 
@@ -3220,46 +2899,55 @@ async def coletar_dados_ncms(
             
             # Verificar se API está disponível
             if await collector.api_client.test_connection():
+                from services.agendador_coleta import ProgressoColeta, executar_coletas
                 stats["usou_api"] = True
                 stats["metodo_usado"] = "API"
                 
+                ncms_validos = []
                 for ncm in request.ncms:
                     ncm_limpo = ncm.replace('.', '').replace(' ', '').strip()
                     if len(ncm_limpo) != 8 or not ncm_limpo.isdigit():
                         logger.warning(f"NCM inválido ignorado: {ncm}")
                         continue
-                    
-                    try:
-                        tipos = ["Importação", "Exportação"]
-                        if request.tipo_operacao:
-                            tipos = [request.tipo_operacao]
-                        
-                        for tipo in tipos:
-                            logger.info(f"Coletando NCM {ncm_limpo} - {tipo}...")
-                            for mes in meses_lista:
-                                try:
-                                    data = await collector.api_client.fetch_data(
-                                        mes_inicio=mes,
-                                        mes_fim=mes,
-                                        tipo_operacao=tipo,
-                                        ncm=ncm_limpo
-                                    )
-                                    
-                                    if data:
-                                        transformed = collector.transformer.transform_api_data(data, mes, tipo)
-                                        saved = collector._save_to_database(db, transformed, mes, tipo)
-                                        stats["total_registros"] += saved
-                                
-                                except Exception as e:
-                                    logger.warning(f"Erro ao coletar {ncm_limpo} - {mes}: {e}")
-                                    continue
-                        
-                        stats["ncms_processados"].append(ncm_limpo)
-                        logger.info(f"✓ NCM {ncm_limpo} processado")
-                    except Exception as e:
-                        error_msg = f"Erro ao coletar NCM {ncm}: {e}"
-                        logger.error(error_msg)
-                        stats["erros"].append(error_msg)
+                    ncms_validos.append(ncm_limpo)
+                
+                tipos = ["Importação", "Exportação"]
+                if request.tipo_operacao:
+                    tipos = [request.tipo_operacao]
+                
+                # Uma requisição por NCM × tipo × mês, em paralelo com limite de taxa,
+                # novas tentativas e progresso persistido (retomada se interrompida)
+                tarefas = [(ncm, tipo, mes) for ncm in ncms_validos for tipo in tipos for mes in meses_lista]
+                
+                async def _buscar(tarefa):
+                    ncm, tipo, mes = tarefa
+                    return await collector.api_client.fetch_data(
+                        mes_inicio=mes,
+                        mes_fim=mes,
+                        tipo_operacao=tipo,
+                        ncm=ncm
+                    )
+                
+                def _salvar(tarefa, data):
+                    ncm, tipo, mes = tarefa
+                    if data:
+                        transformed = collector.transformer.transform_api_data(data, mes, tipo)
+                        saved = collector._save_to_database(db, transformed, mes, tipo)
+                        stats["total_registros"] += saved
+                
+                progresso = ProgressoColeta.para("ncms", {"ncms": sorted(ncms_validos), "tipos": tipos, "meses": meses_lista})
+                stats["agendador"] = await executar_coletas(tarefas, _buscar, _salvar, progresso=progresso)
+                
+                falhas_por_ncm = {}
+                for falha in stats["agendador"]["falhas"]:
+                    ncm = falha.split("|", 1)[0]
+                    falhas_por_ncm[ncm] = falhas_por_ncm.get(ncm, 0) + 1
+                for ncm in ncms_validos:
+                    if ncm in falhas_por_ncm:
+                        stats["erros"].append(f"NCM {ncm}: {falhas_por_ncm[ncm]} requisições falharam")
+                    else:
+                        stats["ncms_processados"].append(ncm)
+                        logger.info(f"✓ NCM {ncm} processado")
             else:
                 # Se API não disponível e NCMs específicos, sugerir coleta geral
                 stats["erros"].append(
@@ -3288,7 +2976,8 @@ class PopularDadosRequest(BaseModel):
 
 
 @app.post("/popular-dados-exemplo")
-async def popular_dados_exemplo(
+@rota_banco
+def popular_dados_exemplo(
     request: PopularDadosRequest,
     db: Session = Depends(get_db)
 ):
@@ -3331,7 +3020,8 @@ async def popular_dados_exemplo(
 
 
 @app.get("/test/empresas")
-async def test_empresas(db: Session = Depends(get_db)):
+@rota_banco
+def test_empresas(db: Session = Depends(get_db)):
     """
     Endpoint de teste para verificar empresas no banco.
     """
@@ -3435,7 +3125,8 @@ async def test_empresas(db: Session = Depends(get_db)):
 
 
 @app.get("/dashboard/debug/empresas")
-async def debug_empresas_unicas(
+@rota_banco
+def debug_empresas_unicas(
     tipo: Optional[str] = Query(default=None, description="importador | exportador"),
     limite: int = Query(default=100, ge=1, le=500),
     busca: Optional[str] = Query(default=None, description="Filtrar nomes que contêm (case-insensitive)"),
@@ -3540,7 +3231,8 @@ def _parse_date_safe(s: Optional[str]) -> Optional[date]:
 
 
 @app.get("/dashboard/stats", response_model=DashboardStats)
-async def get_dashboard_stats(
+@rota_banco
+def get_dashboard_stats(
     meses: int = Query(default=24, ge=1, le=120),  # Padrão: 24; até 120 meses (10 anos, 2024-2034)
     tipo_operacao: Optional[str] = Query(default=None),
     ncm: Optional[str] = Query(default=None),
@@ -3597,13 +3289,13 @@ async def get_dashboard_stats(
     cache_key = None
     if not tem_filtro_empresa and not tem_periodo_explicito:
         try:
-            cache_key = _make_dashboard_cache_key(
-                meses,
-                tipo_operacao,
-                ncm,
-                ncms,
-                empresa_importadora,
-                empresa_exportadora,
+            mes_inicio = (datetime.now() - timedelta(days=30 * meses)).strftime("%Y-%m")
+            cache_key = _chave_cache_versionada(
+                db,
+                f"{_make_dashboard_cache_key(meses, tipo_operacao, ncm, ncms, empresa_importadora, empresa_exportadora)}"
+                f"|hoje={date.today().isoformat()}",
+                [TABELA_OPERACOES],
+                {TABELA_OPERACOES: (mes_inicio, None)},
             )
             cached = _get_cached_dashboard_stats(cache_key)
             if cached:
@@ -3692,6 +3384,10 @@ async def get_dashboard_stats(
             """Busca CNPJs na tabela Empresa cujo nome contém o termo (para importadora ou exportadora)."""
             if not (termo or "").strip():
                 return []
+            # Motor anterior (recarga em andamento) não vê as empresas novas: usa o banco
+            motor = obter_motor(session)
+            if motor is not None and motor_em_dia(session, motor):
+                return motor.cnpjs_por_nome(termo, tipo)
             termo_clean = (termo or "").strip()
             palavras = [p.strip() for p in termo_clean.split() if p.strip()]
             if not palavras:
@@ -3778,249 +3474,54 @@ async def get_dashboard_stats(
             elif tipo_operacao.lower() == "exportação" or tipo_operacao.lower() == "exportacao":
                 tipo_filtro = TipoOperacao.EXPORTACAO
     
-        # Volume de importações e exportações (sempre sobre linhas filtradas)
-        # IMPORTANTE: Usar filtro_importador/exportador apenas onde apropriado!
-        filtros_imp = base_filters + [OperacaoComex.tipo_operacao == TipoOperacao.IMPORTACAO]
-        if filtro_importador is not None:
-            filtros_imp.append(filtro_importador)
-        
-        if tipo_filtro == TipoOperacao.IMPORTACAO or tipo_filtro is None:
-            v_imp = db.query(func.sum(OperacaoComex.peso_liquido_kg)).filter(
-                and_(*filtros_imp)
-            ).scalar()
-            volume_imp = float(v_imp) if v_imp is not None else 0.0
-        else:
-            volume_imp = 0.0
+        # Agregados: rollups mensais quando não há filtro de empresa em texto livre;
+        # filtros de empresa (ILIKE por palavras / CNPJ) continuam sobre as linhas brutas.
+        agregados = None
+        if not tem_filtro_empresa and settings.dashboard_use_rollups:
+            try:
+                from services.rollups import calcular_agregados_dashboard
+                agregados = calcular_agregados_dashboard(
+                    db, data_inicio_val, data_fim_val, tipo_filtro, ncms_filtro
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ Rollups indisponíveis, usando linhas brutas: {e}")
+                db.rollback()
+                agregados = None
 
-        filtros_exp = base_filters + [OperacaoComex.tipo_operacao == TipoOperacao.EXPORTACAO]
-        if filtro_exportador is not None:
-            filtros_exp.append(filtro_exportador)
-        
-        if tipo_filtro == TipoOperacao.EXPORTACAO or tipo_filtro is None:
-            v_exp = db.query(func.sum(OperacaoComex.peso_liquido_kg)).filter(
-                and_(*filtros_exp)
-            ).scalar()
-            volume_exp = float(v_exp) if v_exp is not None else 0.0
-        else:
-            volume_exp = 0.0
-    
-        # Valor total movimentado
-        if tipo_filtro:
-            filtros_valor = base_filters + [OperacaoComex.tipo_operacao == tipo_filtro]
+        if agregados is not None:
+            logger.info("📊 Dashboard stats calculado a partir dos rollups mensais")
         else:
-            filtros_valor = base_filters.copy()  # IMPORTANTE: copiar para não modificar base_filters
-        
-        # Se há filtro de empresa, incluir na query geral (combinando importador OU exportador se ambos existem)
-        if filtro_importador is not None or filtro_exportador is not None:
-            if filtro_importador is not None and filtro_exportador is not None:
-                # Ambos: a empresa pode ter sido importadora OU exportadora
-                filtros_valor_empresa = or_(filtro_importador, filtro_exportador)
-                filtros_valor.append(filtros_valor_empresa)
-            elif filtro_importador is not None:
-                # Apenas importador
-                filtros_valor.append(filtro_importador)
-            elif filtro_exportador is not None:
-                # Apenas exportador
-                filtros_valor.append(filtro_exportador)
-    
-        valor_total_raw = db.query(func.sum(OperacaoComex.valor_fob)).filter(
-            and_(*filtros_valor)
-        ).scalar()
-        valor_total = float(valor_total_raw) if valor_total_raw is not None else 0.0
-
-        # Quantidade estatística = sempre contagem das linhas filtradas (ou soma da coluna se preenchida)
-        # Assim os cartões refletem todas as linhas filtradas e a quantidade nunca fica vazia quando há dados
-        _q_total = db.query(func.sum(OperacaoComex.quantidade_estatistica)).filter(
-            and_(*filtros_valor)
-        ).scalar()
-        quantidade_total = float(_q_total) if _q_total is not None else 0.0
-        count_val = db.query(func.count(OperacaoComex.id)).filter(
-            and_(*filtros_valor)
-        ).scalar() or 0
-        count_val = int(count_val) if count_val is not None else 0
-        if quantidade_total == 0 and count_val > 0:
-            quantidade_total = float(count_val)
-
-        # Valores e quantidade separados por tipo de operação (se não houver filtro de tipo)
-        valor_total_imp = 0.0
-        valor_total_exp = 0.0
-        quantidade_imp = 0.0
-        quantidade_exp = 0.0
-        if tipo_filtro is None:
-            filtros_valor_imp = base_filters + [OperacaoComex.tipo_operacao == TipoOperacao.IMPORTACAO]
-            if filtro_importador is not None:
-                filtros_valor_imp.append(filtro_importador)
-            
-            if tem_filtro_empresa:
-                logger.info(f"🔍 Calculando valor_total_imp com {len(filtros_valor_imp)} filtros (incluindo empresa '{_emp_imp or _emp_exp}')")
-                logger.info(f"📋 Lista de filtros aplicados: {[str(f) for f in filtros_valor_imp]}")
-                # Verificar quantas operações correspondem ANTES de calcular soma
-                count_before_sum = db.query(func.count(OperacaoComex.id)).filter(
-                    and_(*filtros_valor_imp)
-                ).scalar() or 0
-                logger.info(f"📊 Total de operações de importação que correspondem ao filtro: {count_before_sum}")
-            valor_total_imp = db.query(func.sum(OperacaoComex.valor_fob)).filter(
-                and_(*filtros_valor_imp)
-            ).scalar() or 0.0
-            valor_total_imp = float(valor_total_imp)
-            if tem_filtro_empresa:
-                logger.info(f"💰 valor_total_imp calculado: {valor_total_imp:.2f} (empresa: '{_emp_imp or _emp_exp}')")
-                # Verificar se o valor faz sentido (não deve ser igual para empresas diferentes)
-                if valor_total_imp > 0:
-                    # Buscar uma amostra de operações para verificar se o filtro está correto
-                    amostra = db.query(
-                        OperacaoComex.razao_social_importador,
-                        func.sum(OperacaoComex.valor_fob).label('valor')
-                    ).filter(
-                        and_(*filtros_valor_imp)
-                    ).group_by(OperacaoComex.razao_social_importador).limit(3).all()
-                    logger.info(f"📋 Amostra de empresas nas operações filtradas: {[(nome[:50] if nome else 'N/A', float(val)) for nome, val in amostra]}")
-
-            _q_imp = db.query(func.sum(OperacaoComex.quantidade_estatistica)).filter(
-                and_(*filtros_valor_imp)
-            ).scalar()
-            quantidade_imp = float(_q_imp) if _q_imp is not None else 0.0
-            cnt_imp = db.query(func.count(OperacaoComex.id)).filter(
-                and_(*filtros_valor_imp)
-            ).scalar() or 0
-            cnt_imp = int(cnt_imp) if cnt_imp is not None else 0
-            if quantidade_imp == 0 and cnt_imp > 0:
-                quantidade_imp = float(cnt_imp)
-
-            filtros_valor_exp = base_filters + [OperacaoComex.tipo_operacao == TipoOperacao.EXPORTACAO]
-            if filtro_exportador is not None:
-                filtros_valor_exp.append(filtro_exportador)
-            
-            valor_total_exp = db.query(func.sum(OperacaoComex.valor_fob)).filter(
-                and_(*filtros_valor_exp)
-            ).scalar() or 0.0
-            valor_total_exp = float(valor_total_exp)
-
-            _q_exp = db.query(func.sum(OperacaoComex.quantidade_estatistica)).filter(
-                and_(*filtros_valor_exp)
-            ).scalar()
-            quantidade_exp = float(_q_exp) if _q_exp is not None else 0.0
-            cnt_exp = db.query(func.count(OperacaoComex.id)).filter(
-                and_(*filtros_valor_exp)
-            ).scalar() or 0
-            cnt_exp = int(cnt_exp) if cnt_exp is not None else 0
-            if quantidade_exp == 0 and cnt_exp > 0:
-                quantidade_exp = float(cnt_exp)
-        elif tipo_filtro == TipoOperacao.IMPORTACAO:
-            valor_total_imp = valor_total
-            quantidade_imp = quantidade_total
-        elif tipo_filtro == TipoOperacao.EXPORTACAO:
-            valor_total_exp = valor_total
-            quantidade_exp = quantidade_total
-
-        if tem_filtro_empresa:
-            logger.info(
-                "Dashboard stats calculado com filtro empresa '%s': valor_imp=%.2f valor_exp=%.2f total=%.2f base_filters_count=%d",
-                _emp_imp or _emp_exp, valor_total_imp, valor_total_exp, valor_total, len(base_filters),
+            # Consulta direta em passada única: totais em um GROUP BY tipo_operacao
+            # e listas top-N + série mensal em uma consulta com funções de janela
+            from services.dashboard_query import calcular_agregados_brutos
+            agregados = calcular_agregados_brutos(
+                db,
+                base_filters,
+                tipo_filtro=tipo_filtro,
+                filtro_importador=filtro_importador,
+                filtro_exportador=filtro_exportador,
             )
-            # Verificar quantas operações foram encontradas
-            count_ops_imp = db.query(func.count(OperacaoComex.id)).filter(
-                and_(*base_filters + [OperacaoComex.tipo_operacao == TipoOperacao.IMPORTACAO])
-            ).scalar() or 0
-            logger.info(f"📊 Operações de importação encontradas com filtro: {count_ops_imp}")
-    
-        # Principais NCMs
-        principais_ncms = db.query(
-            OperacaoComex.ncm,
-            OperacaoComex.descricao_produto,
-            func.sum(OperacaoComex.valor_fob).label('total_valor'),
-            func.count(OperacaoComex.id).label('total_operacoes')
-        ).filter(
-            and_(*filtros_valor)
-        ).group_by(
-            OperacaoComex.ncm,
-            OperacaoComex.descricao_produto
-        ).order_by(
-            func.sum(OperacaoComex.valor_fob).desc()
-        ).limit(10).all()
-    
-        principais_ncms_list = [
-            {
-                "ncm": ncm,
-                "descricao": desc[:100] if desc else "",
-                "valor_total": float(total_valor),
-                "total_operacoes": total_operacoes
-            }
-            for ncm, desc, total_valor, total_operacoes in principais_ncms
-        ]
-    
-        # Principais países
-        principais_paises = db.query(
-            OperacaoComex.pais_origem_destino,
-            func.sum(OperacaoComex.valor_fob).label('total_valor'),
-            func.count(OperacaoComex.id).label('total_operacoes')
-        ).filter(
-            and_(*filtros_valor)
-        ).group_by(
-            OperacaoComex.pais_origem_destino
-        ).order_by(
-            func.sum(OperacaoComex.valor_fob).desc()
-        ).limit(10).all()
-    
-        principais_paises_list = [
-            {
-                "pais": pais,
-                "valor_total": float(total_valor),
-                "total_operacoes": total_operacoes
-            }
-            for pais, total_valor, total_operacoes in principais_paises
-        ]
+            if tem_filtro_empresa:
+                logger.info(
+                    "Dashboard stats calculado com filtro empresa '%s': valor_imp=%.2f valor_exp=%.2f total=%.2f base_filters_count=%d",
+                    _emp_imp or _emp_exp, agregados["valor_total_imp"], agregados["valor_total_exp"],
+                    agregados["valor_total"], len(base_filters),
+                )
 
-        # Principais importadores por empresa (razao_social_importador) - para lista "Prováveis Importadores"
-        principais_imp = db.query(
-            OperacaoComex.razao_social_importador.label('nome'),
-            func.sum(OperacaoComex.valor_fob).label('valor_total'),
-            func.count(OperacaoComex.id).label('total_operacoes'),
-            func.sum(OperacaoComex.peso_liquido_kg).label('peso_total')
-        ).filter(
-            and_(*filtros_valor),
-            OperacaoComex.razao_social_importador.isnot(None),
-            OperacaoComex.razao_social_importador != ''
-        ).group_by(
-            OperacaoComex.razao_social_importador
-        ).order_by(
-            func.sum(OperacaoComex.valor_fob).desc()
-        ).limit(10).all()
-        principais_importadores_list = [
-            {
-                "nome": nome or "N/A",
-                "valor_total": float(valor_total or 0),
-                "total_operacoes": total_operacoes or 0,
-                "peso_total": float(peso_total or 0)
-            }
-            for nome, valor_total, total_operacoes, peso_total in principais_imp
-        ]
+        volume_imp = agregados["volume_imp"]
+        volume_exp = agregados["volume_exp"]
+        valor_total = agregados["valor_total"]
+        quantidade_total = agregados["quantidade_total"]
+        valor_total_imp = agregados["valor_total_imp"]
+        valor_total_exp = agregados["valor_total_exp"]
+        quantidade_imp = agregados["quantidade_imp"]
+        quantidade_exp = agregados["quantidade_exp"]
+        principais_ncms_list = agregados["principais_ncms"]
+        principais_paises_list = agregados["principais_paises"]
+        principais_importadores_list = agregados["principais_importadores"]
+        principais_exportadores_list = agregados["principais_exportadores"]
+        registros_por_mes_query = agregados["por_mes"]
 
-        # Principais exportadores por empresa (razao_social_exportador) - para lista "Prováveis Exportadores"
-        principais_exp = db.query(
-            OperacaoComex.razao_social_exportador.label('nome'),
-            func.sum(OperacaoComex.valor_fob).label('valor_total'),
-            func.count(OperacaoComex.id).label('total_operacoes'),
-            func.sum(OperacaoComex.peso_liquido_kg).label('peso_total')
-        ).filter(
-            and_(*filtros_valor),
-            OperacaoComex.razao_social_exportador.isnot(None),
-            OperacaoComex.razao_social_exportador != ''
-        ).group_by(
-            OperacaoComex.razao_social_exportador
-        ).order_by(
-            func.sum(OperacaoComex.valor_fob).desc()
-        ).limit(10).all()
-        principais_exportadores_list = [
-            {
-                "nome": nome or "N/A",
-                "valor_total": float(valor_total or 0),
-                "total_operacoes": total_operacoes or 0,
-                "peso_total": float(peso_total or 0)
-            }
-            for nome, valor_total, total_operacoes, peso_total in principais_exp
-        ]
-    
         # Se não houver países no banco, tentar usar empresas recomendadas
         if not principais_paises_list:
             try:
@@ -4049,19 +3550,6 @@ async def get_dashboard_stats(
                 return s[:7]
             return s
 
-        registros_por_mes_query = db.query(
-            OperacaoComex.mes_referencia,
-            func.count(OperacaoComex.id).label('count'),
-            func.sum(OperacaoComex.valor_fob).label('valor_total'),
-            func.sum(OperacaoComex.peso_liquido_kg).label('peso_total')
-        ).filter(
-            and_(*filtros_valor)
-        ).group_by(
-            OperacaoComex.mes_referencia
-        ).order_by(
-            OperacaoComex.mes_referencia
-        ).all()
-    
         registros_dict = {}
         valores_por_mes_dict = {}
         pesos_por_mes_dict = {}
@@ -4094,13 +3582,9 @@ async def get_dashboard_stats(
         # Se não houver dados no banco, tentar usar dados do Excel
         if valor_total == 0 and not principais_ncms_list:
             try:
-                import json
-                from pathlib import Path
-            
-                arquivo_resumo = Path(__file__).parent.parent / "data" / "resumo_dados_comexstat.json"
-                if arquivo_resumo.exists():
-                    with open(arquivo_resumo, 'r', encoding='utf-8') as f:
-                        resumo_excel = json.load(f)
+                conjunto_resumo = obter_conjunto_json("data/resumo_dados_comexstat.json")
+                if conjunto_resumo is not None:
+                    resumo_excel = conjunto_resumo.dados
                 
                     # Usar dados do Excel para popular o dashboard
                     if resumo_excel.get('importacoes'):
@@ -4127,10 +3611,9 @@ async def get_dashboard_stats(
                         pesos_por_mes_dict[mes] = float((volume_imp + volume_exp) / n_meses)
                 
                     # Top NCMs do Excel
-                    arquivo_ncm = Path(__file__).parent.parent / "data" / "dados_ncm_comexstat.json"
-                    if arquivo_ncm.exists():
-                        with open(arquivo_ncm, 'r', encoding='utf-8') as f:
-                            dados_ncm = json.load(f)
+                    conjunto_ncm = obter_conjunto_json("data/dados_ncm_comexstat.json")
+                    if conjunto_ncm is not None:
+                        dados_ncm = conjunto_ncm.dados
                     
                         # Agrupar por NCM e ordenar
                         ncms_agrupados = {}
@@ -4562,17 +4045,6 @@ async def get_dashboard_stats(
         return _empty_stats()
 
 
-def _read_json_file(relative_path: str) -> Optional[dict]:
-    try:
-        file_path = Path(__file__).parent.parent / relative_path
-        if not file_path.exists():
-            return None
-        with open(file_path, "r", encoding="utf-8") as handle:
-            return json.load(handle)
-    except Exception:
-        return None
-
-
 def _load_empresas_recomendadas_fallback(
     limite: int,
     tipo: Optional[str],
@@ -4580,61 +4052,21 @@ def _load_empresas_recomendadas_fallback(
     ncm: Optional[str],
 ) -> List[dict]:
     try:
-        arquivo_empresas = Path(__file__).parent.parent / "data" / "empresas_recomendadas.xlsx"
-        if not arquivo_empresas.exists():
-            arquivo_empresas = Path(__file__).parent.parent / "data" / "empresas_recomendadas.csv"
-            if not arquivo_empresas.exists():
-                return []
-
-        import pandas as pd
-
-        if arquivo_empresas.suffix == ".xlsx":
-            df = pd.read_excel(arquivo_empresas)
-        else:
-            df = pd.read_csv(arquivo_empresas, encoding="utf-8-sig")
-
-        if uf:
-            df = df[df["Estado"].astype(str).str.upper() == uf.upper()]
-
-        if tipo:
-            tipo_lower = tipo.lower()
-            if "import" in tipo_lower:
-                df = df[df["Importado (R$)"].fillna(0) > 0]
-            elif "export" in tipo_lower:
-                df = df[df["Exportado (R$)"].fillna(0) > 0]
-
-        if ncm:
-            df = df[df["NCM Relacionado"].astype(str) == str(ncm)]
-
-        df = df.head(limite)
-
-        data = []
-        for _, row in df.iterrows():
-            valor_importacao = float(row.get("Importado (R$)", 0) or 0)
-            valor_exportacao = float(row.get("Exportado (R$)", 0) or 0)
-            data.append(
-                {
-                    "nome": row.get("Razão Social") or row.get("Nome Fantasia") or "N/A",
-                    "cnpj": row.get("CNPJ"),
-                    "uf": row.get("Estado"),
-                    "tipo": row.get("Sugestão"),
-                    "peso_participacao": float(row.get("Peso Participação (0-100)", 0) or 0),
-                    "valor_total": (valor_importacao + valor_exportacao) / 5.0,
-                    "valor_importacao_usd": valor_importacao / 5.0,
-                    "valor_exportacao_usd": valor_exportacao / 5.0,
-                }
-            )
-        return data
+        planilha = obter_planilha_recomendadas()
+        if planilha is None:
+            return []
+        return planilha.filtrar_dashboard(limite, tipo=tipo, uf=uf, ncm=ncm)
     except Exception:
         return []
 
 
 @app.get("/dashboard/dados-comexstat")
 async def dashboard_dados_comexstat():
-    dados = _read_json_file("data/resumo_dados_comexstat.json")
-    if not dados:
+    conjunto = obter_conjunto_json("data/resumo_dados_comexstat.json")
+    if conjunto is None or not conjunto.dados:
         return {"success": False, "data": None, "message": "Arquivo não encontrado"}
-    return {"success": True, "data": dados}
+    # Corpo serializado na carga do arquivo
+    return Response(content=conjunto.corpo, media_type="application/json")
 
 
 @app.get("/dashboard/dados-ncm-comexstat")
@@ -4643,25 +4075,16 @@ async def dashboard_dados_ncm_comexstat(
     uf: Optional[str] = Query(default=None),
     tipo: Optional[str] = Query(default=None),
 ):
-    dados = _read_json_file("data/dados_ncm_comexstat.json")
-    if not dados:
+    conjunto = obter_conjunto_json("data/dados_ncm_comexstat.json")
+    if conjunto is None or not conjunto.dados:
         return {"success": False, "data": [], "message": "Arquivo não encontrado"}
-
-    resultados = dados
-    if uf:
-        resultados = [item for item in resultados if str(item.get("uf", "")).upper() == uf.upper()]
-    if tipo:
-        tipo_lower = tipo.lower()
-        if "import" in tipo_lower:
-            resultados = [item for item in resultados if item.get("valor_importacao_usd", 0) > 0]
-        elif "export" in tipo_lower:
-            resultados = [item for item in resultados if item.get("valor_exportacao_usd", 0) > 0]
-
-    return {"success": True, "data": resultados[:limite]}
+    # Índices por UF/tipo e itens serializados na carga do arquivo
+    return Response(content=conjunto.corpo_filtrado(uf=uf, tipo=tipo, limite=limite), media_type="application/json")
 
 
 @app.get("/dashboard/stats")
-async def dashboard_stats(
+@rota_banco
+def dashboard_stats(
     meses: int = Query(default=24, ge=1, le=240),
     empresa_importadora: Optional[str] = Query(default=None),
     empresa_exportadora: Optional[str] = Query(default=None),
@@ -4770,7 +4193,8 @@ async def dashboard_stats(
 
 
 @app.get("/dashboard/empresas-recomendadas")
-async def dashboard_empresas_recomendadas(
+@rota_banco
+def dashboard_empresas_recomendadas(
     limite: int = Query(default=100, ge=1, le=500),
     tipo: Optional[str] = Query(default=None),
     uf: Optional[str] = Query(default=None),
@@ -4822,11 +4246,19 @@ async def dashboard_empresas_recomendadas(
 
 
 @app.get("/dashboard/empresas-importadoras")
-async def dashboard_empresas_importadoras(
+@rota_banco
+def dashboard_empresas_importadoras(
     limite: int = Query(default=10, ge=1, le=100),
     uf: Optional[str] = Query(default=None),
     db: Session = Depends(get_db),
 ):
+    cache_key = _chave_cache_versionada(
+        db, f"importadoras|{limite}|{(uf or '').upper()}", [TABELA_EMPRESAS_RECOMENDADAS, TABELA_OPERACOES]
+    )
+    cached = _SINERGIAS_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
     try:
         query = db.query(EmpresasRecomendadas).filter(
             EmpresasRecomendadas.provavel_importador == 1
@@ -4859,7 +4291,9 @@ async def dashboard_empresas_importadoras(
                 "peso_kg": round(peso_kg, 2),
             })
         if data:
-            return {"success": True, "data": data}
+            resposta = {"success": True, "data": data}
+            _SINERGIAS_CACHE.set(cache_key, resposta)
+            return resposta
     except Exception:
         pass
     fallback = _buscar_empresas_importadoras_recomendadas(limite)
@@ -4870,7 +4304,8 @@ async def dashboard_empresas_importadoras(
 
 
 @app.get("/dashboard/empresas-exportadoras")
-async def dashboard_empresas_exportadoras(
+@rota_banco
+def dashboard_empresas_exportadoras(
     limite: int = Query(default=10, ge=1, le=100),
     uf: Optional[str] = Query(default=None),
     db: Session = Depends(get_db),
@@ -4917,13 +4352,24 @@ async def dashboard_empresas_exportadoras(
 
 
 @app.get("/dashboard/sinergias-estado")
-async def dashboard_sinergias_estado(
+@rota_banco
+def dashboard_sinergias_estado(
     uf: Optional[str] = Query(default=None),
     db: Session = Depends(get_db),
 ):
+    cache_key = _chave_cache_versionada(db, f"dashboard_estado|{(uf or '').upper()}", [TABELA_SINERGIAS])
+    cached = _SINERGIAS_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
     if SINERGIA_AVAILABLE and SinergiaAnalyzer is not None:
-        analyzer = SinergiaAnalyzer()
-        return analyzer.analisar_sinergias_por_estado(db, uf)
+        # Sinergias pré-calculadas (services.sinergias); a chave muda se a tabela acabou de ser calculada
+        garantir_sinergias(db)
+        resposta = sinergias_por_estado(db, uf)
+        _SINERGIAS_CACHE.set(
+            _chave_cache_versionada(db, f"dashboard_estado|{(uf or '').upper()}", [TABELA_SINERGIAS]), resposta
+        )
+        return resposta
 
     try:
         from sqlalchemy import func
@@ -4960,18 +4406,55 @@ async def dashboard_sinergias_estado(
                 "exportacao_peso": float(peso or 0),
             })
 
-        return {"success": True, "data": list(resultado.values())}
+        resposta = {"success": True, "data": list(resultado.values())}
+        _SINERGIAS_CACHE.set(cache_key, resposta)
+        return resposta
     except Exception:
         return {"success": False, "data": []}
 
 
 @app.get("/dashboard/sugestoes-empresas")
-async def dashboard_sugestoes_empresas(
+@rota_banco
+def dashboard_sugestoes_empresas(
     limite: int = Query(default=20, ge=1, le=100),
     tipo: Optional[str] = Query(default=None),
     uf: Optional[str] = Query(default=None),
     db: Session = Depends(get_db),
 ):
+    cache_key = _chave_cache_versionada(
+        db,
+        f"dashboard_sugestoes|{limite}|{tipo or ''}|{(uf or '').upper()}",
+        [TABELA_SINERGIAS, TABELA_EMPRESAS_RECOMENDADAS],
+    )
+    cached = _SINERGIAS_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Empresas com maior potencial de sinergia (tabela pré-calculada)
+    if SINERGIA_AVAILABLE and SinergiaAnalyzer is not None:
+        try:
+            garantir_sinergias(db)
+            sugestoes = [
+                {
+                    **empresa,
+                    "nome": empresa["razao_social"] or empresa["nome_fantasia"],
+                    "valor_total": empresa["importacoes"]["valor_total"] + empresa["exportacoes"]["valor_total"],
+                    "tipo": (
+                        "importadora e exportadora"
+                        if empresa["importacoes"]["total_operacoes"] and empresa["exportacoes"]["total_operacoes"]
+                        else "importadora" if empresa["importacoes"]["total_operacoes"] else "exportadora"
+                    ),
+                }
+                for empresa in sinergias_por_empresa(db, limite, tipo=tipo, uf=uf)
+            ]
+            if sugestoes:
+                resposta = {"success": True, "total": len(sugestoes), "sugestoes": sugestoes}
+                _SINERGIAS_CACHE.set(cache_key, resposta)
+                return resposta
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao ler sinergias pré-calculadas: {e}")
+            db.rollback()
+
     try:
         query = db.query(EmpresasRecomendadas)
         if uf:
@@ -4997,122 +4480,48 @@ async def dashboard_sugestoes_empresas(
             for emp in resultados
         ]
         if sugestoes:
-            return {"success": True, "sugestoes": sugestoes}
+            resposta = {"success": True, "sugestoes": sugestoes}
+            _SINERGIAS_CACHE.set(cache_key, resposta)
+            return resposta
     except Exception:
         pass
 
     sugestoes = _buscar_empresas_bigquery_sugestoes(uf=uf, tipo=tipo, limit=limite)
-    return {"success": True, "sugestoes": sugestoes}
+    resposta = {"success": True, "sugestoes": sugestoes}
+    if sugestoes:
+        _SINERGIAS_CACHE.set(cache_key, resposta)
+    return resposta
 
 
 @app.post("/buscar")
-async def buscar_operacoes(
+@rota_banco
+def buscar_operacoes(
     filtros: BuscaFiltros,
     db: Session = Depends(get_db)
 ):
     """
     Busca operações com filtros avançados.
     Por padrão, busca dados dos últimos 2 anos se não especificar datas.
+    Paginação por página (page) ou por cursor (cursor = proximo_cursor da resposta anterior);
+    contagem: exata, estimada ou nenhuma.
     """
-    from sqlalchemy import and_, or_
-    from datetime import datetime, timedelta
-    
-    query = db.query(OperacaoComex)
-    
-    # Aplicar filtros
-    conditions = []
-    
-    # Filtro de NCMs (múltiplos)
-    ncms_filtro = []
-    if filtros.ncms:
-        # Limpar e validar NCMs
-        for ncm in filtros.ncms:
-            ncm_limpo = ncm.replace('.', '').replace(' ', '').strip()
-            if len(ncm_limpo) == 8 and ncm_limpo.isdigit():
-                ncms_filtro.append(ncm_limpo)
-    elif filtros.ncm:
-        # Compatibilidade: aceitar NCM único também
-        ncm_limpo = filtros.ncm.replace('.', '').replace(' ', '').strip()
-        if len(ncm_limpo) == 8 and ncm_limpo.isdigit():
-            ncms_filtro.append(ncm_limpo)
-    
-    if ncms_filtro:
-        conditions.append(OperacaoComex.ncm.in_(ncms_filtro))
-    
-    # Por padrão, buscar últimos 2 anos se não especificar datas
-    if not filtros.data_inicio:
-        filtros.data_inicio = (datetime.now() - timedelta(days=730)).date()
-    if not filtros.data_fim:
-        filtros.data_fim = datetime.now().date()
-    
-    conditions.append(OperacaoComex.data_operacao >= filtros.data_inicio)
-    conditions.append(OperacaoComex.data_operacao <= filtros.data_fim)
-    
-    if filtros.tipo_operacao:
-        tipo = TipoOperacao.IMPORTACAO if filtros.tipo_operacao == "Importação" else TipoOperacao.EXPORTACAO
-        conditions.append(OperacaoComex.tipo_operacao == tipo)
-    
-    if filtros.pais:
-        conditions.append(OperacaoComex.pais_origem_destino.ilike(f"%{filtros.pais}%"))
-    
-    if filtros.uf:
-        conditions.append(OperacaoComex.uf == filtros.uf.upper())
-    
-    if filtros.via_transporte:
-        via = ViaTransporte[filtros.via_transporte.upper()]
-        conditions.append(OperacaoComex.via_transporte == via)
-    
-    # Filtros de empresa: case-insensitive, por palavras; normalizar S.A/SA para coincidir com o banco
-    def _normalizar_palavra_empresa_lista(p: str) -> str:
-        t = (p or "").strip().replace(".", "").strip()
-        return t or (p or "").strip()
-
-    def _palavras_filtro(termo):
-        return [p.strip() for p in (termo or "").split() if p.strip()]
-
-    if filtros.empresa_importadora:
-        palavras_imp = _palavras_filtro(filtros.empresa_importadora)
-        for p in palavras_imp:
-            norm = _normalizar_palavra_empresa_lista(p)
-            if norm:
-                conditions.append(OperacaoComex.razao_social_importador.ilike(f"%{norm}%"))
-
-    if filtros.empresa_exportadora:
-        palavras_exp = _palavras_filtro(filtros.empresa_exportadora)
-        for p in palavras_exp:
-            norm = _normalizar_palavra_empresa_lista(p)
-            if norm:
-                conditions.append(OperacaoComex.razao_social_exportador.ilike(f"%{norm}%"))
-    
-    if filtros.valor_fob_min:
-        conditions.append(OperacaoComex.valor_fob >= filtros.valor_fob_min)
-    
-    if filtros.valor_fob_max:
-        conditions.append(OperacaoComex.valor_fob <= filtros.valor_fob_max)
-    
-    if filtros.peso_min:
-        conditions.append(OperacaoComex.peso_liquido_kg >= filtros.peso_min)
-    
-    if filtros.peso_max:
-        conditions.append(OperacaoComex.peso_liquido_kg <= filtros.peso_max)
-    
-    if conditions:
-        query = query.filter(and_(*conditions))
-    
-    # Contar total
-    total = query.count()
-    
-    # Paginação
-    offset = (filtros.page - 1) * filtros.page_size
-    operacoes = query.order_by(
-        OperacaoComex.data_operacao.desc()
-    ).offset(offset).limit(filtros.page_size).all()
-    
+    if filtros.contagem not in CONTAGENS_BUSCA:
+        raise HTTPException(status_code=400, detail=f"contagem deve ser uma de: {', '.join(CONTAGENS_BUSCA)}")
+    preparar_indice_paginacao(db)
+
+    try:
+        operacoes, proximo_cursor = buscar_pagina(db, filtros)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    total, total_estimado = contar_total(db, filtros)
+
     return {
         "total": total,
+        "total_estimado": total_estimado,
         "page": filtros.page,
         "page_size": filtros.page_size,
-        "total_pages": (total + filtros.page_size - 1) // filtros.page_size,
+        "total_pages": (total + filtros.page_size - 1) // filtros.page_size if total is not None else None,
+        "proximo_cursor": proximo_cursor,
         "results": [
             {
                 "id": op.id,
@@ -5134,7 +4543,8 @@ async def buscar_operacoes(
 
 
 @app.get("/empresas/autocomplete/importadoras")
-async def autocomplete_importadoras(
+@rota_banco
+def autocomplete_importadoras(
     q: str = Query("", description="Termo de busca (vazio retorna sugestões)"),
     limit: int = Query(default=20, ge=1, le=100),
     incluir_sugestoes: bool = Query(default=True, description="Incluir empresas sugeridas do MDIC"),
@@ -5148,19 +4558,40 @@ async def autocomplete_importadoras(
     """
     from sqlalchemy import func, distinct
     
+    cache_key = _chave_cache_versionada(
+        db,
+        f"importadoras|{(q or '').strip().lower()}|{limit}|{incluir_sugestoes}|{ncm or ''}",
+        [TABELA_OPERACOES, TABELA_EMPRESAS, TABELA_EMPRESAS_MDIC],
+    )
+    cached = _AUTOCOMPLETE_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+    
     try:
+        inicio = time.perf_counter()
+        completo = True
         resultado = []
         query_clean = (q or "").strip()
+        # Motor em memória (None até a primeira carga: usa o índice empresas_busca).
+        # Durante a recarga o motor anterior responde, mas a resposta não vai para o cache
+        motor = obter_motor(db)
+        if motor is not None and not motor_em_dia(db, motor):
+            completo = False
         
         # 0. Buscar na tabela empresas (cadastro Base dos Dados) — sempre mostra sugestões por nome
         if query_clean:
-            empresas_cadastro = db.query(Empresa.nome).filter(
-                Empresa.nome.isnot(None),
-                Empresa.nome != "",
-                Empresa.nome.ilike(f"%{query_clean}%"),
-                Empresa.tipo.in_(["importadora", "ambos"])
-            ).distinct().limit(limit).all()
-            for (nome,) in empresas_cadastro:
+            if motor is not None:
+                empresas_cadastro = motor.buscar(query_clean, "importador", limit, fonte=FONTE_EMPRESAS)
+            else:
+                empresas_cadastro = buscar_empresas(db, query_clean, "importador", limit, fonte=FONTE_EMPRESAS)
+            if empresas_cadastro is None:
+                empresas_cadastro = db.query(Empresa.nome).filter(
+                    Empresa.nome.isnot(None),
+                    Empresa.nome != "",
+                    Empresa.nome.ilike(f"%{query_clean}%"),
+                    Empresa.tipo.in_(["importadora", "ambos"])
+                ).distinct().limit(limit).all()
+            for (nome, *_totais) in empresas_cadastro:
                 if nome and nome.strip():
                     if not any(r.get("nome", "").strip().lower() == nome.strip().lower() for r in resultado):
                         resultado.append({
@@ -5170,20 +4601,22 @@ async def autocomplete_importadoras(
                             "fonte": "empresas"
                         })
         
-        # 1. Buscar empresas importadoras que contêm o termo nas operações
-        empresas = db.query(
-            OperacaoComex.razao_social_importador.label('empresa'),
-            func.count(OperacaoComex.id).label('total_operacoes'),
-            func.sum(OperacaoComex.valor_fob).label('valor_total')
-        ).filter(
-            OperacaoComex.razao_social_importador.isnot(None),
-            OperacaoComex.razao_social_importador != '',
-            OperacaoComex.razao_social_importador.ilike(f"%{q}%")
-        ).group_by(
-            OperacaoComex.razao_social_importador
-        ).order_by(
-            func.sum(OperacaoComex.valor_fob).desc()
-        ).limit(limit).all()
+        # 1. Buscar empresas importadoras que contêm o termo nas operações (índice empresas_busca)
+        empresas = motor.buscar(q, "importador", limit) if motor is not None else buscar_empresas(db, q, "importador", limit)
+        if empresas is None:
+            empresas = db.query(
+                OperacaoComex.razao_social_importador.label('empresa'),
+                func.count(OperacaoComex.id).label('total_operacoes'),
+                func.sum(OperacaoComex.valor_fob).label('valor_total')
+            ).filter(
+                OperacaoComex.razao_social_importador.isnot(None),
+                OperacaoComex.razao_social_importador != '',
+                OperacaoComex.razao_social_importador.ilike(f"%{q}%")
+            ).group_by(
+                OperacaoComex.razao_social_importador
+            ).order_by(
+                func.sum(OperacaoComex.valor_fob).desc()
+            ).limit(limit).all()
         
         for empresa, total_operacoes, valor_total in empresas:
             nome_emp = (empresa or "").strip()
@@ -5198,7 +4631,9 @@ async def autocomplete_importadoras(
                 })
         
         # 2. Complementar com BigQuery (cadastro histórico)
-        if len(resultado) < limit:
+        if len(resultado) < limit and _orcamento_esgotado(inicio):
+            completo = False
+        elif len(resultado) < limit:
             try:
                 resultados_bq = _buscar_empresas_bigquery(
                     q=q,
@@ -5214,89 +4649,31 @@ async def autocomplete_importadoras(
             except Exception as e:
                 logger.debug(f"Erro ao buscar BigQuery (importadoras): {e}")
 
-        # 3. Se não encontrou resultados ou quer incluir sugestões, buscar no MDIC
+        # 3. Complementar com a lista de empresas do MDIC (tabela local, carregada em segundo plano)
         if (len(resultado) < limit and incluir_sugestoes) or len(resultado) == 0:
-            try:
-                from data_collector.empresas_mdic_scraper import EmpresasMDICScraper
-                # Importação condicional - apenas quando necessário
-                
-                scraper = EmpresasMDICScraper()
-                empresas_mdic = await scraper.coletar_empresas()
-                
-                # Filtrar empresas do MDIC que são importadoras e contêm o termo
-                empresas_mdic_filtradas = [
-                    emp for emp in empresas_mdic
-                    if emp.get("tipo_operacao", "").lower() in ["importação", "importacao", ""] and
-                    q.lower() in emp.get("razao_social", "").lower()
-                ]
-                
-                # Adicionar empresas do MDIC que não estão no resultado
-                empresas_ja_adicionadas = {r["nome"].lower() for r in resultado}
-                
-                for emp in empresas_mdic_filtradas[:limit - len(resultado)]:
-                    nome = emp.get("razao_social") or emp.get("nome_fantasia", "")
-                    if nome.lower() not in empresas_ja_adicionadas:
-                        resultado.append({
-                            "nome": nome,
-                            "total_operacoes": 0,  # Não temos dados de operações do MDIC
-                            "valor_total": 0.0,
-                            "fonte": "mdic",
-                            "cnpj": emp.get("cnpj"),
-                            "uf": emp.get("uf"),
-                            "faixa_valor": emp.get("faixa_valor")
-                        })
-                        empresas_ja_adicionadas.add(nome.lower())
-                
-            except Exception as e:
-                logger.debug(f"Erro ao buscar empresas MDIC para autocomplete: {e}")
-        
-        # 4. Se ainda não tem resultados suficientes, buscar sugestões de sinergias
-        if len(resultado) < limit and incluir_sugestoes:
-            try:
-                # Importação condicional - apenas quando necessário
-                if not SINERGIA_AVAILABLE or SinergiaAnalyzer is None:
-                    raise ImportError("SinergiaAnalyzer não disponível")
-                from data_collector.cnae_analyzer import CNAEAnalyzer
-                
-                # Carregar CNAE se disponível
-                cnae_analyzer = None
+            if _orcamento_esgotado(inicio):
+                completo = False
+            else:
                 try:
-                    arquivo_cnae = Path("C:/Users/User/Desktop/Cursor/NOVO CNAE.xlsx")
-                    if arquivo_cnae.exists():
-                        cnae_analyzer = CNAEAnalyzer(arquivo_cnae)
-                        cnae_analyzer.carregar_cnae_excel()
-                except:
-                    pass
-                
-                analyzer = SinergiaAnalyzer(cnae_analyzer)
-                
-                # Buscar empresas com sinergia que são importadoras
-                empresas_com_sinergia = analyzer.analisar_sinergias_por_empresa(db, {}, limit * 2)
-                
-                # Filtrar empresas que contêm o termo e são importadoras
-                empresas_ja_adicionadas = {r["nome"].lower() for r in resultado}
-                
-                for emp in empresas_com_sinergia:
-                    nome = emp.get("razao_social", "")
-                    if (nome.lower() not in empresas_ja_adicionadas and
-                        q.lower() in nome.lower() and
-                        emp.get("importacoes", {}).get("total_operacoes", 0) > 0):
-                        resultado.append({
-                            "nome": nome,
-                            "total_operacoes": emp.get("importacoes", {}).get("total_operacoes", 0),
-                            "valor_total": emp.get("importacoes", {}).get("valor_total", 0.0),
-                            "fonte": "sinergia",
-                            "potencial_sinergia": emp.get("potencial_sinergia", 0),
-                            "cnpj": emp.get("cnpj"),
-                            "uf": emp.get("uf")
-                        })
-                        empresas_ja_adicionadas.add(nome.lower())
-                        
-                        if len(resultado) >= limit:
-                            break
-            except Exception as e:
-                logger.debug(f"Erro ao buscar sugestões de sinergia: {e}")
+                    empresas_ja_adicionadas = {r["nome"].lower() for r in resultado}
+                    for emp in buscar_empresas_mdic(db, q, "importador", limit - len(resultado), motor=motor):
+                        if emp["nome"].lower() not in empresas_ja_adicionadas:
+                            resultado.append({
+                                "nome": emp["nome"],
+                                "total_operacoes": 0,  # Não temos dados de operações do MDIC
+                                "valor_total": 0.0,
+                                "fonte": "mdic",
+                                "cnpj": emp["cnpj"],
+                                "uf": emp["uf"],
+                                "faixa_valor": emp["faixa_valor"]
+                            })
+                            empresas_ja_adicionadas.add(emp["nome"].lower())
+                except Exception as e:
+                    logger.debug(f"Erro ao buscar empresas MDIC para autocomplete: {e}")
         
+        # Respostas cortadas pelo orçamento de tempo ou de um motor anterior não vão para o cache
+        if completo:
+            _AUTOCOMPLETE_CACHE.set(cache_key, resultado[:limit])
         return resultado[:limit]
         
     except Exception as e:
@@ -5307,7 +4684,8 @@ async def autocomplete_importadoras(
 
 
 @app.get("/empresas/autocomplete/exportadoras")
-async def autocomplete_exportadoras(
+@rota_banco
+def autocomplete_exportadoras(
     q: str = Query("", description="Termo de busca (vazio retorna sugestões)"),
     limit: int = Query(default=20, ge=1, le=100),
     incluir_sugestoes: bool = Query(default=True, description="Incluir empresas sugeridas do MDIC"),
@@ -5316,26 +4694,47 @@ async def autocomplete_exportadoras(
     """
     Autocomplete para empresas exportadoras.
     Retorna empresas que contêm o termo de busca no nome.
-    Se não encontrar resultados, inclui empresas sugeridas do MDIC e sinergias.
+    Se não encontrar resultados, inclui empresas sugeridas do MDIC.
     """
     from sqlalchemy import func
     
+    cache_key = _chave_cache_versionada(
+        db,
+        f"exportadoras|{(q or '').strip().lower()}|{limit}|{incluir_sugestoes}",
+        [TABELA_OPERACOES, TABELA_EMPRESAS, TABELA_EMPRESAS_MDIC],
+    )
+    cached = _AUTOCOMPLETE_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+    
     try:
         logger.info(f"🔍 Buscando exportadoras com termo: '{q}'")
         
+        inicio = time.perf_counter()
+        completo = True
         resultado = []
         query_clean = (q or "").strip()
         query_lower = query_clean.lower()
+        # Motor em memória (None até a primeira carga: usa o índice empresas_busca).
+        # Durante a recarga o motor anterior responde, mas a resposta não vai para o cache
+        motor = obter_motor(db)
+        if motor is not None and not motor_em_dia(db, motor):
+            completo = False
         
         # 0. Buscar na tabela empresas (cadastro Base dos Dados) — sempre mostra sugestões por nome
         if query_clean:
-            empresas_cadastro = db.query(Empresa.nome).filter(
-                Empresa.nome.isnot(None),
-                Empresa.nome != "",
-                Empresa.nome.ilike(f"%{query_clean}%"),
-                Empresa.tipo.in_(["exportadora", "ambos"])
-            ).distinct().limit(limit).all()
-            for (nome,) in empresas_cadastro:
+            if motor is not None:
+                empresas_cadastro = motor.buscar(query_clean, "exportador", limit, fonte=FONTE_EMPRESAS)
+            else:
+                empresas_cadastro = buscar_empresas(db, query_clean, "exportador", limit, fonte=FONTE_EMPRESAS)
+            if empresas_cadastro is None:
+                empresas_cadastro = db.query(Empresa.nome).filter(
+                    Empresa.nome.isnot(None),
+                    Empresa.nome != "",
+                    Empresa.nome.ilike(f"%{query_clean}%"),
+                    Empresa.tipo.in_(["exportadora", "ambos"])
+                ).distinct().limit(limit).all()
+            for (nome, *_totais) in empresas_cadastro:
                 if nome and nome.strip():
                     if not any(r.get("nome", "").strip().lower() == nome.strip().lower() for r in resultado):
                         resultado.append({
@@ -5345,27 +4744,27 @@ async def autocomplete_exportadoras(
                             "fonte": "empresas"
                         })
         
-        # 1. Buscar nas operações: com termo (ILIKE) ou sem termo (top exportadoras para sugestões)
-        filter_export = [
-            OperacaoComex.razao_social_exportador.isnot(None),
-            OperacaoComex.razao_social_exportador != '',
-        ]
-        if q:
-            filter_export.append(OperacaoComex.razao_social_exportador.ilike(f"%{q}%"))
-        
-        empresas_query = db.query(
-            OperacaoComex.razao_social_exportador,
-            func.count(OperacaoComex.id).label('total_operacoes'),
-            func.sum(OperacaoComex.valor_fob).label('valor_total')
-        ).filter(
-            and_(*filter_export)
-        ).group_by(
-            OperacaoComex.razao_social_exportador
-        ).order_by(
-            func.sum(OperacaoComex.valor_fob).desc()
-        ).limit(limit)
-        
-        empresas = empresas_query.all()
+        # 1. Buscar nas operações: com termo ou sem termo (top exportadoras para sugestões), pelo índice empresas_busca
+        empresas = motor.buscar(q, "exportador", limit) if motor is not None else buscar_empresas(db, q, "exportador", limit)
+        if empresas is None:
+            filter_export = [
+                OperacaoComex.razao_social_exportador.isnot(None),
+                OperacaoComex.razao_social_exportador != '',
+            ]
+            if q:
+                filter_export.append(OperacaoComex.razao_social_exportador.ilike(f"%{q}%"))
+            
+            empresas = db.query(
+                OperacaoComex.razao_social_exportador,
+                func.count(OperacaoComex.id).label('total_operacoes'),
+                func.sum(OperacaoComex.valor_fob).label('valor_total')
+            ).filter(
+                and_(*filter_export)
+            ).group_by(
+                OperacaoComex.razao_social_exportador
+            ).order_by(
+                func.sum(OperacaoComex.valor_fob).desc()
+            ).limit(limit).all()
         
         for empresa, total_operacoes, valor_total in empresas:
             nome_emp = (empresa or "").strip()
@@ -5382,7 +4781,9 @@ async def autocomplete_exportadoras(
         logger.info(f"✅ Encontradas {len(resultado)} exportadoras nas operações para '{q}'")
         
         # 2. Complementar com BigQuery (cadastro histórico)
-        if len(resultado) < limit:
+        if len(resultado) < limit and _orcamento_esgotado(inicio):
+            completo = False
+        elif len(resultado) < limit:
             try:
                 resultados_bq = _buscar_empresas_bigquery(
                     q=q,
@@ -5398,88 +4799,31 @@ async def autocomplete_exportadoras(
             except Exception as e:
                 logger.debug(f"Erro ao buscar BigQuery (exportadoras): {e}")
 
-        # 3. Se não encontrou resultados ou query vazia, buscar no MDIC
+        # 3. Complementar com a lista de empresas do MDIC (tabela local, carregada em segundo plano)
         if (len(resultado) < limit and incluir_sugestoes) or not q:
-            try:
-                from data_collector.empresas_mdic_scraper import EmpresasMDICScraper
-                
-                scraper = EmpresasMDICScraper()
-                empresas_mdic = await scraper.coletar_empresas()
-                
-                # Filtrar empresas do MDIC que são exportadoras e contêm o termo
-                empresas_mdic_filtradas = [
-                    emp for emp in empresas_mdic
-                    if emp.get("tipo_operacao", "").lower() in ["exportação", "exportacao", ""] and
-                    q.lower() in emp.get("razao_social", "").lower()
-                ]
-                
-                # Adicionar empresas do MDIC que não estão no resultado
-                empresas_ja_adicionadas = {r["nome"].lower() for r in resultado}
-                
-                for emp in empresas_mdic_filtradas[:limit - len(resultado)]:
-                    nome = emp.get("razao_social") or emp.get("nome_fantasia", "")
-                    if nome.lower() not in empresas_ja_adicionadas:
-                        resultado.append({
-                            "nome": nome,
-                            "total_operacoes": 0,
-                            "valor_total": 0.0,
-                            "fonte": "mdic",
-                            "cnpj": emp.get("cnpj"),
-                            "uf": emp.get("uf"),
-                            "faixa_valor": emp.get("faixa_valor")
-                        })
-                        empresas_ja_adicionadas.add(nome.lower())
-                
-            except Exception as e:
-                logger.debug(f"Erro ao buscar empresas MDIC: {e}")
-        
-        # 4. Se ainda não tem resultados suficientes, buscar sugestões de sinergias
-        if len(resultado) < limit and incluir_sugestoes:
-            try:
-                # Importação condicional - apenas quando necessário
-                if not SINERGIA_AVAILABLE or SinergiaAnalyzer is None:
-                    raise ImportError("SinergiaAnalyzer não disponível")
-                from data_collector.cnae_analyzer import CNAEAnalyzer
-                
-                # Carregar CNAE se disponível
-                cnae_analyzer = None
+            if _orcamento_esgotado(inicio):
+                completo = False
+            else:
                 try:
-                    arquivo_cnae = Path("C:/Users/User/Desktop/Cursor/NOVO CNAE.xlsx")
-                    if arquivo_cnae.exists():
-                        cnae_analyzer = CNAEAnalyzer(arquivo_cnae)
-                        cnae_analyzer.carregar_cnae_excel()
-                except:
-                    pass
-                
-                analyzer = SinergiaAnalyzer(cnae_analyzer)
-                
-                # Buscar empresas com sinergia que são exportadoras
-                empresas_com_sinergia = analyzer.analisar_sinergias_por_empresa(db, {}, limit * 2)
-                
-                # Filtrar empresas que contêm o termo e são exportadoras
-                empresas_ja_adicionadas = {r["nome"].lower() for r in resultado}
-                
-                for emp in empresas_com_sinergia:
-                    nome = emp.get("razao_social", "")
-                    if (nome.lower() not in empresas_ja_adicionadas and
-                        q.lower() in nome.lower() and
-                        emp.get("exportacoes", {}).get("total_operacoes", 0) > 0):
-                        resultado.append({
-                            "nome": nome,
-                            "total_operacoes": emp.get("exportacoes", {}).get("total_operacoes", 0),
-                            "valor_total": emp.get("exportacoes", {}).get("valor_total", 0.0),
-                            "fonte": "sinergia",
-                            "potencial_sinergia": emp.get("potencial_sinergia", 0),
-                            "cnpj": emp.get("cnpj"),
-                            "uf": emp.get("uf")
-                        })
-                        empresas_ja_adicionadas.add(nome.lower())
-                        
-                        if len(resultado) >= limit:
-                            break
-            except Exception as e:
-                logger.debug(f"Erro ao buscar sugestões de sinergia: {e}")
+                    empresas_ja_adicionadas = {r["nome"].lower() for r in resultado}
+                    for emp in buscar_empresas_mdic(db, q, "exportador", limit - len(resultado), motor=motor):
+                        if emp["nome"].lower() not in empresas_ja_adicionadas:
+                            resultado.append({
+                                "nome": emp["nome"],
+                                "total_operacoes": 0,  # Não temos dados de operações do MDIC
+                                "valor_total": 0.0,
+                                "fonte": "mdic",
+                                "cnpj": emp["cnpj"],
+                                "uf": emp["uf"],
+                                "faixa_valor": emp["faixa_valor"]
+                            })
+                            empresas_ja_adicionadas.add(emp["nome"].lower())
+                except Exception as e:
+                    logger.debug(f"Erro ao buscar empresas MDIC para autocomplete: {e}")
         
+        # Respostas cortadas pelo orçamento de tempo ou de um motor anterior não vão para o cache
+        if completo:
+            _AUTOCOMPLETE_CACHE.set(cache_key, resultado[:limit])
         return resultado[:limit]
         
     except Exception as e:
@@ -5490,7 +4834,8 @@ async def autocomplete_exportadoras(
 
 
 @app.get("/ncm/{ncm}/analise")
-async def analise_ncm(
+@rota_banco
+def analise_ncm(
     ncm: str,
     db: Session = Depends(get_db)
 ):
@@ -5503,6 +4848,11 @@ async def analise_ncm(
     if len(ncm) != 8 or not ncm.isdigit():
         raise HTTPException(status_code=400, detail="NCM inválido")
     
+    cache_key = _chave_cache_versionada(db, ncm, [TABELA_OPERACOES])
+    cached = _NCM_ANALISE_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+    
     # Estatísticas gerais
     stats = db.query(
         func.count(OperacaoComex.id).label('total_operacoes'),
@@ -5542,7 +4892,7 @@ async def analise_ncm(
         OperacaoComex.mes_referencia
     ).all()
     
-    return {
+    resposta = {
         "ncm": ncm,
         "estatisticas": {
             "total_operacoes": stats.total_operacoes or 0,
@@ -5568,6 +4918,8 @@ async def analise_ncm(
             for mes, tipo, valor_total, quantidade in evolucao
         ]
     }
+    _NCM_ANALISE_CACHE.set(cache_key, resposta)
+    return resposta
 
 
 # Endpoints de Autenticação (opcionais - só funcionam se módulos estiverem disponíveis)
@@ -6179,7 +5531,6 @@ else:
 # Endpoints para cruzamento de dados com empresas do MDIC
 try:
     from data_collector.cruzamento_dados import CruzamentoDados
-    from data_collector.empresas_mdic_scraper import EmpresasMDICScraper
     CRUZAMENTO_AVAILABLE = True
 except ImportError:
     CRUZAMENTO_AVAILABLE = False
@@ -6189,6 +5540,10 @@ except ImportError:
 try:
     from data_collector.sinergia_analyzer import SinergiaAnalyzer
     from data_collector.cnae_analyzer import CNAEAnalyzer
+    from services.cnae import NIVEIS as NIVEIS_CNAE, indice_cnae, obter_cnae_analyzer
+    from services.sinergias import (
+        data_sinergias, garantir_sinergias, recalcular_sinergias, sinergias_por_empresa, sinergias_por_estado,
+    )
     SINERGIA_AVAILABLE = True
 except (ImportError, NameError) as e:
     SINERGIA_AVAILABLE = False
@@ -6210,15 +5565,17 @@ async def coletar_empresas_mdic(
         raise HTTPException(status_code=501, detail="Módulo de cruzamento não disponível")
     
     try:
-        scraper = EmpresasMDICScraper()
-        empresas = await scraper.coletar_empresas(ano)
+        # Revalida os arquivos e atualiza a tabela local só se a origem mudou
+        sincronizacao = await sincronizar_empresas_mdic(db, ano=ano)
+        empresas = indice_empresas_mdic(db)
         
         return {
             "success": True,
             "message": f"Coletadas {len(empresas)} empresas do MDIC",
             "total_empresas": len(empresas),
+            "atualizado": sincronizacao["atualizado"],
             "ano": ano or datetime.now().year,
-            "empresas": empresas[:100]  # Retornar primeiras 100 como exemplo
+            "empresas": list(empresas.values())[:100]  # Retornar primeiras 100 como exemplo
         }
     except Exception as e:
         logger.error(f"Erro ao coletar empresas do MDIC: {e}")
@@ -6233,6 +5590,7 @@ class CruzamentoFiltros(BaseModel):
     tipo_operacao: Optional[str] = None
     uf: Optional[str] = None
     limite: int = 1000
+    gravar: bool = False  # Cruzamento em massa gravado em cruzamentos_empresas (limite 0 = todas)
 
 
 @app.post("/cruzar-dados-empresas")
@@ -6258,6 +5616,15 @@ async def cruzar_dados_empresas(
         if filtros.uf:
             filtros_dict["uf"] = filtros.uf
         
+        if filtros.gravar:
+            from services.resolucao_empresas import resolver_empresas_operacoes
+            estatisticas = resolver_empresas_operacoes(db, filtros_dict, limite=filtros.limite or None)
+            return {
+                "success": True,
+                "message": f"Cruzamento gravado: {estatisticas['operacoes_identificadas']}/{estatisticas['total_operacoes']} operações identificadas",
+                "estatisticas": estatisticas,
+            }
+        
         resultados = await cruzamento.cruzar_operacoes_bulk(
             db,
             filtros=filtros_dict if filtros_dict else None,
@@ -6280,7 +5647,8 @@ async def cruzar_dados_empresas(
 
 
 @app.get("/estatisticas-cruzamento")
-async def estatisticas_cruzamento(
+@rota_banco
+def estatisticas_cruzamento(
     db: Session = Depends(get_db)
 ):
     """
@@ -6309,10 +5677,18 @@ async def estatisticas_cruzamento(
             )
         ).scalar() or 0
         
+        # Resultado do último cruzamento em massa (services.resolucao_empresas)
+        from database.models import CruzamentoEmpresa
+        identificadas_por_confianca = dict(
+            db.query(CruzamentoEmpresa.confianca, func.count(CruzamentoEmpresa.id))
+            .group_by(CruzamentoEmpresa.confianca).all()
+        )
+        
         return {
             "total_operacoes": total_operacoes,
             "operacoes_com_cnpj": operacoes_com_cnpj,
             "operacoes_com_razao_social": operacoes_com_razao_social,
+            "operacoes_identificadas_por_confianca": identificadas_por_confianca,
             "taxa_cnpj": (operacoes_com_cnpj / total_operacoes * 100) if total_operacoes > 0 else 0,
             "taxa_razao_social": (operacoes_com_razao_social / total_operacoes * 100) if total_operacoes > 0 else 0,
             "nota": "Dados públicos são anonimizados. CNPJ/razão social podem não estar disponíveis em todas as operações."
@@ -6335,16 +5711,12 @@ async def carregar_cnae(
     try:
         from pathlib import Path
         
-        if arquivo_path:
-            arquivo = Path(arquivo_path)
-        else:
-            # Tentar caminho padrão
-            arquivo = Path("C:/Users/User/Desktop/Cursor/NOVO CNAE.xlsx")
+        # Caminho informado ou o configurado (settings.cnae_arquivo)
+        arquivo = Path(arquivo_path) if arquivo_path else settings.cnae_arquivo
         
-        analyzer = CNAEAnalyzer(arquivo)
-        sucesso = analyzer.carregar_cnae_excel()
+        analyzer = obter_cnae_analyzer(arquivo)
         
-        if sucesso:
+        if analyzer:
             stats = analyzer.estatisticas()
             return {
                 "success": True,
@@ -6360,8 +5732,38 @@ async def carregar_cnae(
         raise HTTPException(status_code=500, detail=f"Erro ao carregar CNAE: {str(e)}")
 
 
+@app.get("/cnae/hierarquia")
+@rota_banco
+def cnae_hierarquia(
+    prefixo: str = Query("", description="Prefixo do código CNAE (ex.: 47 ou 4711-3)"),
+    nivel: str = Query("divisao", description="Nível da agregação: secao, divisao, grupo, classe ou subclasse"),
+    limite: int = Query(100, ge=1, le=5000, description="Máximo de códigos listados"),
+    db: Session = Depends(get_db)
+):
+    """
+    Códigos CNAE com o prefixo (tabela cnae_hierarquia + arquivo CNAE) e
+    empresas do arquivo CNAE agregadas pelo nível da hierarquia.
+    """
+    if not SINERGIA_AVAILABLE:
+        raise HTTPException(status_code=501, detail="Módulo de sinergia não disponível")
+    if nivel not in NIVEIS_CNAE:
+        raise HTTPException(status_code=400, detail=f"Nível inválido: use {', '.join(NIVEIS_CNAE)}")
+    
+    indice = indice_cnae(db)
+    codigos = indice.buscar_prefixo(prefixo)
+    return {
+        "success": True,
+        "prefixo": prefixo,
+        "total_codigos": len(codigos),
+        "codigos": [indice.descrever(codigo) for codigo in codigos[:limite]],
+        "nivel": nivel,
+        "empresas_por_nivel": indice.agregar(nivel, prefixo=prefixo),
+    }
+
+
 @app.get("/analisar-sinergias-estado")
-async def analisar_sinergias_estado(
+@rota_banco
+def analisar_sinergias_estado(
     uf: Optional[str] = Query(None, description="UF específica (None = todos)"),
     db: Session = Depends(get_db)
 ):
@@ -6371,9 +5773,15 @@ async def analisar_sinergias_estado(
     if not SINERGIA_AVAILABLE or SinergiaAnalyzer is None:
         raise HTTPException(status_code=501, detail="Módulo de sinergia não disponível")
     
+    cache_key = _chave_cache_versionada(db, f"estado|{(uf or '').upper()}", [TABELA_SINERGIAS])
+    cached = _SINERGIAS_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+    
     try:
-        analyzer = SinergiaAnalyzer()
-        resultado = analyzer.analisar_sinergias_por_estado(db, uf)
+        garantir_sinergias(db)
+        resultado = sinergias_por_estado(db, uf)
+        _SINERGIAS_CACHE.set(_chave_cache_versionada(db, f"estado|{(uf or '').upper()}", [TABELA_SINERGIAS]), resultado)
         return resultado
     except Exception as e:
         logger.error(f"Erro ao analisar sinergias: {e}")
@@ -6383,51 +5791,53 @@ async def analisar_sinergias_estado(
 
 
 @app.post("/analisar-sinergias-empresas")
-async def analisar_sinergias_empresas(
+@rota_banco
+def analisar_sinergias_empresas(
     limite: int = Query(100, description="Limite de empresas a analisar"),
     ano: Optional[int] = Query(None, description="Ano para coletar empresas do MDIC"),
+    recalcular: bool = Query(False, description="Recalcular a tabela de sinergias antes de responder"),
     db: Session = Depends(get_db)
 ):
     """
     Analisa sinergias por empresa, integrando com CNAE.
+    Lê a tabela pré-calculada (services.sinergias); recalcular=true refaz o cálculo.
     """
     if not SINERGIA_AVAILABLE or not CRUZAMENTO_AVAILABLE:
         raise HTTPException(status_code=501, detail="Módulos necessários não disponíveis")
     
+    cache_key = _chave_cache_versionada(
+        db, f"empresas|{limite}|{ano or ''}", [TABELA_SINERGIAS, TABELA_EMPRESAS_MDIC]
+    )
+    cached = _SINERGIAS_CACHE.get(cache_key) if not recalcular else None
+    if cached is not None:
+        return cached
+    
     try:
-        # Carregar empresas do MDIC
-        scraper = EmpresasMDICScraper()
-        empresas_lista = await scraper.coletar_empresas(ano)
-        
-        # Criar índice por CNPJ
-        empresas_mdic = {}
-        for empresa in empresas_lista:
-            cnpj = empresa.get("cnpj")
-            if cnpj:
-                empresas_mdic[cnpj] = empresa
-        
-        # Carregar CNAE se disponível
-        cnae_analyzer = None
-        try:
-            arquivo_cnae = Path("C:/Users/User/Desktop/Cursor/NOVO CNAE.xlsx")
-            if arquivo_cnae.exists():
-                cnae_analyzer = CNAEAnalyzer(arquivo_cnae)
-                cnae_analyzer.carregar_cnae_excel()
-        except Exception as e:
-            logger.warning(f"Não foi possível carregar CNAE: {e}")
+        if recalcular or not versao_tabela(db, TABELA_SINERGIAS):
+            # CNAE compartilhado pelo processo, se disponível
+            cnae_analyzer = None
+            try:
+                cnae_analyzer = obter_cnae_analyzer()
+            except Exception as e:
+                logger.warning(f"Não foi possível carregar CNAE: {e}")
+            recalcular_sinergias(db, cnae_analyzer)
         
-        # Analisar sinergias
-        analyzer = SinergiaAnalyzer(cnae_analyzer)
-        resultados = analyzer.analisar_sinergias_por_empresa(db, empresas_mdic, limite)
+        resultados = sinergias_por_empresa(db, limite)
         
-        return {
+        resposta = {
             "success": True,
             "message": f"Análise de sinergias concluída para {len(resultados)} empresas",
-            "total_empresas_mdic": len(empresas_mdic),
+            "total_empresas_mdic": len(indice_empresas_mdic(db)),
             "empresas_analisadas": len(resultados),
-            "cnae_carregado": cnae_analyzer is not None,
+            "cnae_carregado": any(r["cnae"] for r in resultados),
+            "atualizado_em": data_sinergias(db),
             "resultados": resultados
         }
+        _SINERGIAS_CACHE.set(
+            _chave_cache_versionada(db, f"empresas|{limite}|{ano or ''}", [TABELA_SINERGIAS, TABELA_EMPRESAS_MDIC]),
+            resposta
+        )
+        return resposta
     except Exception as e:
         logger.error(f"Erro ao analisar sinergias de empresas: {e}")
         import traceback
@@ -6436,7 +5846,8 @@ async def analisar_sinergias_empresas(
 
 
 @app.get("/sugestoes-empresa/{cnpj}")
-async def sugestoes_empresa(
+@rota_banco
+def sugestoes_empresa(
     cnpj: str,
     db: Session = Depends(get_db)
 ):
@@ -6448,26 +5859,16 @@ async def sugestoes_empresa(
     
     try:
         # Buscar empresa no MDIC
-        scraper = EmpresasMDICScraper()
-        empresas_lista = await scraper.coletar_empresas()
-        
-        empresa_mdic = None
         cnpj_limpo = cnpj.replace('.', '').replace('/', '').replace('-', '')
-        for empresa in empresas_lista:
-            if empresa.get("cnpj") == cnpj_limpo:
-                empresa_mdic = empresa
-                break
+        empresa_mdic = indice_empresas_mdic(db).get(cnpj_limpo)
         
         if not empresa_mdic:
             raise HTTPException(status_code=404, detail="Empresa não encontrada no MDIC")
         
-        # Carregar CNAE
+        # CNAE compartilhado pelo processo (services.cnae)
         cnae_analyzer = None
         try:
-            arquivo_cnae = Path("C:/Users/User/Desktop/Cursor/NOVO CNAE.xlsx")
-            if arquivo_cnae.exists():
-                cnae_analyzer = CNAEAnalyzer(arquivo_cnae)
-                cnae_analyzer.carregar_cnae_excel()
+            cnae_analyzer = obter_cnae_analyzer()
         except Exception as e:
             logger.warning(f"Não foi possível carregar CNAE: {e}")
         
@@ -6522,90 +5923,6 @@ async def atualizar_dados_completos():
         raise HTTPException(status_code=500, detail=f"Erro na atualização: {str(e)}")
 
 
-@app.get("/dashboard/sinergias-estado")
-async def dashboard_sinergias_estado(
-    uf: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
-):
-    """
-    Endpoint otimizado para dashboard - sinergias por estado.
-    """
-    if not SINERGIA_AVAILABLE or SinergiaAnalyzer is None:
-        raise HTTPException(status_code=501, detail="Módulo de sinergia não disponível")
-    
-    try:
-        analyzer = SinergiaAnalyzer()
-        resultado = analyzer.analisar_sinergias_por_estado(db, uf)
-        return resultado
-    except Exception as e:
-        logger.error(f"Erro ao buscar sinergias: {e}")
-        raise HTTPException(status_code=500, detail=f"Erro ao buscar sinergias: {str(e)}")
-
-
-@app.get("/dashboard/sugestoes-empresas")
-async def dashboard_sugestoes_empresas(
-    limite: int = Query(20, description="Número de sugestões"),
-    tipo: Optional[str] = Query(None, description="Tipo: 'importacao', 'exportacao', ou None para ambos"),
-    uf: Optional[str] = Query(None, description="Filtrar por UF"),
-    db: Session = Depends(get_db)
-):
-    """
-    Endpoint otimizado para dashboard - sugestões de empresas.
-    Retorna empresas com maior potencial de sinergia.
-    """
-    if not SINERGIA_AVAILABLE or not CRUZAMENTO_AVAILABLE:
-        raise HTTPException(status_code=501, detail="Módulos necessários não disponíveis")
-    
-    try:
-        # Carregar empresas
-        scraper = EmpresasMDICScraper()
-        empresas_lista = await scraper.coletar_empresas()
-        empresas_mdic = {}
-        for empresa in empresas_lista:
-            cnpj = empresa.get("cnpj")
-            if cnpj:
-                empresas_mdic[cnpj] = empresa
-        
-        # Carregar CNAE
-        cnae_analyzer = None
-        try:
-            arquivo_cnae = Path("C:/Users/User/Desktop/Cursor/NOVO CNAE.xlsx")
-            if arquivo_cnae.exists():
-                cnae_analyzer = CNAEAnalyzer(arquivo_cnae)
-                cnae_analyzer.carregar_cnae_excel()
-        except Exception as e:
-            logger.warning(f"Não foi possível carregar CNAE: {e}")
-        
-        # Analisar sinergias
-        analyzer = SinergiaAnalyzer(cnae_analyzer)
-        resultados = analyzer.analisar_sinergias_por_empresa(db, empresas_mdic, limite * 2)
-        
-        # Filtrar por tipo se especificado
-        if tipo == "importacao":
-            resultados = [r for r in resultados if r["importacoes"]["total_operacoes"] > 0 and r["exportacoes"]["total_operacoes"] == 0]
-        elif tipo == "exportacao":
-            resultados = [r for r in resultados if r["exportacoes"]["total_operacoes"] > 0 and r["importacoes"]["total_operacoes"] == 0]
-        
-        # Filtrar por UF se especificado
-        if uf:
-            resultados = [r for r in resultados if r.get("uf") == uf]
-        
-        # Ordenar por potencial e limitar
-        resultados.sort(key=lambda x: x.get("potencial_sinergia", 0), reverse=True)
-        resultados = resultados[:limite]
-        
-        return {
-            "success": True,
-            "total": len(resultados),
-            "sugestoes": resultados
-        }
-    except Exception as e:
-        logger.error(f"Erro ao buscar sugestões: {e}")
-        import traceback
-        logger.error(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=f"Erro ao buscar sugestões: {str(e)}")
-
-
 @app.get("/dashboard/empresas-recomendadas")
 async def get_empresas_recomendadas(
     limite: int = Query(default=100, ge=1, le=5000),
@@ -6617,41 +5934,16 @@ async def get_empresas_recomendadas(
     Retorna lista de empresas recomendadas para o dashboard.
     """
     try:
-        import json
-        from pathlib import Path
-        
-        arquivo_empresas = Path(__file__).parent.parent / "data" / "empresas_recomendadas.xlsx"
-        
-        if not arquivo_empresas.exists():
-            # Tentar CSV como fallback
-            arquivo_empresas = Path(__file__).parent.parent / "data" / "empresas_recomendadas.csv"
-            if not arquivo_empresas.exists():
-                return {
-                    "success": False,
-                    "message": "Arquivo de empresas recomendadas não encontrado",
-                    "data": []
-                }
-        
-        import pandas as pd
-        
-        if arquivo_empresas.suffix == '.xlsx':
-            df = pd.read_excel(arquivo_empresas)
-        else:
-            df = pd.read_csv(arquivo_empresas, encoding='utf-8-sig')
-        
-        # Aplicar filtros
-        if tipo:
-            df = df[df['Sugestão'] == tipo]
-        if uf:
-            df = df[df['Estado'] == uf]
-        if ncm:
-            df = df[df['NCM Relacionado'] == ncm]
-        
-        # Limitar resultados
-        df = df.head(limite)
+        planilha = obter_planilha_recomendadas()
+        if planilha is None:
+            return {
+                "success": False,
+                "message": "Arquivo de empresas recomendadas não encontrado",
+                "data": []
+            }
         
-        # Converter para dict
-        empresas = df.to_dict('records')
+        # Aplicar filtros e limitar resultados
+        empresas = planilha.filtrar_brutos(limite, tipo=tipo, uf=uf, ncm=ncm)
         
         return {
             "success": True,
@@ -6670,53 +5962,11 @@ def _buscar_empresas_importadoras_recomendadas(limite: int = 10):
     Função auxiliar síncrona para buscar empresas importadoras recomendadas.
     """
     try:
-        import pandas as pd
-        from pathlib import Path
-        
-        arquivo_empresas = Path(__file__).parent.parent / "data" / "empresas_recomendadas.xlsx"
-        
-        if not arquivo_empresas.exists():
-            arquivo_empresas = Path(__file__).parent.parent / "data" / "empresas_recomendadas.csv"
-            if not arquivo_empresas.exists():
-                return []
-        
-        if arquivo_empresas.suffix == '.xlsx':
-            df = pd.read_excel(arquivo_empresas)
-        else:
-            df = pd.read_csv(arquivo_empresas, encoding='utf-8-sig')
-        
-        # Filtrar empresas que importam (têm valor de importação > 0)
-        df_importadoras = df[
-            (df['Importado (R$)'].notna()) & 
-            (df['Importado (R$)'] > 0)
-        ].copy()
-        
-        # Agrupar por empresa (CNPJ) e somar valores
-        df_agrupado = df_importadoras.groupby('CNPJ').agg({
-            'Razão Social': 'first',
-            'Nome Fantasia': 'first',
-            'Estado': 'first',
-            'Importado (R$)': 'sum',
-            'Peso Participação (0-100)': 'max'
-        }).reset_index()
-        
-        # Ordenar por valor de importação
-        df_agrupado = df_agrupado.sort_values('Importado (R$)', ascending=False).head(limite)
-        
-        # Converter para formato esperado pelo dashboard
-        empresas = []
-        for _, row in df_agrupado.iterrows():
-            empresas.append({
-                "nome": row['Razão Social'] or row['Nome Fantasia'],
-                "pais": row['Razão Social'] or row['Nome Fantasia'],
-                "valor_total": float(row['Importado (R$)']) / 5.0,  # Converter BRL para USD
-                "total_operacoes": 1,
-                "uf": row.get('Estado', ''),
-                "peso_participacao": float(row.get('Peso Participação (0-100)', 0)),
-                "peso_kg": 0,
-            })
-        
-        return empresas
+        planilha = obter_planilha_recomendadas()
+        if planilha is None:
+            return []
+        # Agrupadas por CNPJ e ordenadas pelo valor na carga da planilha
+        return planilha.maiores("importacao", limite)
     except Exception as e:
         logger.debug(f"Erro ao buscar empresas importadoras: {e}")
         import traceback
@@ -6729,53 +5979,11 @@ def _buscar_empresas_exportadoras_recomendadas(limite: int = 10):
     Função auxiliar síncrona para buscar empresas exportadoras recomendadas.
     """
     try:
-        import pandas as pd
-        from pathlib import Path
-        
-        arquivo_empresas = Path(__file__).parent.parent / "data" / "empresas_recomendadas.xlsx"
-        
-        if not arquivo_empresas.exists():
-            arquivo_empresas = Path(__file__).parent.parent / "data" / "empresas_recomendadas.csv"
-            if not arquivo_empresas.exists():
-                return []
-        
-        if arquivo_empresas.suffix == '.xlsx':
-            df = pd.read_excel(arquivo_empresas)
-        else:
-            df = pd.read_csv(arquivo_empresas, encoding='utf-8-sig')
-        
-        # Filtrar empresas que exportam (têm valor de exportação > 0)
-        df_exportadoras = df[
-            (df['Exportado (R$)'].notna()) & 
-            (df['Exportado (R$)'] > 0)
-        ].copy()
-        
-        # Agrupar por empresa (CNPJ) e somar valores
-        df_agrupado = df_exportadoras.groupby('CNPJ').agg({
-            'Razão Social': 'first',
-            'Nome Fantasia': 'first',
-            'Estado': 'first',
-            'Exportado (R$)': 'sum',
-            'Peso Participação (0-100)': 'max'
-        }).reset_index()
-        
-        # Ordenar por valor de exportação
-        df_agrupado = df_agrupado.sort_values('Exportado (R$)', ascending=False).head(limite)
-        
-        # Converter para formato esperado pelo dashboard
-        empresas = []
-        for _, row in df_agrupado.iterrows():
-            empresas.append({
-                "nome": row['Razão Social'] or row['Nome Fantasia'],
-                "pais": row['Razão Social'] or row['Nome Fantasia'],
-                "valor_total": float(row['Exportado (R$)']) / 5.0,  # Converter BRL para USD
-                "total_operacoes": 1,
-                "uf": row.get('Estado', ''),
-                "peso_participacao": float(row.get('Peso Participação (0-100)', 0)),
-                "peso_kg": 0,
-            })
-        
-        return empresas
+        planilha = obter_planilha_recomendadas()
+        if planilha is None:
+            return []
+        # Agrupadas por CNPJ e ordenadas pelo valor na carga da planilha
+        return planilha.maiores("exportacao", limite)
     except Exception as e:
         logger.debug(f"Erro ao buscar empresas exportadoras: {e}")
         import traceback
@@ -6844,7 +6052,8 @@ async def get_dados_comexstat():
 
 
 @app.get("/api/validar-dados-banco")
-async def validar_dados_banco(db: Session = Depends(get_db)):
+@rota_banco
+def validar_dados_banco(db: Session = Depends(get_db)):
     """
     Valida dados no banco e retorna estatísticas detalhadas.
     """
@@ -30,7 +30,9 @@ from database.database import Base
 # Importar todos os modelos para que o Alembic possa detectá-los
 from database.models import (
     OperacaoComex, NCMInfo, ColetaLog, Usuario, AprovacaoCadastro,
-    ComercioExterior, Empresa, CNAEHierarquia, EmpresasRecomendadas
+    ComercioExterior, Empresa, CNAEHierarquia, EmpresasRecomendadas,
+    OperacaoComexMensal, EmpresaComexMensal, RollupControle, VersaoDados,
+    EmpresaBusca, EmpresaMDIC, CruzamentoEmpresa, Sinergia
 )
 target_metadata = Base.metadata
 
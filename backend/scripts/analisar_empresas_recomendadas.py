@@ -26,8 +26,9 @@ sys.path.insert(0, str(backend_dir))
 from database.database import SessionLocal, init_db, engine
 from database.models import (
     ComercioExterior, Empresa, OperacaoComex, EmpresasRecomendadas,
-    Base, TipoOperacao
+    Base, TipoOperacao, VersaoDados
 )
+from services.versoes import TABELA_EMPRESAS_RECOMENDADAS, registrar_alteracao
 
 def calcular_peso_participacao(valor_imp, valor_exp, qtd_ncms):
     """
@@ -226,7 +227,7 @@ def consolidar_empresas(db):
     logger.info("="*80)
     
     # Criar tabela se não existir
-    Base.metadata.create_all(bind=engine, tables=[EmpresasRecomendadas.__table__])
+    Base.metadata.create_all(bind=engine, tables=[EmpresasRecomendadas.__table__, VersaoDados.__table__])
     
     # Limpar tabela existente
     logger.info("Limpando tabela empresas_recomendadas...")
@@ -344,6 +345,7 @@ def consolidar_empresas(db):
             logger.info(f"  Processados {registros_inseridos} registros...")
     
     db.commit()
+    registrar_alteracao(db, TABELA_EMPRESAS_RECOMENDADAS)
     logger.success(f"✅ {registros_inseridos} empresas inseridas na tabela empresas_recomendadas")
     
     # Estatísticas finais
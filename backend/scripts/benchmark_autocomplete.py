@@ -0,0 +1,121 @@
+"""
+Benchmark do autocomplete de empresas.
+
+Compara a consulta antiga (ILIKE '%termo%' + GROUP BY em operacoes_comex) com o
+índice empresas_busca (services.busca_empresas) e o motor em memória
+(services.autocomplete_memoria), em p50/p99 por termo digitado.
+
+Uso:
+    python scripts/benchmark_autocomplete.py --linhas 300000 --empresas 20000
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from loguru import logger
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from database.models import Base, OperacaoComex, TipoOperacao, ViaTransporte
+from services.autocomplete_memoria import obter_motor
+from services.busca_empresas import buscar_empresas, preparar_indice_busca
+from services.rollups import atualizar_rollups
+
+_PALAVRAS = ["COMERCIO", "INDUSTRIA", "GUARANI", "AÇÚCAR", "METAL", "TÊXTIL", "AGRO", "LOGÍSTICA", "QUÍMICA"]
+
+
+def _popular(db, linhas: int, empresas: int) -> None:
+    random.seed(7)
+    nomes = [
+        f"{random.choice(_PALAVRAS)} {random.choice(_PALAVRAS)} {i} {random.choice(['LTDA', 'S.A.', 'EIRELI'])}"
+        for i in range(empresas)
+    ]
+    hoje = date.today()
+    lote = []
+    for _ in range(linhas):
+        data_op = hoje - timedelta(days=random.randint(0, 720))
+        lote.append({
+            "ncm": "01010101",
+            "descricao_produto": "Produto sintético",
+            "tipo_operacao": TipoOperacao.IMPORTACAO,
+            "pais_origem_destino": "China",
+            "uf": "SP",
+            "via_transporte": ViaTransporte.MARITIMA,
+            "valor_fob": random.uniform(100, 100000),
+            "peso_liquido_kg": 1.0,
+            "data_operacao": data_op,
+            "mes_referencia": data_op.strftime("%Y-%m"),
+            "razao_social_importador": random.choice(nomes),
+            "arquivo_origem": "benchmark",
+        })
+        if len(lote) >= 10000:
+            db.bulk_insert_mappings(OperacaoComex, lote)
+            db.commit()
+            lote = []
+    if lote:
+        db.bulk_insert_mappings(OperacaoComex, lote)
+        db.commit()
+
+
+def _consulta_legada(db, termo: str, limite: int):
+    coluna = OperacaoComex.razao_social_importador
+    return db.query(coluna, func.count(OperacaoComex.id), func.sum(OperacaoComex.valor_fob)).filter(
+        coluna.isnot(None), coluna != "", coluna.ilike(f"%{termo}%")
+    ).group_by(coluna).order_by(func.sum(OperacaoComex.valor_fob).desc()).limit(limite).all()
+
+
+def _percentis(nome, funcao, termos):
+    tempos = []
+    for termo in termos:
+        inicio = time.perf_counter()
+        funcao(termo)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos.sort()
+    p50 = tempos[len(tempos) // 2]
+    p99 = tempos[min(len(tempos) - 1, int(len(tempos) * 0.99))]
+    logger.info(f"  {nome:<10} p50 {p50:8.2f} ms   p99 {p99:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do autocomplete de empresas")
+    parser.add_argument("--linhas", type=int, default=300000)
+    parser.add_argument("--empresas", type=int, default=20000)
+    parser.add_argument("--consultas", type=int, default=200)
+    args = parser.parse_args()
+
+    url = f"sqlite:///{Path(tempfile.mkdtemp()) / 'benchmark_autocomplete.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    logger.info(f"📥 Gerando {args.linhas} operações de {args.empresas} empresas...")
+    _popular(db, args.linhas, args.empresas)
+    inicio = time.perf_counter()
+    atualizar_rollups(db, completo=True)
+    logger.info(f"📊 Rollups + índice construídos em {time.perf_counter() - inicio:.2f}s "
+                f"(estratégia: {preparar_indice_busca(db)})")
+
+    # Termos como digitados no autocomplete: prefixos de 3 a 8 letras e números
+    random.seed(11)
+    termos = []
+    for _ in range(args.consultas):
+        palavra = random.choice(_PALAVRAS + [str(random.randint(1, args.empresas))])
+        termos.append(palavra[:random.randint(3, max(3, len(palavra)))])
+
+    logger.info(f"⏱️ Autocomplete ({args.consultas} termos, limite 20):")
+    _percentis("legado", lambda t: _consulta_legada(db, t, 20), termos)
+    _percentis("índice", lambda t: buscar_empresas(db, t, "importador", 20), termos)
+    motor = obter_motor(db, esperar=True)
+    _percentis("memória", lambda t: motor.buscar(t, "importador", 20), termos)
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Teste de carga: requisições concorrentes às rotas com banco.
+
+Dispara requisições simultâneas ao POST /buscar (consulta lenta: filtro por
+empresa + contagem) enquanto mede a latência do /health, com:
+  - antes: DB_EXECUTOR_THREADS=0, a consulta roda no event loop;
+  - depois: consultas no executor do banco (services.execucao_banco).
+
+A aplicação roda no próprio processo (httpx + ASGITransport), como um único
+worker do uvicorn; o get_db é trocado por sessões do banco do benchmark.
+--latencia-ms soma uma espera a cada consulta, simulando o ida-e-volta de um
+PostgreSQL remoto (no SQLite local a consulta é só CPU do próprio processo).
+A latência do /health conta desde o horário previsto da sondagem, ou seja,
+inclui o tempo em que o event loop ficou ocupado.
+
+Uso:
+    python scripts/benchmark_concorrencia.py --linhas 200000 --concorrencia 16 --threads 8
+    python scripts/benchmark_concorrencia.py --database-url postgresql://... (usa dados existentes)
+"""
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import httpx
+from loguru import logger
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from benchmark_dashboard_stats import _popular
+from config import settings
+from database import get_db
+from database.models import Base
+from services.execucao_banco import encerrar_executor_banco
+
+
+async def _rodada(app, requisicoes: int, concorrencia: int) -> dict:
+    """Dispara as buscas com `concorrencia` em voo e sonda o /health a cada 20 ms."""
+    semaforo = asyncio.Semaphore(concorrencia)
+    latencias_health = []
+    terminou = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as cliente:
+        async def buscar(i: int):
+            async with semaforo:
+                resposta = await cliente.post("/buscar", json={
+                    "empresa_importadora": f"EMPRESA {i % 50}",
+                    "page": 1 + i % 5,
+                    "page_size": 50,
+                })
+                resposta.raise_for_status()
+
+        async def sondar_health():
+            while not terminou.is_set():
+                previsto = time.perf_counter() + 0.02
+                await asyncio.sleep(0.02)
+                (await cliente.get("/health")).raise_for_status()
+                latencias_health.append(time.perf_counter() - previsto)
+
+        sonda = asyncio.create_task(sondar_health())
+        inicio = time.perf_counter()
+        await asyncio.gather(*(buscar(i) for i in range(requisicoes)))
+        duracao = time.perf_counter() - inicio
+        terminou.set()
+        await sonda
+
+    latencias_health.sort()
+    return {
+        "segundos": duracao,
+        "req_s": requisicoes / duracao,
+        "health_p50_ms": latencias_health[len(latencias_health) // 2] * 1000,
+        "health_max_ms": latencias_health[-1] * 1000,
+        "health_amostras": len(latencias_health),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga das rotas com banco (antes/depois do executor)")
+    parser.add_argument("--linhas", type=int, default=200000, help="Linhas sintéticas (SQLite temporário)")
+    parser.add_argument("--database-url", default=None, help="Usar banco existente em vez de gerar dados")
+    parser.add_argument("--requisicoes", type=int, default=64)
+    parser.add_argument("--concorrencia", type=int, default=16)
+    parser.add_argument("--threads", type=int, default=settings.db_executor_threads,
+                        help="Threads do executor do banco na rodada 'depois'")
+    parser.add_argument("--latencia-ms", type=float, default=0.0,
+                        help="Espera extra por consulta (simula banco remoto)")
+    args = parser.parse_args()
+
+    if args.database_url:
+        url = args.database_url
+    else:
+        url = f"sqlite:///{Path(tempfile.mkdtemp()) / 'benchmark_concorrencia.db'}"
+    engine = create_engine(url, pool_size=max(5, args.threads), connect_args=(
+        {"check_same_thread": False} if url.startswith("sqlite") else {}
+    ))
+    Base.metadata.create_all(bind=engine)
+    SessaoBenchmark = sessionmaker(bind=engine)
+
+    if not args.database_url:
+        logger.info(f"📥 Gerando {args.linhas} operações sintéticas em {url}...")
+        with SessaoBenchmark() as db:
+            _popular(db, args.linhas)
+
+    if args.latencia_ms:
+        @event.listens_for(engine, "after_cursor_execute")
+        def _latencia_rede(*_):
+            time.sleep(args.latencia_ms / 1000)
+
+    import main as backend_main
+
+    def _get_db_benchmark():
+        db = SessaoBenchmark()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    backend_main.app.dependency_overrides[get_db] = _get_db_benchmark
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    resultados = {}
+    for nome, threads in (("antes (event loop)", 0), (f"depois ({args.threads} threads)", args.threads)):
+        settings.db_executor_threads = threads
+        encerrar_executor_banco()
+        resultados[nome] = asyncio.run(_rodada(backend_main.app, args.requisicoes, args.concorrencia))
+    encerrar_executor_banco()
+
+    print(
+        f"\n⏱️ POST /buscar: {args.requisicoes} requisições, {args.concorrencia} simultâneas"
+        + (f", +{args.latencia_ms:g} ms por consulta" if args.latencia_ms else "")
+    )
+    for nome, r in resultados.items():
+        print(
+            f"  {nome:<22} {r['req_s']:7.1f} req/s ({r['segundos']:.2f}s)  "
+            f"/health p50 {r['health_p50_ms']:7.1f} ms, máx {r['health_max_ms']:7.1f} ms "
+            f"({r['health_amostras']} sondagens)"
+        )
+
+
+if __name__ == "__main__":
+    main()
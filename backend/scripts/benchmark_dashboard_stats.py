@@ -0,0 +1,150 @@
+"""
+Benchmark dos agregados do /dashboard/stats.
+
+Compara:
+  - legado: uma consulta por KPI/lista (como o endpoint fazia antes);
+  - passada única: services.dashboard_query.calcular_agregados_brutos;
+  - rollups: services.rollups.calcular_agregados_dashboard.
+
+Uso:
+    python scripts/benchmark_dashboard_stats.py --linhas 500000
+    python scripts/benchmark_dashboard_stats.py --database-url postgresql://... (usa dados existentes)
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from loguru import logger
+from sqlalchemy import and_, create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from database.models import Base, OperacaoComex, TipoOperacao, ViaTransporte
+from services.dashboard_query import calcular_agregados_brutos
+from services.rollups import atualizar_rollups, calcular_agregados_dashboard
+
+
+def _popular(db, linhas: int) -> None:
+    """Gera operações sintéticas nos últimos 24 meses."""
+    random.seed(42)
+    hoje = date.today()
+    ncms = [f"{random.randint(1000000, 99999999):08d}" for _ in range(2000)]
+    paises = [f"País {i}" for i in range(150)]
+    ufs = ["SP", "RJ", "MG", "PR", "SC", "RS", "BA", "PE", "ES", "GO"]
+    empresas = [f"EMPRESA {i} LTDA" for i in range(5000)]
+    lote = []
+    for i in range(linhas):
+        data_op = hoje - timedelta(days=random.randint(0, 720))
+        tipo = TipoOperacao.IMPORTACAO if i % 2 else TipoOperacao.EXPORTACAO
+        empresa = random.choice(empresas)
+        lote.append({
+            "ncm": random.choice(ncms),
+            "descricao_produto": "Produto sintético",
+            "tipo_operacao": tipo,
+            "pais_origem_destino": random.choice(paises),
+            "uf": random.choice(ufs),
+            "via_transporte": ViaTransporte.MARITIMA,
+            "valor_fob": random.uniform(100, 100000),
+            "peso_liquido_kg": random.uniform(1, 10000),
+            "quantidade_estatistica": random.uniform(1, 1000),
+            "data_operacao": data_op,
+            "mes_referencia": data_op.strftime("%Y-%m"),
+            "razao_social_importador": empresa if tipo == TipoOperacao.IMPORTACAO else None,
+            "razao_social_exportador": empresa if tipo == TipoOperacao.EXPORTACAO else None,
+            "arquivo_origem": "benchmark",
+        })
+        if len(lote) >= 10000:
+            db.bulk_insert_mappings(OperacaoComex, lote)
+            db.commit()
+            lote = []
+    if lote:
+        db.bulk_insert_mappings(OperacaoComex, lote)
+        db.commit()
+
+
+def _consulta_legada(db, base_filters):
+    """Sequência de consultas separadas usada anteriormente pelo endpoint (sem filtro de tipo/empresa)."""
+    O = OperacaoComex
+    imp = base_filters + [O.tipo_operacao == TipoOperacao.IMPORTACAO]
+    exp = base_filters + [O.tipo_operacao == TipoOperacao.EXPORTACAO]
+    for filtros in (imp, exp):
+        db.query(func.sum(O.peso_liquido_kg)).filter(and_(*filtros)).scalar()
+    for coluna in (O.valor_fob, O.quantidade_estatistica):
+        db.query(func.sum(coluna)).filter(and_(*base_filters)).scalar()
+    db.query(func.count(O.id)).filter(and_(*base_filters)).scalar()
+    for filtros in (imp, exp):
+        db.query(func.sum(O.valor_fob)).filter(and_(*filtros)).scalar()
+        db.query(func.sum(O.quantidade_estatistica)).filter(and_(*filtros)).scalar()
+        db.query(func.count(O.id)).filter(and_(*filtros)).scalar()
+    for chaves in ((O.ncm, O.descricao_produto), (O.pais_origem_destino,)):
+        db.query(*chaves, func.sum(O.valor_fob), func.count(O.id)).filter(
+            and_(*base_filters)
+        ).group_by(*chaves).order_by(func.sum(O.valor_fob).desc()).limit(10).all()
+    for coluna in (O.razao_social_importador, O.razao_social_exportador):
+        db.query(coluna, func.sum(O.valor_fob), func.count(O.id), func.sum(O.peso_liquido_kg)).filter(
+            and_(*base_filters), coluna.isnot(None), coluna != ""
+        ).group_by(coluna).order_by(func.sum(O.valor_fob).desc()).limit(10).all()
+    db.query(
+        O.mes_referencia, func.count(O.id), func.sum(O.valor_fob), func.sum(O.peso_liquido_kg)
+    ).filter(and_(*base_filters)).group_by(O.mes_referencia).order_by(O.mes_referencia).all()
+
+
+def _medir(nome, funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    tempos.sort()
+    mediana = tempos[len(tempos) // 2]
+    logger.info(f"  {nome:<16} mediana {mediana * 1000:9.1f} ms  (min {tempos[0] * 1000:.1f} ms)")
+    return mediana
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos agregados do dashboard")
+    parser.add_argument("--linhas", type=int, default=200000, help="Linhas sintéticas (SQLite temporário)")
+    parser.add_argument("--database-url", default=None, help="Usar banco existente em vez de gerar dados")
+    parser.add_argument("--meses", type=int, default=24)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.database_url:
+        url = args.database_url
+    else:
+        url = f"sqlite:///{Path(tempfile.mkdtemp()) / 'benchmark_dashboard.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    if not args.database_url:
+        logger.info(f"📥 Gerando {args.linhas} operações sintéticas em {url}...")
+        _popular(db, args.linhas)
+
+    hoje = date.today()
+    data_inicio = hoje - timedelta(days=30 * args.meses)
+    base_filters = [OperacaoComex.data_operacao >= data_inicio, OperacaoComex.data_operacao <= hoje]
+
+    inicio = time.perf_counter()
+    atualizar_rollups(db, completo=True)
+    logger.info(f"📊 Rollups construídos em {time.perf_counter() - inicio:.2f}s")
+
+    logger.info(f"⏱️ Agregados do dashboard ({args.meses} meses, {args.repeticoes} repetições):")
+    legado = _medir("legado", lambda: _consulta_legada(db, base_filters), args.repeticoes)
+    unica = _medir("passada única", lambda: calcular_agregados_brutos(db, base_filters), args.repeticoes)
+    rollup = _medir(
+        "rollups", lambda: calcular_agregados_dashboard(db, data_inicio, hoje), args.repeticoes
+    )
+    logger.info(f"✅ Passada única: {legado / unica:.1f}x mais rápida que o legado")
+    logger.info(f"✅ Rollups: {legado / rollup:.1f}x mais rápidos que o legado")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark das rotas que leem a planilha de empresas recomendadas.
+
+Compara:
+  - legado: pd.read_excel + groupby + iterrows a cada chamada (como as rotas faziam);
+  - carga: primeira leitura (xlsx e gravação do snapshot) e leitura do snapshot;
+  - memória: services.planilha_recomendadas com a planilha já carregada.
+
+Uso:
+    python scripts/benchmark_empresas_recomendadas.py --linhas 20000
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import pandas as pd
+from loguru import logger
+
+import services.planilha_recomendadas as planilha_recomendadas
+from config import settings
+
+
+def _gerar_planilha(arquivo: Path, linhas: int) -> None:
+    random.seed(42)
+    ufs = ["SP", "RJ", "MG", "PR", "SC", "RS", "BA", "PE", "ES", "GO"]
+    pd.DataFrame({
+        "CNPJ": [f"{random.randint(0, linhas // 2):014d}" for _ in range(linhas)],
+        "Razão Social": [f"EMPRESA {i} LTDA" for i in range(linhas)],
+        "Nome Fantasia": [f"Empresa {i}" for i in range(linhas)],
+        "Estado": [random.choice(ufs) for _ in range(linhas)],
+        "Sugestão": [random.choice(["CLIENTE_POTENCIAL", "FORNECEDOR_POTENCIAL"]) for _ in range(linhas)],
+        "NCM Relacionado": [f"{random.randint(1000000, 99999999):08d}" for _ in range(linhas)],
+        "Importado (R$)": [random.choice([0.0, random.uniform(1e3, 1e7)]) for _ in range(linhas)],
+        "Exportado (R$)": [random.choice([0.0, random.uniform(1e3, 1e7)]) for _ in range(linhas)],
+        "Peso Participação (0-100)": [random.uniform(0, 100) for _ in range(linhas)],
+    }).to_excel(arquivo, index=False)
+
+
+def _legado_importadoras(arquivo: Path, limite: int) -> list:
+    df = pd.read_excel(arquivo)
+    df_importadoras = df[(df["Importado (R$)"].notna()) & (df["Importado (R$)"] > 0)].copy()
+    df_agrupado = df_importadoras.groupby("CNPJ").agg({
+        "Razão Social": "first",
+        "Nome Fantasia": "first",
+        "Estado": "first",
+        "Importado (R$)": "sum",
+        "Peso Participação (0-100)": "max",
+    }).reset_index()
+    df_agrupado = df_agrupado.sort_values("Importado (R$)", ascending=False).head(limite)
+    return [
+        {"nome": row["Razão Social"] or row["Nome Fantasia"], "valor_total": float(row["Importado (R$)"]) / 5.0}
+        for _, row in df_agrupado.iterrows()
+    ]
+
+
+def _medir(funcao, repeticoes: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) / repeticoes * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da planilha de empresas recomendadas")
+    parser.add_argument("--linhas", type=int, default=20000)
+    parser.add_argument("--repeticoes", type=int, default=1000)
+    args = parser.parse_args()
+
+    diretorio = Path(tempfile.mkdtemp())
+    arquivo = diretorio / "empresas_recomendadas.xlsx"
+    logger.info(f"📥 Gerando planilha sintética com {args.linhas} linhas em {arquivo}...")
+    _gerar_planilha(arquivo, args.linhas)
+    settings.data_dir = diretorio / "comex_data"
+    planilha_recomendadas.DIRETORIO_DADOS = diretorio
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    legado = _medir(lambda: _legado_importadoras(arquivo, 10), 3)
+    inicio = time.perf_counter()
+    planilha_recomendadas.obter_planilha_recomendadas()
+    carga_xlsx = (time.perf_counter() - inicio) * 1000
+    planilha_recomendadas._carregada = None
+    inicio = time.perf_counter()
+    planilha = planilha_recomendadas.obter_planilha_recomendadas()
+    carga_snapshot = (time.perf_counter() - inicio) * 1000
+
+    def importadoras():
+        planilha_recomendadas.obter_planilha_recomendadas().maiores("importacao", 10)
+
+    def fallback():
+        planilha_recomendadas.obter_planilha_recomendadas().filtrar_dashboard(100, tipo="importacao", uf="SP")
+
+    assert [e["valor_total"] for e in planilha.maiores("importacao", 10)] == [
+        e["valor_total"] for e in _legado_importadoras(arquivo, 10)
+    ]
+    print(f"\n⏱️ Planilha com {args.linhas} linhas")
+    print(f"  legado (read_excel + groupby por chamada)  {legado:10.1f} ms")
+    print(f"  primeira carga (xlsx + snapshot)           {carga_xlsx:10.1f} ms")
+    print(f"  carga pelo snapshot                        {carga_snapshot:10.1f} ms")
+    print(f"  importadoras (top 10), em memória          {_medir(importadoras, args.repeticoes):10.3f} ms")
+    print(f"  fallback (uf + tipo, 100), em memória      {_medir(fallback, args.repeticoes):10.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Benchmark da importação da planilha do ComexStat (processar_excel_comex_task).
+
+Compara o loop antigo (df.iterrows() + _parse_number por linha + lista única
+de dicts) com a transformação colunar de services.importacao_comex (lotes
+inseridos à medida que são gerados). Cada implementação roda em um processo
+próprio, lendo/gerando a mesma planilha e inserindo em um SQLite temporário;
+o relatório mostra linhas/s da transformação e do total (com inserção) e o
+pico de RSS.
+
+Uso:
+    python scripts/benchmark_importacao_excel.py --linhas 1000000
+    python scripts/benchmark_importacao_excel.py --arquivo "H_EXPORTACAO_E IMPORTACAO_GERAL_2025.xlsx"
+"""
+import argparse
+import multiprocessing
+import re
+import resource
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database.models import Base, OperacaoComex, TipoOperacao, ViaTransporte
+from services.importacao_comex import MESES, transformar_planilha_comex
+
+NOME_ARQUIVO = "H_EXPORTACAO_E IMPORTACAO_GERAL_2025.xlsx"
+_UFS = ["SP", "RJ", "MG", "PR", "SC", "RS", "BA", "GO", "ES", "AM"]
+_PAISES = ["China", "Estados Unidos", "Argentina", "Alemanha", "Japão", "Chile", "Países Baixos"]
+_MESES = ["01. Janeiro", "02. Fevereiro", "03. Março", "04. Abril", "05. Maio", "06. Junho",
+          "07. Julho", "08. Agosto", "09. Setembro", "10. Outubro", "11. Novembro", "12. Dezembro"]
+
+
+def _gerar_planilha(linhas: int) -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    valores_exp = rng.uniform(0, 1e6, linhas).round(2)
+    valores_exp[rng.random(linhas) < 0.4] = 0
+    valores_imp = rng.uniform(0, 1e6, linhas).round(2)
+    valores_imp[rng.random(linhas) < 0.4] = 0
+    return pd.DataFrame({
+        "Mês": rng.choice(_MESES, linhas),
+        "Código NCM": rng.integers(1010000, 99999999, linhas),
+        "Descrição NCM": rng.choice(["Cavalos reprodutores", "Soja em grão", "Minério de ferro", "Óleo bruto"], linhas),
+        "UF do Produto": rng.choice(_UFS, linhas),
+        "Países": rng.choice(_PAISES, linhas),
+        "Exportação - 2025 - Valor US$ FOB": valores_exp,
+        "Exportação - 2025 - Quilograma Líquido": rng.uniform(0, 1e5, linhas).round(3),
+        "Exportação - 2025 - Quantidade Estatística": rng.uniform(0, 1e5, linhas).round(3),
+        "Importação - 2025 - Valor US$ FOB": valores_imp,
+        "Importação - 2025 - Quilograma Líquido": rng.uniform(0, 1e5, linhas).round(3),
+        "Importação - 2025 - Quantidade Estatística": rng.uniform(0, 1e5, linhas).round(3),
+    })
+
+
+def _transformar_legado(df: pd.DataFrame, nome_original: str) -> list:
+    """Loop de processar_excel_comex_task antes da versão colunar."""
+    ano_match = re.search(r'20\d{2}', nome_original)
+    ano = int(ano_match.group()) if ano_match else date.today().year
+    operacoes_para_inserir = []
+    for idx, row in df.iterrows():
+        try:
+            ncm = str(row.get('Código NCM', '')).strip() if pd.notna(row.get('Código NCM')) else None
+            if not ncm or len(ncm) < 4:
+                continue
+            ncm_normalizado = ncm[:8] if len(ncm) >= 8 else ncm.zfill(8)
+            descricao = str(row.get('Descrição NCM', '')).strip()[:500] if pd.notna(row.get('Descrição NCM')) else ''
+            uf = (
+                str(row.get('UF Produto', '')).strip()[:2] if pd.notna(row.get('UF Produto')) else
+                str(row.get('UF do Produto', '')).strip()[:2] if pd.notna(row.get('UF do Produto')) else
+                None
+            )
+            pais = str(row.get('Países', '')).strip() if pd.notna(row.get('Países')) else None
+            mes_str = str(row.get('Mês', '')).strip() if pd.notna(row.get('Mês')) else ''
+            mes = None
+            if mes_str:
+                match = re.search(r'(\d{1,2})', mes_str)
+                if match:
+                    mes = int(match.group(1))
+                else:
+                    for nome, num in MESES.items():
+                        if nome in mes_str.lower():
+                            mes = num
+                            break
+            if not mes or mes < 1 or mes > 12:
+                mes = 1
+            data_operacao = date(ano, mes, 1)
+            mes_referencia = f"{ano}-{mes:02d}"
+
+            def _parse_number(value) -> float:
+                if pd.isna(value):
+                    return 0.0
+                if isinstance(value, (int, float)):
+                    return float(value)
+                text = str(value).strip()
+                if not text:
+                    return 0.0
+                if "," in text and "." in text:
+                    text = text.replace(".", "").replace(",", ".")
+                elif "," in text:
+                    text = text.replace(",", ".")
+                try:
+                    return float(text)
+                except ValueError:
+                    return 0.0
+
+            for tipo, prefixo, sufixo in (
+                (TipoOperacao.EXPORTACAO, "Exportação", "Exportação"),
+                (TipoOperacao.IMPORTACAO, "Importação", "Importação"),
+            ):
+                valor = _parse_number(
+                    row.get(f'{prefixo} - 2025 - Valor US$ FOB', 0) or
+                    row.get(f'{prefixo} - Valor US$ FOB', 0) or
+                    row.get(f'Valor {sufixo}', 0)
+                )
+                peso = _parse_number(
+                    row.get(f'{prefixo} - 2025 - Quilograma Líquido', 0) or
+                    row.get(f'{prefixo} - Quilograma Líquido', 0) or
+                    row.get(f'Peso {sufixo}', 0)
+                )
+                quantidade = _parse_number(
+                    row.get(f'{prefixo} - 2025 - Quantidade Estatística', 0) or
+                    row.get(f'{prefixo} - Quantidade Estatística', 0) or
+                    row.get(f'Quantidade {sufixo}', 0)
+                )
+                if valor > 0:
+                    operacoes_para_inserir.append({
+                        'ncm': ncm_normalizado,
+                        'descricao_produto': descricao,
+                        'tipo_operacao': tipo,
+                        'via_transporte': ViaTransporte.OUTRAS,
+                        'uf': uf,
+                        'pais_origem_destino': pais,
+                        'valor_fob': float(valor),
+                        'peso_liquido_kg': float(peso),
+                        'quantidade_estatistica': float(quantidade),
+                        'data_operacao': data_operacao,
+                        'mes_referencia': mes_referencia,
+                        'arquivo_origem': nome_original
+                    })
+        except Exception as e:
+            logger.warning(f"Erro na linha {idx}: {e}")
+    return operacoes_para_inserir
+
+
+def _inserir(db, operacoes: list) -> None:
+    for i in range(0, len(operacoes), 1000):
+        db.bulk_insert_mappings(OperacaoComex, operacoes[i:i + 1000])
+        db.commit()
+
+
+def _executar(implementacao: str, linhas: int, arquivo: str, fila) -> None:
+    df = pd.read_excel(arquivo) if arquivo else _gerar_planilha(linhas)
+    nome = Path(arquivo).name if arquivo else NOME_ARQUIVO
+    engine = create_engine(f"sqlite:///{Path(tempfile.mkdtemp()) / 'benchmark_importacao.db'}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    total = 0
+    transformacao = insercao = 0.0
+    if implementacao == "legado":
+        inicio = time.perf_counter()
+        operacoes = _transformar_legado(df, nome)
+        transformacao = time.perf_counter() - inicio
+        total = len(operacoes)
+        inicio = time.perf_counter()
+        _inserir(db, operacoes)
+        insercao = time.perf_counter() - inicio
+    else:
+        lotes = transformar_planilha_comex(df, nome)
+        while True:
+            inicio = time.perf_counter()
+            lote = next(lotes, None)
+            transformacao += time.perf_counter() - inicio
+            if lote is None:
+                break
+            total += len(lote)
+            inicio = time.perf_counter()
+            _inserir(db, lote)
+            insercao += time.perf_counter() - inicio
+    db.close()
+    # ru_maxrss em KB no Linux
+    fila.put((len(df), total, transformacao, insercao, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da importação da planilha do ComexStat")
+    parser.add_argument("--linhas", type=int, default=1000000)
+    parser.add_argument("--arquivo", type=str, default=None, help="Planilha real (senão gera uma sintética)")
+    parser.add_argument("--somente", choices=["legado", "colunar"], default=None)
+    args = parser.parse_args()
+
+    contexto = multiprocessing.get_context("spawn")
+    implementacoes = [args.somente] if args.somente else ["legado", "colunar"]
+    logger.info(f"⏱️ Importação de {args.arquivo or f'{args.linhas} linhas sintéticas'}:")
+    for implementacao in implementacoes:
+        fila = contexto.Queue()
+        processo = contexto.Process(target=_executar, args=(implementacao, args.linhas, args.arquivo, fila))
+        processo.start()
+        linhas, operacoes, transformacao, insercao, pico_mb = fila.get()
+        processo.join()
+        logger.info(
+            f"  {implementacao:<8} transformação {linhas / transformacao:>10,.0f} linhas/s   "
+            f"total {linhas / (transformacao + insercao):>8,.0f} linhas/s   "
+            f"({operacoes} operações, {transformacao:5.1f}s + {insercao:5.1f}s inserção)   pico RSS {pico_mb:5.0f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
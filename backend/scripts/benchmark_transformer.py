@@ -0,0 +1,81 @@
+"""
+Benchmark do DataTransformer em um CSV mensal do MDIC (IMP_/EXP_AAAA_MM.csv).
+
+Compara a transformação registro a registro (_transform_record, que procura cada
+alias em várias variações de maiúsculas em todo registro) com o plano de colunas
+resolvido uma vez por conjunto de chaves (transform_csv_data). Os lotes são lidos
+antes com services.leitura_csv, para medir só a transformação.
+
+Uso:
+    python scripts/benchmark_transformer.py --linhas 500000
+    python scripts/benchmark_transformer.py --arquivo data/csv_downloads/IMP_2025_01.csv
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from loguru import logger
+
+from data_collector.transformer import DataTransformer
+from services.leitura_csv import ler_registros_em_lotes
+
+CABECALHO = "CO_ANO;CO_MES;CO_NCM;CO_UNID;CO_PAIS;SG_UF_NCM;CO_VIA;CO_URF;QT_ESTAT;KG_LIQUIDO;VL_FOB;VL_FRETE;VL_SEGURO"
+_UFS = ["SP", "RJ", "MG", "PR", "SC", "RS", "BA", "GO", "ES", "AM", "ND"]
+
+
+def _gerar_csv(linhas: int) -> Path:
+    """Mês sintético no layout dos CSVs brutos do MDIC."""
+    rng = random.Random(7)
+    caminho = Path(tempfile.mkdtemp()) / "IMP_2025_01.csv"
+    with caminho.open("w", encoding="latin-1", newline="") as arquivo:
+        arquivo.write(CABECALHO + "\n")
+        for _ in range(linhas):
+            arquivo.write(
+                f"2025;01;{rng.randint(1010000, 99999999):08d};{rng.randint(10, 21)};{rng.randint(13, 895)};"
+                f"{rng.choice(_UFS)};{rng.randint(1, 9):02d};{rng.randint(100000, 999999):07d};"
+                f"{rng.randint(0, 100000)};{rng.randint(0, 500000)};{rng.randint(1, 2000000)};"
+                f"{rng.randint(0, 50000)};{rng.randint(0, 5000)}\n"
+            )
+    return caminho
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do DataTransformer (registro a registro x plano de colunas)")
+    parser.add_argument("--linhas", type=int, default=500000)
+    parser.add_argument("--arquivo", type=str, default=None, help="CSV real do MDIC (senão gera um sintético)")
+    parser.add_argument("--tipo", choices=["Importação", "Exportação"], default="Importação")
+    parser.add_argument("--mes", type=str, default="2025-01")
+    args = parser.parse_args()
+
+    caminho = Path(args.arquivo) if args.arquivo else _gerar_csv(args.linhas)
+    lotes = list(ler_registros_em_lotes(caminho))
+    total = sum(len(lote) for lote in lotes)
+    logger.info(f"⏱️ Transformação de {total} registros de {caminho.name}:")
+
+    transformer = DataTransformer()
+    inicio = time.perf_counter()
+    por_registro = 0
+    for lote in lotes:
+        for registro in lote:
+            if transformer._transform_record(registro, args.mes, args.tipo):
+                por_registro += 1
+    antes = time.perf_counter() - inicio
+
+    transformer = DataTransformer()
+    inicio = time.perf_counter()
+    com_plano = sum(len(transformer.transform_csv_data(lote, args.mes, args.tipo)) for lote in lotes)
+    depois = time.perf_counter() - inicio
+
+    logger.info(f"  registro a registro {total / antes:>10,.0f} registros/s  ({por_registro} operações, {antes:5.1f}s)")
+    logger.info(f"  plano de colunas    {total / depois:>10,.0f} registros/s  ({com_plano} operações, {depois:5.1f}s)")
+    logger.info(f"  ganho: {antes / depois:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -25,6 +25,7 @@ from database.models import (
     ComercioExterior, Empresa, CNAEHierarquia,
     Base
 )
+from services.versoes import TABELA_EMPRESAS, registrar_alteracao
 
 # Garantir que está usando SQLite
 from sqlalchemy import create_engine
@@ -287,6 +288,7 @@ def importar_dados_empresas(db, arquivo_excel):
             continue
     
     db.commit()
+    registrar_alteracao(db, TABELA_EMPRESAS)
     
     logger.success("="*80)
     logger.success("✅ IMPORTAÇÃO DE EMPRESAS CONCLUÍDA")
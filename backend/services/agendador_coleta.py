@@ -0,0 +1,176 @@
+"""
+Agendador das requisições da coleta por NCM (/coletar-dados-ncms).
+
+A coleta de NCMs específicos fazia uma chamada à API por NCM × tipo × mês, uma
+depois da outra (50 NCMs em 24 meses = 2.400 idas e voltas em série). Aqui as
+tarefas rodam em paralelo com:
+  - concorrência limitada (settings.coleta_concorrencia requisições em voo);
+  - limite de taxa por token bucket (settings.coleta_requisicoes_por_segundo,
+    rajada de até um segundo de fichas);
+  - novas tentativas com espera exponencial (settings.retry_attempts,
+    settings.retry_delay_seconds * 2^tentativa), sem ocupar a vaga de concorrência
+    durante a espera;
+  - progresso por tarefa em JSON (data_dir/coletas/<id>.json): uma coleta
+    interrompida e repetida com os mesmos parâmetros pula as tarefas concluídas.
+    O arquivo é removido quando todas as tarefas terminam.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Sequence
+
+from loguru import logger
+
+from config import settings
+
+
+def chave_tarefa(tarefa: Sequence[Any]) -> str:
+    return "|".join(str(parte) for parte in tarefa)
+
+
+class LimiteTaxa:
+    """Token bucket: `taxa` fichas por segundo, acumulando até `capacidade`."""
+
+    def __init__(self, taxa: float, capacidade: Optional[int] = None):
+        self.taxa = float(taxa)
+        self.capacidade = capacidade or max(1, int(taxa))
+        self.fichas = float(self.capacidade)
+        self._ultimo = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def adquirir(self) -> None:
+        """Espera até haver uma ficha e a consome."""
+        async with self._lock:
+            while True:
+                agora = time.monotonic()
+                self.fichas = min(self.capacidade, self.fichas + (agora - self._ultimo) * self.taxa)
+                self._ultimo = agora
+                if self.fichas >= 1:
+                    self.fichas -= 1
+                    return
+                await asyncio.sleep((1 - self.fichas) / self.taxa)
+
+
+class ProgressoColeta:
+    """Chaves das tarefas concluídas de uma coleta, persistidas em JSON."""
+
+    def __init__(self, caminho: Path):
+        self.caminho = Path(caminho)
+        self.concluidas = set()
+        if self.caminho.exists():
+            try:
+                self.concluidas = set(json.loads(self.caminho.read_text(encoding="utf-8")).get("concluidas", []))
+                logger.info(f"🔄 Retomando coleta: {len(self.concluidas)} tarefas já concluídas ({self.caminho.name})")
+            except (OSError, ValueError) as e:
+                logger.warning(f"⚠️ Progresso de coleta ilegível ({self.caminho}): {e}")
+
+    @classmethod
+    def para(cls, nome: str, parametros: Any) -> "ProgressoColeta":
+        """Progresso identificado pelos parâmetros da coleta (mesmos parâmetros = mesmo arquivo)."""
+        assinatura = hashlib.sha1(json.dumps(parametros, sort_keys=True, default=str).encode()).hexdigest()[:16]
+        return cls(settings.data_dir / "coletas" / f"{nome}_{assinatura}.json")
+
+    def concluir(self, chave: str) -> None:
+        self.concluidas.add(chave)
+        try:
+            self.caminho.parent.mkdir(parents=True, exist_ok=True)
+            temporario = self.caminho.with_suffix(".tmp")
+            temporario.write_text(json.dumps({"concluidas": sorted(self.concluidas)}), encoding="utf-8")
+            temporario.replace(self.caminho)
+        except OSError as e:
+            logger.warning(f"⚠️ Não foi possível salvar o progresso da coleta: {e}")
+
+    def finalizar(self) -> None:
+        """Remove o arquivo (coleta completa; a próxima começa do zero)."""
+        try:
+            self.caminho.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"⚠️ Não foi possível remover o progresso da coleta: {e}")
+
+
+async def executar_coletas(
+    tarefas: Iterable[Sequence[Any]],
+    buscar: Callable[[Sequence[Any]], Awaitable[Any]],
+    ao_concluir: Callable[[Sequence[Any], Any], None],
+    progresso: Optional[ProgressoColeta] = None,
+    concorrencia: Optional[int] = None,
+    requisicoes_por_segundo: Optional[float] = None,
+    tentativas: Optional[int] = None,
+    atraso_base: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Executa as tarefas com concorrência e taxa limitadas.
+
+    Args:
+        tarefas: Tuplas que identificam cada requisição (ex.: (ncm, tipo, mes))
+        buscar: Corrotina que faz a requisição de uma tarefa
+        ao_concluir: Chamada com (tarefa, resultado) após cada requisição bem-sucedida
+            (ex.: transformar e gravar); só então a tarefa conta como concluída
+        progresso: Progresso persistido (None = sem retomada)
+        concorrencia, requisicoes_por_segundo, tentativas, atraso_base: padrões em settings
+
+    Returns:
+        Estatísticas: tarefas, retomadas, concluídas, falhas, requisições e taxa obtida
+    """
+    concorrencia = concorrencia or settings.coleta_concorrencia
+    requisicoes_por_segundo = requisicoes_por_segundo or settings.coleta_requisicoes_por_segundo
+    tentativas = max(1, tentativas or settings.retry_attempts)
+    atraso_base = settings.retry_delay_seconds if atraso_base is None else atraso_base
+
+    tarefas = list(tarefas)
+    concluidas = progresso.concluidas if progresso else set()
+    pendentes = [tarefa for tarefa in tarefas if chave_tarefa(tarefa) not in concluidas]
+    stats: Dict[str, Any] = {
+        "total_tarefas": len(tarefas),
+        "retomadas": len(tarefas) - len(pendentes),
+        "concluidas": 0,
+        "falhas": [],
+        "requisicoes": 0,
+    }
+
+    limite = LimiteTaxa(requisicoes_por_segundo)
+    semaforo = asyncio.Semaphore(concorrencia)
+
+    async def _executar(tarefa):
+        for tentativa in range(tentativas):
+            await limite.adquirir()
+            try:
+                async with semaforo:
+                    stats["requisicoes"] += 1
+                    resultado = await buscar(tarefa)
+                break
+            except Exception as e:
+                if tentativa + 1 >= tentativas:
+                    logger.warning(f"⚠️ Tarefa {chave_tarefa(tarefa)} falhou após {tentativas} tentativas: {e}")
+                    stats["falhas"].append(f"{chave_tarefa(tarefa)}: {e}")
+                    return
+                await asyncio.sleep(atraso_base * 2 ** tentativa)
+
+        try:
+            ao_concluir(tarefa, resultado)
+        except Exception as e:
+            logger.error(f"❌ Erro ao processar {chave_tarefa(tarefa)}: {e}")
+            stats["falhas"].append(f"{chave_tarefa(tarefa)}: {e}")
+            return
+        stats["concluidas"] += 1
+        if progresso is not None:
+            progresso.concluir(chave_tarefa(tarefa))
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(_executar(tarefa) for tarefa in pendentes))
+    segundos = time.perf_counter() - inicio
+
+    stats["segundos"] = round(segundos, 3)
+    stats["requisicoes_por_segundo"] = round(stats["requisicoes"] / segundos, 2) if segundos > 0 else 0.0
+    if progresso is not None and not stats["falhas"]:
+        progresso.finalizar()
+    logger.info(
+        f"📊 Coleta: {stats['concluidas']}/{len(pendentes)} tarefas em {segundos:.1f}s "
+        f"({stats['requisicoes']} requisições, {stats['requisicoes_por_segundo']}/s, "
+        f"{stats['retomadas']} retomadas, {len(stats['falhas'])} falhas)"
+    )
+    return stats
@@ -0,0 +1,283 @@
+"""
+Motor de autocomplete de empresas em memória.
+
+Nomes de empresas de três fontes, normalizados como em services.busca_empresas
+(sem acentos, sem pontos de "S.A."/"LTDA.", maiúsculo):
+  - "operacoes": empresas_busca (totais de operacoes_comex por importador/exportador);
+  - "empresas": cadastro (Empresa) + EmpresasRecomendadas, com CNPJ;
+  - "mdic": lista de empresas do MDIC (EmpresaMDIC), com CNPJ.
+
+Cada lista fica ordenada por valor FOB (desc) e tem postings de trigramas
+(array de posições), então a busca percorre só a menor lista de posições em
+ordem de ranking e para no limite, sem consultar o banco.
+
+Carregado em segundo plano (startup ou primeiro uso) e recarregado quando a
+versão dos dados (services.versoes) muda; durante a recarga continua valendo o
+motor anterior. Só antes da primeira carga as chamadas recebem None e usam o
+índice do banco.
+"""
+import threading
+import time
+import weakref
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy.orm import Session, sessionmaker
+
+from database.models import Empresa, EmpresaBusca, EmpresaMDIC, EmpresasRecomendadas
+from services.busca_empresas import (
+    FONTE_EMPRESAS, FONTE_MDIC, FONTE_OPERACOES, PAPEIS, indice_empresas_pronto, normalizar_nome_empresa
+)
+from services.versoes import (
+    TABELA_EMPRESAS, TABELA_EMPRESAS_MDIC, TABELA_EMPRESAS_RECOMENDADAS, TABELA_OPERACOES,
+    assinatura_versoes
+)
+
+TABELAS_MOTOR = [TABELA_OPERACOES, TABELA_EMPRESAS, TABELA_EMPRESAS_RECOMENDADAS, TABELA_EMPRESAS_MDIC]
+
+# Só o cadastro (Empresa) com CNPJ: busca de CNPJs por nome, como o fallback do /dashboard/stats
+_CADASTRO = "cadastro"
+
+_TIPOS_EMPRESA = {
+    "importador": ("importadora", "ambos"),
+    "exportador": ("exportadora", "ambos"),
+}
+
+
+def _trigramas(texto: str) -> set:
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class _ListaNomes:
+    """Nomes ordenados por FOB com postings de trigramas."""
+
+    __slots__ = ("nomes", "normalizados", "totais", "valores", "cnpjs", "postings")
+
+    def __init__(self, registros: List[tuple]):
+        # registros: (nome, normalizado, total_operacoes, valor_fob, cnpj)
+        registros.sort(key=lambda r: (-r[3], r[1]))
+        self.nomes = [r[0] for r in registros]
+        self.normalizados = [r[1] for r in registros]
+        self.totais = array("l", (r[2] for r in registros))
+        self.valores = array("d", (r[3] for r in registros))
+        self.cnpjs = [r[4] for r in registros]
+        self.postings: Dict[str, array] = {}
+        for posicao, normalizado in enumerate(self.normalizados):
+            for tri in _trigramas(normalizado):
+                lista = self.postings.get(tri)
+                if lista is None:
+                    lista = self.postings[tri] = array("I")
+                lista.append(posicao)
+
+    def __len__(self) -> int:
+        return len(self.nomes)
+
+    def _candidatos(self, palavras: List[str]) -> Iterable[int]:
+        """Posições (em ordem de ranking) que podem conter todas as palavras."""
+        melhor = None
+        for palavra in palavras:
+            if len(palavra) < 3:
+                continue
+            for tri in _trigramas(palavra):
+                lista = self.postings.get(tri)
+                if lista is None:
+                    return ()
+                if melhor is None or len(lista) < len(melhor):
+                    melhor = lista
+        return melhor if melhor is not None else range(len(self.nomes))
+
+    def buscar(self, palavras: List[str], limite: Optional[int], distinto: bool = False) -> List[int]:
+        """Posições cujos nomes normalizados contêm todas as palavras, na ordem do ranking."""
+        resultado, vistos = [], set()
+        for posicao in self._candidatos(palavras):
+            normalizado = self.normalizados[posicao]
+            if all(p in normalizado for p in palavras):
+                if distinto:
+                    if self.nomes[posicao] in vistos:
+                        continue
+                    vistos.add(self.nomes[posicao])
+                resultado.append(posicao)
+                if limite is not None and len(resultado) >= limite:
+                    break
+        return resultado
+
+
+class MotorAutocomplete:
+    """Listas de nomes por (fonte, papel) carregadas do banco."""
+
+    def __init__(self, assinatura: str, listas: Dict[Tuple[str, str], _ListaNomes]):
+        self.assinatura = assinatura
+        self.listas = listas
+
+    @classmethod
+    def carregar(cls, db: Session, assinatura: str) -> "MotorAutocomplete":
+        inicio = time.perf_counter()
+        registros: Dict[Tuple[str, str], List[tuple]] = {
+            (fonte, papel): [] for fonte in (FONTE_OPERACOES, FONTE_EMPRESAS, FONTE_MDIC, _CADASTRO) for papel in PAPEIS
+        }
+
+        for papel, nome, total, valor in db.query(
+            EmpresaBusca.papel, EmpresaBusca.nome, EmpresaBusca.total_operacoes, EmpresaBusca.valor_fob
+        ).filter(EmpresaBusca.fonte == FONTE_OPERACOES).yield_per(10000):
+            registros[(FONTE_OPERACOES, papel)].append(
+                (nome.strip(), normalizar_nome_empresa(nome), int(total or 0), float(valor or 0), None)
+            )
+
+        for nome, cnpj, tipo, valor_imp, valor_exp in db.query(
+            Empresa.nome, Empresa.cnpj, Empresa.tipo, Empresa.valor_importacao, Empresa.valor_exportacao
+        ).filter(Empresa.nome.isnot(None), Empresa.nome != "").yield_per(10000):
+            for papel, valor in (("importador", valor_imp), ("exportador", valor_exp)):
+                if tipo in _TIPOS_EMPRESA[papel]:
+                    registro = (nome.strip(), normalizar_nome_empresa(nome), 0, float(valor or 0), cnpj or None)
+                    registros[(FONTE_EMPRESAS, papel)].append(registro)
+                    if cnpj:
+                        registros[(_CADASTRO, papel)].append(registro)
+
+        for nome, cnpj, imp, exp, valor_imp, valor_exp in db.query(
+            EmpresasRecomendadas.nome, EmpresasRecomendadas.cnpj,
+            EmpresasRecomendadas.provavel_importador, EmpresasRecomendadas.provavel_exportador,
+            EmpresasRecomendadas.valor_total_importacao_usd, EmpresasRecomendadas.valor_total_exportacao_usd,
+        ).filter(EmpresasRecomendadas.nome.isnot(None), EmpresasRecomendadas.nome != "").yield_per(10000):
+            for papel, provavel, valor in (("importador", imp, valor_imp), ("exportador", exp, valor_exp)):
+                if provavel == 1:
+                    registros[(FONTE_EMPRESAS, papel)].append(
+                        (nome.strip(), normalizar_nome_empresa(nome), 0, float(valor or 0), cnpj or None)
+                    )
+
+        for nome, cnpj, importadora, exportadora in db.query(
+            EmpresaMDIC.nome, EmpresaMDIC.cnpj, EmpresaMDIC.importadora, EmpresaMDIC.exportadora
+        ).yield_per(10000):
+            for papel, consta in (("importador", importadora), ("exportador", exportadora)):
+                if consta:
+                    registros[(FONTE_MDIC, papel)].append(
+                        (nome.strip(), normalizar_nome_empresa(nome), 0, 0.0, cnpj)
+                    )
+
+        listas = {chave: _ListaNomes(lista) for chave, lista in registros.items()}
+        logger.info(
+            f"✅ Autocomplete em memória carregado: "
+            f"{sum(len(lista) for (fonte, _p), lista in listas.items() if fonte != _CADASTRO)} nomes em {time.perf_counter() - inicio:.2f}s"
+        )
+        return cls(assinatura, listas)
+
+    def buscar(
+        self, termo: Optional[str], papel: str, limite: int, fonte: str = FONTE_OPERACOES
+    ) -> List[Tuple[str, int, float]]:
+        """
+        Empresas cujo nome contém o termo, ordenadas por FOB.
+        Mesmo formato de services.busca_empresas.buscar_empresas.
+        """
+        lista = self.listas[(fonte, papel)]
+        termo_norm = normalizar_nome_empresa(termo)
+        palavras = [termo_norm] if termo_norm else []
+        return [
+            (lista.nomes[i], int(lista.totais[i]), float(lista.valores[i]))
+            for i in lista.buscar(palavras, limite, distinto=True)
+        ]
+
+    def cnpjs_por_nome(self, termo: Optional[str], tipo: str, limite: int = 500) -> List[str]:
+        """
+        CNPJs do cadastro (só Empresa) cujo nome contém todas as palavras do termo
+        (como _cnpjs_empresa_por_nome no /dashboard/stats).
+        """
+        palavras = [p for p in (normalizar_nome_empresa(p) for p in (termo or "").split()) if p]
+        if not palavras:
+            return []
+        lista = self.listas[(_CADASTRO, "importador" if tipo == "importadora" else "exportador")]
+        cnpjs: List[str] = []
+        vistos = set()
+        for posicao in lista.buscar(palavras, None):
+            cnpj = lista.cnpjs[posicao]
+            if cnpj and cnpj not in vistos:
+                vistos.add(cnpj)
+                cnpjs.append(cnpj)
+                if len(cnpjs) >= limite:
+                    break
+        return cnpjs
+
+
+class _EstadoMotor:
+    def __init__(self):
+        self.motor: Optional[MotorAutocomplete] = None
+        self.carregando = False
+        self.lock = threading.Lock()
+
+
+# Um motor por engine (testes usam bancos diferentes no mesmo processo)
+_estados: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_estados_lock = threading.Lock()
+
+
+def _estado(engine) -> _EstadoMotor:
+    with _estados_lock:
+        estado = _estados.get(engine)
+        if estado is None:
+            estado = _estados[engine] = _EstadoMotor()
+        return estado
+
+
+def _carregar_em_segundo_plano(engine, estado: _EstadoMotor) -> None:
+    with estado.lock:
+        if estado.carregando:
+            return
+        estado.carregando = True
+
+    def _executar():
+        db = sessionmaker(bind=engine)()
+        try:
+            if not indice_empresas_pronto(db):
+                return
+            assinatura = assinatura_versoes(db, TABELAS_MOTOR)
+            if assinatura is not None:
+                estado.motor = MotorAutocomplete.carregar(db, assinatura)
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao carregar autocomplete em memória: {e}")
+        finally:
+            db.close()
+            with estado.lock:
+                estado.carregando = False
+
+    threading.Thread(target=_executar, daemon=True, name="autocomplete-memoria").start()
+
+
+def iniciar_carregamento(engine) -> None:
+    """Dispara a carga inicial em segundo plano (startup da aplicação)."""
+    _carregar_em_segundo_plano(engine, _estado(engine))
+
+
+def motor_em_dia(db: Session, motor: MotorAutocomplete) -> bool:
+    """
+    True se o motor foi carregado da versão atual dos dados. Respostas de um motor
+    anterior (servido durante a recarga) não devem ir para caches com a chave da
+    versão nova.
+    """
+    return motor.assinatura == assinatura_versoes(db, TABELAS_MOTOR)
+
+
+def obter_motor(db: Session, esperar: bool = False) -> Optional[MotorAutocomplete]:
+    """
+    Motor para a versão atual dos dados.
+
+    Quando os dados mudam, a nova versão é carregada em segundo plano e o motor
+    anterior continua respondendo até ela ficar pronta; None só enquanto nenhum
+    motor foi carregado.
+
+    Args:
+        esperar: Carrega na própria sessão em vez de em segundo plano
+    """
+    engine = db.get_bind()
+    estado = _estado(engine)
+    assinatura = assinatura_versoes(db, TABELAS_MOTOR)
+    if assinatura is None:
+        return None
+    motor = estado.motor
+    if motor is not None and motor.assinatura == assinatura:
+        return motor
+    if esperar:
+        if not indice_empresas_pronto(db):
+            return None
+        estado.motor = MotorAutocomplete.carregar(db, assinatura)
+        return estado.motor
+    _carregar_em_segundo_plano(engine, estado)
+    return motor
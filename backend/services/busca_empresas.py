@@ -0,0 +1,400 @@
+"""
+Índice de busca de empresas (tabela empresas_busca) para o autocomplete.
+
+Em vez de ILIKE '%termo%' + GROUP BY sobre operacoes_comex a cada tecla, o
+autocomplete consulta uma tabela pequena com um nome normalizado por empresa e os
+totais (operações, FOB) já calculados:
+  - SQLite: tabela virtual FTS5 com tokenizer trigram (busca por substring);
+  - PostgreSQL: índice GIN pg_trgm em nome_normalizado (acelera LIKE '%termo%');
+  - sem FTS5/pg_trgm: LIKE sobre a tabela pequena.
+
+A parte "operacoes" é mantida por services.rollups.atualizar_rollups a cada
+importação (empresas dos meses alterados); as partes "empresas" (cadastro) e
+"mdic" (lista do MDIC, services.empresas_mdic) são reconstruídas por
+sincronizar_indice_cadastro nos fluxos que gravam essas tabelas e na
+sincronização agendada (utils.scheduler), quando a versão da tabela de origem
+muda. buscar_empresas só lê o índice. O estado do índice fica em versoes_dados: a versão de
+"empresas_busca" sobe a cada atualização da parte "operacoes", e as de
+"empresas_busca_cadastro"/"empresas_busca_mdic" guardam a versão da tabela de
+origem já indexada.
+
+As estruturas de texto (FTS5/pg_trgm) são criadas na startup, numa conexão
+própria (preparar_indice_busca não mexe na transação da sessão recebida).
+"""
+import re
+import threading
+import unicodedata
+import weakref
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from loguru import logger
+from sqlalchemy import func, literal_column, select, text
+from sqlalchemy.orm import Session
+
+from database.models import Empresa, EmpresaBusca, EmpresaComexMensal, EmpresaMDIC, VersaoDados
+from services.versoes import TABELA_EMPRESAS, TABELA_EMPRESAS_MDIC, TODOS, incrementar_versao, versao_tabela
+
+FONTE_OPERACOES = "operacoes"
+FONTE_EMPRESAS = "empresas"
+FONTE_MDIC = "mdic"
+PAPEIS = ("importador", "exportador")
+
+# Nomes das versões do índice em versoes_dados
+INDICE_OPERACOES = "empresas_busca"
+INDICE_CADASTRO = "empresas_busca_cadastro"
+INDICE_MDIC = "empresas_busca_mdic"
+
+_TAMANHO_LOTE = 500
+# Acima disso a atualização incremental sai mais cara que reconstruir o índice
+_LIMITE_INCREMENTAL = 5000
+
+# Lock (PostgreSQL) contra reconstruções simultâneas das partes do cadastro em outros processos
+CHAVE_BLOQUEIO_CADASTRO = 7310002
+
+_cadastro_lock = threading.Lock()
+
+# Estratégia de busca por engine: "fts5", "trgm" ou "like"
+_estrategias: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def normalizar_nome_empresa(nome: Optional[str]) -> str:
+    """
+    Normaliza nome de empresa para busca: sem acentos, maiúsculo, sem pontos
+    ("S.A." -> "SA", "LTDA." -> "LTDA") e com espaços simples.
+    """
+    texto = unicodedata.normalize("NFKD", nome or "")
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    texto = texto.upper().replace(".", "")
+    texto = re.sub(r"[^A-Z0-9&]+", " ", texto)
+    return " ".join(texto.split())
+
+
+def _estruturas_texto_existem(conn, dialeto: str) -> bool:
+    """True se a tabela FTS5 e os gatilhos (SQLite) ou o índice trigram (PostgreSQL) já existem."""
+    if dialeto == "sqlite":
+        nomes = {n for (n,) in conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE name IN "
+            "('empresas_busca_fts', 'empresas_busca_ai', 'empresas_busca_ad', 'empresas_busca_au')"
+        ))}
+        return len(nomes) == 4
+    return conn.execute(
+        text("SELECT 1 FROM pg_indexes WHERE indexname = 'idx_busca_nome_trgm'")
+    ).first() is not None
+
+
+def _criar_estruturas_texto(conn, dialeto: str) -> None:
+    if dialeto == "sqlite":
+        existe = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'empresas_busca_fts'")
+        ).first()
+        if not existe:
+            conn.execute(text(
+                "CREATE VIRTUAL TABLE empresas_busca_fts "
+                "USING fts5(nome_normalizado, tokenize = 'trigram')"
+            ))
+            conn.execute(text(
+                "INSERT INTO empresas_busca_fts (rowid, nome_normalizado) "
+                "SELECT id, nome_normalizado FROM empresas_busca"
+            ))
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS empresas_busca_ai AFTER INSERT ON empresas_busca BEGIN "
+            "INSERT INTO empresas_busca_fts (rowid, nome_normalizado) VALUES (new.id, new.nome_normalizado); END"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS empresas_busca_ad AFTER DELETE ON empresas_busca BEGIN "
+            "DELETE FROM empresas_busca_fts WHERE rowid = old.id; END"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS empresas_busca_au AFTER UPDATE OF nome_normalizado ON empresas_busca BEGIN "
+            "UPDATE empresas_busca_fts SET nome_normalizado = new.nome_normalizado WHERE rowid = old.id; END"
+        ))
+    else:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS idx_busca_nome_trgm "
+            "ON empresas_busca USING gin (nome_normalizado gin_trgm_ops)"
+        ))
+
+
+def preparar_indice_busca(db: Session) -> str:
+    """
+    Cria (uma vez por engine) as estruturas de texto do banco e devolve a estratégia.
+
+    Chamada na startup; nas demais chamadas só confere que as estruturas existem.
+    A criação usa uma conexão própria do engine: a transação da sessão recebida
+    não é confirmada (no SQLite em memória a conexão por thread é a mesma).
+    """
+    engine = db.get_bind()
+    estrategia = _estrategias.get(engine)
+    if estrategia is not None:
+        return estrategia
+
+    dialeto = engine.dialect.name
+    if dialeto not in ("sqlite", "postgresql"):
+        estrategia = "like"
+    else:
+        try:
+            with engine.connect() as conn:
+                if not _estruturas_texto_existem(conn, dialeto):
+                    _criar_estruturas_texto(conn, dialeto)
+                    conn.commit()
+            estrategia = "fts5" if dialeto == "sqlite" else "trgm"
+        except Exception as e:
+            logger.warning(f"⚠️ Índice de texto indisponível para empresas_busca ({dialeto}), usando LIKE: {e}")
+            estrategia = "like"
+
+    _estrategias[engine] = estrategia
+    logger.info(f"🔍 Busca de empresas usando {estrategia}")
+    return estrategia
+
+
+def _lotes(valores: List[str]) -> Iterable[List[str]]:
+    for i in range(0, len(valores), _TAMANHO_LOTE):
+        yield valores[i:i + _TAMANHO_LOTE]
+
+
+def _versao_indice(db: Session, nome: str) -> Optional[int]:
+    """Versão registrada para uma parte do índice (None = nunca construída)."""
+    return db.query(VersaoDados.versao).filter(
+        VersaoDados.tabela == nome, VersaoDados.mes_referencia == TODOS
+    ).scalar()
+
+
+def indice_empresas_pronto(db: Session) -> bool:
+    """True se o índice de operações já foi construído ao menos uma vez."""
+    return _versao_indice(db, INDICE_OPERACOES) is not None
+
+
+def empresas_dos_meses(db: Session, meses: Iterable[Optional[str]]) -> Dict[str, Set[str]]:
+    """Nomes (por papel) presentes nos rollups de empresa dos meses de referência informados."""
+    from services.rollups import _filtro_meses
+
+    nomes: Dict[str, Set[str]] = {papel: set() for papel in PAPEIS}
+    for papel, nome in db.query(EmpresaComexMensal.papel, EmpresaComexMensal.nome).filter(
+        _filtro_meses(EmpresaComexMensal.mes_referencia, meses)
+    ).distinct().all():
+        nomes.setdefault(papel, set()).add(nome)
+    return nomes
+
+
+def _totais_operacoes(db: Session, papel: Optional[str] = None, nomes: Optional[List[str]] = None):
+    consulta = db.query(
+        EmpresaComexMensal.papel,
+        EmpresaComexMensal.nome,
+        func.sum(EmpresaComexMensal.total_operacoes),
+        func.sum(EmpresaComexMensal.valor_fob),
+    )
+    if papel is not None:
+        consulta = consulta.filter(EmpresaComexMensal.papel == papel)
+    if nomes is not None:
+        consulta = consulta.filter(EmpresaComexMensal.nome.in_(nomes))
+    return consulta.group_by(EmpresaComexMensal.papel, EmpresaComexMensal.nome).all()
+
+
+def _registro(fonte: str, papel: str, nome: str, total_operacoes, valor_fob, agora: datetime) -> dict:
+    return {
+        "fonte": fonte,
+        "papel": papel,
+        "nome": nome,
+        "nome_normalizado": normalizar_nome_empresa(nome),
+        "total_operacoes": int(total_operacoes or 0),
+        "valor_fob": float(valor_fob or 0),
+        "data_atualizacao": agora,
+    }
+
+
+def _marcar_versao_indice(db: Session, nome: str, versao: int, agora: datetime) -> None:
+    """Registra a versão da tabela de origem já indexada em uma parte do índice."""
+    registro = db.query(VersaoDados).filter(
+        VersaoDados.tabela == nome, VersaoDados.mes_referencia == TODOS
+    ).first()
+    if registro is None:
+        registro = VersaoDados(tabela=nome, mes_referencia=TODOS)
+        db.add(registro)
+    registro.versao = versao
+    registro.data_atualizacao = agora
+
+
+def atualizar_indice_empresas(db: Session, nomes: Optional[Dict[str, Set[str]]] = None) -> None:
+    """
+    Atualiza a parte "operacoes" do índice a partir de empresas_comex_mensal.
+    Não faz commit (roda dentro da transação dos rollups).
+
+    Args:
+        nomes: Empresas (por papel) cujos totais mudaram; None reconstrói o índice inteiro
+    """
+    agora = datetime.utcnow()
+    if nomes is not None and sum(len(n) for n in nomes.values()) > _LIMITE_INCREMENTAL:
+        nomes = None
+
+    if nomes is None:
+        db.query(EmpresaBusca).filter(EmpresaBusca.fonte == FONTE_OPERACOES).delete(synchronize_session=False)
+        registros = [
+            _registro(FONTE_OPERACOES, papel, nome, total, valor, agora)
+            for papel, nome, total, valor in _totais_operacoes(db)
+        ]
+        for i in range(0, len(registros), 10000):
+            db.bulk_insert_mappings(EmpresaBusca, registros[i:i + 10000])
+        logger.info(f"🔍 Índice de empresas reconstruído: {len(registros)} nomes")
+    else:
+        for papel, conjunto in nomes.items():
+            for lote in _lotes(sorted(conjunto)):
+                totais = {nome: (total, valor) for _p, nome, total, valor in _totais_operacoes(db, papel, lote)}
+                existentes = db.query(EmpresaBusca).filter(
+                    EmpresaBusca.fonte == FONTE_OPERACOES,
+                    EmpresaBusca.papel == papel,
+                    EmpresaBusca.nome.in_(lote),
+                ).all()
+                for item in existentes:
+                    if item.nome in totais:
+                        total, valor = totais.pop(item.nome)
+                        item.total_operacoes = int(total or 0)
+                        item.valor_fob = float(valor or 0)
+                        item.data_atualizacao = agora
+                    else:
+                        db.delete(item)
+                novos = [
+                    _registro(FONTE_OPERACOES, papel, nome, total, valor, agora)
+                    for nome, (total, valor) in totais.items()
+                ]
+                if novos:
+                    db.bulk_insert_mappings(EmpresaBusca, novos)
+        db.flush()
+
+    incrementar_versao(db, INDICE_OPERACOES, [])
+
+
+def _nomes_cadastro(db: Session) -> Iterable[Tuple[str, str, float]]:
+    for nome, tipo, valor_imp, valor_exp in db.query(
+        Empresa.nome, Empresa.tipo, Empresa.valor_importacao, Empresa.valor_exportacao
+    ).filter(Empresa.nome.isnot(None), Empresa.nome != "").all():
+        for papel, tipos, valor in (
+            ("importador", ("importadora", "ambos"), valor_imp),
+            ("exportador", ("exportadora", "ambos"), valor_exp),
+        ):
+            if tipo in tipos:
+                yield papel, nome.strip(), valor
+
+
+def _nomes_mdic(db: Session) -> Iterable[Tuple[str, str, float]]:
+    for nome, importadora, exportadora in db.query(
+        EmpresaMDIC.nome, EmpresaMDIC.importadora, EmpresaMDIC.exportadora
+    ).yield_per(10000):
+        if importadora:
+            yield "importador", nome.strip(), 0.0
+        if exportadora:
+            yield "exportador", nome.strip(), 0.0
+
+
+# fonte -> (tabela de origem em versoes_dados, versão do índice em versoes_dados, nomes por papel)
+_FONTES_CADASTRO = {
+    FONTE_EMPRESAS: (TABELA_EMPRESAS, INDICE_CADASTRO, _nomes_cadastro),
+    FONTE_MDIC: (TABELA_EMPRESAS_MDIC, INDICE_MDIC, _nomes_mdic),
+}
+
+
+def sincronizar_indice_cadastro(db: Session, fonte: str = FONTE_EMPRESAS) -> bool:
+    """
+    Reconstrói a parte "empresas" (ou "mdic") do índice se a versão da tabela de
+    origem mudou desde a última indexação. Chamada depois de gravar a tabela de
+    origem e pela sincronização agendada; confirma a sessão (db.commit).
+
+    Returns:
+        True se a parte foi reconstruída
+    """
+    tabela, nome_indice, nomes = _FONTES_CADASTRO[fonte]
+    if _versao_indice(db, nome_indice) == versao_tabela(db, tabela):
+        return False
+
+    with _cadastro_lock:
+        agora = datetime.utcnow()
+        try:
+            if db.get_bind().dialect.name == "postgresql":
+                db.execute(select(func.pg_advisory_xact_lock(CHAVE_BLOQUEIO_CADASTRO)))
+            # O DELETE toma o lock de escrita (SQLite) antes de reler as versões:
+            # quem esperou outra reconstrução vê a versão já indexada e desiste
+            db.query(EmpresaBusca).filter(EmpresaBusca.fonte == fonte).delete(synchronize_session=False)
+            versao = versao_tabela(db, tabela)
+            if _versao_indice(db, nome_indice) == versao:
+                db.rollback()
+                return False
+
+            vistos: Set[Tuple[str, str]] = set()
+            registros = []
+            for papel, nome, valor in nomes(db):
+                if nome and (papel, nome) not in vistos:
+                    vistos.add((papel, nome))
+                    registros.append(_registro(fonte, papel, nome, 0, valor, agora))
+            for i in range(0, len(registros), 10000):
+                db.bulk_insert_mappings(EmpresaBusca, registros[i:i + 10000])
+            _marcar_versao_indice(db, nome_indice, versao, agora)
+            db.commit()
+            logger.info(f"🔍 Fonte {fonte} indexada: {len(registros)} nomes (versão {versao})")
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao indexar fonte {fonte} na busca de empresas: {e}")
+            db.rollback()
+            return False
+
+
+def sincronizar_indices_cadastro(db: Session) -> None:
+    """Sincroniza as partes "empresas" e "mdic" do índice (startup e sincronização agendada)."""
+    for fonte in _FONTES_CADASTRO:
+        sincronizar_indice_cadastro(db, fonte)
+
+
+def buscar_empresas(
+    db: Session,
+    termo: Optional[str],
+    papel: str,
+    limite: int,
+    fonte: str = FONTE_OPERACOES,
+) -> Optional[List[Tuple[str, int, float]]]:
+    """
+    Empresas cujo nome normalizado contém o termo, ordenadas por valor FOB.
+
+    Args:
+        termo: Texto digitado (vazio = maiores empresas do papel)
+        papel: "importador" ou "exportador"
+        fonte: "operacoes" (totais das operações), "empresas" (cadastro) ou "mdic" (lista do MDIC)
+
+    Só lê o índice como está (as partes são atualizadas nos fluxos de escrita).
+
+    Returns:
+        Lista de (nome, total_operacoes, valor_fob), ou None se o índice não estiver
+        disponível (o chamador deve consultar as tabelas de origem diretamente)
+    """
+    if db.get_bind().dialect.name not in ("sqlite", "postgresql"):
+        return None
+    try:
+        estrategia = preparar_indice_busca(db)
+        nome_indice = _FONTES_CADASTRO[fonte][1] if fonte in _FONTES_CADASTRO else INDICE_OPERACOES
+        if _versao_indice(db, nome_indice) is None:
+            return None
+
+        consulta = db.query(
+            EmpresaBusca.nome, EmpresaBusca.total_operacoes, EmpresaBusca.valor_fob
+        ).filter(EmpresaBusca.fonte == fonte, EmpresaBusca.papel == papel)
+
+        termo_norm = normalizar_nome_empresa(termo)
+        if termo_norm:
+            if estrategia == "fts5" and len(termo_norm) >= 3:
+                # Frase entre aspas: com o tokenizer trigram equivale a substring
+                ids = select(literal_column("rowid")).select_from(text("empresas_busca_fts")).where(
+                    text("empresas_busca_fts MATCH :termo_fts")
+                )
+                consulta = consulta.filter(EmpresaBusca.id.in_(ids)).params(
+                    termo_fts='"' + termo_norm.replace('"', '""') + '"'
+                )
+            else:
+                consulta = consulta.filter(EmpresaBusca.nome_normalizado.like(f"%{termo_norm}%"))
+
+        return [
+            (nome, int(total or 0), float(valor or 0))
+            for nome, total, valor in consulta.order_by(EmpresaBusca.valor_fob.desc()).limit(limite).all()
+        ]
+    except Exception as e:
+        logger.warning(f"⚠️ Erro na busca de empresas pelo índice: {e}")
+        db.rollback()
+        return None
@@ -0,0 +1,314 @@
+"""
+Busca paginada de operações (POST /buscar).
+
+O /buscar fazia query.count() sobre todo o conjunto filtrado e depois
+ORDER BY data_operacao DESC OFFSET n LIMIT m: páginas profundas e períodos longos
+ficavam cada vez mais lentos. Agora:
+  - paginação por cursor (keyset): proximo_cursor guarda (data_operacao, id) da
+    última linha e a página seguinte começa em
+    WHERE (data_operacao, id) < (:data, :id), no índice idx_operacao_data_id;
+    a página 500 custa o mesmo que a página 1;
+  - os ids da página saem só do índice (data_operacao, id) e apenas as linhas
+    da página são lidas da tabela;
+  - o total é opcional: "exata" (COUNT), "estimada" (rollups mensais quando os
+    filtros cabem neles, senão estatísticas do planejador no PostgreSQL) ou
+    "nenhuma";
+  - a paginação por número de página (page/page_size) continua disponível, com a
+    mesma ordem (o id desempata datas iguais);
+  - iterar_operacoes percorre todas as linhas dos filtros em lotes (yield_per,
+    cursor do servidor no PostgreSQL) para a exportação (api/export.py).
+"""
+import base64
+import json
+import weakref
+from datetime import date, datetime, timedelta
+from typing import Iterator, List, Optional, Tuple
+
+from loguru import logger
+from pydantic import BaseModel
+from sqlalchemy import func, select, text, tuple_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from config import settings
+from database.models import OperacaoComex, TipoOperacao, ViaTransporte
+
+CONTAGENS = ("exata", "estimada", "nenhuma")
+
+# Colunas da exportação, na ordem do arquivo
+COLUNAS_EXPORTACAO = (
+    "id", "ncm", "descricao_produto", "tipo_operacao", "pais_origem_destino", "uf",
+    "valor_fob", "peso_liquido_kg", "data_operacao", "razao_social_importador", "razao_social_exportador",
+)
+
+INDICE_PAGINACAO = "idx_operacao_data_id"
+
+# Engines em que o índice de paginação já foi conferido
+_indices_prontos: "weakref.WeakSet" = weakref.WeakSet()
+
+
+class _Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) de uma consulta, com os parâmetros dela."""
+
+    inherit_cache = False
+
+    def __init__(self, consulta):
+        self.consulta = consulta
+
+
+@compiles(_Explain, "postgresql")
+def _compilar_explain(elemento, compilador, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compilador.process(elemento.consulta, **kw)
+
+
+class BuscaFiltros(BaseModel):
+    """Filtros de busca."""
+    ncms: Optional[List[str]] = None  # Lista de NCMs
+    ncm: Optional[str] = None  # Mantido para compatibilidade
+    data_inicio: Optional[date] = None
+    data_fim: Optional[date] = None
+    tipo_operacao: Optional[str] = None
+    pais: Optional[str] = None
+    uf: Optional[str] = None
+    via_transporte: Optional[str] = None
+    valor_fob_min: Optional[float] = None
+    valor_fob_max: Optional[float] = None
+    peso_min: Optional[float] = None
+    peso_max: Optional[float] = None
+    empresa_importadora: Optional[str] = None
+    empresa_exportadora: Optional[str] = None
+    page: int = 1
+    page_size: int = 50
+    cursor: Optional[str] = None  # proximo_cursor da página anterior (paginação por cursor)
+    contagem: str = "exata"  # exata, estimada ou nenhuma
+
+
+def preparar_indice_paginacao(db: Session) -> None:
+    """
+    Cria (uma vez por engine) o índice (data_operacao, id) em bancos criados antes
+    dele existir no modelo (create_all não altera tabelas existentes). Faz commit.
+    """
+    engine = db.get_bind()
+    if engine in _indices_prontos:
+        return
+    try:
+        db.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {INDICE_PAGINACAO} ON operacoes_comex (data_operacao, id)"
+        ))
+        db.commit()
+        _indices_prontos.add(engine)
+    except Exception as e:
+        logger.warning(f"⚠️ Não foi possível criar o índice de paginação: {e}")
+        db.rollback()
+
+
+def _normalizar_ncms(ncms: Optional[List[str]], ncm: Optional[str]) -> List[str]:
+    """NCMs válidos (8 dígitos) da lista, ou do NCM único (compatibilidade)."""
+    validos = []
+    for valor in (ncms or ([ncm] if ncm else [])):
+        limpo = valor.replace('.', '').replace(' ', '').strip()
+        if len(limpo) == 8 and limpo.isdigit():
+            validos.append(limpo)
+    return validos
+
+
+def _palavras_empresa(termo: Optional[str]) -> List[str]:
+    """Palavras do filtro de empresa; normaliza S.A/SA para coincidir com o banco."""
+    palavras = []
+    for p in (termo or "").split():
+        t = p.strip().replace(".", "").strip() or p.strip()
+        if t:
+            palavras.append(t)
+    return palavras
+
+
+def condicoes_busca(filtros, ate: Optional[date] = None) -> list:
+    """
+    Condições SQL dos filtros do /buscar (BuscaFiltros).
+
+    Sem datas, usa os últimos 2 anos e grava o período em filtros.data_inicio/data_fim.
+
+    Args:
+        ate: Data máxima mais restrita que data_fim (cursor); vira o limite
+            superior do período, que é o que o índice usa para começar a leitura
+    """
+    O = OperacaoComex
+    condicoes = []
+
+    ncms = _normalizar_ncms(filtros.ncms, filtros.ncm)
+    if ncms:
+        condicoes.append(O.ncm.in_(ncms))
+
+    if not filtros.data_inicio:
+        filtros.data_inicio = (datetime.now() - timedelta(days=730)).date()
+    if not filtros.data_fim:
+        filtros.data_fim = datetime.now().date()
+    condicoes.append(O.data_operacao >= filtros.data_inicio)
+    condicoes.append(O.data_operacao <= (min(filtros.data_fim, ate) if ate else filtros.data_fim))
+
+    tipo = _tipo_operacao(filtros)
+    if tipo is not None:
+        condicoes.append(O.tipo_operacao == tipo)
+
+    if filtros.pais:
+        condicoes.append(O.pais_origem_destino.ilike(f"%{filtros.pais}%"))
+
+    if filtros.uf:
+        condicoes.append(O.uf == filtros.uf.upper())
+
+    if filtros.via_transporte:
+        condicoes.append(O.via_transporte == ViaTransporte[filtros.via_transporte.upper()])
+
+    # Filtros de empresa: case-insensitive, por palavras
+    for palavra in _palavras_empresa(filtros.empresa_importadora):
+        condicoes.append(O.razao_social_importador.ilike(f"%{palavra}%"))
+    for palavra in _palavras_empresa(filtros.empresa_exportadora):
+        condicoes.append(O.razao_social_exportador.ilike(f"%{palavra}%"))
+
+    if filtros.valor_fob_min:
+        condicoes.append(O.valor_fob >= filtros.valor_fob_min)
+    if filtros.valor_fob_max:
+        condicoes.append(O.valor_fob <= filtros.valor_fob_max)
+    if filtros.peso_min:
+        condicoes.append(O.peso_liquido_kg >= filtros.peso_min)
+    if filtros.peso_max:
+        condicoes.append(O.peso_liquido_kg <= filtros.peso_max)
+
+    return condicoes
+
+
+def _tipo_operacao(filtros) -> Optional[TipoOperacao]:
+    if not filtros.tipo_operacao:
+        return None
+    return TipoOperacao.IMPORTACAO if filtros.tipo_operacao == "Importação" else TipoOperacao.EXPORTACAO
+
+
+def codificar_cursor(data_operacao: date, id_operacao: int) -> str:
+    """Cursor opaco (base64) com a chave da última linha da página."""
+    bruto = json.dumps([data_operacao.isoformat(), id_operacao]).encode()
+    return base64.urlsafe_b64encode(bruto).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> Tuple[date, int]:
+    """
+    Chave (data_operacao, id) do cursor.
+
+    Raises:
+        ValueError: cursor inválido
+    """
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data_iso, id_operacao = json.loads(bruto)
+        return date.fromisoformat(data_iso), int(id_operacao)
+    except Exception as e:
+        raise ValueError(f"Cursor inválido: {cursor}") from e
+
+
+def buscar_pagina(db: Session, filtros) -> Tuple[List[OperacaoComex], Optional[str]]:
+    """
+    Uma página de operações, da mais recente para a mais antiga.
+
+    Usa filtros.cursor (proximo_cursor da página anterior, keyset) ou, sem cursor,
+    filtros.page (OFFSET); filtros.page_size linhas.
+
+    Returns:
+        (operações da página, cursor da próxima página ou None se for a última)
+
+    Raises:
+        ValueError: cursor inválido
+    """
+    O = OperacaoComex
+    page_size = filtros.page_size
+    if filtros.cursor:
+        data_cursor, id_cursor = decodificar_cursor(filtros.cursor)
+        # A data do cursor é o limite superior do período (faixa do índice); a tupla desempata pelo id
+        chaves = select(O.data_operacao, O.id).where(
+            *condicoes_busca(filtros, ate=data_cursor),
+            tuple_(O.data_operacao, O.id) < tuple_(data_cursor, id_cursor),
+        )
+    else:
+        chaves = select(O.data_operacao, O.id).where(*condicoes_busca(filtros))
+        chaves = chaves.offset((filtros.page - 1) * page_size)
+    # Uma linha a mais indica se há próxima página
+    chaves = db.execute(chaves.order_by(O.data_operacao.desc(), O.id.desc()).limit(page_size + 1)).all()
+
+    proximo = None
+    if len(chaves) > page_size:
+        chaves = chaves[:page_size]
+        proximo = codificar_cursor(*chaves[-1])
+
+    ids = [id_operacao for _, id_operacao in chaves]
+    if not ids:
+        return [], None
+    por_id = {op.id: op for op in db.query(O).filter(O.id.in_(ids))}
+    return [por_id[i] for i in ids if i in por_id], proximo
+
+
+def _cabe_nos_rollups(filtros) -> bool:
+    """Os rollups mensais têm tipo, NCM, UF e país; os demais filtros exigem as linhas brutas."""
+    return not any((
+        filtros.via_transporte, filtros.empresa_importadora, filtros.empresa_exportadora,
+        filtros.valor_fob_min, filtros.valor_fob_max, filtros.peso_min, filtros.peso_max,
+    ))
+
+
+def _estimativa_planejador(db: Session, condicoes: list) -> Optional[int]:
+    """Linhas estimadas pelo planejador do PostgreSQL (pg_statistic), sem executar a consulta."""
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    try:
+        plano = db.execute(_Explain(select(OperacaoComex.id).where(*condicoes))).scalar()
+        if isinstance(plano, str):
+            plano = json.loads(plano)
+        return int(plano[0]["Plan"]["Plan Rows"])
+    except Exception as e:
+        logger.warning(f"⚠️ Estimativa do planejador indisponível: {e}")
+        db.rollback()
+        return None
+
+
+def contar_total(db: Session, filtros) -> Tuple[Optional[int], bool]:
+    """
+    Total de operações dos filtros, conforme filtros.contagem ("exata", "estimada" ou "nenhuma").
+
+    Returns:
+        (total ou None, True se o total é estimativa do planejador)
+    """
+    contagem = filtros.contagem
+    if contagem == "nenhuma":
+        return None, False
+    condicoes = condicoes_busca(filtros)
+    if contagem == "estimada":
+        if settings.dashboard_use_rollups and _cabe_nos_rollups(filtros):
+            from services.rollups import contar_operacoes
+            total = contar_operacoes(
+                db, filtros.data_inicio, filtros.data_fim, _tipo_operacao(filtros),
+                _normalizar_ncms(filtros.ncms, filtros.ncm), filtros.uf, filtros.pais,
+            )
+            if total is not None:
+                return total, False
+        total = _estimativa_planejador(db, condicoes)
+        if total is not None:
+            return total, True
+    return db.query(func.count(OperacaoComex.id)).filter(*condicoes).scalar() or 0, False
+
+
+def iterar_operacoes(db: Session, filtros, lote: int = 1000) -> Iterator[tuple]:
+    """
+    Todas as operações dos filtros, na ordem do /buscar, como tuplas de COLUNAS_EXPORTACAO.
+
+    Lê só as colunas exportadas, `lote` linhas por vez (yield_per): a memória não
+    cresce com o tamanho do resultado.
+    """
+    O = OperacaoComex
+    consulta = select(*(getattr(O, coluna) for coluna in COLUNAS_EXPORTACAO)).where(
+        *condicoes_busca(filtros)
+    ).order_by(O.data_operacao.desc(), O.id.desc()).execution_options(yield_per=lote)
+    i_tipo = COLUNAS_EXPORTACAO.index("tipo_operacao")
+    i_data = COLUNAS_EXPORTACAO.index("data_operacao")
+    for linha in db.execute(consulta):
+        linha = list(linha)
+        linha[i_tipo] = linha[i_tipo].value if linha[i_tipo] is not None else None
+        linha[i_data] = linha[i_data].isoformat() if linha[i_data] is not None else None
+        yield tuple(linha)
@@ -0,0 +1,299 @@
+"""
+Cache de respostas com backends plugáveis.
+
+- MemoryCacheBackend: em processo, LRU com limite de entradas e de bytes.
+- SQLiteCacheBackend: arquivo SQLite compartilhado entre workers do uvicorn,
+  com o mesmo LRU (coluna ultimo_acesso) e os mesmos limites.
+
+Cada endpoint usa um namespace com TTL próprio (obter_cache("dashboard_stats")).
+Os valores são serializados em JSON, então o cache devolve sempre uma cópia.
+"""
+import json
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import closing
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+from config import settings
+
+# TTL padrão por endpoint (segundos); CACHE_TTL_SECONDS sobrescreve por namespace.
+# As chaves levam a versão dos dados (services.versoes), então o TTL só limita
+# fontes externas não versionadas (BigQuery, MDIC ao vivo).
+TTL_PADRAO_SEGUNDOS: Dict[str, int] = {
+    "dashboard_stats": 6 * 3600,
+    "ncm_analise": 6 * 3600,
+    "autocomplete": 3600,
+    "sinergias": 3600,
+}
+
+
+def _serializar(valor: Any) -> bytes:
+    return json.dumps(valor, ensure_ascii=False, default=str).encode("utf-8")
+
+
+def _desserializar(dados: bytes) -> Any:
+    return json.loads(dados.decode("utf-8") if isinstance(dados, (bytes, bytearray, memoryview)) else dados)
+
+
+class CacheBackend(ABC):
+    """Interface dos backends de cache."""
+
+    @abstractmethod
+    def get(self, chave: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def set(self, chave: str, valor: Any, ttl: int) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, chave: str) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self, prefixo: str = "") -> None:
+        ...
+
+    @abstractmethod
+    def estatisticas(self) -> Dict[str, Any]:
+        ...
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Cache LRU em memória do processo."""
+
+    def __init__(self, max_entradas: int = 1000, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._dados: "OrderedDict[str, tuple]" = OrderedDict()  # chave -> (expira_em, bytes)
+        self._total_bytes = 0
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def _remover(self, chave: str) -> None:
+        item = self._dados.pop(chave, None)
+        if item is not None:
+            self._total_bytes -= len(item[1])
+
+    def get(self, chave: str) -> Optional[Any]:
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is None:
+                self._misses += 1
+                return None
+            expira_em, dados = item
+            if expira_em <= time.time():
+                self._remover(chave)
+                self._misses += 1
+                return None
+            self._dados.move_to_end(chave)
+            self._hits += 1
+        return _desserializar(dados)
+
+    def set(self, chave: str, valor: Any, ttl: int) -> None:
+        dados = _serializar(valor)
+        if len(dados) > self.max_bytes:
+            logger.debug(f"Valor grande demais para o cache ({len(dados)} bytes): {chave}")
+            return
+        with self._lock:
+            self._remover(chave)
+            self._dados[chave] = (time.time() + ttl, dados)
+            self._total_bytes += len(dados)
+            while self._dados and (
+                len(self._dados) > self.max_entradas or self._total_bytes > self.max_bytes
+            ):
+                _, (_, dados_antigos) = self._dados.popitem(last=False)
+                self._total_bytes -= len(dados_antigos)
+
+    def delete(self, chave: str) -> None:
+        with self._lock:
+            self._remover(chave)
+
+    def clear(self, prefixo: str = "") -> None:
+        with self._lock:
+            if not prefixo:
+                self._dados.clear()
+                self._total_bytes = 0
+                return
+            for chave in [c for c in self._dados if c.startswith(prefixo)]:
+                self._remover(chave)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "entradas": len(self._dados),
+                "bytes": self._total_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+            }
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """Cache LRU em arquivo SQLite, compartilhado entre processos."""
+
+    def __init__(self, caminho: Path, max_entradas: int = 1000, max_bytes: int = 64 * 1024 * 1024):
+        self.caminho = Path(caminho)
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        with closing(self._conectar()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache (
+                    chave TEXT PRIMARY KEY,
+                    valor BLOB NOT NULL,
+                    tamanho INTEGER NOT NULL,
+                    expira_em REAL NOT NULL,
+                    ultimo_acesso REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_acesso ON cache (ultimo_acesso)")
+
+    def _conectar(self) -> sqlite3.Connection:
+        # Conexão curta por operação (autocommit), fechada pelo chamador: segura entre threads e processos
+        return sqlite3.connect(str(self.caminho), timeout=5, isolation_level=None)
+
+    def get(self, chave: str) -> Optional[Any]:
+        agora = time.time()
+        with closing(self._conectar()) as conn:
+            linha = conn.execute(
+                "SELECT valor, expira_em FROM cache WHERE chave = ?", (chave,)
+            ).fetchone()
+            if linha is None:
+                return None
+            if linha[1] <= agora:
+                conn.execute("DELETE FROM cache WHERE chave = ?", (chave,))
+                return None
+            conn.execute("UPDATE cache SET ultimo_acesso = ? WHERE chave = ?", (agora, chave))
+        return _desserializar(linha[0])
+
+    def set(self, chave: str, valor: Any, ttl: int) -> None:
+        dados = _serializar(valor)
+        if len(dados) > self.max_bytes:
+            logger.debug(f"Valor grande demais para o cache ({len(dados)} bytes): {chave}")
+            return
+        agora = time.time()
+        with closing(self._conectar()) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (chave, valor, tamanho, expira_em, ultimo_acesso) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (chave, dados, len(dados), agora + ttl, agora),
+            )
+            self._aplicar_limites(conn, agora)
+
+    def _aplicar_limites(self, conn: sqlite3.Connection, agora: float) -> None:
+        total, total_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM cache").fetchone()
+        if total <= self.max_entradas and total_bytes <= self.max_bytes:
+            return
+        conn.execute("DELETE FROM cache WHERE expira_em <= ?", (agora,))
+        total, total_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM cache").fetchone()
+        excesso_entradas = max(0, total - self.max_entradas)
+        excesso_bytes = max(0, total_bytes - self.max_bytes)
+        if not excesso_entradas and not excesso_bytes:
+            return
+        # Remover as menos usadas recentemente até caber nos limites
+        remover, liberados = [], 0
+        for chave, tamanho in conn.execute("SELECT chave, tamanho FROM cache ORDER BY ultimo_acesso"):
+            if len(remover) >= excesso_entradas and liberados >= excesso_bytes:
+                break
+            remover.append((chave,))
+            liberados += tamanho
+        conn.executemany("DELETE FROM cache WHERE chave = ?", remover)
+
+    def delete(self, chave: str) -> None:
+        with closing(self._conectar()) as conn:
+            conn.execute("DELETE FROM cache WHERE chave = ?", (chave,))
+
+    def clear(self, prefixo: str = "") -> None:
+        with closing(self._conectar()) as conn:
+            if prefixo:
+                conn.execute("DELETE FROM cache WHERE substr(chave, 1, ?) = ?", (len(prefixo), prefixo))
+            else:
+                conn.execute("DELETE FROM cache")
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with closing(self._conectar()) as conn:
+            total, total_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM cache"
+            ).fetchone()
+        return {"backend": "sqlite", "arquivo": str(self.caminho), "entradas": total, "bytes": total_bytes}
+
+
+class CacheNamespace:
+    """
+    Visão de um backend para um endpoint: prefixo de chave + TTL próprio.
+    Chave None (versão dos dados indisponível) desativa o cache na chamada.
+    """
+
+    def __init__(self, backend: CacheBackend, namespace: str, ttl: int):
+        self.backend = backend
+        self.namespace = namespace
+        self.ttl = ttl
+
+    def _chave(self, chave: str) -> str:
+        return f"{self.namespace}:{chave}"
+
+    def get(self, chave: Optional[str]) -> Optional[Any]:
+        if chave is None:
+            return None
+        try:
+            return self.backend.get(self._chave(chave))
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao ler cache ({self.namespace}): {e}")
+            return None
+
+    def set(self, chave: Optional[str], valor: Any, ttl: Optional[int] = None) -> None:
+        if chave is None:
+            return
+        try:
+            self.backend.set(self._chave(chave), valor, ttl if ttl is not None else self.ttl)
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao salvar cache ({self.namespace}): {e}")
+
+    def delete(self, chave: str) -> None:
+        self.backend.delete(self._chave(chave))
+
+    def clear(self) -> None:
+        self.backend.clear(f"{self.namespace}:")
+
+
+_backend: Optional[CacheBackend] = None
+_backend_lock = Lock()
+
+
+def obter_backend() -> CacheBackend:
+    """Backend configurado em CACHE_BACKEND (memory ou sqlite), criado uma vez por processo."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                tipo = (settings.cache_backend or "memory").strip().lower()
+                if tipo == "sqlite":
+                    caminho = settings.cache_sqlite_path or (settings.data_dir / "cache" / "respostas.db")
+                    try:
+                        _backend = SQLiteCacheBackend(
+                            caminho, settings.cache_max_entries, settings.cache_max_bytes
+                        )
+                        logger.info(f"✅ Cache compartilhado em SQLite: {caminho}")
+                    except Exception as e:
+                        logger.warning(f"⚠️ Cache SQLite indisponível ({e}), usando memória")
+                if _backend is None:
+                    _backend = MemoryCacheBackend(settings.cache_max_entries, settings.cache_max_bytes)
+    return _backend
+
+
+def obter_cache(namespace: str) -> CacheNamespace:
+    """Cache de um endpoint com o TTL configurado para o namespace."""
+    ttls = dict(TTL_PADRAO_SEGUNDOS)
+    ttls.update(settings.cache_ttl_seconds or {})
+    return CacheNamespace(obter_backend(), namespace, int(ttls.get(namespace, 300)))
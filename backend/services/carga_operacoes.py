@@ -0,0 +1,452 @@
+"""
+Carga em massa de operações em operacoes_comex.
+
+Todos os fluxos de ingestão (planilhas do ComexStat, coletores da API e da Base
+dos Dados) gravam por aqui em vez de bulk_insert_mappings em blocos de 1000 com
+nova tentativa linha a linha, ou db.add por objeto:
+  - cada registro é validado contra o esquema da tabela (NOT NULL, tamanho das
+    colunas de texto, enums, números e datas); os inválidos vão para um arquivo
+    de rejeitos (CSV em data_dir/rejeitos, com o motivo) em vez de derrubar o bloco;
+  - PostgreSQL: COPY ... FROM STDIN (formato CSV) na transação da sessão;
+  - SQLite: um executemany numa única transação, com pragmas de carga
+    (cache maior, temporários em memória, synchronous=NORMAL) restaurados no fim;
+  - outros bancos: insert executemany do SQLAlchemy.
+Com deduplicar=True, registros cuja chave natural (NCM, tipo, data, país, UF)
+já existe são ignorados (ou atualizados, com atualizar=True) por um join com uma
+tabela temporária das chaves do bloco.
+Cada execução termina com um relatório de linhas/s (CargaOperacoes.relatorio).
+"""
+import csv
+import enum
+import io
+import math
+import re
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import (
+    Column, Date, DateTime, Enum as SQLEnum, Float, Integer, MetaData, String, Table,
+    and_, cast, func, literal_column, select,
+)
+from sqlalchemy.orm import Session
+
+from config import settings
+from database.models import OperacaoComex
+
+_TABELA = OperacaoComex.__table__
+_COLUNAS = [coluna for coluna in _TABELA.columns if not coluna.primary_key]
+_NOMES = [coluna.name for coluna in _COLUNAS]
+
+# Chave natural de uma operação (a mesma das verificações de duplicata dos coletores)
+CHAVE_NATURAL = ("ncm", "tipo_operacao", "data_operacao", "pais_origem_destino", "uf")
+_POSICOES_CHAVE = [_NOMES.index(nome) for nome in CHAVE_NATURAL]
+
+# Pragmas do SQLite durante a carga (valores anteriores são restaurados)
+_PRAGMAS_SQLITE = {
+    "synchronous": "NORMAL",
+    "cache_size": "-65536",  # 64 MB
+    "temp_store": "MEMORY",
+}
+
+_NULO_COPY = "\\N"
+
+
+def _conversor(coluna) -> Callable[[Any], Any]:
+    """Função que valida/normaliza o valor de uma coluna (ValueError com o motivo)."""
+    tipo = coluna.type
+    nome = coluna.name
+
+    if isinstance(tipo, SQLEnum) and tipo.enum_class is not None:
+        classe = tipo.enum_class
+
+        def _enum(valor):
+            if isinstance(valor, classe):
+                return valor
+            texto = str(valor)
+            if texto in classe.__members__:
+                return classe[texto]
+            try:
+                return classe(texto)
+            except ValueError:
+                raise ValueError(f"{nome} inválido: {texto!r}")
+        return _enum
+
+    if isinstance(tipo, Float):
+        def _float(valor):
+            try:
+                numero = float(valor)
+            except (TypeError, ValueError):
+                raise ValueError(f"{nome} não numérico: {valor!r}")
+            return None if math.isnan(numero) else numero
+        return _float
+
+    if isinstance(tipo, Integer):
+        def _int(valor):
+            try:
+                return int(valor)
+            except (TypeError, ValueError):
+                raise ValueError(f"{nome} não inteiro: {valor!r}")
+        return _int
+
+    if isinstance(tipo, DateTime):
+        def _datetime(valor):
+            if isinstance(valor, datetime):
+                return valor
+            try:
+                return datetime.fromisoformat(str(valor))
+            except ValueError:
+                raise ValueError(f"{nome} inválido: {valor!r}")
+        return _datetime
+
+    if isinstance(tipo, Date):
+        def _date(valor):
+            if isinstance(valor, datetime):
+                return valor.date()
+            if isinstance(valor, date):
+                return valor
+            try:
+                return date.fromisoformat(str(valor)[:10])
+            except ValueError:
+                raise ValueError(f"{nome} inválido: {valor!r}")
+        return _date
+
+    tamanho = getattr(tipo, "length", None) if isinstance(tipo, String) else None
+
+    def _texto(valor):
+        texto = valor if isinstance(valor, str) else str(valor)
+        if tamanho and len(texto) > tamanho:
+            raise ValueError(f"{nome} com mais de {tamanho} caracteres")
+        return texto
+    return _texto
+
+
+_CONVERSORES = [_conversor(coluna) for coluna in _COLUNAS]
+
+
+def _padroes() -> List[Any]:
+    """Valores padrão das colunas (Column(default=...)), calculados uma vez por bloco."""
+    padroes = []
+    for coluna in _COLUNAS:
+        padrao = coluna.default
+        if padrao is None or not (padrao.is_scalar or padrao.is_callable):
+            padroes.append(None)
+        elif padrao.is_scalar:
+            padroes.append(padrao.arg)
+        else:
+            padroes.append(padrao.arg(None))
+    return padroes
+
+
+def preparar_registro(registro: Dict[str, Any], padroes: List[Any]) -> Tuple:
+    """
+    Linha pronta para o banco (na ordem de _NOMES) a partir de um dicionário de
+    operação. Chaves fora do esquema são ignoradas.
+
+    Raises:
+        ValueError: com o motivo, se o registro viola o esquema da tabela
+    """
+    linha = []
+    for coluna, conversor, padrao in zip(_COLUNAS, _CONVERSORES, padroes):
+        valor = registro.get(coluna.name)
+        if isinstance(valor, float) and math.isnan(valor):
+            valor = None
+        if valor is None:
+            valor = padrao
+        if valor is not None:
+            valor = conversor(valor)
+        if valor is None and not coluna.nullable:
+            raise ValueError(f"{coluna.name} vazio")
+        linha.append(valor)
+    return tuple(linha)
+
+
+def _valor_sqlite(valor):
+    # Mesmo formato de armazenamento dos tipos Date/DateTime/Enum do SQLAlchemy no SQLite
+    if isinstance(valor, enum.Enum):
+        return valor.name
+    if isinstance(valor, datetime):
+        return valor.strftime("%Y-%m-%d %H:%M:%S.%f")
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return valor
+
+
+def _valor_copy(valor):
+    if valor is None:
+        return _NULO_COPY
+    if isinstance(valor, enum.Enum):
+        return valor.name
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return valor
+
+
+class CargaOperacoes:
+    """
+    Uma execução de carga (um arquivo importado, uma coleta): acumula contagens,
+    tempo de gravação e o arquivo de rejeitos entre chamadas de carregar().
+
+    Uso:
+        carga = CargaOperacoes(db, "excel_H_EXPORTACAO_2025")
+        for lote in lotes:
+            carga.carregar(lote)
+        carga.relatorio()
+    """
+
+    def __init__(self, db: Session, origem: str, dir_rejeitos: Optional[Path] = None):
+        self.db = db
+        self.origem = origem
+        self.dialeto = db.get_bind().dialect.name
+        self.dir_rejeitos = Path(dir_rejeitos) if dir_rejeitos else settings.data_dir / "rejeitos"
+        self.inseridos = 0
+        self.ignorados = 0
+        self.atualizados = 0
+        self.rejeitados = 0
+        self.segundos = 0.0
+        self.arquivo_rejeitos: Optional[Path] = None
+
+    def carregar(
+        self,
+        registros: Iterable[Dict[str, Any]],
+        deduplicar: bool = False,
+        atualizar: bool = False,
+    ) -> int:
+        """
+        Valida e grava os registros numa única transação (commit no fim).
+
+        Args:
+            registros: Dicionários de operação (colunas de operacoes_comex)
+            deduplicar: Ignora registros cuja chave natural (NCM, tipo, data, país,
+                UF) já existe no banco ou se repete no próprio bloco
+            atualizar: Com deduplicar, atualiza as operações existentes com os
+                campos não nulos do registro em vez de ignorá-los
+
+        Returns:
+            Quantidade de registros gravados (novos)
+        """
+        inicio = time.perf_counter()
+        padroes = _padroes()
+        linhas = []
+        originais = []
+        rejeitos = []
+        for registro in registros:
+            try:
+                linhas.append(preparar_registro(registro, padroes))
+                originais.append(registro)
+            except ValueError as e:
+                rejeitos.append((str(e), registro))
+
+        gravados = ignorados = atualizados = 0
+        if linhas:
+            try:
+                with self._transacao() as cursor_sqlite:
+                    if deduplicar:
+                        total = len(linhas)
+                        linhas, existentes = self._separar_existentes(linhas, originais)
+                        ignorados = total - len(linhas)
+                        if atualizar and existentes:
+                            self.db.bulk_update_mappings(OperacaoComex, existentes)
+                            atualizados = len(existentes)
+                            ignorados -= atualizados
+                    if linhas:
+                        self._inserir(linhas, cursor_sqlite)
+                gravados = len(linhas)
+            except Exception as e:
+                # Sem nova tentativa linha a linha: o bloco inteiro vai para os rejeitos
+                self.db.rollback()
+                logger.error(f"❌ Erro na carga de {len(linhas)} operações ({self.origem}): {e}")
+                motivo = f"erro do banco: {str(e).splitlines()[0][:200]}"
+                rejeitos.extend((motivo, dict(zip(_NOMES, linha))) for linha in linhas)
+                ignorados = atualizados = 0
+
+        if rejeitos:
+            self._rejeitar(rejeitos)
+        self.inseridos += gravados
+        self.ignorados += ignorados
+        self.atualizados += atualizados
+        self.segundos += time.perf_counter() - inicio
+        if deduplicar:
+            logger.info(
+                f"💾 Lote {self.origem}: {gravados} inseridas, {ignorados} já existentes"
+                + (f", {atualizados} atualizadas" if atualizar else "")
+                + f", {len(rejeitos)} rejeitadas"
+            )
+        return gravados
+
+    def _separar_existentes(self, linhas: List[Tuple], originais: List[Dict[str, Any]]) -> Tuple[List[Tuple], List[Dict]]:
+        """
+        Remove do bloco as linhas cuja chave natural já está no banco ou repete
+        outra linha do bloco (fica a primeira).
+
+        As chaves do bloco vão para uma tabela temporária e as existentes saem de
+        um único join com operacoes_comex (índice idx_ncm_tipo_data), em vez de um
+        SELECT por registro.
+
+        Returns:
+            (linhas novas, mapeamentos {"id", campos não nulos} das operações existentes)
+        """
+        posicoes: Dict[Tuple, int] = {}
+        for i, linha in enumerate(linhas):
+            posicoes.setdefault(tuple(linha[p] for p in _POSICOES_CHAVE), i)
+
+        conexao = self.db.connection()
+        staging = Table(
+            "carga_operacoes_chaves", MetaData(),
+            Column("posicao", Integer),
+            Column("ncm", String(8)),
+            Column("tipo_operacao", String(20)),
+            Column("data_operacao", Date),
+            Column("pais_origem_destino", String(100)),
+            Column("uf", String(2)),
+            prefixes=["TEMPORARY"],
+        )
+        # Criada e removida na transação do bloco (um rollback também a descarta)
+        staging.create(conexao)
+        conexao.execute(staging.insert(), [
+            {
+                "posicao": i, "ncm": ncm, "tipo_operacao": tipo.name, "data_operacao": data_operacao,
+                "pais_origem_destino": pais, "uf": uf,
+            }
+            for (ncm, tipo, data_operacao, pais, uf), i in posicoes.items()
+        ])
+        uf, pais = OperacaoComex.uf, OperacaoComex.pais_origem_destino
+        if self.dialeto == "sqlite":
+            # Sem estatísticas (ANALYZE) o SQLite escolhe idx_uf_tipo_data/idx_pais_tipo_data,
+            # pouco seletivos; o "+" (no-op) tira uf e país da escolha do índice
+            uf = literal_column(f"+{_TABELA.name}.uf")
+            pais = literal_column(f"+{_TABELA.name}.pais_origem_destino")
+        existentes = dict(conexao.execute(
+            select(staging.c.posicao, func.min(OperacaoComex.id))
+            .select_from(staging)
+            .join(OperacaoComex, and_(
+                OperacaoComex.ncm == staging.c.ncm,
+                # Cast do lado da tabela temporária: mantém idx_ncm_tipo_data utilizável
+                OperacaoComex.tipo_operacao == cast(staging.c.tipo_operacao, OperacaoComex.tipo_operacao.type),
+                OperacaoComex.data_operacao == staging.c.data_operacao,
+                pais == staging.c.pais_origem_destino,
+                uf == staging.c.uf,
+            ))
+            .group_by(staging.c.posicao)
+        ).all())
+        staging.drop(conexao)
+
+        novas = [linhas[i] for i in posicoes.values() if i not in existentes]
+        atualizacoes = [
+            {
+                "id": id_existente,
+                **{
+                    nome: valor for nome, valor in zip(_NOMES, linhas[i])
+                    if valor is not None and originais[i].get(nome) is not None
+                },
+            }
+            for i, id_existente in existentes.items()
+        ]
+        return novas, atualizacoes
+
+    def _inserir(self, linhas: List[Tuple], cursor_sqlite=None) -> None:
+        if self.dialeto == "postgresql":
+            self._copy(linhas)
+        elif cursor_sqlite is not None:
+            sql = (
+                f"INSERT INTO {_TABELA.name} ({', '.join(_NOMES)}) "
+                f"VALUES ({', '.join('?' for _ in _NOMES)})"
+            )
+            cursor_sqlite.executemany(sql, ([_valor_sqlite(valor) for valor in linha] for linha in linhas))
+        else:
+            self.db.execute(_TABELA.insert(), [dict(zip(_NOMES, linha)) for linha in linhas])
+
+    def _copy(self, linhas: List[Tuple]) -> None:
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer)
+        for linha in linhas:
+            escritor.writerow([_valor_copy(valor) for valor in linha])
+        buffer.seek(0)
+        sql = f"COPY {_TABELA.name} ({', '.join(_NOMES)}) FROM STDIN WITH (FORMAT csv, NULL '{_NULO_COPY}')"
+
+        cursor = self.db.connection().connection.cursor()
+        try:
+            if hasattr(cursor, "copy_expert"):
+                cursor.copy_expert(sql, buffer)
+            else:
+                # psycopg 3
+                with cursor.copy(sql) as copia:
+                    copia.write(buffer.getvalue())
+        finally:
+            cursor.close()
+
+    @contextmanager
+    def _transacao(self):
+        """
+        Transação do bloco, com commit no fim. No SQLite entrega um cursor da
+        conexão do driver com os pragmas de carga (executemany direto) e faz o
+        commit nessa conexão para restaurar os pragmas nela mesma; nos demais
+        bancos entrega None.
+        """
+        if self.dialeto != "sqlite":
+            yield None
+            self.db.commit()
+            return
+
+        conexao = self.db.connection().connection.dbapi_connection
+        cursor = conexao.cursor()
+        # Pragmas (synchronous) não podem mudar dentro de uma transação já aberta
+        anteriores = {} if conexao.in_transaction else {
+            pragma: cursor.execute(f"PRAGMA {pragma}").fetchone()[0] for pragma in _PRAGMAS_SQLITE
+        }
+        try:
+            for pragma in anteriores:
+                cursor.execute(f"PRAGMA {pragma} = {_PRAGMAS_SQLITE[pragma]}")
+            yield cursor
+            self.db.flush()
+            conexao.commit()
+        except Exception:
+            conexao.rollback()
+            raise
+        finally:
+            for pragma, valor in anteriores.items():
+                cursor.execute(f"PRAGMA {pragma} = {valor}")
+            cursor.close()
+        self.db.commit()
+
+    def _rejeitar(self, rejeitos: List[Tuple[str, Dict[str, Any]]]) -> None:
+        self.rejeitados += len(rejeitos)
+        try:
+            if self.arquivo_rejeitos is None:
+                self.dir_rejeitos.mkdir(parents=True, exist_ok=True)
+                nome = re.sub(r"[^\w.-]+", "_", self.origem)[:80]
+                self.arquivo_rejeitos = self.dir_rejeitos / f"{nome}_{datetime.now():%Y%m%d_%H%M%S}.csv"
+                with self.arquivo_rejeitos.open("w", newline="", encoding="utf-8") as arquivo:
+                    csv.writer(arquivo).writerow(["motivo"] + _NOMES)
+            with self.arquivo_rejeitos.open("a", newline="", encoding="utf-8") as arquivo:
+                escritor = csv.writer(arquivo)
+                for motivo, registro in rejeitos:
+                    escritor.writerow([motivo] + [
+                        valor.value if isinstance(valor, enum.Enum) else valor
+                        for valor in (registro.get(nome) for nome in _NOMES)
+                    ])
+        except OSError as e:
+            logger.warning(f"⚠️ Não foi possível gravar rejeitos de {self.origem}: {e}")
+
+    def relatorio(self) -> Dict[str, Any]:
+        """Registra e retorna o resumo da execução (inseridos, rejeitados, linhas/s)."""
+        linhas_por_segundo = self.inseridos / self.segundos if self.segundos > 0 else 0.0
+        logger.info(
+            f"📊 Carga {self.origem} ({self.dialeto}): {self.inseridos} operações gravadas, "
+            f"{self.ignorados} já existentes, {self.atualizados} atualizadas, {self.rejeitados} rejeitadas em {self.segundos:.1f}s ({linhas_por_segundo:,.0f} linhas/s)"
+        )
+        if self.arquivo_rejeitos is not None:
+            logger.warning(f"⚠️ Registros rejeitados em {self.arquivo_rejeitos}")
+        return {
+            "origem": self.origem,
+            "inseridos": self.inseridos,
+            "ignorados": self.ignorados,
+            "atualizados": self.atualizados,
+            "rejeitados": self.rejeitados,
+            "segundos": round(self.segundos, 3),
+            "linhas_por_segundo": round(linhas_por_segundo, 1),
+            "arquivo_rejeitos": str(self.arquivo_rejeitos) if self.arquivo_rejeitos else None,
+        }
@@ -0,0 +1,174 @@
+"""
+Clientes HTTP compartilhados pelos coletores (API Comex Stat, CSVs e lista de empresas do MDIC).
+
+Antes cada chamada abria um httpx.AsyncClient / aiohttp.ClientSession próprio e
+pagava de novo DNS + TCP + TLS (48 sondagens HEAD = 48 handshakes). Aqui há um
+cliente de cada tipo por event loop, com keep-alive e limites de conexão:
+  - aiohttp (obter_sessao): limite total (settings.http_max_conexoes) e por host
+    (settings.http_conexoes_por_host), cache de DNS;
+  - httpx (obter_cliente_httpx): limite total e, como o httpx não tem limite por
+    host, um semáforo por host (settings.http_conexoes_por_host) segura cada
+    requisição até o corpo da resposta ser lido ou fechado; HTTP/2 quando o
+    pacote h2 está instalado.
+
+Os clientes são criados na primeira chamada dentro do loop e fechados no shutdown
+da aplicação (fechar_clientes_http). Loops de threads com asyncio.run ganham clientes
+próprios, já que uma sessão não pode ser usada fora do loop em que nasceu
+(asyncio.run(com_clientes_http(...)) os fecha ao final).
+Quem usa os clientes não deve fechá-los; o timeout vai por requisição.
+"""
+import asyncio
+from typing import Any, AsyncIterator, Dict, Tuple
+
+import aiohttp
+from loguru import logger
+
+from config import settings
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+try:
+    import h2  # noqa: F401  (habilita HTTP/2 no httpx)
+    HTTP2_AVAILABLE = HTTPX_AVAILABLE
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+
+# Clientes abertos, por event loop
+_sessoes: Dict[asyncio.AbstractEventLoop, "aiohttp.ClientSession"] = {}
+_clientes_httpx: Dict[asyncio.AbstractEventLoop, Any] = {}
+
+
+def _descartar_loops_fechados() -> None:
+    """Esquece clientes de loops já encerrados (ex.: asyncio.run de uma thread que terminou)."""
+    for registro in (_sessoes, _clientes_httpx):
+        for loop in [loop for loop in registro if loop.is_closed()]:
+            del registro[loop]
+
+
+def obter_sessao() -> "aiohttp.ClientSession":
+    """Sessão aiohttp compartilhada do loop atual (cria na primeira chamada)."""
+    loop = asyncio.get_running_loop()
+    sessao = _sessoes.get(loop)
+    if sessao is None or sessao.closed:
+        _descartar_loops_fechados()
+        connector = aiohttp.TCPConnector(
+            ssl=False,
+            limit=settings.http_max_conexoes,
+            limit_per_host=settings.http_conexoes_por_host,
+            keepalive_timeout=settings.http_keepalive_segundos,
+            ttl_dns_cache=300,
+        )
+        sessao = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=300),
+            headers={"User-Agent": USER_AGENT},
+        )
+        _sessoes[loop] = sessao
+        logger.debug(
+            f"🔄 Sessão HTTP compartilhada criada (até {settings.http_max_conexoes} conexões, "
+            f"{settings.http_conexoes_por_host} por host)"
+        )
+    return sessao
+
+
+if HTTPX_AVAILABLE:
+    class _CorpoLiberaSemaforo(httpx.AsyncByteStream):
+        """Corpo da resposta que devolve a vaga do host ao ser fechado."""
+
+        def __init__(self, corpo: "httpx.AsyncByteStream", semaforo: asyncio.Semaphore):
+            self._corpo = corpo
+            self._semaforo = semaforo
+            self._liberado = False
+
+        async def __aiter__(self) -> AsyncIterator[bytes]:
+            async for parte in self._corpo:
+                yield parte
+
+        async def aclose(self) -> None:
+            try:
+                await self._corpo.aclose()
+            finally:
+                if not self._liberado:
+                    self._liberado = True
+                    self._semaforo.release()
+
+    class _TransportePorHost(httpx.AsyncBaseTransport):
+        """Transporte httpx com no máximo `limite` requisições simultâneas por host."""
+
+        def __init__(self, transporte: "httpx.AsyncBaseTransport", limite: int):
+            self._transporte = transporte
+            self._limite = limite
+            self._semaforos: Dict[Tuple[bytes, bytes, Any], asyncio.Semaphore] = {}
+
+        async def handle_async_request(self, request: "httpx.Request") -> "httpx.Response":
+            host = (request.url.raw_scheme, request.url.raw_host, request.url.port)
+            semaforo = self._semaforos.get(host)
+            if semaforo is None:
+                semaforo = self._semaforos[host] = asyncio.Semaphore(self._limite)
+            await semaforo.acquire()
+            try:
+                resposta = await self._transporte.handle_async_request(request)
+            except BaseException:
+                semaforo.release()
+                raise
+            resposta.stream = _CorpoLiberaSemaforo(resposta.stream, semaforo)
+            return resposta
+
+        async def aclose(self) -> None:
+            await self._transporte.aclose()
+
+
+def obter_cliente_httpx():
+    """Cliente httpx compartilhado do loop atual (limite por host; HTTP/2 se disponível)."""
+    if not HTTPX_AVAILABLE:
+        raise RuntimeError("httpx não disponível")
+    loop = asyncio.get_running_loop()
+    cliente = _clientes_httpx.get(loop)
+    if cliente is None or cliente.is_closed:
+        _descartar_loops_fechados()
+        transporte = httpx.AsyncHTTPTransport(
+            http2=HTTP2_AVAILABLE,
+            verify=False,
+            limits=httpx.Limits(
+                max_connections=settings.http_max_conexoes,
+                max_keepalive_connections=settings.http_conexoes_por_host,
+                keepalive_expiry=settings.http_keepalive_segundos,
+            ),
+        )
+        cliente = httpx.AsyncClient(
+            transport=_TransportePorHost(transporte, settings.http_conexoes_por_host),
+            timeout=30.0,
+            headers={"User-Agent": USER_AGENT},
+        )
+        _clientes_httpx[loop] = cliente
+        logger.debug(
+            f"🔄 Cliente httpx compartilhado criado ({settings.http_conexoes_por_host} requisições por host, "
+            f"HTTP/2: {HTTP2_AVAILABLE})"
+        )
+    return cliente
+
+
+async def fechar_clientes_http() -> None:
+    """Fecha os clientes do loop atual (shutdown da aplicação ou fim de um asyncio.run)."""
+    loop = asyncio.get_running_loop()
+    sessao = _sessoes.pop(loop, None)
+    if sessao is not None and not sessao.closed:
+        await sessao.close()
+    cliente = _clientes_httpx.pop(loop, None)
+    if cliente is not None and not cliente.is_closed:
+        await cliente.aclose()
+    _descartar_loops_fechados()
+
+
+async def com_clientes_http(corrotina):
+    """Executa `corrotina` e fecha os clientes do loop ao final (uso: asyncio.run(com_clientes_http(...)))."""
+    try:
+        return await corrotina
+    finally:
+        await fechar_clientes_http()
@@ -0,0 +1,218 @@
+"""
+CNAE compartilhado pelo processo.
+
+Cada /sugestoes-empresa/{cnpj}, análise de sinergias por empresa e cada
+DataUpdater / EnrichedDataCollector criava um CNAEAnalyzer e relia o Excel
+inteiro. Agora:
+  - obter_cnae_analyzer devolve um CNAEAnalyzer carregado uma vez por arquivo
+    (recarregado só se o tamanho ou a data de modificação do arquivo mudarem;
+    a carga usa o snapshot JSON do próprio analisador quando existe);
+  - indice_cnae monta, por engine, um índice ordenado dos códigos da tabela
+    cnae_hierarquia e do arquivo: busca por prefixo com busca binária e
+    agregação por seção → divisão → grupo → classe → subclasse. É refeito
+    quando a versão "cnae_hierarquia" (services.versoes) muda.
+"""
+import threading
+import weakref
+from bisect import bisect_left
+from itertools import groupby
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from loguru import logger
+from sqlalchemy.orm import Session
+
+from config import settings
+from data_collector.cnae_analyzer import CNAEAnalyzer
+from database.models import CNAEHierarquia
+from services.versoes import TABELA_CNAE, versao_tabela
+
+# Seções da CNAE 2.x pelas faixas de divisão (dois primeiros dígitos)
+SECOES_POR_DIVISAO: Tuple[Tuple[int, int, str], ...] = (
+    (1, 3, "A"), (5, 9, "B"), (10, 33, "C"), (35, 35, "D"), (36, 39, "E"),
+    (41, 43, "F"), (45, 47, "G"), (49, 53, "H"), (55, 56, "I"), (58, 63, "J"),
+    (64, 66, "K"), (68, 68, "L"), (69, 75, "M"), (77, 82, "N"), (84, 84, "O"),
+    (85, 85, "P"), (86, 88, "Q"), (90, 93, "R"), (94, 96, "S"), (97, 97, "T"),
+    (99, 99, "U"),
+)
+
+# Dígitos do código em cada nível (a seção vem da divisão)
+DIGITOS_NIVEL = {"divisao": 2, "grupo": 3, "classe": 5, "subclasse": 7}
+NIVEIS = ("secao",) + tuple(DIGITOS_NIVEL)
+
+
+def limpar_cnae(cnae: Optional[str]) -> str:
+    """'4711-3/01' -> '4711301'."""
+    return "".join(c for c in str(cnae or "") if c.isdigit())
+
+
+def secao_cnae(cnae: str) -> Optional[str]:
+    """Letra da seção a partir da divisão do código."""
+    codigo = limpar_cnae(cnae)
+    if len(codigo) < 2:
+        return None
+    divisao = int(codigo[:2])
+    for inicio, fim, secao in SECOES_POR_DIVISAO:
+        if inicio <= divisao <= fim:
+            return secao
+    return None
+
+
+def niveis_cnae(cnae: str) -> Dict[str, Optional[str]]:
+    """Seção, divisão, grupo, classe e subclasse de um código (None nos níveis além do código)."""
+    codigo = limpar_cnae(cnae)
+    niveis: Dict[str, Optional[str]] = {"secao": secao_cnae(codigo)}
+    for nivel, digitos in DIGITOS_NIVEL.items():
+        niveis[nivel] = codigo[:digitos] if len(codigo) >= digitos else None
+    return niveis
+
+
+class IndiceCNAE:
+    """Códigos CNAE ordenados: busca por prefixo e agregação pelos níveis da hierarquia."""
+
+    def __init__(self, descricoes: Dict[str, Dict[str, Any]], empresas_por_codigo: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            descricoes: {código limpo: dados (descricao, setor, segmento, ramo, categoria)}
+            empresas_por_codigo: {código limpo: empresas com o código} (arquivo CNAE)
+        """
+        self.descricoes = descricoes
+        self.empresas_por_codigo = empresas_por_codigo or {}
+        self.codigos: List[str] = sorted(set(descricoes) | set(self.empresas_por_codigo))
+
+    def __len__(self) -> int:
+        return len(self.codigos)
+
+    def buscar_prefixo(self, prefixo: str, limite: Optional[int] = None) -> List[str]:
+        """Códigos que começam com o prefixo (pontuação ignorada), em ordem."""
+        prefixo = limpar_cnae(prefixo)
+        inicio = bisect_left(self.codigos, prefixo)
+        # Todo código com o prefixo é < prefixo + "~" ("~" vem depois dos dígitos)
+        fim = bisect_left(self.codigos, prefixo + "~", inicio)
+        if limite is not None:
+            fim = min(fim, inicio + limite)
+        return self.codigos[inicio:fim]
+
+    def chave_nivel(self, cnae: str, nivel: str) -> Optional[str]:
+        """Código do nível para o CNAE (ex.: nivel='grupo' -> '471')."""
+        if nivel == "secao":
+            return secao_cnae(cnae)
+        digitos = DIGITOS_NIVEL[nivel]
+        return cnae[:digitos] if len(cnae) >= digitos else None
+
+    def agregar(
+        self,
+        nivel: str,
+        valores: Optional[Dict[str, float]] = None,
+        prefixo: str = "",
+    ) -> Dict[str, float]:
+        """
+        Soma valores por código no nível pedido (rollup).
+
+        Args:
+            nivel: secao, divisao, grupo, classe ou subclasse
+            valores: {código: valor}; padrão = empresas por código (arquivo CNAE)
+            prefixo: Restringe aos códigos com o prefixo
+
+        Returns:
+            {código do nível: soma}, na ordem dos códigos
+        """
+        if nivel not in NIVEIS:
+            raise ValueError(f"Nível CNAE inválido: {nivel} (use {', '.join(NIVEIS)})")
+        if valores is None:
+            valores = self.empresas_por_codigo
+            codigos = self.buscar_prefixo(prefixo)
+        else:
+            valores = {limpar_cnae(c): v for c, v in valores.items()}
+            prefixo = limpar_cnae(prefixo)
+            codigos = sorted(c for c in valores if c.startswith(prefixo))
+
+        # Códigos ordenados: os de um mesmo nível são contíguos (a seção agrupa divisões vizinhas)
+        totais: Dict[str, float] = {}
+        for chave, grupo in groupby(codigos, key=lambda c: self.chave_nivel(c, nivel)):
+            if chave is None:
+                continue
+            soma = sum(valores.get(c, 0) for c in grupo)
+            if soma:
+                totais[chave] = totais.get(chave, 0) + soma
+        return totais
+
+    def descrever(self, cnae: str) -> Dict[str, Any]:
+        """Código, níveis e dados da tabela cnae_hierarquia."""
+        codigo = limpar_cnae(cnae)
+        return {
+            "cnae": codigo,
+            **niveis_cnae(codigo),
+            **self.descricoes.get(codigo, {}),
+            "empresas": self.empresas_por_codigo.get(codigo, 0),
+        }
+
+
+# CNAEAnalyzer carregado por arquivo: {caminho: ((tamanho, mtime_ns), analyzer ou None)}
+_analyzers: Dict[Path, Tuple[Tuple[int, int], Optional[CNAEAnalyzer]]] = {}
+_analyzers_lock = threading.Lock()
+
+
+def obter_cnae_analyzer(arquivo: Optional[Union[str, Path]] = None) -> Optional[CNAEAnalyzer]:
+    """
+    CNAEAnalyzer carregado do arquivo (padrão: settings.cnae_arquivo), compartilhado pelo processo.
+
+    Returns:
+        Analisador carregado, ou None se o arquivo não existe ou não pôde ser lido
+    """
+    caminho = Path(arquivo or settings.cnae_arquivo)
+    try:
+        info = caminho.stat()
+    except OSError:
+        return None
+    assinatura = (info.st_size, info.st_mtime_ns)
+
+    with _analyzers_lock:
+        carregado = _analyzers.get(caminho)
+        if carregado is not None and carregado[0] == assinatura:
+            return carregado[1]
+        analyzer = CNAEAnalyzer(caminho)
+        if not analyzer.carregar_cnae_excel():
+            # Falha também fica guardada: não relê o arquivo até ele mudar
+            analyzer = None
+        _analyzers[caminho] = (assinatura, analyzer)
+        return analyzer
+
+
+# Índice por engine: {engine: (versão cnae_hierarquia, analyzer usado, índice)}
+_indices: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_indices_lock = threading.Lock()
+
+
+def indice_cnae(db: Session) -> IndiceCNAE:
+    """Índice CNAE compartilhado (tabela cnae_hierarquia + arquivo CNAE, se houver)."""
+    engine = db.get_bind()
+    versao = versao_tabela(db, TABELA_CNAE)
+    analyzer = obter_cnae_analyzer()
+    with _indices_lock:
+        atual = _indices.get(engine)
+        if atual is not None and atual[0] == versao and atual[1] is analyzer:
+            return atual[2]
+
+        descricoes = {}
+        for cnae, descricao, setor, segmento, ramo, categoria in db.query(
+            CNAEHierarquia.cnae, CNAEHierarquia.descricao, CNAEHierarquia.setor,
+            CNAEHierarquia.segmento, CNAEHierarquia.ramo, CNAEHierarquia.categoria,
+        ):
+            codigo = limpar_cnae(cnae)
+            if codigo:
+                descricoes[codigo] = {
+                    "descricao": descricao, "setor": setor, "segmento": segmento,
+                    "ramo": ramo, "categoria": categoria,
+                }
+        empresas = {}
+        if analyzer is not None:
+            for cnae, registros in analyzer.cnae_data.items():
+                codigo = limpar_cnae(cnae)
+                if codigo:
+                    empresas[codigo] = empresas.get(codigo, 0) + len(registros)
+
+        indice = IndiceCNAE(descricoes, empresas)
+        _indices[engine] = (versao, analyzer, indice)
+        logger.info(f"✅ Índice CNAE carregado: {len(indice)} códigos (versão {versao})")
+        return indice
@@ -0,0 +1,150 @@
+"""
+Arquivos JSON de dados do dashboard (data/*.json) carregados uma vez.
+
+/dashboard/dados-comexstat e /dashboard/dados-ncm-comexstat reabriam e
+reinterpretavam o arquivo a cada requisição e filtravam a lista inteira por
+UF/tipo. Agora:
+  - obter_conjunto_json devolve o conjunto carregado uma vez por arquivo
+    (relido só se o tamanho ou a data de modificação mudarem), com orjson
+    quando instalado;
+  - para listas, os índices (posições na ordem do arquivo) por UF, por tipo
+    (importação/exportação) e pelos dois juntos são montados na carga, e cada
+    item é serializado uma vez: a resposta filtrada só junta os bytes dos
+    itens do índice, sem percorrer a lista;
+  - o corpo da resposta sem filtros fica pronto.
+"""
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from loguru import logger
+
+# Import opcional - parser/serializador JSON mais rápido
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+DIRETORIO_RAIZ = Path(__file__).parent.parent.parent
+
+TIPOS = ("importacao", "exportacao")
+
+
+def _ler_json(conteudo: bytes) -> Any:
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.loads(conteudo)
+        except orjson.JSONDecodeError:
+            pass  # NaN/Infinity: só o json da biblioteca padrão aceita
+    return json.loads(conteudo)
+
+
+def serializar_json(valor: Any) -> bytes:
+    """JSON compacto em bytes (NaN vira null com orjson)."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(valor)
+    return json.dumps(valor, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def tipo_filtro(tipo: Optional[str]) -> Optional[str]:
+    """'importacao', 'exportacao' ou None, pelas regras dos endpoints ('import'/'export' no texto)."""
+    if not tipo:
+        return None
+    tipo_lower = tipo.lower()
+    if "import" in tipo_lower:
+        return "importacao"
+    if "export" in tipo_lower:
+        return "exportacao"
+    return None
+
+
+def _positivo(item: Dict[str, Any], campo: str) -> bool:
+    try:
+        return item.get(campo, 0) > 0
+    except TypeError:
+        return False
+
+
+class ConjuntoJSON:
+    """Conteúdo de um arquivo JSON, com índices e respostas pré-serializadas."""
+
+    def __init__(self, dados: Any):
+        self.dados = dados
+        # Corpo de {"success": true, "data": dados}
+        self.corpo = serializar_json({"success": True, "data": dados})
+        self._itens: List[bytes] = []
+        self._indices: Dict[Tuple[Optional[str], Optional[str]], List[int]] = {}
+        if isinstance(dados, list):
+            self._indexar(dados)
+
+    def _indexar(self, itens: List[Any]) -> None:
+        self._itens = [serializar_json(item) for item in itens]
+        todos = list(range(len(itens)))
+        self._indices[(None, None)] = todos
+        for posicao, item in enumerate(itens):
+            if not isinstance(item, dict):
+                continue
+            chaves_tipo = [None]
+            if _positivo(item, "valor_importacao_usd"):
+                chaves_tipo.append("importacao")
+            if _positivo(item, "valor_exportacao_usd"):
+                chaves_tipo.append("exportacao")
+            uf = str(item.get("uf", "")).upper()
+            for tipo in chaves_tipo:
+                if tipo is not None:
+                    self._indices.setdefault((None, tipo), []).append(posicao)
+                self._indices.setdefault((uf, tipo), []).append(posicao)
+
+    def __len__(self) -> int:
+        return len(self._itens)
+
+    def posicoes(self, uf: Optional[str] = None, tipo: Optional[str] = None) -> List[int]:
+        """Posições dos itens da UF (sem diferenciar maiúsculas) e do tipo, na ordem do arquivo."""
+        return self._indices.get(((uf.upper() if uf else None), tipo_filtro(tipo)), [])
+
+    def filtrar(self, uf: Optional[str] = None, tipo: Optional[str] = None, limite: Optional[int] = None) -> List[Any]:
+        """Itens filtrados (os próprios objetos carregados: não alterar)."""
+        return [self.dados[i] for i in self.posicoes(uf, tipo)[:limite]]
+
+    def corpo_filtrado(self, uf: Optional[str] = None, tipo: Optional[str] = None, limite: Optional[int] = None) -> bytes:
+        """Corpo de {"success": true, "data": itens filtrados}, juntando os itens já serializados."""
+        itens = b",".join(self._itens[i] for i in self.posicoes(uf, tipo)[:limite])
+        return b'{"success":true,"data":[' + itens + b"]}"
+
+
+# Conjuntos carregados: {caminho: ((tamanho, mtime_ns), conjunto ou None)}
+_conjuntos: Dict[Path, Tuple[Tuple[int, int], Optional[ConjuntoJSON]]] = {}
+_conjuntos_lock = threading.Lock()
+
+
+def obter_conjunto_json(arquivo: Union[str, Path]) -> Optional[ConjuntoJSON]:
+    """
+    Conjunto do arquivo JSON (caminho relativo à raiz do projeto), compartilhado pelo processo.
+
+    Returns:
+        Conjunto carregado, ou None se o arquivo não existe ou não pôde ser lido
+    """
+    caminho = Path(arquivo)
+    if not caminho.is_absolute():
+        caminho = DIRETORIO_RAIZ / caminho
+    try:
+        info = caminho.stat()
+    except OSError:
+        return None
+    assinatura = (info.st_size, info.st_mtime_ns)
+
+    with _conjuntos_lock:
+        carregado = _conjuntos.get(caminho)
+        if carregado is not None and carregado[0] == assinatura:
+            return carregado[1]
+        try:
+            conjunto = ConjuntoJSON(_ler_json(caminho.read_bytes()))
+            logger.info(f"✅ {caminho.name} carregado: {len(conjunto)} itens indexados")
+        except (OSError, ValueError, TypeError) as e:
+            # Falha também fica guardada: não relê o arquivo até ele mudar
+            logger.warning(f"⚠️ Erro ao carregar {caminho}: {e}")
+            conjunto = None
+        _conjuntos[caminho] = (assinatura, conjunto)
+        return conjunto
@@ -0,0 +1,268 @@
+"""
+Consulta em passada única dos agregados do /dashboard/stats sobre operacoes_comex.
+
+Usada quando os rollups não se aplicam (filtro de empresa em texto livre) ou estão
+desativados. Em vez de uma consulta por KPI, faz:
+  1. um GROUP BY tipo_operacao com agregados condicionais (CASE) para todos os totais;
+  2. uma única consulta com CTE + row_number() para as listas top-N e a série mensal.
+Funciona em SQLite (>= 3.25, funções de janela) e PostgreSQL.
+"""
+import sqlite3
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+from sqlalchemy import and_, case, func, literal_column, null, or_, select, true, union_all
+from sqlalchemy.orm import Session
+
+from database.models import OperacaoComex, TipoOperacao
+
+def _suporta_janela(db: Session) -> bool:
+    """SQLite só tem funções de janela a partir da 3.25."""
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite3.sqlite_version_info >= (3, 25, 0)
+    return True
+
+
+def _totais_por_tipo(
+    db: Session,
+    base_filters: list,
+    tipo_filtro: Optional[TipoOperacao],
+    filtro_importador,
+    filtro_exportador,
+) -> Dict[TipoOperacao, Dict[str, float]]:
+    """
+    Todos os totais escalares em um único GROUP BY tipo_operacao.
+
+    - *_tipo: linhas do tipo filtradas pela empresa do mesmo papel
+      (importações x filtro_importador, exportações x filtro_exportador);
+    - *_geral: linhas filtradas pela empresa em qualquer papel (OR), como filtros_valor.
+    """
+    O = OperacaoComex
+    cond_imp = filtro_importador if filtro_importador is not None else true()
+    cond_exp = filtro_exportador if filtro_exportador is not None else true()
+    cond_tipo = or_(
+        and_(O.tipo_operacao == TipoOperacao.IMPORTACAO, cond_imp),
+        and_(O.tipo_operacao == TipoOperacao.EXPORTACAO, cond_exp),
+    )
+    if filtro_importador is not None and filtro_exportador is not None:
+        cond_geral = or_(filtro_importador, filtro_exportador)
+    elif filtro_importador is not None or filtro_exportador is not None:
+        cond_geral = cond_imp if filtro_importador is not None else cond_exp
+    else:
+        cond_geral = true()
+
+    def _soma(condicao, coluna):
+        return func.sum(case((condicao, coluna), else_=null()))
+
+    def _contagem(condicao):
+        return func.count(case((condicao, O.id), else_=null()))
+
+    filtros = list(base_filters)
+    if tipo_filtro is not None:
+        filtros.append(O.tipo_operacao == tipo_filtro)
+    if filtro_importador is not None or filtro_exportador is not None:
+        filtros.append(or_(cond_tipo, cond_geral))
+
+    linhas = db.execute(
+        select(
+            O.tipo_operacao,
+            _soma(cond_tipo, O.peso_liquido_kg),
+            _soma(cond_tipo, O.valor_fob),
+            _soma(cond_tipo, O.quantidade_estatistica),
+            _contagem(cond_tipo),
+            _soma(cond_geral, O.valor_fob),
+            _soma(cond_geral, O.quantidade_estatistica),
+            _contagem(cond_geral),
+        ).where(*filtros).group_by(O.tipo_operacao)
+    ).all()
+
+    return {
+        tipo: {
+            "peso_tipo": float(peso or 0),
+            "valor_tipo": float(valor or 0),
+            "quantidade_tipo": float(qtd or 0),
+            "n_tipo": int(n or 0),
+            "valor_geral": float(valor_g or 0),
+            "quantidade_geral": float(qtd_g or 0),
+            "n_geral": int(n_g or 0),
+        }
+        for tipo, peso, valor, qtd, n, valor_g, qtd_g, n_g in linhas
+    }
+
+
+def _selects_dimensoes(filtradas) -> Dict[str, Any]:
+    """Um SELECT agrupado por dimensão, todos com as mesmas colunas."""
+    c = filtradas.c
+
+    def _dim(nome, chave, descricao, *filtros):
+        sel = select(
+            literal_column(f"'{nome}'").label("dimensao"),
+            chave.label("chave"),
+            descricao.label("descricao"),
+            func.sum(c.valor_fob).label("valor_total"),
+            func.count().label("total_operacoes"),
+            func.sum(c.peso_liquido_kg).label("peso_total"),
+        )
+        if filtros:
+            sel = sel.where(*filtros)
+        # NCM agrupa também pela descrição (como a consulta original)
+        return sel.group_by(chave, descricao) if nome == "ncm" else sel.group_by(chave)
+
+    return {
+        "ncm": _dim("ncm", c.ncm, c.descricao_produto),
+        "pais": _dim("pais", c.pais_origem_destino, null()),
+        "importador": _dim(
+            "importador", c.razao_social_importador, null(),
+            c.razao_social_importador.isnot(None), c.razao_social_importador != "",
+        ),
+        "exportador": _dim(
+            "exportador", c.razao_social_exportador, null(),
+            c.razao_social_exportador.isnot(None), c.razao_social_exportador != "",
+        ),
+        "mes": _dim("mes", c.mes_referencia, null()),
+    }
+
+
+def _listas_agrupadas(db: Session, filtros_valor: list, limite_top: int) -> Dict[str, List[tuple]]:
+    """Top-N por dimensão e série mensal em uma consulta (CTE + row_number)."""
+    O = OperacaoComex
+    filtradas = select(
+        O.id, O.ncm, O.descricao_produto, O.pais_origem_destino,
+        O.razao_social_importador, O.razao_social_exportador, O.mes_referencia,
+        O.valor_fob, O.peso_liquido_kg,
+    ).where(*filtros_valor).cte("filtradas")
+    selects = _selects_dimensoes(filtradas)
+
+    resultado: Dict[str, List[tuple]] = {nome: [] for nome in selects}
+    if _suporta_janela(db):
+        dims = union_all(*selects.values()).cte("dimensoes")
+        rn = func.row_number().over(
+            partition_by=dims.c.dimensao, order_by=dims.c.valor_total.desc()
+        ).label("rn")
+        ranqueadas = select(dims, rn).subquery("ranqueadas")
+        linhas = db.execute(
+            select(ranqueadas).where(
+                or_(ranqueadas.c.rn <= limite_top, ranqueadas.c.dimensao == "mes")
+            ).order_by(ranqueadas.c.dimensao, ranqueadas.c.rn)
+        ).all()
+        for dimensao, chave, descricao, valor, total, peso, _rn in linhas:
+            resultado[dimensao].append((chave, descricao, valor, total, peso))
+    else:
+        # SQLite antigo sem funções de janela: uma consulta por dimensão
+        for nome, sel in selects.items():
+            sel_ordenado = sel.order_by(literal_column("valor_total").desc())
+            if nome != "mes":
+                sel_ordenado = sel_ordenado.limit(limite_top)
+            resultado[nome] = [tuple(linha[1:]) for linha in db.execute(sel_ordenado).all()]
+    return resultado
+
+
+def calcular_agregados_brutos(
+    db: Session,
+    base_filters: list,
+    tipo_filtro: Optional[TipoOperacao] = None,
+    filtro_importador=None,
+    filtro_exportador=None,
+    limite_top: int = 10,
+) -> Dict[str, Any]:
+    """
+    Calcula os agregados do /dashboard/stats direto em operacoes_comex em duas consultas.
+
+    Returns:
+        Dicionário no mesmo formato de services.rollups.calcular_agregados_dashboard
+    """
+    O = OperacaoComex
+    por_tipo = _totais_por_tipo(db, base_filters, tipo_filtro, filtro_importador, filtro_exportador)
+    vazio = {
+        "peso_tipo": 0.0, "valor_tipo": 0.0, "quantidade_tipo": 0.0, "n_tipo": 0,
+        "valor_geral": 0.0, "quantidade_geral": 0.0, "n_geral": 0,
+    }
+    imp = por_tipo.get(TipoOperacao.IMPORTACAO, vazio)
+    exp = por_tipo.get(TipoOperacao.EXPORTACAO, vazio)
+
+    def _quantidade(qtd: float, n: int) -> float:
+        # Quantidade estatística vazia: usar contagem das linhas filtradas
+        return float(n) if qtd == 0 and n > 0 else qtd
+
+    valor_total = imp["valor_geral"] + exp["valor_geral"]
+    quantidade_total = _quantidade(
+        imp["quantidade_geral"] + exp["quantidade_geral"], imp["n_geral"] + exp["n_geral"]
+    )
+    volume_imp = imp["peso_tipo"] if tipo_filtro in (None, TipoOperacao.IMPORTACAO) else 0.0
+    volume_exp = exp["peso_tipo"] if tipo_filtro in (None, TipoOperacao.EXPORTACAO) else 0.0
+    if tipo_filtro is None:
+        valor_total_imp = imp["valor_tipo"]
+        valor_total_exp = exp["valor_tipo"]
+        quantidade_imp = _quantidade(imp["quantidade_tipo"], imp["n_tipo"])
+        quantidade_exp = _quantidade(exp["quantidade_tipo"], exp["n_tipo"])
+    elif tipo_filtro == TipoOperacao.IMPORTACAO:
+        valor_total_imp, valor_total_exp = valor_total, 0.0
+        quantidade_imp, quantidade_exp = quantidade_total, 0.0
+    else:
+        valor_total_imp, valor_total_exp = 0.0, valor_total
+        quantidade_imp, quantidade_exp = 0.0, quantidade_total
+
+    # filtros_valor: período/NCM + tipo + empresa (importador OU exportador)
+    filtros_valor = list(base_filters)
+    if tipo_filtro is not None:
+        filtros_valor.append(O.tipo_operacao == tipo_filtro)
+    if filtro_importador is not None and filtro_exportador is not None:
+        filtros_valor.append(or_(filtro_importador, filtro_exportador))
+    elif filtro_importador is not None:
+        filtros_valor.append(filtro_importador)
+    elif filtro_exportador is not None:
+        filtros_valor.append(filtro_exportador)
+
+    listas = _listas_agrupadas(db, filtros_valor, limite_top)
+    logger.debug(
+        f"📊 Agregados em passada única: {imp['n_geral'] + exp['n_geral']} operações, "
+        f"{len(listas['mes'])} meses"
+    )
+
+    def _empresas(linhas):
+        return [
+            {
+                "nome": nome or "N/A",
+                "valor_total": float(valor or 0),
+                "total_operacoes": int(total or 0),
+                "peso_total": float(peso or 0),
+            }
+            for nome, _desc, valor, total, peso in linhas
+        ]
+
+    return {
+        "volume_imp": volume_imp,
+        "volume_exp": volume_exp,
+        "valor_total": valor_total,
+        "quantidade_total": quantidade_total,
+        "valor_total_imp": valor_total_imp,
+        "valor_total_exp": valor_total_exp,
+        "quantidade_imp": quantidade_imp,
+        "quantidade_exp": quantidade_exp,
+        "principais_ncms": [
+            {
+                "ncm": ncm,
+                "descricao": desc[:100] if desc else "",
+                "valor_total": float(valor or 0),
+                "total_operacoes": int(total or 0),
+            }
+            for ncm, desc, valor, total, _peso in listas["ncm"]
+        ],
+        "principais_paises": [
+            {
+                "pais": pais,
+                "valor_total": float(valor or 0),
+                "total_operacoes": int(total or 0),
+            }
+            for pais, _desc, valor, total, _peso in listas["pais"]
+        ],
+        "principais_importadores": _empresas(listas["importador"]),
+        "principais_exportadores": _empresas(listas["exportador"]),
+        "por_mes": sorted(
+            (
+                (mes, int(total or 0), float(valor or 0), float(peso or 0))
+                for mes, _desc, valor, total, peso in listas["mes"]
+            ),
+            key=lambda linha: (linha[0] is None, linha[0] or ""),
+        ),
+    }
@@ -0,0 +1,249 @@
+"""
+Lista de empresas exportadoras/importadoras do MDIC em tabela local (empresas_mdic).
+
+O autocomplete baixava e processava os arquivos do gov.br dentro da requisição
+(EmpresasMDICScraper.coletar_empresas a cada tecla sem resultado local). Agora:
+  - um job em segundo plano (DataUpdater.atualizar_empresas_mdic, no startup e no
+    scheduler) revalida os arquivos com ETag/Last-Modified (snapshot.json junto
+    dos arquivos em data_dir/empresas_mdic) e só processa os arquivos e regrava a
+    tabela quando algum arquivo mudou ou a tabela está vazia (os arquivos em disco
+    são o snapshot);
+  - a gravação é incremental por CNPJ (insere os novos, atualiza os alterados,
+    remove os que saíram da lista) e incrementa a versão "empresas_mdic"
+    (services.versoes); o próprio job reindexa os nomes no índice empresas_busca
+    (fonte "mdic"), e o motor em memória é recarregado pela versão nova;
+  - o autocomplete só consulta os índices como estão (buscar_empresas_mdic),
+    sem reconstruir nada dentro da requisição;
+  - cruzamentos, sinergias e sugestões usam o índice CNPJ -> empresa em memória
+    (indice_empresas_mdic), compartilhado e recarregado quando a versão muda.
+"""
+import threading
+import unicodedata
+import weakref
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+from sqlalchemy.orm import Session
+
+from database.models import EmpresaMDIC
+from services.busca_empresas import FONTE_MDIC, buscar_empresas, sincronizar_indice_cadastro
+from services.versoes import TABELA_EMPRESAS_MDIC, registrar_alteracao, versao_tabela
+
+# Colunas comparadas na gravação incremental (data_atualizacao só muda junto com elas)
+CAMPOS_EMPRESA = (
+    "nome", "razao_social", "nome_fantasia", "uf", "municipio", "tipo_operacao",
+    "faixa_valor", "ano", "importadora", "exportadora",
+)
+
+# Como no filtro antigo do autocomplete: tipo vazio vale para os dois papéis
+_TIPOS_PAPEL = {
+    "importador": ("importacao", ""),
+    "exportador": ("exportacao", ""),
+}
+
+
+def _tipo_normalizado(tipo: Optional[str]) -> str:
+    texto = unicodedata.normalize("NFKD", (tipo or "").strip().lower())
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+
+def gravar_empresas_mdic(db: Session, empresas: List[Dict[str, Any]]) -> int:
+    """
+    Atualiza empresas_mdic para a lista processada do MDIC (um registro por CNPJ;
+    importadora/exportadora acumulam entre os arquivos). Só os CNPJs novos,
+    alterados ou que saíram da lista são gravados.
+
+    Returns:
+        Quantidade de CNPJs na lista
+    """
+    agora = datetime.utcnow()
+    por_cnpj: Dict[str, Dict[str, Any]] = {}
+    for emp in empresas:
+        cnpj = emp.get("cnpj")
+        nome = (emp.get("razao_social") or emp.get("nome_fantasia") or "").strip()
+        if not cnpj or not nome:
+            continue
+        tipo = _tipo_normalizado(emp.get("tipo_operacao"))
+        registro = por_cnpj.get(cnpj)
+        if registro is None:
+            registro = por_cnpj[cnpj] = {
+                "cnpj": cnpj,
+                "nome": nome[:255],
+                "razao_social": (emp.get("razao_social") or None),
+                "nome_fantasia": (emp.get("nome_fantasia") or None),
+                "uf": (emp.get("uf") or None),
+                "municipio": (emp.get("municipio") or None),
+                "tipo_operacao": (emp.get("tipo_operacao") or None),
+                "faixa_valor": (emp.get("faixa_valor") or None),
+                "ano": (str(emp["ano"]) if emp.get("ano") else None),
+                "importadora": 0,
+                "exportadora": 0,
+                "data_atualizacao": agora,
+            }
+        if tipo in _TIPOS_PAPEL["importador"]:
+            registro["importadora"] = 1
+        if tipo in _TIPOS_PAPEL["exportador"]:
+            registro["exportadora"] = 1
+
+    colunas = [getattr(EmpresaMDIC, campo) for campo in CAMPOS_EMPRESA]
+    existentes = {
+        cnpj: (id_, tuple(valores))
+        for id_, cnpj, *valores in db.query(EmpresaMDIC.id, EmpresaMDIC.cnpj, *colunas).yield_per(10000)
+    }
+    novos: List[Dict[str, Any]] = []
+    alterados: List[Dict[str, Any]] = []
+    for cnpj, registro in por_cnpj.items():
+        atual = existentes.pop(cnpj, None)
+        if atual is None:
+            novos.append(registro)
+        elif atual[1] != tuple(registro[campo] for campo in CAMPOS_EMPRESA):
+            alterados.append({"id": atual[0], **registro})
+    removidos = [id_ for id_, _valores in existentes.values()]
+
+    if not (novos or alterados or removidos):
+        logger.info(f"✅ Empresas MDIC sem alterações ({len(por_cnpj)} CNPJs)")
+        return len(por_cnpj)
+
+    try:
+        for i in range(0, len(removidos), 500):
+            db.query(EmpresaMDIC).filter(EmpresaMDIC.id.in_(removidos[i:i + 500])).delete(synchronize_session=False)
+        for i in range(0, len(alterados), 10000):
+            db.bulk_update_mappings(EmpresaMDIC, alterados[i:i + 10000])
+        for i in range(0, len(novos), 10000):
+            db.bulk_insert_mappings(EmpresaMDIC, novos[i:i + 10000])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    registrar_alteracao(db, TABELA_EMPRESAS_MDIC)
+    logger.info(
+        f"💾 Empresas MDIC gravadas: {len(novos)} novas, {len(alterados)} alteradas, "
+        f"{len(removidos)} removidas ({len(por_cnpj)} CNPJs)"
+    )
+    return len(por_cnpj)
+
+
+async def sincronizar_empresas_mdic(db: Session, scraper=None, ano: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Revalida os arquivos do MDIC e, se algum mudou (ou a tabela está vazia),
+    processa os arquivos e atualiza empresas_mdic. Em seguida reindexa a fonte
+    "mdic" de empresas_busca se a versão de empresas_mdic mudou desde a última
+    indexação.
+
+    Args:
+        scraper: EmpresasMDICScraper (um novo se None)
+        ano: Ano dos arquivos (None = ano atual)
+    """
+    if scraper is None:
+        from data_collector.empresas_mdic_scraper import EmpresasMDICScraper
+        scraper = EmpresasMDICScraper()
+
+    arquivos = await scraper.baixar_arquivos(ano, condicional=True)
+    vazia = db.query(EmpresaMDIC.id).first() is None
+    if not scraper.arquivos_alterados and not vazia:
+        logger.info("✅ Lista de empresas MDIC sem alterações na origem")
+        sincronizar_indice_cadastro(db, FONTE_MDIC)
+        return {"atualizado": False, "total_empresas": db.query(EmpresaMDIC.id).count()}
+
+    empresas = [empresa for arquivo in arquivos for empresa in scraper.parse_csv_empresas(arquivo)]
+    if not empresas:
+        logger.warning("⚠️ Nenhuma empresa MDIC processada; tabela local mantida")
+        return {"atualizado": False, "total_empresas": 0}
+    total = gravar_empresas_mdic(db, empresas)
+    sincronizar_indice_cadastro(db, FONTE_MDIC)
+    return {"atualizado": True, "total_empresas": total}
+
+
+# Índice CNPJ -> empresa por engine, com a versão de empresas_mdic em que foi carregado
+_indices: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_indices_lock = threading.Lock()
+
+
+def indice_empresas_mdic(db: Optional[Session] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Empresas do MDIC por CNPJ, no formato de EmpresasMDICScraper.parse_csv_empresas
+    (textos ausentes como "") mais importadora/exportadora.
+
+    O dicionário é compartilhado entre as chamadas e recarregado da tabela só
+    quando a versão de empresas_mdic muda; quem usa não deve alterá-lo.
+
+    Args:
+        db: Sessão do banco (None = abre uma própria)
+    """
+    if db is None:
+        from database import SessionLocal
+        db = SessionLocal()
+        try:
+            return indice_empresas_mdic(db)
+        finally:
+            db.close()
+
+    engine = db.get_bind()
+    versao = versao_tabela(db, TABELA_EMPRESAS_MDIC)
+    with _indices_lock:
+        carregado = _indices.get(engine)
+        if carregado is not None and carregado[0] == versao:
+            return carregado[1]
+
+        indice: Dict[str, Dict[str, Any]] = {}
+        for (cnpj, razao_social, nome_fantasia, uf, municipio, tipo_operacao, faixa_valor, ano,
+             importadora, exportadora) in db.query(
+            EmpresaMDIC.cnpj, EmpresaMDIC.razao_social, EmpresaMDIC.nome_fantasia, EmpresaMDIC.uf,
+            EmpresaMDIC.municipio, EmpresaMDIC.tipo_operacao, EmpresaMDIC.faixa_valor, EmpresaMDIC.ano,
+            EmpresaMDIC.importadora, EmpresaMDIC.exportadora,
+        ).yield_per(10000):
+            indice[cnpj] = {
+                "cnpj": cnpj,
+                "razao_social": razao_social or "",
+                "nome_fantasia": nome_fantasia or "",
+                "uf": uf or "",
+                "municipio": municipio or "",
+                "tipo_operacao": tipo_operacao or "",
+                "faixa_valor": faixa_valor or "",
+                "ano": ano or "",
+                "importadora": bool(importadora),
+                "exportadora": bool(exportadora),
+            }
+        _indices[engine] = (versao, indice)
+    logger.info(f"✅ Índice de empresas MDIC carregado: {len(indice)} CNPJs (versão {versao})")
+    return indice
+
+
+def buscar_empresas_mdic(
+    db: Session,
+    termo: Optional[str],
+    papel: str,
+    limite: int,
+    motor=None,
+) -> List[Dict[str, Any]]:
+    """
+    Empresas do MDIC cujo nome contém o termo, só por índice: nomes no motor em
+    memória (ou em empresas_busca, fonte "mdic", como está: a reindexação fica em
+    sincronizar_empresas_mdic) e dados por nome em empresas_mdic.
+
+    Args:
+        papel: "importador" ou "exportador"
+        motor: MotorAutocomplete carregado, se houver
+    """
+    if limite <= 0:
+        return []
+    if motor is not None:
+        nomes = [nome for nome, _t, _v in motor.buscar(termo, papel, limite, fonte=FONTE_MDIC)]
+    else:
+        nomes = [nome for nome, _t, _v in (buscar_empresas(db, termo, papel, limite, fonte=FONTE_MDIC) or [])]
+    if not nomes:
+        return []
+
+    coluna_papel = EmpresaMDIC.importadora if papel == "importador" else EmpresaMDIC.exportadora
+    dados: Dict[str, Dict[str, Any]] = {}
+    for nome, cnpj, uf, faixa_valor in db.query(
+        EmpresaMDIC.nome, EmpresaMDIC.cnpj, EmpresaMDIC.uf, EmpresaMDIC.faixa_valor
+    ).filter(EmpresaMDIC.nome.in_(nomes), coluna_papel == 1).all():
+        dados.setdefault(nome.strip(), {"cnpj": cnpj, "uf": uf, "faixa_valor": faixa_valor})
+
+    return [
+        {"nome": nome, **dados[nome]}
+        for nome in nomes
+        if nome in dados
+    ]
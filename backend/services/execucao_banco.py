@@ -0,0 +1,119 @@
+"""
+Execução das rotas que usam o banco fora do event loop.
+
+As rotas eram `async def` chamando a Session síncrona do SQLAlchemy: uma consulta
+lenta (/dashboard/stats, /buscar) parava o event loop inteiro, inclusive /health,
+e a instância única do Render atendia uma requisição por vez. Agora:
+  - as rotas que só usam o banco são funções síncronas marcadas com @rota_banco;
+    cada chamada roda num ThreadPoolExecutor dedicado (settings.db_executor_threads
+    threads) e o loop fica livre para as demais requisições. A rota continua
+    aguardável (await rota(...)), como quando era `async def`;
+  - rotas que também aguardam I/O assíncrono usam
+    `await executar_no_banco(funcao, ...)` no trecho que usa o banco;
+  - respostas em streaming que leem o banco aos poucos usam
+    `iterar_no_banco(iterador, db)`: cada next() roda no executor.
+
+Sessões de SQLite em memória (pool SingletonThreadPool: uma conexão, e um banco,
+por thread) rodam na thread de quem chamou; em outra thread veriam um banco vazio.
+Com settings.db_executor_threads = 0 tudo roda no event loop (comportamento antigo).
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import SingletonThreadPool
+
+from config import settings
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def obter_executor_banco() -> ThreadPoolExecutor:
+    """Executor das rotas com banco (criado na primeira chamada)."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            threads = settings.db_executor_threads
+            _executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="banco")
+            logger.info(f"✅ Executor do banco iniciado com {threads} threads")
+        return _executor
+
+
+def encerrar_executor_banco(esperar: bool = True) -> None:
+    """Encerra o executor (shutdown da aplicação); a próxima chamada cria outro."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=esperar)
+        logger.info("✅ Executor do banco encerrado")
+
+
+def _exige_thread_atual(args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> bool:
+    """True se alguma sessão recebida tem conexões por thread (SQLite em memória)."""
+    for valor in (*args, *kwargs.values()):
+        if isinstance(valor, Session):
+            pool = getattr(valor.get_bind(), "pool", None)
+            if isinstance(pool, SingletonThreadPool):
+                return True
+    return False
+
+
+async def executar_no_banco(funcao: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Executa funcao(*args, **kwargs) no executor do banco e aguarda o resultado."""
+    if settings.db_executor_threads <= 0 or _exige_thread_atual(args, kwargs):
+        return funcao(*args, **kwargs)
+    contexto = contextvars.copy_context()
+    chamada = functools.partial(contexto.run, funcao, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(obter_executor_banco(), chamada)
+
+
+async def iterar_no_banco(iterador: Iterator[Any], *sessoes: Session) -> AsyncIterator[Any]:
+    """
+    Percorre um iterador síncrono que usa o banco sem bloquear o event loop.
+
+    `sessoes` são as sessões de que o iterador depende (decidem se ele precisa
+    rodar na thread atual, como em executar_no_banco). Se quem consome parar
+    antes do fim (cliente desconectou), o iterador é fechado.
+    """
+    fim = object()
+
+    def proximo(*_sessoes: Session) -> Any:
+        return next(iterador, fim)
+
+    def fechar(*_sessoes: Session) -> None:
+        fechar_iterador = getattr(iterador, "close", None)
+        if fechar_iterador is not None:
+            fechar_iterador()
+
+    try:
+        while True:
+            item = await executar_no_banco(proximo, *sessoes)
+            if item is fim:
+                break
+            yield item
+    finally:
+        await executar_no_banco(fechar, *sessoes)
+
+
+def rota_banco(funcao: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Marca uma rota síncrona que usa o banco: o FastAPI a vê como `async def` com a
+    mesma assinatura (parâmetros e Depends) e o corpo roda no executor do banco.
+
+    Usar abaixo do decorator da rota:
+        @app.get("/buscar")
+        @rota_banco
+        def buscar(db: Session = Depends(get_db)): ...
+    """
+    @functools.wraps(funcao)
+    async def rota(*args: Any, **kwargs: Any) -> Any:
+        return await executar_no_banco(funcao, *args, **kwargs)
+
+    return rota
@@ -0,0 +1,236 @@
+"""
+Gerenciador de downloads dos CSVs mensais do MDIC (MDICCSVCollector, CSVDataScraper).
+
+Os coletores baixavam um mês de cada vez, com pausas fixas de 1-2 s entre arquivos,
+e guardavam o corpo inteiro em memória antes de gravar. Aqui:
+  - vários arquivos em paralelo (settings.download_concorrencia), na sessão HTTP
+    compartilhada (services.clientes_http);
+  - o corpo vai para disco em blocos (settings.download_bloco_bytes) num arquivo
+    <nome>.part, renomeado só quando completo;
+  - um .part interrompido é retomado com Range + If-Range (se o arquivo mudou no
+    servidor, a resposta vem inteira e o download recomeça);
+  - um arquivo já baixado só é baixado de novo se o ETag (ou, sem ETag, o
+    Content-Length) informado pelo HEAD mudou.
+Os validadores ficam em <diretorio>/downloads.json, por nome de arquivo.
+"""
+import asyncio
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import aiohttp
+from loguru import logger
+
+from config import settings
+from services.clientes_http import obter_sessao
+
+# Downloads grandes: sem limite total, só de conexão e de leitura entre blocos
+TIMEOUT_DOWNLOAD = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=120)
+TIMEOUT_HEAD = aiohttp.ClientTimeout(total=30)
+
+
+class GerenciadorDownloads:
+    """Downloads concorrentes, em blocos e retomáveis, para um diretório."""
+
+    METADADOS_ARQUIVO = "downloads.json"
+
+    def __init__(
+        self,
+        diretorio: Path,
+        concorrencia: Optional[int] = None,
+        tamanho_bloco: Optional[int] = None,
+        tamanho_minimo: int = 100,
+    ):
+        self.diretorio = Path(diretorio)
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        self.concorrencia = concorrencia or settings.download_concorrencia
+        self.tamanho_bloco = tamanho_bloco or settings.download_bloco_bytes
+        self.tamanho_minimo = tamanho_minimo
+        self.stats: Dict[str, int] = {"baixados": 0, "inalterados": 0, "retomados": 0, "falhas": 0, "bytes": 0}
+        self._metadados = self._carregar_metadados()
+
+    # ------------------------------------------------------------------ metadados
+
+    def _carregar_metadados(self) -> Dict[str, Dict[str, Any]]:
+        caminho = self.diretorio / self.METADADOS_ARQUIVO
+        if not caminho.exists():
+            return {}
+        try:
+            return json.loads(caminho.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Metadados de downloads ilegíveis ({caminho}), ignorando: {e}")
+            return {}
+
+    def _registrar(self, nome: str, **dados: Any) -> None:
+        self._metadados[nome] = dados
+        caminho = self.diretorio / self.METADADOS_ARQUIVO
+        temporario = caminho.with_suffix(".tmp")
+        temporario.write_text(json.dumps(self._metadados, ensure_ascii=False, indent=2), encoding="utf-8")
+        temporario.replace(caminho)
+
+    # ------------------------------------------------------------------ downloads
+
+    async def baixar(
+        self,
+        urls: Sequence[str],
+        destino: Path,
+        sessao: Optional[aiohttp.ClientSession] = None,
+    ) -> Optional[Path]:
+        """
+        Baixa `destino` da primeira URL que responder com o arquivo.
+
+        Args:
+            urls: URLs candidatas, na ordem de preferência
+            destino: Caminho final do arquivo
+            sessao: Sessão HTTP (padrão: a sessão compartilhada)
+
+        Returns:
+            Caminho do arquivo (baixado ou inalterado) ou None
+        """
+        sessao = sessao or obter_sessao()
+        destino = Path(destino)
+        existente = destino.exists() and destino.stat().st_size > 0
+        for url in urls:
+            try:
+                if existente and await self._inalterado(sessao, url, destino):
+                    self.stats["inalterados"] += 1
+                    logger.debug(f"Arquivo sem alterações no servidor: {destino.name}")
+                    return destino
+                if await self._baixar_url(sessao, url, destino):
+                    return destino
+            except Exception as e:
+                logger.debug(f"Erro ao baixar {url}: {e}")
+
+        self.stats["falhas"] += 1
+        if existente:
+            # Servidor indisponível: a cópia em disco continua valendo
+            return destino
+        logger.warning(f"⚠️ Não foi possível baixar {destino.name}")
+        return None
+
+    async def baixar_varios(self, itens: Iterable[Tuple[Sequence[str], Path]]) -> List[Path]:
+        """
+        Baixa vários arquivos em paralelo (até self.concorrencia ao mesmo tempo).
+
+        Args:
+            itens: Pares (urls candidatas, destino); destinos repetidos são baixados uma vez
+
+        Returns:
+            Caminhos obtidos, na ordem dos itens
+        """
+        pendentes: Dict[Path, Sequence[str]] = {}
+        for urls, destino in itens:
+            pendentes.setdefault(Path(destino), urls)
+
+        semaforo = asyncio.Semaphore(self.concorrencia)
+        sessao = obter_sessao()
+
+        async def _baixar(urls, destino):
+            async with semaforo:
+                return await self.baixar(urls, destino, sessao)
+
+        resultados = await asyncio.gather(*(_baixar(urls, destino) for destino, urls in pendentes.items()))
+        logger.info(
+            f"📊 Downloads: {self.stats['baixados']} baixados ({self.stats['retomados']} retomados, "
+            f"{self.stats['bytes']:,} bytes), {self.stats['inalterados']} inalterados, {self.stats['falhas']} falhas"
+        )
+        return [caminho for caminho in resultados if caminho]
+
+    async def _inalterado(self, sessao: aiohttp.ClientSession, url: str, destino: Path) -> bool:
+        """HEAD na URL e comparação com o que foi baixado antes (ETag ou tamanho)."""
+        async with sessao.head(url, timeout=TIMEOUT_HEAD, allow_redirects=True) as resposta:
+            if resposta.status != 200:
+                return False
+            etag = resposta.headers.get("ETag")
+            tamanho = resposta.headers.get("Content-Length")
+        anterior = self._metadados.get(destino.name) or {}
+        local = destino.stat().st_size
+        if anterior and not anterior.get("completo"):
+            # Nova versão começou a ser baixada (.part pendente)
+            return False
+        if etag and anterior.get("etag"):
+            return etag == anterior["etag"]
+        if tamanho is not None and int(tamanho) == local:
+            if not anterior:
+                # Arquivo baixado antes do gerenciador: passa a ter validadores
+                self._registrar(destino.name, url=url, etag=etag, tamanho=local, completo=True)
+            return True
+        return False
+
+    async def _baixar_url(self, sessao: aiohttp.ClientSession, url: str, destino: Path) -> bool:
+        parcial = destino.with_name(destino.name + ".part")
+        anterior = self._metadados.get(destino.name) or {}
+        headers = {}
+        inicio = parcial.stat().st_size if parcial.exists() else 0
+        validador = anterior.get("etag") or anterior.get("last_modified")
+        if inicio and anterior.get("url") == url and not anterior.get("completo") and validador:
+            headers["Range"] = f"bytes={inicio}-"
+            headers["If-Range"] = validador
+        else:
+            inicio = 0
+
+        logger.info(f"Baixando: {url}" + (f" (retomando de {inicio:,} bytes)" if inicio else ""))
+        async with sessao.get(url, headers=headers, timeout=TIMEOUT_DOWNLOAD) as resposta:
+            if resposta.status == 206 and inicio:
+                total = _total_content_range(resposta.headers.get("Content-Range"))
+                modo = "ab"
+                self.stats["retomados"] += 1
+            elif resposta.status == 200:
+                # Corpo comprimido: Content-Length não é o tamanho do que vai para o disco
+                total = None if resposta.headers.get("Content-Encoding") else resposta.content_length
+                inicio, modo = 0, "wb"
+            else:
+                logger.debug(f"Status {resposta.status} para {url}")
+                return False
+
+            if "html" in resposta.headers.get("Content-Type", "").lower():
+                logger.warning(f"⚠️ URL retornou HTML em vez de CSV: {url}")
+                return False
+
+            # Validadores gravados antes do corpo: um download interrompido pode ser retomado
+            self._registrar(
+                destino.name,
+                url=url,
+                etag=resposta.headers.get("ETag"),
+                last_modified=resposta.headers.get("Last-Modified"),
+                tamanho=total,
+                completo=False,
+            )
+            recebidos = 0
+            with open(parcial, modo) as arquivo:
+                async for bloco in resposta.content.iter_chunked(self.tamanho_bloco):
+                    if recebidos == 0 and inicio == 0 and _parece_html(bloco):
+                        logger.warning(f"⚠️ Arquivo baixado parece ser HTML, não CSV: {url}")
+                        arquivo.close()
+                        parcial.unlink()
+                        return False
+                    arquivo.write(bloco)
+                    recebidos += len(bloco)
+
+        tamanho = parcial.stat().st_size
+        self.stats["bytes"] += recebidos
+        if total is not None and tamanho != total:
+            logger.warning(f"⚠️ Download incompleto de {destino.name} ({tamanho:,}/{total:,} bytes); será retomado")
+            return False
+        if tamanho <= self.tamanho_minimo:
+            logger.warning(f"Arquivo muito pequeno: {tamanho} bytes ({url})")
+            parcial.unlink()
+            return False
+
+        parcial.replace(destino)
+        self._registrar(destino.name, **{**self._metadados[destino.name], "tamanho": tamanho, "completo": True})
+        self.stats["baixados"] += 1
+        logger.success(f"✅ Baixado: {destino.name} ({tamanho:,} bytes)")
+        return True
+
+
+def _total_content_range(valor: Optional[str]) -> Optional[int]:
+    """Tamanho total de um cabeçalho 'bytes 100-199/200' (None se desconhecido)."""
+    encontrado = re.search(r"/(\d+)\s*$", valor or "")
+    return int(encontrado.group(1)) if encontrado else None
+
+
+def _parece_html(bloco: bytes) -> bool:
+    inicio = bloco[:100].decode("utf-8", errors="ignore").strip().lower()
+    return inicio.startswith("<!doctype") or inicio.startswith("<html")
@@ -0,0 +1,276 @@
+"""
+Transformação colunar das planilhas do ComexStat (H_EXPORTACAO_E IMPORTACAO_GERAL).
+
+Substitui o df.iterrows() de processar_excel_comex_task: os aliases de coluna são
+resolvidos uma vez por planilha, números ("1.234,56"), meses ("03", "Março") e
+UF/país/descrição são convertidos com operações vetorizadas do pandas, e as
+linhas de exportação/importação saem por máscara (valor FOB > 0), em lotes de
+dicionários prontos para bulk_insert_mappings.
+
+Regras iguais às do loop antigo:
+  - linhas sem "Código NCM" (ou com menos de 4 caracteres) são ignoradas;
+  - NCM com 8+ caracteres é cortado em 8, menor é completado com zeros à esquerda;
+  - o mês é o primeiro número (1-2 dígitos) do texto ou o nome do mês; inválido vira janeiro;
+  - entre aliases de um valor vale o primeiro não vazio/não zero (como `a or b or c`).
+"""
+import re
+from datetime import date
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+from sqlalchemy.orm import Session
+
+from database.models import OperacaoComex, TipoOperacao, ViaTransporte
+
+TAMANHO_LOTE_PADRAO = 50000
+
+MESES = {
+    'janeiro': 1, 'fevereiro': 2, 'março': 3, 'marco': 3,
+    'abril': 4, 'maio': 5, 'junho': 6,
+    'julho': 7, 'agosto': 8, 'setembro': 9,
+    'outubro': 10, 'novembro': 11, 'dezembro': 12
+}
+
+# Campo -> colunas aceitas, em ordem de prioridade
+ALIASES_COLUNAS: Dict[str, List[str]] = {
+    "ncm": ['Código NCM'],
+    "descricao": ['Descrição NCM'],
+    "uf": ['UF Produto', 'UF do Produto'],
+    "pais": ['Países'],
+    "mes": ['Mês'],
+    "valor_exp": ['Exportação - 2025 - Valor US$ FOB', 'Exportação - Valor US$ FOB', 'Valor Exportação'],
+    "peso_exp": ['Exportação - 2025 - Quilograma Líquido', 'Exportação - Quilograma Líquido', 'Peso Exportação'],
+    "quantidade_exp": [
+        'Exportação - 2025 - Quantidade Estatística', 'Exportação - Quantidade Estatística', 'Quantidade Exportação'
+    ],
+    "valor_imp": ['Importação - 2025 - Valor US$ FOB', 'Importação - Valor US$ FOB', 'Valor Importação'],
+    "peso_imp": ['Importação - 2025 - Quilograma Líquido', 'Importação - Quilograma Líquido', 'Peso Importação'],
+    "quantidade_imp": [
+        'Importação - 2025 - Quantidade Estatística', 'Importação - Quantidade Estatística', 'Quantidade Importação'
+    ],
+}
+
+
+def ano_do_arquivo(nome_arquivo: str) -> int:
+    """Ano no nome do arquivo (20xx) ou o ano atual."""
+    ano_match = re.search(r'20\d{2}', nome_arquivo or "")
+    return int(ano_match.group()) if ano_match else date.today().year
+
+
+def resolver_colunas(colunas) -> Dict[str, List[str]]:
+    """Para cada campo, os aliases presentes na planilha (na ordem de prioridade)."""
+    existentes = set(colunas)
+    return {campo: [c for c in aliases if c in existentes] for campo, aliases in ALIASES_COLUNAS.items()}
+
+
+def _texto(serie: pd.Series) -> pd.Series:
+    """str(valor).strip() onde há valor; NaN onde não há (pandas 2 e 3)."""
+    return serie.astype(str).str.strip().where(serie.notna())
+
+
+def _primeiro_texto(df: pd.DataFrame, colunas: List[str]) -> pd.Series:
+    """Texto da primeira coluna com valor (como `a if notna(a) else b if notna(b) else None`)."""
+    resultado = pd.Series(np.nan, index=df.index, dtype=object)
+    for coluna in reversed(colunas):
+        texto = _texto(df[coluna])
+        resultado = texto.where(texto.notna(), resultado)
+    return resultado
+
+
+def _coalescer(df: pd.DataFrame, colunas: List[str]) -> pd.Series:
+    """Primeiro valor "verdadeiro" entre as colunas (NaN conta como verdadeiro, como no `or`)."""
+    if not colunas:
+        return pd.Series(0.0, index=df.index)
+    resultado = df[colunas[-1]]
+    for coluna in reversed(colunas[:-1]):
+        serie = df[coluna]
+        falso = serie.isin([0, ""])
+        resultado = serie.where(~falso, resultado)
+    return resultado
+
+
+def converter_numeros(serie: pd.Series) -> pd.Series:
+    """
+    Converte números em formato brasileiro ou americano ("1.234,56", "1234,5", "1234.5").
+    Vazio ou inválido vira 0.0.
+    """
+    if is_numeric_dtype(serie) and not is_bool_dtype(serie):
+        return serie.astype("float64").fillna(0.0)
+    numeros = pd.to_numeric(serie, errors="coerce")
+    pendentes = numeros.isna() & serie.notna()
+    if pendentes.any():
+        texto = serie[pendentes].astype(str).str.strip()
+        virgula = texto.str.contains(",", regex=False)
+        ponto = texto.str.contains(".", regex=False)
+        texto = texto.where(~(virgula & ponto), texto.str.replace(".", "", regex=False))
+        texto = texto.where(~virgula, texto.str.replace(",", ".", regex=False))
+        numeros[pendentes] = pd.to_numeric(texto, errors="coerce")
+    return numeros.astype("float64").fillna(0.0)
+
+
+def extrair_meses(serie: pd.Series) -> pd.Series:
+    """Mês (1-12) de cada linha: primeiro número do texto ou nome do mês; inválido vira 1."""
+    texto = _texto(serie).fillna("")
+    meses = pd.to_numeric(texto.str.extract(r'(\d{1,2})', expand=False), errors="coerce")
+    sem_numero = meses.isna() & (texto != "")
+    if sem_numero.any():
+        minusculo = texto[sem_numero].str.lower()
+        por_nome = pd.Series(np.nan, index=minusculo.index)
+        # Ordem inversa: o primeiro nome do dicionário encontrado no texto prevalece
+        for nome, numero in reversed(list(MESES.items())):
+            por_nome = por_nome.mask(minusculo.str.contains(nome, regex=False), numero)
+        meses[sem_numero] = por_nome
+    return meses.where(meses.between(1, 12), 1).astype("int64")
+
+
+def _registros(
+    base: pd.DataFrame,
+    mascara: pd.Series,
+    tipo: TipoOperacao,
+    valor: pd.Series,
+    peso: pd.Series,
+    quantidade: pd.Series,
+) -> List[dict]:
+    if not mascara.any():
+        return []
+    parte = base[mascara].copy()
+    parte['tipo_operacao'] = tipo
+    parte['valor_fob'] = valor[mascara]
+    parte['peso_liquido_kg'] = peso[mascara]
+    parte['quantidade_estatistica'] = quantidade[mascara]
+    return parte.to_dict("records")
+
+
+def transformar_planilha_comex(
+    df: pd.DataFrame,
+    nome_original: str,
+    ano: Optional[int] = None,
+    tamanho_lote: int = TAMANHO_LOTE_PADRAO,
+    estatisticas: Optional[dict] = None,
+) -> Iterator[List[dict]]:
+    """
+    Converte a planilha em lotes de operações (dicts de OperacaoComex).
+
+    Args:
+        df: Planilha ou lote dela (services.leitura_planilhas.ler_em_lotes)
+        nome_original: Nome do arquivo (arquivo_origem e detecção do ano)
+        ano: Ano das operações (None = detectar pelo nome do arquivo)
+        tamanho_lote: Linhas da planilha por lote
+        estatisticas: Dict atualizado com total_registros, importacoes e exportacoes
+
+    Yields:
+        Lista de dicts por lote (exportações e importações das linhas do lote)
+    """
+    if ano is None:
+        ano = ano_do_arquivo(nome_original)
+    if estatisticas is None:
+        estatisticas = {}
+    for chave in ("total_registros", "importacoes", "exportacoes"):
+        estatisticas.setdefault(chave, 0)
+
+    colunas = resolver_colunas(df.columns)
+    if not colunas["ncm"]:
+        return
+    datas = {mes: date(ano, mes, 1) for mes in range(1, 13)}
+    referencias = {mes: f"{ano}-{mes:02d}" for mes in range(1, 13)}
+
+    for inicio in range(0, len(df), tamanho_lote):
+        lote = df.iloc[inicio:inicio + tamanho_lote]
+
+        ncm = _texto(lote[colunas["ncm"][0]])
+        validas = ncm.str.len() >= 4
+        if not validas.any():
+            continue
+        lote = lote[validas]
+        ncm = ncm[validas]
+
+        meses = extrair_meses(lote[colunas["mes"][0]]) if colunas["mes"] else pd.Series(1, index=lote.index)
+        descricao = (
+            _texto(lote[colunas["descricao"][0]]).str[:500].fillna("")
+            if colunas["descricao"] else pd.Series("", index=lote.index)
+        )
+        uf = _primeiro_texto(lote, colunas["uf"]).str[:2]
+        pais = _primeiro_texto(lote, colunas["pais"])
+
+        base = pd.DataFrame({
+            'ncm': ncm.str[:8].str.zfill(8),
+            'descricao_produto': descricao,
+            'via_transporte': ViaTransporte.OUTRAS,
+            'uf': uf.astype(object).where(uf.notna(), None),
+            'pais_origem_destino': pais.astype(object).where(pais.notna(), None),
+            'data_operacao': meses.map(datas),
+            'mes_referencia': meses.map(referencias),
+            'arquivo_origem': nome_original,
+        }, index=lote.index)
+
+        valor_exp = converter_numeros(_coalescer(lote, colunas["valor_exp"]))
+        valor_imp = converter_numeros(_coalescer(lote, colunas["valor_imp"]))
+        mascara_exp = valor_exp > 0
+        mascara_imp = valor_imp > 0
+
+        exportacoes = _registros(
+            base, mascara_exp, TipoOperacao.EXPORTACAO, valor_exp,
+            converter_numeros(_coalescer(lote, colunas["peso_exp"])),
+            converter_numeros(_coalescer(lote, colunas["quantidade_exp"])),
+        )
+        importacoes = _registros(
+            base, mascara_imp, TipoOperacao.IMPORTACAO, valor_imp,
+            converter_numeros(_coalescer(lote, colunas["peso_imp"])),
+            converter_numeros(_coalescer(lote, colunas["quantidade_imp"])),
+        )
+
+        estatisticas["exportacoes"] += len(exportacoes)
+        estatisticas["importacoes"] += len(importacoes)
+        estatisticas["total_registros"] += len(exportacoes) + len(importacoes)
+        if exportacoes or importacoes:
+            yield exportacoes + importacoes
+
+
+def _chave_operacao(registro: dict) -> Tuple:
+    return (
+        registro['ncm'], registro['tipo_operacao'], registro['data_operacao'],
+        registro['pais_origem_destino'], registro['uf'],
+    )
+
+
+def filtrar_operacoes_existentes(db: Session, registros: List[dict], vistos: Set[Tuple]) -> List[dict]:
+    """
+    Remove do lote as operações que já existem no banco (ou já vieram no arquivo) com
+    mesmo NCM, tipo, data, país e UF. Uma consulta por bloco de NCMs do lote em vez
+    de uma por linha.
+
+    Linhas sem país ou UF nunca são consideradas repetidas (NULL não é igual a NULL no SQL).
+
+    Args:
+        vistos: Chaves já aceitas nos lotes anteriores do mesmo arquivo (atualizado aqui)
+    """
+    comparaveis = [r for r in registros if r['pais_origem_destino'] is not None and r['uf'] is not None]
+    existentes: Set[Tuple] = set()
+    if comparaveis:
+        ncms = sorted({r['ncm'] for r in comparaveis})
+        datas = sorted({r['data_operacao'] for r in comparaveis})
+        for i in range(0, len(ncms), 500):
+            existentes.update(
+                (ncm, tipo, data_operacao, pais, uf)
+                for ncm, tipo, data_operacao, pais, uf in db.query(
+                    OperacaoComex.ncm, OperacaoComex.tipo_operacao, OperacaoComex.data_operacao,
+                    OperacaoComex.pais_origem_destino, OperacaoComex.uf,
+                ).filter(
+                    OperacaoComex.ncm.in_(ncms[i:i + 500]),
+                    OperacaoComex.data_operacao.in_(datas),
+                ).all()
+            )
+
+    novos = []
+    for registro in registros:
+        if registro['pais_origem_destino'] is None or registro['uf'] is None:
+            novos.append(registro)
+            continue
+        chave = _chave_operacao(registro)
+        if chave in existentes or chave in vistos:
+            continue
+        vistos.add(chave)
+        novos.append(registro)
+    return novos
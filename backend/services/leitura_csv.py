@@ -0,0 +1,115 @@
+"""
+Leitura incremental dos CSVs brutos do MDIC (IMP_/EXP_AAAA_MM.csv e tabelas).
+
+O parse_csv_file dos coletores lia o arquivo inteiro numa string (uma vez por
+encoding tentado), lia o CSV duas vezes (validação + leitura) e guardava todas
+as linhas como dicts; um arquivo anual de alguns GB não cabia na memória. Aqui:
+  - encoding e separador detectados num prefixo do arquivo (detectar_formato_csv);
+  - o cabeçalho é normalizado uma vez só;
+  - as linhas são lidas em fluxo (csv.reader sobre o arquivo aberto) e entregues
+    em lotes de até tamanho_lote registros, que vão direto para o DataTransformer
+    e para a carga em massa (services.carga_operacoes) antes do próximo lote.
+Não depende de pandas (opcional nos coletores).
+"""
+import csv
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from loguru import logger
+
+from config import settings
+
+# Prefixo lido para detectar encoding/separador
+TAMANHO_AMOSTRA = 1024 * 1024
+
+Registro = Dict[str, Optional[str]]
+
+
+def detectar_formato_csv(caminho: Union[str, Path], tamanho_amostra: int = TAMANHO_AMOSTRA) -> Tuple[str, str]:
+    """(encoding, separador) a partir do início do arquivo."""
+    with Path(caminho).open("rb") as arquivo:
+        amostra = arquivo.read(tamanho_amostra)
+    encoding = "utf-8-sig"
+    try:
+        texto = amostra.decode(encoding)
+    except UnicodeDecodeError as e:
+        # Amostra cortada no meio de um caractere multibyte não é erro de encoding
+        if e.start < len(amostra) - 4:
+            encoding = "latin-1"
+        texto = amostra.decode(encoding, errors="ignore")
+    primeira_linha = texto.splitlines()[0] if texto else ""
+    separador = ";" if primeira_linha.count(";") >= primeira_linha.count(",") else ","
+    return encoding, separador
+
+
+def normalizar_coluna(nome: str) -> str:
+    """'CO NCM' / 'co-ncm' -> 'co_ncm'."""
+    return nome.strip().lower().replace(" ", "_").replace("-", "_")
+
+
+def _parece_html(cabecalho: List[str]) -> bool:
+    """Página de erro servida no lugar do CSV (<!DOCTYPE html>, <html>...)."""
+    texto = ";".join(cabecalho).lower()
+    return "<" in texto or "html" in texto
+
+
+def ler_registros_em_lotes(
+    caminho: Union[str, Path],
+    tamanho_lote: Optional[int] = None,
+    separador: Optional[str] = None,
+    normalizar: Callable[[str], str] = normalizar_coluna,
+) -> Iterator[List[Registro]]:
+    """
+    Lê o CSV em lotes de registros {coluna_normalizada: texto ou None}.
+
+    Args:
+        caminho: Arquivo CSV
+        tamanho_lote: Registros por lote (None = settings.import_batch_rows)
+        separador: Delimitador (None = detectado)
+        normalizar: Normalização dos nomes de coluna
+
+    Yields:
+        Listas de até tamanho_lote registros; colunas sem nome são descartadas,
+        células vazias viram None e linhas sem nenhum valor são puladas
+    """
+    caminho = Path(caminho)
+    tamanho_lote = tamanho_lote or settings.import_batch_rows
+    encoding, detectado = detectar_formato_csv(caminho)
+    separador = separador or detectado
+
+    # Encoding vem da amostra; um byte inválido depois dela não interrompe a leitura
+    with caminho.open("r", encoding=encoding, errors="replace", newline="") as arquivo:
+        leitor = csv.reader(arquivo, delimiter=separador)
+        cabecalho = next(leitor, None)
+        if not cabecalho:
+            logger.warning(f"⚠️ CSV sem cabeçalhos válidos: {caminho.name}")
+            return
+        if _parece_html(cabecalho):
+            logger.error(f"⚠️ Arquivo parece ser HTML, não CSV: {caminho.name}")
+            return
+
+        # Cabeçalho normalizado uma vez; só as posições com nome são lidas
+        colunas = [(i, normalizar(nome)) for i, nome in enumerate(cabecalho) if nome and nome.strip()]
+        lote: List[Registro] = []
+        total = 0
+        for linha in leitor:
+            registro = {}
+            vazio = True
+            for i, coluna in colunas:
+                valor = linha[i].strip() if i < len(linha) else ""
+                if valor:
+                    registro[coluna] = valor
+                    vazio = False
+                else:
+                    registro[coluna] = None
+            if vazio:
+                continue
+            lote.append(registro)
+            if len(lote) >= tamanho_lote:
+                total += len(lote)
+                yield lote
+                lote = []
+        if lote:
+            total += len(lote)
+            yield lote
+    logger.info(f"✅ Processados {total} registros de {caminho.name}")
@@ -0,0 +1,100 @@
+"""
+Leitura em lotes de planilhas de importação (xlsx/xls/csv).
+
+pd.read_excel carrega a planilha inteira (e o DataFrame resultante) antes de a
+importação começar; a planilha anual H_EXPORTACAO_E IMPORTACAO_GERAL leva a
+instância do Render perto do limite de memória. Aqui cada lote de linhas vira um
+DataFrame pequeno que é transformado e inserido antes do próximo ser lido:
+  - .xlsx/.xlsm: openpyxl em modo read_only (iter_rows, sem carregar a planilha);
+  - .csv: pd.read_csv com chunksize, células como texto (separador ";" ou "," e
+    encoding detectados);
+  - .xls (formato antigo, até 65536 linhas): pd.read_excel fatiado.
+
+A primeira linha é o cabeçalho, como no pd.read_excel.
+"""
+from pathlib import Path
+from typing import Iterator, List, Optional, Union
+
+import pandas as pd
+from loguru import logger
+
+from config import settings
+from services.leitura_csv import detectar_formato_csv
+
+try:
+    from openpyxl import load_workbook
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+    logger.warning("openpyxl não disponível - planilhas xlsx serão lidas inteiras com pandas")
+
+
+def _nomes_colunas(cabecalho: tuple) -> List[str]:
+    """Cabeçalho como o pandas nomeia: vazios viram "Unnamed: i" e repetidos ganham ".1", ".2"..."""
+    nomes: List[str] = []
+    vistos = {}
+    for i, valor in enumerate(cabecalho):
+        nome = f"Unnamed: {i}" if valor is None or str(valor).strip() == "" else str(valor)
+        if nome in vistos:
+            vistos[nome] += 1
+            nome = f"{nome}.{vistos[nome]}"
+        else:
+            vistos[nome] = 0
+        nomes.append(nome)
+    return nomes
+
+
+def _lotes_xlsx(caminho: Path, tamanho_lote: int) -> Iterator[pd.DataFrame]:
+    workbook = load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        planilha = workbook.worksheets[0]
+        linhas = planilha.iter_rows(values_only=True)
+        cabecalho = next(linhas, None)
+        if cabecalho is None:
+            return
+        colunas = _nomes_colunas(cabecalho)
+        lote = []
+        for linha in linhas:
+            if linha is None or all(valor is None for valor in linha):
+                continue
+            lote.append(linha[:len(colunas)])
+            if len(lote) >= tamanho_lote:
+                yield pd.DataFrame.from_records(lote, columns=colunas)
+                lote = []
+        if lote:
+            yield pd.DataFrame.from_records(lote, columns=colunas)
+    finally:
+        workbook.close()
+
+
+def _lotes_csv(caminho: Path, tamanho_lote: int) -> Iterator[pd.DataFrame]:
+    encoding, separador = detectar_formato_csv(caminho)
+    # Tudo como texto: NCM "01012100" não pode virar 1012100 (os números são
+    # convertidos depois, em services.importacao_comex.converter_numeros)
+    with pd.read_csv(caminho, sep=separador, encoding=encoding, dtype=str, chunksize=tamanho_lote) as leitor:
+        for lote in leitor:
+            yield lote
+
+
+def ler_em_lotes(caminho: Union[str, Path], tamanho_lote: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """
+    Lê a planilha em DataFrames de até tamanho_lote linhas (primeira planilha do arquivo).
+
+    Args:
+        caminho: Arquivo .xlsx, .xlsm, .xls ou .csv
+        tamanho_lote: Linhas por lote (None = settings.import_batch_rows)
+    """
+    caminho = Path(caminho)
+    tamanho_lote = tamanho_lote or settings.import_batch_rows
+    sufixo = caminho.suffix.lower()
+
+    if sufixo == ".csv":
+        yield from _lotes_csv(caminho, tamanho_lote)
+        return
+    if sufixo in (".xlsx", ".xlsm") and OPENPYXL_AVAILABLE:
+        yield from _lotes_xlsx(caminho, tamanho_lote)
+        return
+
+    df = pd.read_excel(caminho)
+    for inicio in range(0, len(df), tamanho_lote):
+        yield df.iloc[inicio:inicio + tamanho_lote]
@@ -0,0 +1,243 @@
+"""
+Planilha de empresas recomendadas (data/empresas_recomendadas.xlsx) em memória.
+
+As rotas de dashboard que caem na planilha (/dashboard/empresas-recomendadas,
+/dashboard/empresas-importadoras e -exportadoras, e os países do
+/dashboard/stats) faziam pd.read_excel, groupby e iterrows a cada requisição:
+centenas de ms só para abrir o xlsx. Agora:
+  - obter_planilha_recomendadas lê o arquivo uma vez por processo e o relê só
+    se o tamanho ou a data de modificação mudarem;
+  - a tabela lida vai para um snapshot colunar em
+    data_dir/empresas_recomendadas (DataFrame em pickle: colunas numpy), que
+    dispensa abrir o xlsx nas cargas seguintes e após reinícios;
+  - as listas de importadoras e exportadoras (agrupadas por CNPJ e ordenadas
+    pelo valor) e os registros de cada linha são montados na carga; os filtros
+    por UF, tipo e NCM são máscaras numpy sobre colunas pré-calculadas.
+"""
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from loguru import logger
+
+from config import settings
+
+# Import opcional - não disponível no Render
+try:
+    import numpy as np
+    import pandas as pd
+    PANDAS_AVAILABLE = True
+except ImportError:
+    PANDAS_AVAILABLE = False
+
+DIRETORIO_DADOS = Path(__file__).parent.parent.parent / "data"
+
+# Conversão BRL -> USD usada pelo dashboard
+TAXA_BRL_USD = 5.0
+
+
+def arquivo_recomendadas() -> Optional[Path]:
+    """data/empresas_recomendadas.xlsx, ou o .csv se o xlsx não existe."""
+    for nome in ("empresas_recomendadas.xlsx", "empresas_recomendadas.csv"):
+        caminho = DIRETORIO_DADOS / nome
+        if caminho.exists():
+            return caminho
+    return None
+
+
+class PlanilhaRecomendadas:
+    """Tabela da planilha com as visões usadas pelo dashboard já prontas."""
+
+    def __init__(self, tabela: "pd.DataFrame"):
+        self.tabela = tabela
+        self.total = len(tabela)
+        self.registros_brutos: List[Dict[str, Any]] = tabela.to_dict("records")
+        self.importadoras = self._agrupar_por_valor("Importado (R$)")
+        self.exportadoras = self._agrupar_por_valor("Exportado (R$)")
+
+        # Colunas dos filtros do fallback (comparações de _load_empresas_recomendadas_fallback)
+        self._estado_maiusculo = self._coluna(lambda c: c.astype(str).str.upper(), "Estado")
+        self._importa = self._coluna(lambda c: c.fillna(0) > 0, "Importado (R$)")
+        self._exporta = self._coluna(lambda c: c.fillna(0) > 0, "Exportado (R$)")
+        self._ncm_texto = self._coluna(lambda c: c.astype(str), "NCM Relacionado")
+        self.registros_dashboard = self._montar_registros_dashboard()
+
+    def _coluna(self, transformar, nome: str) -> Optional["np.ndarray"]:
+        if nome not in self.tabela.columns:
+            return None
+        return transformar(self.tabela[nome]).to_numpy()
+
+    def _agrupar_por_valor(self, coluna_valor: str) -> Optional[List[Dict[str, Any]]]:
+        """Empresas com valor > 0 agrupadas por CNPJ, da maior para a menor (None se faltam colunas)."""
+        df = self.tabela
+        try:
+            df_valor = df[(df[coluna_valor].notna()) & (df[coluna_valor] > 0)]
+            df_agrupado = df_valor.groupby("CNPJ").agg({
+                "Razão Social": "first",
+                "Nome Fantasia": "first",
+                "Estado": "first",
+                coluna_valor: "sum",
+                "Peso Participação (0-100)": "max",
+            }).reset_index()
+        except (KeyError, TypeError, ValueError) as e:
+            logger.debug(f"Planilha de recomendadas sem as colunas para {coluna_valor}: {e}")
+            return None
+        df_agrupado = df_agrupado.sort_values(coluna_valor, ascending=False)
+
+        empresas = []
+        for _, row in df_agrupado.iterrows():
+            empresas.append({
+                "nome": row["Razão Social"] or row["Nome Fantasia"],
+                "pais": row["Razão Social"] or row["Nome Fantasia"],
+                "valor_total": float(row[coluna_valor]) / TAXA_BRL_USD,
+                "total_operacoes": 1,
+                "uf": row.get("Estado", ""),
+                "peso_participacao": float(row.get("Peso Participação (0-100)", 0)),
+                "peso_kg": 0,
+            })
+        return empresas
+
+    def _montar_registros_dashboard(self) -> List[Dict[str, Any]]:
+        registros = []
+        for row in self.registros_brutos:
+            valor_importacao = float(row.get("Importado (R$)", 0) or 0)
+            valor_exportacao = float(row.get("Exportado (R$)", 0) or 0)
+            registros.append({
+                "nome": row.get("Razão Social") or row.get("Nome Fantasia") or "N/A",
+                "cnpj": row.get("CNPJ"),
+                "uf": row.get("Estado"),
+                "tipo": row.get("Sugestão"),
+                "peso_participacao": float(row.get("Peso Participação (0-100)", 0) or 0),
+                "valor_total": (valor_importacao + valor_exportacao) / TAXA_BRL_USD,
+                "valor_importacao_usd": valor_importacao / TAXA_BRL_USD,
+                "valor_exportacao_usd": valor_exportacao / TAXA_BRL_USD,
+            })
+        return registros
+
+    @staticmethod
+    def _primeiros(registros: List[Dict[str, Any]], mascara, limite: int) -> List[Dict[str, Any]]:
+        if mascara is None:
+            return [dict(r) for r in registros[:limite]]
+        return [dict(registros[i]) for i in np.flatnonzero(mascara)[:limite]]
+
+    def maiores(self, tipo: str, limite: int) -> List[Dict[str, Any]]:
+        """Maiores importadoras (tipo='importacao') ou exportadoras, no formato do dashboard."""
+        empresas = self.importadoras if tipo == "importacao" else self.exportadoras
+        if empresas is None:
+            return []
+        return [dict(e) for e in empresas[:limite]]
+
+    def filtrar_dashboard(
+        self,
+        limite: int,
+        tipo: Optional[str] = None,
+        uf: Optional[str] = None,
+        ncm: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Linhas na ordem da planilha, filtradas por UF, tipo (import/export) e NCM."""
+        mascara = None
+        condicoes = []
+        if uf:
+            condicoes.append((self._estado_maiusculo, lambda c: c == uf.upper()))
+        if tipo:
+            tipo_lower = tipo.lower()
+            if "import" in tipo_lower:
+                condicoes.append((self._importa, lambda c: c))
+            elif "export" in tipo_lower:
+                condicoes.append((self._exporta, lambda c: c))
+        if ncm:
+            condicoes.append((self._ncm_texto, lambda c: c == str(ncm)))
+        for coluna, condicao in condicoes:
+            if coluna is None:
+                return []
+            atual = np.asarray(condicao(coluna), dtype=bool)
+            mascara = atual if mascara is None else mascara & atual
+        return self._primeiros(self.registros_dashboard, mascara, limite)
+
+    def filtrar_brutos(
+        self,
+        limite: int,
+        tipo: Optional[str] = None,
+        uf: Optional[str] = None,
+        ncm: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Linhas com as colunas da planilha, por igualdade em Sugestão, Estado e NCM Relacionado."""
+        mascara = None
+        for nome, valor in (("Sugestão", tipo), ("Estado", uf), ("NCM Relacionado", ncm)):
+            if not valor:
+                continue
+            if nome not in self.tabela.columns:
+                raise KeyError(nome)
+            atual = (self.tabela[nome] == valor).to_numpy()
+            mascara = atual if mascara is None else mascara & atual
+        return self._primeiros(self.registros_brutos, mascara, limite)
+
+
+# Planilha carregada: (caminho, (tamanho, mtime_ns), planilha ou None)
+_carregada: Optional[Tuple[Path, Tuple[int, int], Optional[PlanilhaRecomendadas]]] = None
+_carregada_lock = threading.Lock()
+
+
+def _caminho_snapshot(arquivo: Path) -> Path:
+    return settings.data_dir / "empresas_recomendadas" / f"{arquivo.stem}{arquivo.suffix}.snapshot.pkl"
+
+
+def _ler_tabela(arquivo: Path, assinatura: Tuple[int, int]) -> "pd.DataFrame":
+    """Tabela do snapshot, se ele é do arquivo atual; senão lê a planilha e grava o snapshot."""
+    snapshot = _caminho_snapshot(arquivo)
+    if snapshot.exists():
+        try:
+            conteudo = pd.read_pickle(snapshot)
+            if conteudo.get("origem") == [str(arquivo), *assinatura]:
+                logger.info(f"✅ Empresas recomendadas carregadas do snapshot: {len(conteudo['tabela'])} linhas")
+                return conteudo["tabela"]
+        except Exception as e:
+            logger.warning(f"⚠️ Snapshot de empresas recomendadas ilegível ({snapshot}), relendo a planilha: {e}")
+
+    if arquivo.suffix == ".xlsx":
+        tabela = pd.read_excel(arquivo)
+    else:
+        tabela = pd.read_csv(arquivo, encoding="utf-8-sig")
+    try:
+        snapshot.parent.mkdir(parents=True, exist_ok=True)
+        temporario = snapshot.with_suffix(".tmp")
+        pd.to_pickle({"origem": [str(arquivo), *assinatura], "tabela": tabela}, temporario)
+        temporario.replace(snapshot)
+        logger.info(f"💾 Snapshot de empresas recomendadas gravado: {snapshot}")
+    except Exception as e:
+        logger.warning(f"⚠️ Não foi possível gravar o snapshot de empresas recomendadas: {e}")
+    return tabela
+
+
+def obter_planilha_recomendadas(arquivo: Optional[Union[str, Path]] = None) -> Optional[PlanilhaRecomendadas]:
+    """
+    Planilha de empresas recomendadas compartilhada pelo processo.
+
+    Returns:
+        Planilha carregada, ou None se o arquivo não existe, não pôde ser lido
+        ou o pandas não está instalado
+    """
+    global _carregada
+    if not PANDAS_AVAILABLE:
+        return None
+    caminho = Path(arquivo) if arquivo else arquivo_recomendadas()
+    if caminho is None:
+        return None
+    try:
+        info = caminho.stat()
+    except OSError:
+        return None
+    assinatura = (info.st_size, info.st_mtime_ns)
+
+    with _carregada_lock:
+        if _carregada is not None and _carregada[0] == caminho and _carregada[1] == assinatura:
+            return _carregada[2]
+        try:
+            planilha = PlanilhaRecomendadas(_ler_tabela(caminho, assinatura))
+            logger.info(f"✅ Planilha de empresas recomendadas em memória: {planilha.total} linhas")
+        except Exception as e:
+            # Falha também fica guardada: não relê o arquivo até ele mudar
+            logger.warning(f"⚠️ Erro ao carregar {caminho}: {e}")
+            planilha = None
+        _carregada = (caminho, assinatura, planilha)
+        return planilha
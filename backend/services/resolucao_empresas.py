@@ -0,0 +1,291 @@
+"""
+Identificação de empresas do MDIC pelo nome (cruzamento operações x empresas_mdic).
+
+Sem CNPJ na operação, CruzamentoDados.cruzar_operacao_com_empresa percorria
+todas as empresas do MDIC procurando a razão social como substring
+(operações x empresas comparações). Aqui os nomes viram um índice, montado uma
+vez por versão da lista (services.empresas_mdic.indice_empresas_mdic):
+  - tokens normalizados (normalizar_nome_empresa, sem sufixos societários e
+    conectivos como LTDA, SA, DE, DO);
+  - índice invertido token -> posições dos nomes, com peso IDF por token;
+  - nome idêntico (mesmos tokens) resolvido direto por dicionário;
+  - senão, candidatos só da lista de posições do token mais raro: vale o nome
+    que contém todos os tokens da busca (como a substring antiga) com a maior
+    fração do nome coberta; sem nenhum, o mais parecido (coeficiente de Dice
+    ponderado pelo IDF) acima de LIMIAR_SIMILARIDADE.
+
+resolver_empresas_operacoes identifica as operações em massa e grava o resultado
+em cruzamentos_empresas (uma linha por operação identificada, com confiança e pontuação).
+"""
+import math
+import threading
+import time
+import weakref
+from array import array
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy.orm import Session
+
+from database.models import CruzamentoEmpresa, OperacaoComex, TipoOperacao
+from services.busca_empresas import normalizar_nome_empresa
+from services.empresas_mdic import indice_empresas_mdic
+
+# Palavras que não distinguem empresas (forma jurídica, porte, conectivos)
+PALAVRAS_IGNORADAS = {
+    "LTDA", "SA", "S", "A", "ME", "EPP", "EIRELI", "MEI", "CIA", "COMPANHIA",
+    "DE", "DA", "DO", "DAS", "DOS", "E", "&", "EM", "LIMITADA", "SOCIEDADE", "ANONIMA",
+}
+
+# Similaridade mínima para aceitar um nome que não contém todos os tokens da busca
+LIMIAR_SIMILARIDADE = 0.6
+
+# Tokens presentes em mais nomes que isso não geram candidatos na busca por similaridade
+MAX_CANDIDATOS_TOKEN = 5000
+
+# Operações lidas (e cruzamentos gravados) por vez em resolver_empresas_operacoes
+TAMANHO_LOTE = 10000
+
+
+def tokens_nome(nome: Optional[str]) -> List[str]:
+    """Tokens distintivos do nome, sem repetição, na ordem em que aparecem."""
+    todos = normalizar_nome_empresa(nome).split()
+    tokens = [t for t in todos if t not in PALAVRAS_IGNORADAS]
+    # Nome só com palavras ignoradas ("S A"): usa o que houver
+    return list(dict.fromkeys(tokens or todos))
+
+
+class IndiceNomesEmpresas:
+    """Índice invertido dos nomes das empresas do MDIC (razão social e nome fantasia)."""
+
+    def __init__(self, empresas: Dict[str, Dict[str, Any]]):
+        inicio = time.perf_counter()
+        self.cnpjs: List[str] = []
+        self.tokens: List[frozenset] = []
+        self.exatos: Dict[str, int] = {}
+        self.postings: Dict[str, array] = {}
+        for cnpj, empresa in empresas.items():
+            nomes = {empresa.get("razao_social") or "", empresa.get("nome_fantasia") or ""}
+            for nome in nomes:
+                tokens = tokens_nome(nome)
+                if not tokens:
+                    continue
+                posicao = len(self.cnpjs)
+                self.cnpjs.append(cnpj)
+                self.tokens.append(frozenset(tokens))
+                self.exatos.setdefault(" ".join(sorted(tokens)), posicao)
+                for token in tokens:
+                    lista = self.postings.get(token)
+                    if lista is None:
+                        lista = self.postings[token] = array("I")
+                    lista.append(posicao)
+
+        total = max(len(self.cnpjs), 1)
+        self.idf = {token: math.log(1 + total / len(lista)) for token, lista in self.postings.items()}
+        # Token desconhecido pesa como o mais raro possível
+        self.idf_ausente = math.log(1 + total)
+        self.pesos = array("d", (sum(self.idf[t] for t in tokens) for tokens in self.tokens))
+        logger.info(
+            f"✅ Índice de nomes MDIC: {len(self.cnpjs)} nomes, {len(self.postings)} tokens "
+            f"em {time.perf_counter() - inicio:.2f}s"
+        )
+
+    def __len__(self) -> int:
+        return len(self.cnpjs)
+
+    def resolver(self, nome: Optional[str]) -> Optional[Tuple[str, float]]:
+        """
+        CNPJ da empresa com o nome mais próximo.
+
+        Returns:
+            (cnpj, pontuação entre 0 e 1; 1.0 = mesmos tokens) ou None
+        """
+        tokens = tokens_nome(nome)
+        if not tokens:
+            return None
+        posicao = self.exatos.get(" ".join(sorted(tokens)))
+        if posicao is not None:
+            return self.cnpjs[posicao], 1.0
+
+        conhecidos = sorted((t for t in tokens if t in self.postings), key=lambda t: len(self.postings[t]))
+        if not conhecidos:
+            return None
+        peso_busca = sum(self.idf.get(t, self.idf_ausente) for t in tokens)
+
+        if len(conhecidos) == len(tokens):
+            # Nomes que contêm todos os tokens: só as posições do token mais raro são testadas
+            restantes = conhecidos[1:]
+            melhor, melhor_pontuacao = None, 0.0
+            for posicao in self.postings[conhecidos[0]]:
+                tokens_nome_indice = self.tokens[posicao]
+                if all(t in tokens_nome_indice for t in restantes):
+                    pontuacao = peso_busca / self.pesos[posicao]
+                    if pontuacao > melhor_pontuacao:
+                        melhor, melhor_pontuacao = posicao, pontuacao
+            if melhor is not None:
+                return self.cnpjs[melhor], round(min(melhor_pontuacao, 1.0), 4)
+
+        # Similaridade: candidatos dos dois tokens mais raros (os comuns demais não ajudam)
+        compartilhado: Dict[int, float] = {}
+        for token in conhecidos[:2]:
+            lista = self.postings[token]
+            if len(lista) > MAX_CANDIDATOS_TOKEN:
+                continue
+            for posicao in lista:
+                if posicao not in compartilhado:
+                    compartilhado[posicao] = sum(self.idf[t] for t in conhecidos if t in self.tokens[posicao])
+        melhor, melhor_pontuacao = None, 0.0
+        for posicao, peso_comum in compartilhado.items():
+            pontuacao = 2 * peso_comum / (peso_busca + self.pesos[posicao])
+            if pontuacao > melhor_pontuacao:
+                melhor, melhor_pontuacao = posicao, pontuacao
+        if melhor is None or melhor_pontuacao < LIMIAR_SIMILARIDADE:
+            return None
+        return self.cnpjs[melhor], round(melhor_pontuacao, 4)
+
+
+# Índice de nomes por engine, junto com o índice por CNPJ de que foi montado
+_indices: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_indices_lock = threading.Lock()
+
+
+def indice_nomes_empresas(db: Session) -> IndiceNomesEmpresas:
+    """Índice de nomes da versão atual de empresas_mdic (remontado só quando ela muda)."""
+    empresas = indice_empresas_mdic(db)
+    engine = db.get_bind()
+    with _indices_lock:
+        carregado = _indices.get(engine)
+        if carregado is not None and carregado[0] is empresas:
+            return carregado[1]
+        indice = IndiceNomesEmpresas(empresas)
+        _indices[engine] = (empresas, indice)
+        return indice
+
+
+def _identificar(
+    empresas: Dict[str, Dict[str, Any]],
+    nomes: IndiceNomesEmpresas,
+    cnpj: Optional[str],
+    razao_social: Optional[str],
+    resolvidos: Dict[str, Optional[Tuple[str, float]]],
+) -> Optional[Tuple[str, str, str, float]]:
+    """(cnpj, metodo, confianca, pontuação) da empresa da operação, ou None."""
+    if cnpj:
+        cnpj_limpo = cnpj.replace('.', '').replace('/', '').replace('-', '')
+        if cnpj_limpo in empresas:
+            return cnpj_limpo, "cnpj", "alta", 1.0
+    if not razao_social:
+        return None
+    if razao_social not in resolvidos:
+        resolvidos[razao_social] = nomes.resolver(razao_social)
+    encontrado = resolvidos[razao_social]
+    if encontrado is None:
+        return None
+    return encontrado[0], "nome", "media", encontrado[1]
+
+
+def resolver_empresas_operacoes(
+    db: Session,
+    filtros: Optional[Dict[str, Any]] = None,
+    limite: Optional[int] = None,
+    tamanho_lote: int = TAMANHO_LOTE,
+) -> Dict[str, Any]:
+    """
+    Identifica a empresa do MDIC de cada operação e grava em cruzamentos_empresas.
+
+    Operações reprocessadas têm o cruzamento anterior substituído (ou removido,
+    se a empresa não é mais identificada).
+
+    Args:
+        filtros: ncm, tipo_operacao e/ou uf (como em CruzamentoDados.cruzar_operacoes_bulk)
+        limite: Máximo de operações (None = todas)
+        tamanho_lote: Operações lidas e gravadas por transação
+
+    Returns:
+        Estatísticas no formato de CruzamentoDados.estatisticas_cruzamento,
+        mais segundos e operações por segundo
+    """
+    inicio = time.perf_counter()
+    empresas = indice_empresas_mdic(db)
+    nomes = indice_nomes_empresas(db)
+    filtros = filtros or {}
+
+    consulta = db.query(
+        OperacaoComex.id, OperacaoComex.tipo_operacao,
+        OperacaoComex.cnpj_importador, OperacaoComex.razao_social_importador,
+        OperacaoComex.cnpj_exportador, OperacaoComex.razao_social_exportador,
+    )
+    if filtros.get("ncm"):
+        consulta = consulta.filter(OperacaoComex.ncm == filtros["ncm"])
+    if filtros.get("tipo_operacao"):
+        consulta = consulta.filter(OperacaoComex.tipo_operacao == filtros["tipo_operacao"])
+    if filtros.get("uf"):
+        consulta = consulta.filter(OperacaoComex.uf == filtros["uf"])
+
+    resolvidos: Dict[str, Optional[Tuple[str, float]]] = {}
+    por_confianca = {"alta": 0, "media": 0, "baixa": 0}
+    cnpjs_encontrados = set()
+    total = 0
+    ultimo_id = 0
+    agora = datetime.utcnow()
+    while limite is None or total < limite:
+        tamanho = tamanho_lote if limite is None else min(tamanho_lote, limite - total)
+        # Paginação por id: cada lote é gravado e confirmado antes do próximo
+        linhas = consulta.filter(OperacaoComex.id > ultimo_id).order_by(OperacaoComex.id).limit(tamanho).all()
+        if not linhas:
+            break
+        ultimo_id = linhas[-1][0]
+        total += len(linhas)
+
+        cruzamentos = []
+        for operacao_id, tipo, cnpj_imp, razao_imp, cnpj_exp, razao_exp in linhas:
+            if tipo == TipoOperacao.IMPORTACAO:
+                papel, encontrado = "importador", _identificar(empresas, nomes, cnpj_imp, razao_imp, resolvidos)
+            else:
+                papel, encontrado = "exportador", _identificar(empresas, nomes, cnpj_exp, razao_exp, resolvidos)
+            if encontrado is None:
+                por_confianca["baixa"] += 1
+                continue
+            cnpj, metodo, confianca, pontuacao = encontrado
+            por_confianca[confianca] += 1
+            cnpjs_encontrados.add(cnpj)
+            cruzamentos.append({
+                "operacao_id": operacao_id,
+                "papel": papel,
+                "cnpj": cnpj,
+                "metodo": metodo,
+                "confianca": confianca,
+                "pontuacao": pontuacao,
+                "data_atualizacao": agora,
+            })
+
+        try:
+            ids = [linha[0] for linha in linhas]
+            for i in range(0, len(ids), 500):
+                db.query(CruzamentoEmpresa).filter(
+                    CruzamentoEmpresa.operacao_id.in_(ids[i:i + 500])
+                ).delete(synchronize_session=False)
+            db.bulk_insert_mappings(CruzamentoEmpresa, cruzamentos)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+    segundos = time.perf_counter() - inicio
+    identificadas = por_confianca["alta"] + por_confianca["media"]
+    stats = {
+        "total_operacoes": total,
+        "operacoes_identificadas": identificadas,
+        "taxa_identificacao": identificadas / total * 100 if total > 0 else 0,
+        "por_confianca": por_confianca,
+        "empresas_unicas": len(cnpjs_encontrados),
+        "segundos": round(segundos, 3),
+        "operacoes_por_segundo": round(total / segundos, 1) if segundos > 0 else 0.0,
+    }
+    logger.info(
+        f"📊 Cruzamento em massa: {identificadas}/{total} operações identificadas "
+        f"({por_confianca['alta']} por CNPJ, {por_confianca['media']} por nome, "
+        f"{len(resolvidos)} nomes distintos) em {segundos:.1f}s"
+    )
+    return stats
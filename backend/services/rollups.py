@@ -0,0 +1,627 @@
+"""
+Rollups mensais pré-agregados de operacoes_comex.
+
+As tabelas operacoes_comex_mensal (mes, tipo, ncm, uf, país) e empresas_comex_mensal
+(mes, tipo, ncm, importador/exportador) são reconstruídas por mês de referência
+após cada importação/coleta. O /dashboard/stats lê desses rollups quando não há
+filtro de empresa em texto livre; meses parcialmente cobertos pelo período são
+complementados com as linhas brutas, então o resultado é o mesmo da consulta direta.
+
+Reconstruções concorrentes são serializadas por um lock do processo e um lock
+no banco (pg_advisory_xact_lock no PostgreSQL; no SQLite, a escrita na linha de
+rollup_controle, que toma o lock de escrita do arquivo); a marca d'água é relida
+depois do lock, então a segunda chamada não refaz (nem duplica) os meses da primeira.
+"""
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import distinct, false, func, insert, literal_column, or_, select, union_all
+from sqlalchemy.orm import Session
+
+from database.models import (
+    OperacaoComex, OperacaoComexMensal, EmpresaComexMensal, RollupControle, TipoOperacao, VersaoDados
+)
+from services.busca_empresas import (
+    atualizar_indice_empresas, empresas_dos_meses, indice_empresas_pronto
+)
+from services.versoes import TABELA_OPERACOES, TODOS, incrementar_versao
+
+# O sufixo muda quando a chave dos rollups muda: sem linha de controle, a próxima atualização reconstrói tudo
+NOME_CONTROLE = "operacoes_comex_v2"
+
+# Chave do pg_advisory_xact_lock das reconstruções
+CHAVE_BLOQUEIO = 7310001
+
+_rollups_lock = threading.Lock()
+
+_COLUNAS_EMPRESA = {
+    "importador": OperacaoComex.razao_social_importador,
+    "exportador": OperacaoComex.razao_social_exportador,
+}
+
+
+def _expr_mes_operacao(db: Session):
+    """Expressão SQL que converte data_operacao em YYYY-MM conforme o banco."""
+    dialeto = db.get_bind().dialect.name
+    if dialeto == "sqlite":
+        return func.strftime(literal_column("'%Y-%m'"), OperacaoComex.data_operacao)
+    if dialeto == "postgresql":
+        return func.to_char(OperacaoComex.data_operacao, literal_column("'YYYY-MM'"))
+    return None
+
+
+def _filtro_meses(coluna, meses: Iterable[Optional[str]]):
+    """Filtro por lista de meses, tratando mes_referencia nulo."""
+    meses = set(meses)
+    validos = sorted(m for m in meses if m)
+    condicoes = []
+    if validos:
+        condicoes.append(coluna.in_(validos))
+    if None in meses:
+        condicoes.append(coluna.is_(None))
+    return or_(*condicoes) if condicoes else false()
+
+
+def _meses_operacao(db: Session, meses: Optional[Iterable[Optional[str]]]) -> set:
+    """
+    Meses presentes nos rollups dos meses de referência informados (None = todos):
+    mes_referencia e mes_operacao (YYYY-MM de data_operacao).
+    """
+    consulta = db.query(OperacaoComexMensal.mes_referencia, OperacaoComexMensal.mes_operacao).distinct()
+    if meses is not None:
+        consulta = consulta.filter(_filtro_meses(OperacaoComexMensal.mes_referencia, meses))
+    return {m for linha in consulta.all() for m in linha}
+
+
+def _meses_versionados(db: Session) -> set:
+    """Meses que já têm versão registrada para operacoes_comex."""
+    linhas = db.query(VersaoDados.mes_referencia).filter(
+        VersaoDados.tabela == TABELA_OPERACOES, VersaoDados.mes_referencia != TODOS
+    ).all()
+    return {m for (m,) in linhas}
+
+
+def _reconstruir_meses(db: Session, meses: Optional[Iterable[Optional[str]]]) -> None:
+    """Apaga e recalcula os rollups dos meses informados (None = tabela inteira)."""
+    mes_op = _expr_mes_operacao(db)
+
+    if meses is None:
+        db.query(OperacaoComexMensal).delete(synchronize_session=False)
+        db.query(EmpresaComexMensal).delete(synchronize_session=False)
+        filtro_origem = None
+    else:
+        db.query(OperacaoComexMensal).filter(
+            _filtro_meses(OperacaoComexMensal.mes_referencia, meses)
+        ).delete(synchronize_session=False)
+        db.query(EmpresaComexMensal).filter(
+            _filtro_meses(EmpresaComexMensal.mes_referencia, meses)
+        ).delete(synchronize_session=False)
+        filtro_origem = _filtro_meses(OperacaoComex.mes_referencia, meses)
+
+    # Rollup por (mes, tipo, ncm, descrição, uf, país): principais NCMs agrupam por (ncm, descrição), como a consulta direta
+    sel = select(
+        OperacaoComex.mes_referencia,
+        mes_op,
+        OperacaoComex.tipo_operacao,
+        OperacaoComex.ncm,
+        OperacaoComex.descricao_produto,
+        OperacaoComex.uf,
+        OperacaoComex.pais_origem_destino,
+        func.count(OperacaoComex.id),
+        func.sum(OperacaoComex.valor_fob),
+        func.sum(OperacaoComex.peso_liquido_kg),
+        func.sum(OperacaoComex.quantidade_estatistica),
+    ).group_by(
+        OperacaoComex.mes_referencia,
+        mes_op,
+        OperacaoComex.tipo_operacao,
+        OperacaoComex.ncm,
+        OperacaoComex.descricao_produto,
+        OperacaoComex.uf,
+        OperacaoComex.pais_origem_destino,
+    )
+    if filtro_origem is not None:
+        sel = sel.where(filtro_origem)
+    db.execute(
+        insert(OperacaoComexMensal).from_select(
+            [
+                "mes_referencia", "mes_operacao", "tipo_operacao", "ncm", "descricao_produto",
+                "uf", "pais_origem_destino", "total_operacoes", "valor_fob",
+                "peso_liquido_kg", "quantidade_estatistica",
+            ],
+            sel,
+        )
+    )
+
+    # Rollup por empresa (importador e exportador)
+    for papel, coluna in _COLUNAS_EMPRESA.items():
+        sel_emp = select(
+            OperacaoComex.mes_referencia,
+            mes_op,
+            OperacaoComex.tipo_operacao,
+            OperacaoComex.ncm,
+            literal_column(f"'{papel}'"),
+            coluna,
+            func.count(OperacaoComex.id),
+            func.sum(OperacaoComex.valor_fob),
+            func.sum(OperacaoComex.peso_liquido_kg),
+        ).where(
+            coluna.isnot(None),
+            coluna != "",
+        ).group_by(
+            OperacaoComex.mes_referencia,
+            mes_op,
+            OperacaoComex.tipo_operacao,
+            OperacaoComex.ncm,
+            coluna,
+        )
+        if filtro_origem is not None:
+            sel_emp = sel_emp.where(filtro_origem)
+        db.execute(
+            insert(EmpresaComexMensal).from_select(
+                [
+                    "mes_referencia", "mes_operacao", "tipo_operacao", "ncm", "papel", "nome",
+                    "total_operacoes", "valor_fob", "peso_liquido_kg",
+                ],
+                sel_emp,
+            )
+        )
+
+
+def atualizar_rollups(
+    db: Session,
+    meses: Optional[Iterable[Optional[str]]] = None,
+    completo: bool = False,
+) -> Optional[Dict[str, Any]]:
+    """
+    Atualiza os rollups de forma incremental.
+
+    Recalcula os meses informados e também os meses de qualquer linha inserida
+    depois da última atualização (controle pelo maior id já agregado), de modo que
+    inserções feitas fora dos fluxos de importação também são absorvidas.
+    Incrementa a versão dos dados (services.versoes) dos meses recalculados e
+    atualiza o índice de busca de empresas (services.busca_empresas).
+    Quando há o que recalcular, confirma a sessão (db.commit) antes e depois.
+
+    Args:
+        db: Sessão do banco
+        meses: Meses de referência (YYYY-MM) alterados pela importação/coleta
+        completo: Reconstrói os rollups inteiros
+
+    Returns:
+        Dicionário com os meses atualizados, ou None se os rollups não puderem ser usados
+    """
+    suporta_rollups = _expr_mes_operacao(db) is not None
+    try:
+        if not completo and not meses and not _rollups_pendentes(db, suporta_rollups):
+            return {"meses_atualizados": [], "completo": False} if suporta_rollups else None
+    except Exception as e:
+        logger.warning(f"⚠️ Erro ao verificar rollups: {e}")
+        db.rollback()
+        return None
+
+    with _rollups_lock:
+        return _atualizar_com_bloqueio(db, meses, completo, suporta_rollups)
+
+
+def _rollups_pendentes(db: Session, suporta_rollups: bool) -> bool:
+    """True se há linhas novas (ou tabela recriada) desde a última atualização."""
+    ultimo_id = db.query(RollupControle.ultimo_id).filter(RollupControle.nome == NOME_CONTROLE).scalar()
+    max_id = db.query(func.max(OperacaoComex.id)).scalar() or 0
+    if ultimo_id is None or max_id != ultimo_id:
+        return True
+    return suporta_rollups and not indice_empresas_pronto(db)
+
+
+def _bloquear_controle(db: Session) -> None:
+    """Lock no banco até o fim da transação, contra reconstruções de outros processos."""
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(select(func.pg_advisory_xact_lock(CHAVE_BLOQUEIO)))
+    else:
+        # Escrita na linha de controle: toma o lock de escrita antes de ler a marca d'água
+        db.query(RollupControle).filter(RollupControle.nome == NOME_CONTROLE).update(
+            {RollupControle.data_atualizacao: datetime.utcnow()}, synchronize_session=False
+        )
+
+
+def _atualizar_com_bloqueio(
+    db: Session,
+    meses: Optional[Iterable[Optional[str]]],
+    completo: bool,
+    suporta_rollups: bool,
+) -> Optional[Dict[str, Any]]:
+    inicio = time.perf_counter()
+    try:
+        # Encerra o snapshot de leitura: a marca d'água relida após o lock vê o que outra reconstrução confirmou
+        db.commit()
+        _bloquear_controle(db)
+        controle = db.query(RollupControle).filter(RollupControle.nome == NOME_CONTROLE).populate_existing().first()
+        ultimo_id = controle.ultimo_id if controle else 0
+        max_id = db.query(func.max(OperacaoComex.id)).scalar() or 0
+
+        meses_alvo = set(meses or [])
+        if controle is None or max_id < ultimo_id:
+            # Primeira execução ou tabela recriada: reconstruir tudo
+            completo = True
+        elif max_id > ultimo_id:
+            pendentes = db.query(distinct(OperacaoComex.mes_referencia)).filter(
+                OperacaoComex.id > ultimo_id
+            ).all()
+            meses_alvo.update(m for (m,) in pendentes)
+
+        indice_pendente = suporta_rollups and not indice_empresas_pronto(db)
+        if not completo and not meses_alvo and not indice_pendente:
+            return {"meses_atualizados": [], "completo": False} if suporta_rollups else None
+
+        if completo:
+            meses_versao = _meses_versionados(db)
+            if suporta_rollups:
+                meses_versao |= _meses_operacao(db, None)
+        elif suporta_rollups:
+            # Versionar também os meses de data_operacao (antes e depois), que recortam o período do dashboard
+            meses_versao = set(meses_alvo) | _meses_operacao(db, meses_alvo)
+        else:
+            meses_versao = set(meses_alvo)
+
+        if suporta_rollups:
+            # Empresas dos meses alterados (antes e depois) para o índice de busca
+            nomes_indice = None if completo or indice_pendente else empresas_dos_meses(db, meses_alvo)
+            if completo or meses_alvo:
+                _reconstruir_meses(db, None if completo else meses_alvo)
+                meses_versao |= _meses_operacao(db, None if completo else meses_alvo)
+            if nomes_indice is not None:
+                for papel, nomes in empresas_dos_meses(db, meses_alvo).items():
+                    nomes_indice.setdefault(papel, set()).update(nomes)
+            atualizar_indice_empresas(db, nomes_indice)
+        elif completo:
+            meses_versao |= {m for (m,) in db.query(distinct(OperacaoComex.mes_referencia)).all()}
+        if completo or meses_alvo:
+            incrementar_versao(db, TABELA_OPERACOES, meses_versao)
+
+        if controle is None:
+            controle = RollupControle(nome=NOME_CONTROLE)
+            db.add(controle)
+        controle.ultimo_id = max_id
+        controle.data_atualizacao = datetime.utcnow()
+        db.commit()
+
+        if not suporta_rollups:
+            return None
+
+        meses_atualizados = sorted(m for m in meses_alvo if m)
+        logger.info(
+            f"📊 Rollups atualizados ({'completo' if completo else f'{len(meses_alvo)} mês(es)'}) "
+            f"em {time.perf_counter() - inicio:.2f}s"
+        )
+        return {"meses_atualizados": meses_atualizados, "completo": completo}
+    except Exception as e:
+        logger.warning(f"⚠️ Erro ao atualizar rollups: {e}")
+        db.rollback()
+        return None
+
+
+def _meses_completos(data_inicio: date, data_fim: date) -> List[str]:
+    """Meses (YYYY-MM) inteiramente contidos em [data_inicio, data_fim]."""
+    meses = []
+    y, m = data_inicio.year, data_inicio.month
+    while (y, m) <= (data_fim.year, data_fim.month):
+        primeiro = date(y, m, 1)
+        proximo = date(y + 1, 1, 1) if m == 12 else date(y, m + 1, 1)
+        if primeiro >= data_inicio and proximo - timedelta(days=1) <= data_fim:
+            meses.append(f"{y}-{m:02d}")
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+    return meses
+
+
+def _intervalos_brutos(data_inicio: date, data_fim: date, meses: List[str]) -> List[Tuple[date, date]]:
+    """Trechos do período que não são cobertos por meses completos (lidos das linhas brutas)."""
+    if not meses:
+        return [(data_inicio, data_fim)]
+    ano_ini, mes_ini = (int(p) for p in meses[0].split("-"))
+    ano_fim, mes_fim = (int(p) for p in meses[-1].split("-"))
+    primeiro_dia = date(ano_ini, mes_ini, 1)
+    dia_seguinte = date(ano_fim + 1, 1, 1) if mes_fim == 12 else date(ano_fim, mes_fim + 1, 1)
+    intervalos = []
+    if data_inicio < primeiro_dia:
+        intervalos.append((data_inicio, primeiro_dia - timedelta(days=1)))
+    if dia_seguinte <= data_fim:
+        intervalos.append((dia_seguinte, data_fim))
+    return intervalos
+
+
+def _filtros_comuns(modelo, tipo_filtro, ncms_filtro) -> list:
+    filtros = []
+    if tipo_filtro is not None:
+        filtros.append(modelo.tipo_operacao == tipo_filtro)
+    if ncms_filtro:
+        filtros.append(modelo.ncm.in_(ncms_filtro))
+    return filtros
+
+
+def _fonte_operacoes(data_inicio, data_fim, tipo_filtro, ncms_filtro):
+    """Subquery com rollups dos meses completos + linhas brutas agregadas das bordas."""
+    meses = _meses_completos(data_inicio, data_fim)
+    partes = []
+    if meses:
+        R = OperacaoComexMensal
+        partes.append(
+            select(
+                R.mes_referencia.label("mes_referencia"),
+                R.tipo_operacao.label("tipo_operacao"),
+                R.ncm.label("ncm"),
+                R.descricao_produto.label("descricao_produto"),
+                R.pais_origem_destino.label("pais_origem_destino"),
+                R.total_operacoes.label("total_operacoes"),
+                R.valor_fob.label("valor_fob"),
+                R.peso_liquido_kg.label("peso_liquido_kg"),
+                R.quantidade_estatistica.label("quantidade_estatistica"),
+            ).where(
+                R.mes_operacao >= meses[0],
+                R.mes_operacao <= meses[-1],
+                *_filtros_comuns(R, tipo_filtro, ncms_filtro),
+            )
+        )
+    O = OperacaoComex
+    for ini, fim in _intervalos_brutos(data_inicio, data_fim, meses):
+        partes.append(
+            select(
+                O.mes_referencia.label("mes_referencia"),
+                O.tipo_operacao.label("tipo_operacao"),
+                O.ncm.label("ncm"),
+                O.descricao_produto.label("descricao_produto"),
+                O.pais_origem_destino.label("pais_origem_destino"),
+                func.count(O.id).label("total_operacoes"),
+                func.sum(O.valor_fob).label("valor_fob"),
+                func.sum(O.peso_liquido_kg).label("peso_liquido_kg"),
+                func.sum(O.quantidade_estatistica).label("quantidade_estatistica"),
+            ).where(
+                O.data_operacao >= ini,
+                O.data_operacao <= fim,
+                *_filtros_comuns(O, tipo_filtro, ncms_filtro),
+            ).group_by(
+                O.mes_referencia, O.tipo_operacao, O.ncm, O.descricao_produto, O.pais_origem_destino,
+            )
+        )
+    return (union_all(*partes) if len(partes) > 1 else partes[0]).subquery("fonte_operacoes")
+
+
+def _fonte_empresas(data_inicio, data_fim, tipo_filtro, ncms_filtro, papel: str):
+    """Subquery de empresas (importador/exportador) no período, no mesmo esquema da fonte de operações."""
+    meses = _meses_completos(data_inicio, data_fim)
+    partes = []
+    if meses:
+        R = EmpresaComexMensal
+        partes.append(
+            select(
+                R.nome.label("nome"),
+                R.total_operacoes.label("total_operacoes"),
+                R.valor_fob.label("valor_fob"),
+                R.peso_liquido_kg.label("peso_liquido_kg"),
+            ).where(
+                R.papel == papel,
+                R.mes_operacao >= meses[0],
+                R.mes_operacao <= meses[-1],
+                *_filtros_comuns(R, tipo_filtro, ncms_filtro),
+            )
+        )
+    coluna = _COLUNAS_EMPRESA[papel]
+    O = OperacaoComex
+    for ini, fim in _intervalos_brutos(data_inicio, data_fim, meses):
+        partes.append(
+            select(
+                coluna.label("nome"),
+                func.count(O.id).label("total_operacoes"),
+                func.sum(O.valor_fob).label("valor_fob"),
+                func.sum(O.peso_liquido_kg).label("peso_liquido_kg"),
+            ).where(
+                O.data_operacao >= ini,
+                O.data_operacao <= fim,
+                coluna.isnot(None),
+                coluna != "",
+                *_filtros_comuns(O, tipo_filtro, ncms_filtro),
+            ).group_by(coluna)
+        )
+    return (union_all(*partes) if len(partes) > 1 else partes[0]).subquery(f"fonte_{papel}")
+
+
+def _top_empresas(db: Session, fonte, limite: int) -> List[Dict[str, Any]]:
+    valor = func.sum(fonte.c.valor_fob)
+    linhas = db.execute(
+        select(
+            fonte.c.nome,
+            valor,
+            func.sum(fonte.c.total_operacoes),
+            func.sum(fonte.c.peso_liquido_kg),
+        ).group_by(fonte.c.nome).order_by(valor.desc()).limit(limite)
+    ).all()
+    return [
+        {
+            "nome": nome or "N/A",
+            "valor_total": float(valor_total or 0),
+            "total_operacoes": int(total_operacoes or 0),
+            "peso_total": float(peso_total or 0),
+        }
+        for nome, valor_total, total_operacoes, peso_total in linhas
+    ]
+
+
+def rollups_disponiveis(db: Session) -> bool:
+    """
+    True se os rollups já foram construídos (linha de controle presente). Só lê:
+    as leituras usam os rollups como estão, atualizados nas importações e na
+    sincronização agendada (utils.scheduler).
+    """
+    if _expr_mes_operacao(db) is None:
+        return False
+    return db.query(RollupControle.id).filter(RollupControle.nome == NOME_CONTROLE).first() is not None
+
+
+def calcular_agregados_dashboard(
+    db: Session,
+    data_inicio: date,
+    data_fim: date,
+    tipo_filtro: Optional[TipoOperacao] = None,
+    ncms_filtro: Optional[List[str]] = None,
+    limite_top: int = 10,
+) -> Optional[Dict[str, Any]]:
+    """
+    Calcula os agregados do /dashboard/stats a partir dos rollups, como estão.
+
+    Returns:
+        Dicionário com totais, listas top-N e série mensal, ou None se os rollups
+        não estiverem disponíveis (o chamador deve usar as linhas brutas).
+    """
+    if not rollups_disponiveis(db):
+        return None
+
+    fonte = _fonte_operacoes(data_inicio, data_fim, tipo_filtro, ncms_filtro)
+
+    # Totais por tipo de operação
+    por_tipo = {
+        tipo: (int(n or 0), float(v or 0), float(p or 0), float(q or 0))
+        for tipo, n, v, p, q in db.execute(
+            select(
+                fonte.c.tipo_operacao,
+                func.sum(fonte.c.total_operacoes),
+                func.sum(fonte.c.valor_fob),
+                func.sum(fonte.c.peso_liquido_kg),
+                func.sum(fonte.c.quantidade_estatistica),
+            ).group_by(fonte.c.tipo_operacao)
+        ).all()
+    }
+    vazio = (0, 0.0, 0.0, 0.0)
+    n_imp, valor_imp, peso_imp, qtd_imp = por_tipo.get(TipoOperacao.IMPORTACAO, vazio)
+    n_exp, valor_exp, peso_exp, qtd_exp = por_tipo.get(TipoOperacao.EXPORTACAO, vazio)
+
+    def _quantidade(qtd: float, n: int) -> float:
+        # Quantidade estatística vazia: usar contagem de linhas (mesma regra da consulta direta)
+        return float(n) if qtd == 0 and n > 0 else qtd
+
+    valor_total = valor_imp + valor_exp
+    quantidade_total = _quantidade(qtd_imp + qtd_exp, n_imp + n_exp)
+    if tipo_filtro is None:
+        quantidade_imp = _quantidade(qtd_imp, n_imp)
+        quantidade_exp = _quantidade(qtd_exp, n_exp)
+    elif tipo_filtro == TipoOperacao.IMPORTACAO:
+        valor_exp, quantidade_imp, quantidade_exp = 0.0, quantidade_total, 0.0
+    else:
+        valor_imp, quantidade_imp, quantidade_exp = 0.0, 0.0, quantidade_total
+
+    # Principais NCMs (por NCM e descrição, como a consulta direta)
+    valor_ncm = func.sum(fonte.c.valor_fob)
+    principais_ncms = [
+        {
+            "ncm": ncm,
+            "descricao": desc[:100] if desc else "",
+            "valor_total": float(total_valor or 0),
+            "total_operacoes": int(total_operacoes or 0),
+        }
+        for ncm, desc, total_valor, total_operacoes in db.execute(
+            select(
+                fonte.c.ncm,
+                fonte.c.descricao_produto,
+                valor_ncm,
+                func.sum(fonte.c.total_operacoes),
+            ).group_by(fonte.c.ncm, fonte.c.descricao_produto).order_by(valor_ncm.desc()).limit(limite_top)
+        ).all()
+    ]
+
+    # Principais países
+    valor_pais = func.sum(fonte.c.valor_fob)
+    principais_paises = [
+        {
+            "pais": pais,
+            "valor_total": float(total_valor or 0),
+            "total_operacoes": int(total_operacoes or 0),
+        }
+        for pais, total_valor, total_operacoes in db.execute(
+            select(
+                fonte.c.pais_origem_destino,
+                valor_pais,
+                func.sum(fonte.c.total_operacoes),
+            ).group_by(fonte.c.pais_origem_destino).order_by(valor_pais.desc()).limit(limite_top)
+        ).all()
+    ]
+
+    # Série mensal
+    por_mes = [
+        (mes, int(count or 0), float(valor or 0), float(peso or 0))
+        for mes, count, valor, peso in db.execute(
+            select(
+                fonte.c.mes_referencia,
+                func.sum(fonte.c.total_operacoes),
+                func.sum(fonte.c.valor_fob),
+                func.sum(fonte.c.peso_liquido_kg),
+            ).group_by(fonte.c.mes_referencia).order_by(fonte.c.mes_referencia)
+        ).all()
+    ]
+
+    return {
+        "volume_imp": peso_imp,
+        "volume_exp": peso_exp,
+        "valor_total": valor_total,
+        "quantidade_total": quantidade_total,
+        "valor_total_imp": valor_imp,
+        "valor_total_exp": valor_exp,
+        "quantidade_imp": quantidade_imp,
+        "quantidade_exp": quantidade_exp,
+        "principais_ncms": principais_ncms,
+        "principais_paises": principais_paises,
+        "principais_importadores": _top_empresas(
+            db, _fonte_empresas(data_inicio, data_fim, tipo_filtro, ncms_filtro, "importador"), limite_top
+        ),
+        "principais_exportadores": _top_empresas(
+            db, _fonte_empresas(data_inicio, data_fim, tipo_filtro, ncms_filtro, "exportador"), limite_top
+        ),
+        "por_mes": por_mes,
+    }
+
+
+def contar_operacoes(
+    db: Session,
+    data_inicio: date,
+    data_fim: date,
+    tipo_filtro: Optional[TipoOperacao] = None,
+    ncms_filtro: Optional[List[str]] = None,
+    uf: Optional[str] = None,
+    pais: Optional[str] = None,
+) -> Optional[int]:
+    """
+    Número de operações no período: soma dos rollups nos meses completos, como
+    estão, mais a contagem das linhas brutas nas bordas (mesmo resultado de um
+    COUNT direto quando os rollups estão em dia).
+
+    Args:
+        uf: UF exata
+        pais: Trecho do país (ILIKE, como no /buscar)
+
+    Returns:
+        Contagem, ou None se os rollups não estiverem disponíveis
+    """
+    if not rollups_disponiveis(db):
+        return None
+
+    def _filtros(modelo) -> list:
+        filtros = _filtros_comuns(modelo, tipo_filtro, ncms_filtro)
+        if uf:
+            filtros.append(modelo.uf == uf.upper())
+        if pais:
+            filtros.append(modelo.pais_origem_destino.ilike(f"%{pais}%"))
+        return filtros
+
+    meses = _meses_completos(data_inicio, data_fim)
+    total = 0
+    if meses:
+        R = OperacaoComexMensal
+        total += db.query(func.sum(R.total_operacoes)).filter(
+            R.mes_operacao >= meses[0], R.mes_operacao <= meses[-1], *_filtros(R)
+        ).scalar() or 0
+    O = OperacaoComex
+    for ini, fim in _intervalos_brutos(data_inicio, data_fim, meses):
+        total += db.query(func.count(O.id)).filter(
+            O.data_operacao >= ini, O.data_operacao <= fim, *_filtros(O)
+        ).scalar() or 0
+    return int(total)
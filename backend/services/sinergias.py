@@ -0,0 +1,217 @@
+"""
+Sinergias importação/exportação pré-calculadas (tabela sinergias).
+
+O SinergiaAnalyzer fazia, a cada requisição, um SELECT DISTINCT de CNPJs e duas
+consultas agregadas por empresa (importações e exportações), e recalculava as
+sinergias por estado. Agora:
+  - os totais por empresa e por estado saem de uma consulta agrupada cada uma
+    (SinergiaAnalyzer.totais_por_empresa / totais_por_estado);
+  - recalcular_sinergias grava o resultado completo na tabela sinergias, com o
+    horário do cálculo, e incrementa a versão "sinergias" (services.versoes),
+    que entra nas chaves de cache das respostas;
+  - o recálculo roda no DataUpdater (startup, scheduler e atualização completa)
+    e, na primeira consulta, se a tabela nunca foi calculada;
+  - /analisar-sinergias-empresas, /analisar-sinergias-estado,
+    /dashboard/sinergias-estado e /dashboard/sugestoes-empresas só leem a tabela.
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from data_collector.sinergia_analyzer import SinergiaAnalyzer
+from database.models import Sinergia
+from services.empresas_mdic import indice_empresas_mdic
+from services.versoes import TABELA_SINERGIAS, incrementar_versao, versao_tabela
+
+ESCOPO_EMPRESA = "empresa"
+ESCOPO_ESTADO = "estado"
+
+# Um recálculo por vez (a tabela é apagada e regravada)
+_recalculo_lock = threading.Lock()
+
+
+def recalcular_sinergias(db: Session, cnae_analyzer=None) -> Dict[str, Any]:
+    """
+    Recalcula e grava as sinergias por empresa (CNPJs da lista do MDIC) e por estado.
+
+    Args:
+        db: Sessão do banco de dados
+        cnae_analyzer: CNAEAnalyzer carregado (opcional; preenche CNAE e sugestões por CNAE)
+
+    Returns:
+        Estatísticas: estados, estados_com_sinergia, empresas, data_atualizacao, segundos
+    """
+    with _recalculo_lock:
+        inicio = time.perf_counter()
+        agora = datetime.utcnow()
+        analyzer = SinergiaAnalyzer(cnae_analyzer)
+
+        linhas: List[Dict[str, Any]] = []
+        estados_com_sinergia = 0
+        totais_estados = analyzer.totais_por_estado(db)
+        for uf, totais in totais_estados.items():
+            imp, exp = totais["importacoes"], totais["exportacoes"]
+            sinergia = analyzer.sinergia_estado(uf, imp, exp)
+            estados_com_sinergia += sinergia is not None
+            linhas.append({
+                "escopo": ESCOPO_ESTADO,
+                "chave": uf or "",
+                "uf": uf,
+                "importacoes_total": imp["total"],
+                "importacoes_valor": imp["valor_total"],
+                "importacoes_peso": imp["peso_total"],
+                "exportacoes_total": exp["total"],
+                "exportacoes_valor": exp["valor_total"],
+                "exportacoes_peso": exp["peso_total"],
+                "indice_sinergia": sinergia["indice_sinergia"] if sinergia else 0.0,
+                "sugestao": sinergia["sugestao"] if sinergia else None,
+                "data_atualizacao": agora,
+            })
+
+        empresas = analyzer.analisar_sinergias_por_empresa(db, indice_empresas_mdic(db), limite=None)
+        for empresa in empresas:
+            linhas.append({
+                "escopo": ESCOPO_EMPRESA,
+                "chave": empresa["cnpj"],
+                "uf": (empresa.get("uf") or "")[:2] or None,
+                "razao_social": empresa.get("razao_social"),
+                "nome_fantasia": empresa.get("nome_fantasia"),
+                "municipio": empresa.get("municipio"),
+                "importacoes_total": empresa["importacoes"]["total_operacoes"],
+                "importacoes_valor": empresa["importacoes"]["valor_total"],
+                "exportacoes_total": empresa["exportacoes"]["total_operacoes"],
+                "exportacoes_valor": empresa["exportacoes"]["valor_total"],
+                "indice_sinergia": empresa["potencial_sinergia"],
+                "cnae": empresa.get("cnae"),
+                "classificacao_cnae": empresa.get("classificacao_cnae"),
+                "sugestao": empresa.get("sugestao"),
+                "data_atualizacao": agora,
+            })
+
+        try:
+            db.query(Sinergia).delete(synchronize_session=False)
+            if linhas:
+                db.bulk_insert_mappings(Sinergia, linhas)
+            incrementar_versao(db, TABELA_SINERGIAS)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        stats = {
+            "estados": len(totais_estados),
+            "estados_com_sinergia": estados_com_sinergia,
+            "empresas": len(empresas),
+            "data_atualizacao": agora.isoformat(),
+            "segundos": round(time.perf_counter() - inicio, 3),
+        }
+        logger.info(
+            f"✅ Sinergias recalculadas: {stats['empresas']} empresas, "
+            f"{stats['estados_com_sinergia']}/{stats['estados']} estados com sinergia em {stats['segundos']}s"
+        )
+        return stats
+
+
+def garantir_sinergias(db: Session, cnae_analyzer=None) -> None:
+    """Calcula a tabela na primeira consulta (nunca calculada = versão 0)."""
+    if versao_tabela(db, TABELA_SINERGIAS) == 0:
+        logger.info("🔄 Tabela de sinergias ainda não calculada, calculando...")
+        recalcular_sinergias(db, cnae_analyzer)
+
+
+def data_sinergias(db: Session) -> Optional[str]:
+    """Horário (ISO) do último cálculo gravado, ou None."""
+    data = db.query(func.max(Sinergia.data_atualizacao)).scalar()
+    return data.isoformat() if data else None
+
+
+def _totais(linha: Sinergia, peso: bool) -> Dict[str, Dict[str, Any]]:
+    chave_total = "total" if peso else "total_operacoes"
+    imp = {chave_total: linha.importacoes_total, "valor_total": linha.importacoes_valor}
+    exp = {chave_total: linha.exportacoes_total, "valor_total": linha.exportacoes_valor}
+    if peso:
+        imp["peso_total"] = linha.importacoes_peso or 0.0
+        exp["peso_total"] = linha.exportacoes_peso or 0.0
+    return {"importacoes": imp, "exportacoes": exp}
+
+
+def sinergias_por_estado(db: Session, uf: Optional[str] = None, limite: int = 20) -> Dict[str, Any]:
+    """
+    Sinergias por estado gravadas, no formato de SinergiaAnalyzer.analisar_sinergias_por_estado
+    (mais atualizado_em).
+    """
+    consulta = db.query(Sinergia).filter(Sinergia.escopo == ESCOPO_ESTADO)
+    if uf:
+        consulta = consulta.filter(Sinergia.chave == uf.upper())
+    com_sinergia = consulta.filter(Sinergia.importacoes_total > 0, Sinergia.exportacoes_total > 0)
+
+    sinergias = [
+        {
+            "uf": linha.uf,
+            **_totais(linha, peso=True),
+            "indice_sinergia": linha.indice_sinergia,
+            "sugestao": linha.sugestao,
+        }
+        for linha in com_sinergia.order_by(Sinergia.indice_sinergia.desc(), Sinergia.chave).limit(limite)
+    ]
+    return {
+        "uf_filtrada": uf,
+        "total_estados": consulta.count(),
+        "estados_com_sinergia": com_sinergia.count(),
+        "sinergias": sinergias,
+        "atualizado_em": data_sinergias(db),
+    }
+
+
+def sinergias_por_empresa(
+    db: Session,
+    limite: Optional[int] = 100,
+    tipo: Optional[str] = None,
+    uf: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Sinergias por empresa gravadas, da maior para a menor, no formato de
+    SinergiaAnalyzer.analisar_sinergias_por_empresa.
+
+    Args:
+        limite: Quantidade de empresas (None = todas)
+        tipo: 'importacao' (só importam) ou 'exportacao' (só exportam); None = todas
+        uf: Filtrar por UF
+    """
+    consulta = db.query(Sinergia).filter(Sinergia.escopo == ESCOPO_EMPRESA)
+    tipo = (tipo or "").lower()
+    if "import" in tipo:
+        consulta = consulta.filter(Sinergia.importacoes_total > 0, Sinergia.exportacoes_total == 0)
+    elif "export" in tipo:
+        consulta = consulta.filter(Sinergia.exportacoes_total > 0, Sinergia.importacoes_total == 0)
+    if uf:
+        consulta = consulta.filter(Sinergia.uf == uf.upper())
+    consulta = consulta.order_by(
+        Sinergia.indice_sinergia.desc(),
+        (Sinergia.importacoes_valor + Sinergia.exportacoes_valor).desc(),
+        Sinergia.chave,
+    )
+    if limite is not None:
+        consulta = consulta.limit(limite)
+
+    return [
+        {
+            "cnpj": linha.chave,
+            "razao_social": linha.razao_social,
+            "nome_fantasia": linha.nome_fantasia,
+            "uf": linha.uf,
+            "municipio": linha.municipio,
+            **_totais(linha, peso=False),
+            "potencial_sinergia": linha.indice_sinergia,
+            "cnae": linha.cnae,
+            "classificacao_cnae": linha.classificacao_cnae,
+            "sugestao": linha.sugestao,
+        }
+        for linha in consulta
+    ]
+
@@ -0,0 +1,126 @@
+"""
+Versões dos dados por tabela e mês de referência (tabela versoes_dados).
+
+Toda importação/coleta incrementa a versão dos meses alterados e a versão da
+tabela inteira ("*"). As chaves de cache das respostas incluem a assinatura
+das versões que a resposta lê, então as entradas podem viver horas e deixam de
+ser usadas assim que os meses envolvidos mudam.
+"""
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Sequence
+
+from loguru import logger
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database.models import VersaoDados
+
+TABELA_OPERACOES = "operacoes_comex"
+TABELA_EMPRESAS = "empresas"
+TABELA_EMPRESAS_RECOMENDADAS = "empresas_recomendadas"
+TABELA_EMPRESAS_MDIC = "empresas_mdic"
+TABELA_SINERGIAS = "sinergias"
+TABELA_CNAE = "cnae_hierarquia"
+
+TODOS = "*"
+SEM_MES = ""
+
+
+def incrementar_versao(db: Session, tabela: str, meses: Optional[Iterable[Optional[str]]] = None) -> None:
+    """
+    Incrementa a versão dos meses informados e da tabela inteira.
+    meses=None: alteração sem mês conhecido (reconstrução completa) -> todos os meses da tabela.
+    Não faz commit; o chamador confirma junto com os dados.
+    """
+    agora = datetime.utcnow()
+    if meses is None:
+        db.query(VersaoDados).filter(VersaoDados.tabela == tabela).update(
+            {VersaoDados.versao: VersaoDados.versao + 1, VersaoDados.data_atualizacao: agora},
+            synchronize_session=False,
+        )
+        alvo = {TODOS}
+    else:
+        alvo = {m if m else SEM_MES for m in meses}
+        alvo.add(TODOS)
+
+    existentes = {
+        v.mes_referencia: v
+        for v in db.query(VersaoDados).filter(
+            VersaoDados.tabela == tabela, VersaoDados.mes_referencia.in_(alvo)
+        ).all()
+    }
+    for mes in alvo:
+        versao = existentes.get(mes)
+        if versao is None:
+            db.add(VersaoDados(tabela=tabela, mes_referencia=mes, versao=1, data_atualizacao=agora))
+        elif meses is not None or mes != TODOS:
+            versao.versao += 1
+            versao.data_atualizacao = agora
+        else:
+            # Já incrementada pelo UPDATE em massa acima
+            db.expire(versao)
+    db.flush()
+
+
+def versao_tabela(db: Session, tabela: str) -> int:
+    """Versão da tabela inteira."""
+    versao = db.query(VersaoDados.versao).filter(
+        VersaoDados.tabela == tabela, VersaoDados.mes_referencia == TODOS
+    ).scalar()
+    return int(versao or 0)
+
+
+def versao_periodo(db: Session, tabela: str, mes_inicio: str, mes_fim: Optional[str] = None) -> int:
+    """
+    Soma das versões dos meses do período (inclui linhas sem mês).
+    As versões só crescem, então a soma muda sempre que algum mês do período muda.
+    """
+    filtros = [
+        VersaoDados.tabela == tabela,
+        VersaoDados.mes_referencia != TODOS,
+        (VersaoDados.mes_referencia >= mes_inicio) | (VersaoDados.mes_referencia == SEM_MES),
+    ]
+    if mes_fim:
+        filtros.append((VersaoDados.mes_referencia <= mes_fim) | (VersaoDados.mes_referencia == SEM_MES))
+    return int(db.query(func.sum(VersaoDados.versao)).filter(*filtros).scalar() or 0)
+
+
+def assinatura_versoes(
+    db: Session,
+    tabelas: Sequence[str],
+    periodos: Optional[Dict[str, tuple]] = None,
+) -> Optional[str]:
+    """
+    Assinatura para chaves de cache, ex.: "operacoes_comex=12;empresas=3".
+
+    Args:
+        tabelas: Tabelas lidas pela resposta (versão da tabela inteira)
+        periodos: {tabela: (mes_inicio, mes_fim)} para usar só as versões do período
+
+    Returns:
+        Assinatura, ou None se as versões não puderem ser lidas (não usar cache)
+    """
+    periodos = periodos or {}
+    try:
+        partes = []
+        for tabela in tabelas:
+            if tabela in periodos:
+                mes_inicio, mes_fim = periodos[tabela]
+                partes.append(f"{tabela}={versao_periodo(db, tabela, mes_inicio, mes_fim)}")
+            else:
+                partes.append(f"{tabela}={versao_tabela(db, tabela)}")
+        return ";".join(partes)
+    except Exception as e:
+        logger.warning(f"⚠️ Erro ao ler versões dos dados: {e}")
+        db.rollback()
+        return None
+
+
+def registrar_alteracao(db: Session, tabela: str, meses: Optional[Iterable[Optional[str]]] = None) -> None:
+    """Incrementa e confirma a versão após uma importação já confirmada (erros só geram aviso)."""
+    try:
+        incrementar_versao(db, tabela, meses)
+        db.commit()
+    except Exception as e:
+        logger.warning(f"⚠️ Erro ao registrar versão de {tabela}: {e}")
+        db.rollback()
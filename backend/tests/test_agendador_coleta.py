@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+import pytest
+from aiohttp import web
+
+from data_collector.api_client import ComexStatAPIClient
+from services.agendador_coleta import ProgressoColeta, executar_coletas
+from services.clientes_http import fechar_clientes_http
+
+
+async def _servidor_stub():
+    """
+    Stub local de /dados: registra horários e requisições simultâneas. A primeira
+    requisição de cada (NCM, mês) falha (503), e NCMs em "indisponiveis" sempre falham.
+    """
+    estado = {"horarios": [], "em_voo": 0, "max_em_voo": 0, "tentativas": {}, "indisponiveis": set()}
+
+    async def dados(request):
+        estado["horarios"].append(time.monotonic())
+        estado["em_voo"] += 1
+        estado["max_em_voo"] = max(estado["max_em_voo"], estado["em_voo"])
+        try:
+            await asyncio.sleep(0.05)
+            ncm, mes = request.query["ncm"], request.query["mes_inicio"]
+            estado["tentativas"][(ncm, mes)] = estado["tentativas"].get((ncm, mes), 0) + 1
+            if ncm in estado["indisponiveis"] or estado["tentativas"][(ncm, mes)] == 1:
+                return web.json_response({"erro": "indisponível"}, status=503)
+            return web.json_response({"registros": [{"ncm": ncm, "mes": mes}]})
+        finally:
+            estado["em_voo"] -= 1
+
+    app = web.Application()
+    app.router.add_get("/dados", dados)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    porta = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{porta}", estado
+
+
+@pytest.mark.asyncio
+async def test_agendador_limita_concorrencia_tenta_de_novo_e_retoma(tmp_path):
+    runner, url, estado = await _servidor_stub()
+    cliente = ComexStatAPIClient()
+    cliente.base_url = url
+    tarefas = [(f"0101210{n}", "Importação", f"2025-{m:02d}") for n in range(4) for m in range(1, 7)]
+    salvos = {}
+
+    async def _buscar(tarefa):
+        ncm, tipo, mes = tarefa
+        return await cliente.fetch_data(mes_inicio=mes, mes_fim=mes, tipo_operacao=tipo, ncm=ncm)
+
+    def _salvar(tarefa, dados):
+        salvos[tarefa] = dados
+
+    parametros = dict(concorrencia=4, requisicoes_por_segundo=200, tentativas=3, atraso_base=0.01)
+    caminho = tmp_path / "progresso.json"
+    try:
+        # Primeira execução: dois NCMs fora do ar -> progresso guardado para retomar
+        estado["indisponiveis"] = {"01012102", "01012103"}
+        parcial = await executar_coletas(tarefas, _buscar, _salvar, progresso=ProgressoColeta(caminho), **parametros)
+        assert parcial["concluidas"] == 12 and len(parcial["falhas"]) == 12
+        assert parcial["requisicoes"] == 12 * 2 + 12 * 3  # uma nova tentativa / três tentativas
+        assert caminho.exists()
+
+        estado["indisponiveis"] = set()
+        estado["horarios"].clear()
+        inicio = time.monotonic()
+        stats = await executar_coletas(tarefas, _buscar, _salvar, progresso=ProgressoColeta(caminho), **parametros)
+        duracao = time.monotonic() - inicio
+    finally:
+        await fechar_clientes_http()
+        await runner.cleanup()
+
+    assert stats["retomadas"] == 12 and stats["concluidas"] == 12 and not stats["falhas"]
+    assert len(estado["horarios"]) == 12  # só as tarefas pendentes foram requisitadas
+    assert len(salvos) == 24 and salvos[tarefas[-1]] == [{"ncm": "01012103", "mes": "2025-06"}]
+    assert estado["max_em_voo"] <= 4
+    # 12 requisições de 50 ms em série levariam >= 0,6 s
+    assert duracao < 0.6
+    assert not caminho.exists()
+
+
+@pytest.mark.asyncio
+async def test_agendador_respeita_limite_de_taxa():
+    chamadas = []
+
+    async def _buscar(tarefa):
+        chamadas.append(time.monotonic())
+        if tarefa[0] == "falha":
+            raise RuntimeError("erro permanente")
+        return tarefa
+
+    tarefas = [("ok", i) for i in range(40)] + [("falha", 0)]
+    stats = await executar_coletas(
+        tarefas, _buscar, lambda tarefa, dados: None,
+        concorrencia=20, requisicoes_por_segundo=30, tentativas=2, atraso_base=0.01,
+    )
+
+    assert stats["concluidas"] == 40 and len(stats["falhas"]) == 1 and stats["requisicoes"] == 42
+    # Rajada de 30 fichas + 30/s: em qualquer janela, no máximo 30 + 30 * duração (+1 de folga)
+    chamadas.sort()
+    for i in range(len(chamadas)):
+        for j in range(i + 1, len(chamadas)):
+            assert j - i + 1 <= 30 + 30 * (chamadas[j] - chamadas[i]) + 1
+    assert chamadas[-1] - chamadas[0] >= (42 - 30) / 30 * 0.9
@@ -0,0 +1,325 @@
+import threading
+import time
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database.models import (
+    Base, Empresa, EmpresaBusca, EmpresasRecomendadas, OperacaoComex, RollupControle, TipoOperacao, VersaoDados,
+    ViaTransporte,
+)
+import main as backend_main
+from services.autocomplete_memoria import MotorAutocomplete, motor_em_dia, obter_motor
+from services.busca_empresas import (
+    FONTE_EMPRESAS, FONTE_MDIC, INDICE_CADASTRO, INDICE_OPERACOES, buscar_empresas, normalizar_nome_empresa,
+    preparar_indice_busca, sincronizar_indice_cadastro, sincronizar_indices_cadastro,
+)
+from database.models import EmpresaMDIC
+from services.empresas_mdic import (
+    buscar_empresas_mdic, gravar_empresas_mdic, indice_empresas_mdic, sincronizar_empresas_mdic
+)
+from services.rollups import atualizar_rollups
+from services.versoes import TABELA_EMPRESAS, TODOS, TABELA_EMPRESAS_MDIC, registrar_alteracao, versao_tabela
+
+
+def _make_session():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def _importacao(importador, valor):
+    hoje = date.today()
+    return OperacaoComex(
+        ncm="01010101",
+        descricao_produto="Produto A",
+        tipo_operacao=TipoOperacao.IMPORTACAO,
+        pais_origem_destino="China",
+        uf="SP",
+        via_transporte=ViaTransporte.MARITIMA,
+        valor_fob=valor,
+        peso_liquido_kg=1.0,
+        data_operacao=hoje,
+        mes_referencia=hoje.strftime("%Y-%m"),
+        arquivo_origem="teste",
+        razao_social_importador=importador,
+    )
+
+
+def test_normalizar_nome_empresa():
+    assert normalizar_nome_empresa("  Açúcar  Guarani S.A. ") == "ACUCAR GUARANI SA"
+    assert normalizar_nome_empresa("Comércio-Ltda.") == "COMERCIO LTDA"
+
+
+def test_indice_acompanha_importacoes_e_cadastro():
+    db = _make_session()
+    db.add_all([
+        _importacao("Açúcar Guarani S.A.", 300.0),
+        _importacao("Açúcar Guarani S.A.", 200.0),
+        _importacao("GUARANIA COMERCIO LTDA", 900.0),
+        _importacao("Outra Empresa", 50.0),
+    ])
+    db.commit()
+    atualizar_rollups(db)
+
+    assert buscar_empresas(db, "guarani", "importador", 10) == [
+        ("GUARANIA COMERCIO LTDA", 1, 900.0),
+        ("Açúcar Guarani S.A.", 2, 500.0),
+    ]
+    assert buscar_empresas(db, "acucar guarani sa", "importador", 10) == [("Açúcar Guarani S.A.", 2, 500.0)]
+    assert buscar_empresas(db, "", "importador", 1) == [("GUARANIA COMERCIO LTDA", 1, 900.0)]
+    assert buscar_empresas(db, "ou", "importador", 10) == [("Outra Empresa", 1, 50.0)]
+
+    # Nova importação: totais atualizados incrementalmente
+    db.add(_importacao("Outra Empresa", 1000.0))
+    db.commit()
+    atualizar_rollups(db)
+    assert buscar_empresas(db, "empresa", "importador", 10) == [("Outra Empresa", 2, 1050.0)]
+
+    # Cadastro: a busca só lê; reindexado pelo fluxo de gravação quando a versão muda
+    db.add(Empresa(nome="Guarani Cadastro", tipo="ambos", valor_importacao=10.0, valor_exportacao=0.0))
+    db.commit()
+    registrar_alteracao(db, TABELA_EMPRESAS)
+    assert buscar_empresas(db, "guarani", "exportador", 10, fonte=FONTE_EMPRESAS) is None
+    assert sincronizar_indice_cadastro(db, FONTE_EMPRESAS) is True
+    assert sincronizar_indice_cadastro(db, FONTE_EMPRESAS) is False
+    assert buscar_empresas(db, "guarani", "exportador", 10, fonte=FONTE_EMPRESAS) == [
+        ("Guarani Cadastro", 0, 0.0),
+    ]
+
+    db.add(Empresa(nome="Guarani Novo", tipo="exportadora", valor_importacao=0.0, valor_exportacao=20.0))
+    db.commit()
+    registrar_alteracao(db, TABELA_EMPRESAS)
+    assert len(buscar_empresas(db, "guarani", "exportador", 10, fonte=FONTE_EMPRESAS)) == 1
+    sincronizar_indice_cadastro(db, FONTE_EMPRESAS)
+    assert [n for n, _t, _v in buscar_empresas(db, "guarani", "exportador", 10, fonte=FONTE_EMPRESAS)] == [
+        "Guarani Novo", "Guarani Cadastro",
+    ]
+
+
+def test_indice_de_texto_em_conexao_propria_e_versoes_em_versoes_dados(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'busca.db'}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    # Alteração pendente da sessão não é confirmada pela criação das estruturas
+    db.add(_importacao("Pendente Ltda", 10.0))
+    assert preparar_indice_busca(db) == "fts5"
+    db.rollback()
+    assert db.query(OperacaoComex).count() == 0
+
+    db.add(_importacao("Guarani Ltda", 10.0))
+    db.add(Empresa(nome="Guarani Cadastro", tipo="ambos", valor_importacao=1.0, valor_exportacao=0.0))
+    db.commit()
+    registrar_alteracao(db, TABELA_EMPRESAS)
+    sincronizar_indices_cadastro(db)
+    atualizar_rollups(db)
+    assert [n for n, _t, _v in buscar_empresas(db, "guarani", "importador", 10)] == ["Guarani Ltda"]
+    assert buscar_empresas(db, "guarani", "importador", 10, fonte=FONTE_EMPRESAS) == [("Guarani Cadastro", 0, 1.0)]
+
+    versoes = dict(
+        db.query(VersaoDados.tabela, VersaoDados.versao).filter(VersaoDados.mes_referencia == TODOS)
+    )
+    assert versoes[INDICE_OPERACOES] >= 1
+    assert versoes[INDICE_CADASTRO] == versao_tabela(db, TABELA_EMPRESAS)
+    assert db.query(RollupControle).filter(RollupControle.nome.like("empresas_busca%")).count() == 0
+    db.close()
+    engine.dispose()
+
+
+def test_reindexacao_do_cadastro_concorrente_nao_duplica(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'cadastro.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    Sessao = sessionmaker(bind=engine)
+    with Sessao() as db:
+        db.add_all([
+            Empresa(nome=f"Empresa {i}", tipo="ambos", valor_importacao=float(i), valor_exportacao=0.0)
+            for i in range(200)
+        ])
+        db.commit()
+        registrar_alteracao(db, TABELA_EMPRESAS)
+
+    barreira = threading.Barrier(4)
+
+    def reindexar():
+        with Sessao() as db:
+            barreira.wait()
+            return sincronizar_indice_cadastro(db, FONTE_EMPRESAS)
+
+    threads = [threading.Thread(target=reindexar) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    with Sessao() as db:
+        total = db.query(EmpresaBusca).filter(EmpresaBusca.fonte == FONTE_EMPRESAS).count()
+        assert total == 400  # 200 nomes x (importador, exportador)
+    engine.dispose()
+
+
+def test_motor_em_memoria_segue_indice_e_versao():
+    db = _make_session()
+    db.add_all([
+        _importacao("Açúcar Guarani S.A.", 300.0),
+        _importacao("GUARANIA COMERCIO LTDA", 900.0),
+        Empresa(nome="Guarani Açúcar e Álcool S.A.", cnpj="11111111000111", tipo="importadora",
+                valor_importacao=5.0, valor_exportacao=0.0),
+        Empresa(nome="Guarani Exportadora", cnpj="22222222000122", tipo="exportadora",
+                valor_importacao=0.0, valor_exportacao=5.0),
+        EmpresasRecomendadas(nome="Guarani Recomendada", cnpj="44444444000144", tipo_principal="importadora",
+                             provavel_importador=1, valor_total_importacao_usd=50.0),
+    ])
+    db.commit()
+    registrar_alteracao(db, TABELA_EMPRESAS)
+    atualizar_rollups(db)
+
+    motor = obter_motor(db, esperar=True)
+    # CNPJs por nome só do cadastro Empresa (como a consulta do /dashboard/stats sem motor)
+    assert motor.cnpjs_por_nome("guarani", "importadora") == ["11111111000111"]
+    assert motor.buscar("guarani", "importador", 10) == buscar_empresas(db, "guarani", "importador", 10)
+    assert motor.cnpjs_por_nome("guarani acucar s.a.", "importadora") == ["11111111000111"]
+    assert motor.cnpjs_por_nome("guarani", "exportadora") == ["22222222000122"]
+
+    # Nova importação muda a versão: o motor é recarregado
+    db.add(_importacao("Guarani Nova", 50.0))
+    db.commit()
+    atualizar_rollups(db)
+    novo = obter_motor(db, esperar=True)
+    assert novo is not motor
+    assert [nome for nome, _t, _v in novo.buscar("guarani", "importador", 10)] == [
+        "GUARANIA COMERCIO LTDA", "Açúcar Guarani S.A.", "Guarani Nova",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_motor_anterior_responde_durante_recarga_sem_ir_para_o_cache(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'motor.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add(_importacao("Guarani Ltda", 10.0))
+    db.commit()
+    atualizar_rollups(db)
+    motor = obter_motor(db, esperar=True)
+    backend_main._AUTOCOMPLETE_CACHE.clear()
+
+    # Recarga em segundo plano segura até o teste liberar
+    liberar = threading.Event()
+    carregar = MotorAutocomplete.carregar.__func__
+    monkeypatch.setattr(
+        MotorAutocomplete, "carregar", classmethod(lambda cls, *a: liberar.wait(10) and carregar(cls, *a))
+    )
+
+    async def autocomplete():
+        resposta = await backend_main.autocomplete_importadoras(
+            q="guarani", limit=10, incluir_sugestoes=False, ncm=None, db=db
+        )
+        return [empresa["nome"] for empresa in resposta]
+
+    db.add(_importacao("Guarani Nova", 50.0))
+    db.commit()
+    atualizar_rollups(db)
+    # Versão nova: o motor anterior continua respondendo enquanto o novo carrega
+    assert obter_motor(db) is motor
+    assert not motor_em_dia(db, motor)
+    assert await autocomplete() == ["Guarani Ltda"]
+
+    liberar.set()
+    limite = time.monotonic() + 10
+    novo = motor
+    while novo is motor and time.monotonic() < limite:
+        time.sleep(0.02)
+        novo = obter_motor(db)
+    assert novo is not motor and motor_em_dia(db, novo)
+    # A resposta do motor anterior não ficou no cache da versão nova
+    assert await autocomplete() == ["Guarani Nova", "Guarani Ltda"]
+    db.close()
+    engine.dispose()
+
+
+class _ScraperFalso:
+    def __init__(self, empresas, alterados):
+        self.empresas = empresas
+        self.arquivos_alterados = alterados
+
+    async def baixar_arquivos(self, ano=None, condicional=False):
+        return ["empresas_mdic.csv"]
+
+    def parse_csv_empresas(self, arquivo):
+        return self.empresas
+
+
+@pytest.mark.asyncio
+async def test_empresas_mdic_gravadas_e_buscadas_por_indice():
+    db = _make_session()
+    empresas = [
+        {"cnpj": "33333333000133", "razao_social": "Guarani Têxtil Ltda", "uf": "SC",
+         "tipo_operacao": "Importação", "faixa_valor": "Até US$ 1 milhão"},
+        {"cnpj": "33333333000133", "razao_social": "Guarani Têxtil Ltda", "uf": "SC",
+         "tipo_operacao": "Exportação", "faixa_valor": "Até US$ 1 milhão"},
+        {"cnpj": "44444444000144", "razao_social": "Guarani Export S.A.", "uf": "SP",
+         "tipo_operacao": "Exportação", "faixa_valor": None},
+    ]
+    resultado = await sincronizar_empresas_mdic(db, _ScraperFalso(empresas, []))
+    assert resultado == {"atualizado": True, "total_empresas": 2}
+
+    assert buscar_empresas_mdic(db, "guarani textil", "importador", 10) == [
+        {"nome": "Guarani Têxtil Ltda", "cnpj": "33333333000133", "uf": "SC", "faixa_valor": "Até US$ 1 milhão"},
+    ]
+    assert {e["cnpj"] for e in buscar_empresas_mdic(db, "guarani", "exportador", 10)} == {
+        "33333333000133", "44444444000144",
+    }
+
+    # Gravação fora do job: a busca lê o índice como está, sem reindexar
+    nova = {"cnpj": "55555555000155", "razao_social": "Guarani Nova ME", "uf": "PR",
+            "tipo_operacao": "Exportação", "faixa_valor": None}
+    gravar_empresas_mdic(db, empresas + [nova])
+    assert len(buscar_empresas_mdic(db, "guarani", "exportador", 10)) == 2
+
+    # Origem sem alterações e tabela preenchida: nada é regravado, mas o índice é posto em dia
+    resultado = await sincronizar_empresas_mdic(db, _ScraperFalso(empresas[:1], []))
+    assert resultado["atualizado"] is False
+    assert len(buscar_empresas_mdic(db, "guarani", "exportador", 10)) == 3
+
+    atualizar_rollups(db)
+    motor = obter_motor(db, esperar=True)
+    assert buscar_empresas_mdic(db, "export", "exportador", 10, motor=motor) == [
+        {"nome": "Guarani Export S.A.", "cnpj": "44444444000144", "uf": "SP", "faixa_valor": None},
+    ]
+
+
+def test_empresas_mdic_gravacao_incremental_e_indice_por_cnpj():
+    db = _make_session()
+    empresas = [
+        {"cnpj": "55555555000155", "razao_social": "Alfa Ltda", "uf": "SP", "tipo_operacao": "Importação"},
+        {"cnpj": "66666666000166", "razao_social": "Beta S.A.", "uf": "RJ", "tipo_operacao": "Exportação"},
+        {"cnpj": "77777777000177", "razao_social": "Gama Ltda", "uf": "MG", "tipo_operacao": "Exportação"},
+    ]
+    assert gravar_empresas_mdic(db, empresas) == 3
+    ids = {e.cnpj: e.id for e in db.query(EmpresaMDIC).all()}
+    indice = indice_empresas_mdic(db)
+    assert indice["55555555000155"]["razao_social"] == "Alfa Ltda" and indice["55555555000155"]["importadora"]
+    assert indice_empresas_mdic(db) is indice  # mesma versão: índice compartilhado
+
+    # Mesma lista: nada gravado, versão inalterada
+    versao = versao_tabela(db, TABELA_EMPRESAS_MDIC)
+    gravar_empresas_mdic(db, empresas)
+    assert versao_tabela(db, TABELA_EMPRESAS_MDIC) == versao
+
+    # Alfa muda de UF, Gama sai da lista, Delta entra
+    gravar_empresas_mdic(db, [
+        {**empresas[0], "uf": "PR"},
+        empresas[1],
+        {"cnpj": "88888888000188", "razao_social": "Delta Ltda", "tipo_operacao": "Importação"},
+    ])
+    atual = {e.cnpj: e for e in db.query(EmpresaMDIC).all()}
+    assert set(atual) == {"55555555000155", "66666666000166", "88888888000188"}
+    assert atual["55555555000155"].id == ids["55555555000155"] and atual["55555555000155"].uf == "PR"
+    assert atual["66666666000166"].id == ids["66666666000166"]
+
+    novo = indice_empresas_mdic(db)
+    assert novo is not indice
+    assert novo["55555555000155"]["uf"] == "PR" and "77777777000177" not in novo
+    assert novo["88888888000188"]["uf"] == "" and not novo["88888888000188"]["exportadora"]
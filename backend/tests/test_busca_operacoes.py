@@ -0,0 +1,107 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import main as backend_main
+from database.models import Base, OperacaoComex, RollupControle, TipoOperacao, ViaTransporte
+from services.busca_operacoes import buscar_pagina, condicoes_busca, contar_total, decodificar_cursor
+from services.rollups import atualizar_rollups
+
+
+def _make_session():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    hoje = date.today()
+    db.add_all([
+        OperacaoComex(
+            ncm="01010101" if i % 3 else "02020202",
+            descricao_produto="Produto",
+            tipo_operacao=TipoOperacao.IMPORTACAO if i % 2 else TipoOperacao.EXPORTACAO,
+            pais_origem_destino="China" if i % 4 else "Estados Unidos",
+            uf=("SP", "RJ", "MG")[i % 3],
+            via_transporte=ViaTransporte.MARITIMA if i % 5 else ViaTransporte.AEREA,
+            valor_fob=float(i),
+            peso_liquido_kg=1.0,
+            # Várias operações no mesmo dia: o id desempata
+            data_operacao=hoje - timedelta(days=(i * 7) % 400),
+            mes_referencia=(hoje - timedelta(days=(i * 7) % 400)).strftime("%Y-%m"),
+            razao_social_importador=f"EMPRESA {i % 10} LTDA",
+        )
+        for i in range(230)
+    ])
+    db.commit()
+    atualizar_rollups(db)  # como nos fluxos de importação
+    return engine, db
+
+
+@pytest.mark.asyncio
+async def test_buscar_paginacao_por_cursor_e_total_estimado():
+    engine, db = _make_session()
+    filtros = backend_main.BuscaFiltros(page_size=20)
+    condicoes = condicoes_busca(filtros)
+    esperado = [
+        op.id for op in db.query(OperacaoComex).filter(*condicoes)
+        .order_by(OperacaoComex.data_operacao.desc(), OperacaoComex.id.desc())
+    ]
+
+    # Percorre tudo por cursor: mesma ordem da paginação por página, sem OFFSET
+    consultas = []
+    event.listen(engine, "before_cursor_execute", lambda c, cur, sql, params, *a: consultas.append((sql, params)))
+    vistos, cursor, pagina = [], None, 1
+    while True:
+        ops, proximo = buscar_pagina(db, backend_main.BuscaFiltros(page_size=20, cursor=cursor))
+        por_pagina, _ = buscar_pagina(db, backend_main.BuscaFiltros(page_size=20, page=pagina))
+        assert [o.id for o in ops] == [o.id for o in por_pagina]
+        vistos += [o.id for o in ops]
+        if proximo is None:
+            break
+        assert decodificar_cursor(proximo)[1] == ops[-1].id
+        cursor, pagina = proximo, pagina + 1
+    assert vistos == esperado and pagina == 12
+    # O SQLite sempre escreve OFFSET junto com LIMIT: no cursor ele é 0
+    por_cursor = [params for sql, params in consultas if "(operacoes_comex.data_operacao, operacoes_comex.id) <" in sql]
+    assert len(por_cursor) == 11 and all(params[-1] == 0 for params in por_cursor)
+
+    # Pela rota: total estimado (rollups) igual ao exato nos filtros que cabem nos rollups
+    for campos in ({}, {"uf": "sp", "tipo_operacao": "Importação"}, {"ncms": ["0202.02.02"], "pais": "unidos"}):
+        exata = await backend_main.buscar_operacoes(filtros=backend_main.BuscaFiltros(**campos), db=db)
+        estimada = await backend_main.buscar_operacoes(
+            filtros=backend_main.BuscaFiltros(contagem="estimada", **campos), db=db
+        )
+        assert estimada["total"] == exata["total"] > 0 and estimada["total_estimado"] is False
+        assert [r["id"] for r in estimada["results"]] == [r["id"] for r in exata["results"]]
+
+    # Filtro fora dos rollups (empresa): SQLite sem planejador cai no COUNT
+    total, estimado = contar_total(db, backend_main.BuscaFiltros(empresa_importadora="empresa 3", contagem="estimada"))
+    assert total == 23 and estimado is False
+
+    segunda = await backend_main.buscar_operacoes(
+        filtros=backend_main.BuscaFiltros(page_size=50, contagem="nenhuma"), db=db
+    )
+    assert segunda["total"] is None and segunda["total_pages"] is None
+    seguinte = await backend_main.buscar_operacoes(
+        filtros=backend_main.BuscaFiltros(page_size=50, cursor=segunda["proximo_cursor"], contagem="nenhuma"), db=db
+    )
+    assert [r["id"] for r in seguinte["results"]] == esperado[50:100]
+
+    with pytest.raises(backend_main.HTTPException) as erro:
+        await backend_main.buscar_operacoes(filtros=backend_main.BuscaFiltros(cursor="xyz"), db=db)
+    assert erro.value.status_code == 400
+
+    # Contagem estimada só lê os rollups: linha nova em mês completo entra na próxima sincronização
+    hoje = date.today()
+    db.add(OperacaoComex(
+        ncm="01010101", descricao_produto="Produto", tipo_operacao=TipoOperacao.IMPORTACAO,
+        pais_origem_destino="China", uf="SP", via_transporte=ViaTransporte.MARITIMA, valor_fob=1.0,
+        peso_liquido_kg=1.0, data_operacao=hoje - timedelta(days=40),
+        mes_referencia=(hoje - timedelta(days=40)).strftime("%Y-%m"),
+    ))
+    db.commit()
+    controle = db.query(RollupControle.ultimo_id, RollupControle.data_atualizacao).all()
+    total, _ = contar_total(db, backend_main.BuscaFiltros(contagem="estimada"))
+    assert total == 230 and db.query(RollupControle.ultimo_id, RollupControle.data_atualizacao).all() == controle
+    atualizar_rollups(db)
+    assert contar_total(db, backend_main.BuscaFiltros(contagem="estimada"))[0] == 231
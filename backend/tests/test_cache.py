@@ -0,0 +1,116 @@
+import time
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database.models import Base, OperacaoComex, TipoOperacao, ViaTransporte
+from services.cache import CacheNamespace, MemoryCacheBackend, SQLiteCacheBackend
+from services.rollups import atualizar_rollups
+import main as backend_main
+
+
+def _backends(tmp_path):
+    return [
+        MemoryCacheBackend(max_entradas=2, max_bytes=1024),
+        SQLiteCacheBackend(tmp_path / "cache.db", max_entradas=2, max_bytes=1024),
+    ]
+
+
+@pytest.mark.parametrize("indice", [0, 1])
+def test_lru_remove_entrada_menos_usada(tmp_path, indice):
+    backend = _backends(tmp_path)[indice]
+    backend.set("a", {"v": 1}, ttl=60)
+    time.sleep(0.01)
+    backend.set("b", {"v": 2}, ttl=60)
+    time.sleep(0.01)
+    assert backend.get("a") == {"v": 1}  # "a" passa a ser a mais recente
+    time.sleep(0.01)
+    backend.set("c", {"v": 3}, ttl=60)
+
+    assert backend.get("b") is None
+    assert backend.get("a") == {"v": 1}
+    assert backend.get("c") == {"v": 3}
+
+
+@pytest.mark.parametrize("indice", [0, 1])
+def test_ttl_limite_de_bytes_e_namespace(tmp_path, indice):
+    backend = _backends(tmp_path)[indice]
+    backend.set("expirada", [1], ttl=-1)
+    assert backend.get("expirada") is None
+
+    backend.set("grande", "x" * 2048, ttl=60)
+    assert backend.get("grande") is None
+
+    ncm = CacheNamespace(backend, "ncm_analise", ttl=60)
+    autocomplete = CacheNamespace(backend, "autocomplete", ttl=60)
+    ncm.set("01010101", {"ncm": "01010101"})
+    autocomplete.set("01010101", ["EMPRESA"])
+    ncm.clear()
+    assert ncm.get("01010101") is None
+    assert autocomplete.get("01010101") == ["EMPRESA"]
+
+
+def _operacao(data_operacao, valor):
+    return OperacaoComex(
+        ncm="01010101",
+        descricao_produto="Produto A",
+        tipo_operacao=TipoOperacao.IMPORTACAO,
+        pais_origem_destino="China",
+        uf="SP",
+        via_transporte=ViaTransporte.MARITIMA,
+        valor_fob=valor,
+        peso_liquido_kg=1.0,
+        quantidade_estatistica=1.0,
+        data_operacao=data_operacao,
+        mes_referencia=data_operacao.strftime("%Y-%m"),
+        arquivo_origem="teste",
+    )
+
+
+@pytest.mark.asyncio
+async def test_cache_do_dashboard_segue_versao_dos_meses(monkeypatch):
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    backend = MemoryCacheBackend()
+    monkeypatch.setattr(backend_main, "_DASHBOARD_CACHE", CacheNamespace(backend, "dashboard_stats", ttl=3600))
+
+    hoje = date.today()
+
+    def _importar(operacao):
+        # Como os fluxos de importação: grava e sobe a versão dos meses alterados
+        db.add(operacao)
+        db.commit()
+        atualizar_rollups(db, [operacao.mes_referencia])
+
+    _importar(_operacao(hoje, 100.0))
+
+    async def _stats():
+        return await backend_main.get_dashboard_stats(
+            meses=3, tipo_operacao=None, ncm=None, ncms=None,
+            empresa_importadora=None, empresa_exportadora=None,
+            data_inicio=None, data_fim=None, db=db,
+        )
+
+    assert (await _stats())["valor_total_importacoes"] == 100.0
+
+    # Mês fora do período: a entrada continua válida
+    _importar(_operacao(hoje - timedelta(days=400), 50.0))
+    assert (await _stats())["valor_total_importacoes"] == 100.0
+    assert backend.estatisticas()["hits"] == 1
+
+    # Mês do período alterado: nova versão, recalcula
+    _importar(_operacao(hoje, 20.0))
+    assert (await _stats())["valor_total_importacoes"] == 120.0
+    assert backend.estatisticas()["hits"] == 1
+
+    # Linha inserida fora das importações: a leitura não sincroniza rollups/versões...
+    db.add(_operacao(hoje, 5.0))
+    db.commit()
+    assert (await _stats())["valor_total_importacoes"] == 120.0
+    assert backend.estatisticas()["hits"] == 2
+    # ...a sincronização agendada sobe a versão do mês
+    atualizar_rollups(db)
+    assert (await _stats())["valor_total_importacoes"] == 125.0
@@ -0,0 +1,92 @@
+import csv
+from datetime import date
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from database.models import Base, OperacaoComex, TipoOperacao, ViaTransporte
+from services.carga_operacoes import CargaOperacoes
+
+
+def _operacao(**campos):
+    operacao = {
+        "ncm": "01012100",
+        "descricao_produto": "Cavalos",
+        "tipo_operacao": TipoOperacao.EXPORTACAO,
+        "via_transporte": ViaTransporte.OUTRAS,
+        "uf": "SP",
+        "pais_origem_destino": "China",
+        "valor_fob": 10.0,
+        "data_operacao": date(2025, 3, 1),
+        "mes_referencia": "2025-03",
+    }
+    operacao.update(campos)
+    return operacao
+
+
+def test_carga_grava_validos_e_rejeita_invalidos_em_arquivo(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'carga.db'}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    sincrono_antes = db.execute(text("PRAGMA synchronous")).scalar()
+
+    carga = CargaOperacoes(db, "teste/arquivo 2025", dir_rejeitos=tmp_path / "rejeitos")
+    assert carga.carregar([
+        _operacao(),
+        # Texto do enum (valor ou nome) é convertido
+        _operacao(tipo_operacao="Importação", via_transporte="MARITIMA", valor_fob="7.5"),
+        _operacao(pais_origem_destino=None),
+        _operacao(uf="SPX"),
+        _operacao(valor_fob=float("nan")),
+    ]) == 2
+    assert carga.carregar([_operacao(data_operacao="2025-04-01", mes_referencia="2025-04")]) == 1
+    relatorio = carga.relatorio()
+
+    assert relatorio["inseridos"] == 3 and relatorio["rejeitados"] == 3
+    assert relatorio["linhas_por_segundo"] > 0
+    operacoes = db.query(OperacaoComex).order_by(OperacaoComex.id).all()
+    assert [(o.tipo_operacao, o.via_transporte, o.valor_fob, o.data_operacao) for o in operacoes] == [
+        (TipoOperacao.EXPORTACAO, ViaTransporte.OUTRAS, 10.0, date(2025, 3, 1)),
+        (TipoOperacao.IMPORTACAO, ViaTransporte.MARITIMA, 7.5, date(2025, 3, 1)),
+        (TipoOperacao.EXPORTACAO, ViaTransporte.OUTRAS, 10.0, date(2025, 4, 1)),
+    ]
+    assert all(o.data_importacao is not None for o in operacoes)
+
+    with open(relatorio["arquivo_rejeitos"], encoding="utf-8") as arquivo:
+        rejeitos = list(csv.DictReader(arquivo))
+    assert [r["motivo"] for r in rejeitos] == [
+        "pais_origem_destino vazio", "uf com mais de 2 caracteres", "valor_fob vazio"
+    ]
+    assert rejeitos[1]["uf"] == "SPX" and rejeitos[1]["tipo_operacao"] == "Exportação"
+    # Pragmas de carga restaurados na conexão
+    assert db.execute(text("PRAGMA synchronous")).scalar() == sincrono_antes
+
+
+def test_carga_deduplica_pela_chave_natural_e_atualiza_existentes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'carga.db'}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    carga = CargaOperacoes(db, "dedup", dir_rejeitos=tmp_path)
+    assert carga.carregar([_operacao(), _operacao(uf="RJ")], deduplicar=True) == 2
+    # Já existentes (texto do enum também casa), repetida no lote e uma nova
+    assert carga.carregar([
+        _operacao(tipo_operacao="Exportação", valor_fob=99.0),
+        _operacao(uf="PR"),
+        _operacao(uf="PR", valor_fob=1.0),
+        _operacao(tipo_operacao=TipoOperacao.IMPORTACAO),
+    ], deduplicar=True) == 2
+    assert (carga.inseridos, carga.ignorados, carga.atualizados) == (4, 2, 0)
+    assert db.query(OperacaoComex).filter(OperacaoComex.uf == "SP").count() == 2
+
+    upsert = CargaOperacoes(db, "upsert", dir_rejeitos=tmp_path)
+    assert upsert.carregar(
+        [_operacao(valor_fob=50.0, arquivo_origem=None), _operacao(uf="MG")], deduplicar=True, atualizar=True
+    ) == 1
+    relatorio = upsert.relatorio()
+    assert (relatorio["inseridos"], relatorio["atualizados"], relatorio["ignorados"]) == (1, 1, 0)
+    exportacao_sp = db.query(OperacaoComex).filter(
+        OperacaoComex.uf == "SP", OperacaoComex.tipo_operacao == TipoOperacao.EXPORTACAO
+    ).one()
+    assert exportacao_sp.valor_fob == 50.0
+    assert db.query(OperacaoComex).count() == 5
@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from config import settings
+from data_collector.api_client import ComexStatAPIClient
+from services.clientes_http import fechar_clientes_http, obter_cliente_httpx, obter_sessao
+
+
+async def _servidor_stub():
+    """Stub local que registra de quais conexões (porta de origem) vieram as requisições."""
+    conexoes = []
+
+    async def dados(request):
+        conexoes.append(request.transport.get_extra_info("peername")[1])
+        return web.json_response({"registros": [{"mes": request.query["mes_inicio"]}]})
+
+    async def arquivo(request):
+        conexoes.append(request.transport.get_extra_info("peername")[1])
+        await asyncio.sleep(0.05)
+        return web.Response(text="CO_ANO;CO_MES\n2025;01\n")
+
+    app = web.Application()
+    app.router.add_get("/dados", dados)
+    app.router.add_route("HEAD", "/arquivo", arquivo)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    porta = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{porta}", conexoes
+
+
+@pytest.mark.asyncio
+async def test_clientes_compartilhados_reaproveitam_conexoes():
+    runner, url, conexoes = await _servidor_stub()
+    try:
+        cliente = ComexStatAPIClient()
+        cliente.base_url = url
+        for mes in range(1, 11):
+            registros = await cliente.fetch_data(mes_inicio=f"2025-{mes:02d}", mes_fim=f"2025-{mes:02d}")
+            assert registros == [{"mes": f"2025-{mes:02d}"}]
+        # Dez chamadas, uma conexão (keep-alive no cliente compartilhado)
+        assert len(conexoes) == 10 and len(set(conexoes)) == 1
+        assert obter_cliente_httpx() is obter_cliente_httpx()
+
+        # Sondagens simultâneas na sessão aiohttp: limitadas por host e reaproveitadas depois
+        conexoes.clear()
+        sessao = obter_sessao()
+
+        async def sondar():
+            async with sessao.head(f"{url}/arquivo") as resposta:
+                return resposta.status
+
+        assert await asyncio.gather(*(sondar() for _ in range(30))) == [200] * 30
+        assert len(set(conexoes)) <= sessao.connector.limit_per_host
+        portas = set(conexoes)
+        await sondar()
+        assert conexoes[-1] in portas
+    finally:
+        await fechar_clientes_http()
+        await runner.cleanup()
+    assert sessao.closed
+    assert obter_sessao() is not sessao
+    await fechar_clientes_http()
+
+
+@pytest.mark.asyncio
+async def test_cliente_httpx_limita_requisicoes_por_host(monkeypatch):
+    monkeypatch.setattr(settings, "http_conexoes_por_host", 2)
+    simultaneas = {"atual": 0, "maximo": 0}
+
+    async def lento(request):
+        simultaneas["atual"] += 1
+        simultaneas["maximo"] = max(simultaneas["maximo"], simultaneas["atual"])
+        await asyncio.sleep(0.05)
+        simultaneas["atual"] -= 1
+        return web.Response(text="ok")
+
+    app = web.Application()
+    app.router.add_get("/lento", lento)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/lento"
+    try:
+        cliente = obter_cliente_httpx()
+        respostas = await asyncio.gather(*(cliente.get(url) for _ in range(8)))
+        assert [r.text for r in respostas] == ["ok"] * 8
+        assert simultaneas["maximo"] == 2
+
+        # Resposta em streaming segura a vaga até ser fechada
+        async with cliente.stream("GET", url) as resposta:
+            assert await resposta.aread() == b"ok"
+        respostas = await asyncio.gather(*(cliente.get(url) for _ in range(4)))
+        assert all(r.status_code == 200 for r in respostas)
+    finally:
+        await fechar_clientes_http()
+        await runner.cleanup()
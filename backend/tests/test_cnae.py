@@ -0,0 +1,68 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import data_collector.cnae_analyzer as cnae_analyzer
+from config import settings
+from database.models import Base, CNAEHierarquia
+from services.cnae import indice_cnae, niveis_cnae, obter_cnae_analyzer
+from services.versoes import TABELA_CNAE, registrar_alteracao
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("openpyxl")
+
+
+def test_cnae_carregado_uma_vez_com_snapshot_e_indice(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "data_dir", tmp_path)
+    arquivo = tmp_path / "NOVO CNAE.xlsx"
+    pd.DataFrame({
+        "CNPJ": ["11.111.111/0001-11", "22222222000122", "33333333000133", "44444444000144"],
+        "Razao Social": ["Mercado A", "Mercado B", "Soja C", None],
+        "CNAE": ["4711-3.01", "47.11-3.02", "0115-600", "4712100"],
+        "Setor": ["Comércio", "Comércio", "Agro", "Comércio"],
+    }).to_excel(arquivo, index=False)
+
+    analyzer = obter_cnae_analyzer(arquivo)
+    assert analyzer is obter_cnae_analyzer(arquivo)  # carregado uma vez por processo
+    assert analyzer.buscar_cnae_empresa("11111111000111")["cnae"] == "4711301"
+    assert analyzer.empresas_cnae["33333333000133"]["razao_social"] == "Soja C"
+    assert analyzer.empresas_cnae["44444444000144"]["razao_social"] is None
+    assert [e["cnpj"] for e in analyzer.buscar_empresas_por_cnae("4711")] == ["11111111000111", "22222222000122"]
+    assert [e["cnpj"] for e in analyzer.buscar_empresas_por_cnae("47123")] == ["44444444000144"]
+
+    # Outra instância lê o snapshot, sem pandas
+    monkeypatch.setattr(cnae_analyzer, "PANDAS_AVAILABLE", False)
+    copia = cnae_analyzer.CNAEAnalyzer(arquivo)
+    assert copia.carregar_cnae_excel()
+    assert copia.empresas_cnae == analyzer.empresas_cnae and copia.cnae_data == analyzer.cnae_data
+
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all([
+        CNAEHierarquia(cnae="4711301", descricao="Hipermercados", setor="Comércio"),
+        CNAEHierarquia(cnae="4721102", descricao="Padaria", setor="Comércio"),
+    ])
+    db.commit()
+    registrar_alteracao(db, TABELA_CNAE)
+
+    monkeypatch.setattr(settings, "cnae_arquivo", arquivo)
+    indice = indice_cnae(db)
+    assert indice is indice_cnae(db)
+    assert indice.buscar_prefixo("47") == ["4711301", "4711302", "4712100", "4721102"]
+    assert indice.buscar_prefixo("4711-3") == ["4711301", "4711302"]
+    assert indice.buscar_prefixo("99") == []
+    assert indice.agregar("secao") == {"A": 1, "G": 3}
+    assert indice.agregar("grupo", prefixo="47") == {"471": 3}
+    assert indice.agregar("classe", valores={"4711-3/01": 10.0, "4711302": 5.0, "4721102": 1.0}) == {
+        "47113": 15.0, "47211": 1.0
+    }
+    assert indice.descrever("4711301")["descricao"] == "Hipermercados"
+    assert niveis_cnae("4711-3/01") == {
+        "secao": "G", "divisao": "47", "grupo": "471", "classe": "47113", "subclasse": "4711301"
+    }
+
+    db.add(CNAEHierarquia(cnae="0111301", descricao="Arroz"))
+    db.commit()
+    registrar_alteracao(db, TABELA_CNAE)
+    assert indice_cnae(db).buscar_prefixo("01") == ["0111301", "0115600"]
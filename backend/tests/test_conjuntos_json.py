@@ -0,0 +1,66 @@
+import json
+import os
+
+import pytest
+
+import main as backend_main
+import services.conjuntos_json as conjuntos_json
+
+
+def _filtrar_como_antes(dados, limite, uf, tipo):
+    resultados = dados
+    if uf:
+        resultados = [item for item in resultados if str(item.get("uf", "")).upper() == uf.upper()]
+    if tipo:
+        tipo_lower = tipo.lower()
+        if "import" in tipo_lower:
+            resultados = [item for item in resultados if item.get("valor_importacao_usd", 0) > 0]
+        elif "export" in tipo_lower:
+            resultados = [item for item in resultados if item.get("valor_exportacao_usd", 0) > 0]
+    return resultados[:limite]
+
+
+@pytest.mark.asyncio
+async def test_dados_comexstat_carregados_uma_vez_com_indices(tmp_path, monkeypatch):
+    monkeypatch.setattr(conjuntos_json, "DIRETORIO_RAIZ", tmp_path)
+    (tmp_path / "data").mkdir()
+    dados = [
+        {
+            "ncm": f"{i:08d}",
+            "descricao": f"Produto ç {i}",
+            "uf": ("SP", "rj", "MG")[i % 3],
+            "valor_importacao_usd": float(i % 4),
+            "valor_exportacao_usd": float(i % 5),
+        }
+        for i in range(60)
+    ] + [{"ncm": "99999999", "descricao": "Sem UF"}]
+    arquivo_ncm = tmp_path / "data" / "dados_ncm_comexstat.json"
+    arquivo_ncm.write_text(json.dumps(dados, ensure_ascii=False), encoding="utf-8")
+    resumo = {"importacoes": {"valor_total_usd": 10.5, "total_registros": 3}, "exportacoes": {}}
+    (tmp_path / "data" / "resumo_dados_comexstat.json").write_text(json.dumps(resumo), encoding="utf-8")
+
+    resposta = await backend_main.dashboard_dados_comexstat()
+    assert json.loads(resposta.body) == {"success": True, "data": resumo}
+    assert resposta.media_type == "application/json"
+
+    for limite, uf, tipo in [
+        (100, None, None), (5, None, None), (100, "rj", None), (100, "SP", "importacao"),
+        (3, "MG", "Exportação"), (100, None, "exportacao"), (100, "BA", None), (100, None, "outro"),
+    ]:
+        resposta = await backend_main.dashboard_dados_ncm_comexstat(limite=limite, uf=uf, tipo=tipo)
+        assert json.loads(resposta.body) == {"success": True, "data": _filtrar_como_antes(dados, limite, uf, tipo)}
+
+    conjunto = conjuntos_json.obter_conjunto_json("data/dados_ncm_comexstat.json")
+    assert conjunto is conjuntos_json.obter_conjunto_json("data/dados_ncm_comexstat.json")
+    assert conjunto.filtrar(uf="sp", tipo="importacao", limite=2) == _filtrar_como_antes(dados, 2, "SP", "importacao")
+
+    # Arquivo alterado: relido
+    arquivo_ncm.write_text(json.dumps([{"ncm": "1", "uf": "BA", "valor_importacao_usd": 1}]), encoding="utf-8")
+    info = arquivo_ncm.stat()
+    os.utime(arquivo_ncm, ns=(info.st_atime_ns, info.st_mtime_ns + 1_000_000_000))
+    resposta = await backend_main.dashboard_dados_ncm_comexstat(limite=10, uf="ba", tipo=None)
+    assert json.loads(resposta.body)["data"] == [{"ncm": "1", "uf": "BA", "valor_importacao_usd": 1}]
+
+    arquivo_ncm.unlink()
+    resposta = await backend_main.dashboard_dados_ncm_comexstat(limite=10, uf=None, tipo=None)
+    assert resposta == {"success": False, "data": [], "message": "Arquivo não encontrado"}
@@ -0,0 +1,43 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import main as backend_main
+from database.models import Base, EmpresasRecomendadas
+from services.versoes import TABELA_EMPRESAS_RECOMENDADAS, registrar_alteracao
+
+
+def _make_session():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def _recomendada(nome, uf, peso, valor):
+    return EmpresasRecomendadas(
+        nome=nome, estado=uf, tipo_principal="importadora", provavel_importador=1,
+        peso_participacao=peso, valor_total_importacao_usd=valor, volume_total_importacao_kg=1.0,
+    )
+
+
+@pytest.mark.asyncio
+async def test_empresas_importadoras_com_cache_proprio():
+    db = _make_session()
+    backend_main._SINERGIAS_CACHE.clear()
+    db.add_all([_recomendada("Alfa", "SP", 90.0, 100.0), _recomendada("Beta", "RJ", 80.0, 50.0)])
+    db.commit()
+    registrar_alteracao(db, TABELA_EMPRESAS_RECOMENDADAS)
+
+    resposta = await backend_main.dashboard_empresas_importadoras(limite=10, uf="sp", db=db)
+    assert [e["nome"] for e in resposta["data"]] == ["Alfa"]
+    assert resposta["data"][0]["peso_kg"] == 1.0
+
+    # Segunda chamada vem do cache (mesma versão dos dados)
+    db.add(_recomendada("Gama", "SP", 95.0, 10.0))
+    db.commit()
+    assert await backend_main.dashboard_empresas_importadoras(limite=10, uf="SP", db=db) == resposta
+
+    # Nova versão da tabela: recalculado
+    registrar_alteracao(db, TABELA_EMPRESAS_RECOMENDADAS)
+    resposta = await backend_main.dashboard_empresas_importadoras(limite=10, uf="SP", db=db)
+    assert [e["nome"] for e in resposta["data"]] == ["Gama", "Alfa"]
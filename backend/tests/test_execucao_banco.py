@@ -0,0 +1,106 @@
+import contextvars
+import threading
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from config import settings
+from database.models import Base, OperacaoComex, TipoOperacao, ViaTransporte
+from services.execucao_banco import encerrar_executor_banco, executar_no_banco, iterar_no_banco, rota_banco
+
+requisicao_atual = contextvars.ContextVar("requisicao_atual", default=None)
+
+
+def _operacao(valor):
+    hoje = date.today()
+    return OperacaoComex(
+        ncm="01010101",
+        descricao_produto="Produto A",
+        tipo_operacao=TipoOperacao.IMPORTACAO,
+        pais_origem_destino="China",
+        uf="SP",
+        via_transporte=ViaTransporte.MARITIMA,
+        valor_fob=valor,
+        peso_liquido_kg=1.0,
+        data_operacao=hoje,
+        mes_referencia=hoje.strftime("%Y-%m"),
+    )
+
+
+@pytest.fixture
+def sessao_arquivo(tmp_path, monkeypatch):
+    # Banco em arquivo (pool por conexão): o trabalho vai para as threads do executor
+    monkeypatch.setattr(settings, "db_executor_threads", 2)
+    engine = create_engine(f"sqlite:///{tmp_path / 'banco.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    yield db
+    db.close()
+    engine.dispose()
+    encerrar_executor_banco()
+
+
+@pytest.mark.asyncio
+async def test_trabalho_roda_no_executor_com_contexto_e_sessao_entre_threads(sessao_arquivo):
+    db = sessao_arquivo
+    requisicao_atual.set("req-1")
+
+    def gravar(sessao, valor):
+        sessao.add(_operacao(valor))
+        sessao.flush()
+        return threading.current_thread().name, requisicao_atual.get()
+
+    def somar(sessao):
+        sessao.commit()
+        return sessao.query(func.sum(OperacaoComex.valor_fob)).scalar()
+
+    thread, contexto = await executar_no_banco(gravar, db, 10.0)
+    assert thread.startswith("banco_") and thread != threading.current_thread().name
+    assert contexto == "req-1"
+
+    # Mesma sessão usada em outra chamada (outra thread do executor) e depois no loop
+    await executar_no_banco(gravar, db, 5.0)
+    assert await executar_no_banco(somar, db) == 15.0
+    assert db.query(func.count(OperacaoComex.id)).scalar() == 2
+
+    @rota_banco
+    def rota(sessao):
+        return threading.current_thread().name, sessao.query(func.count(OperacaoComex.id)).scalar()
+
+    thread, total = await rota(db)
+    assert thread.startswith("banco_") and total == 2
+
+
+@pytest.mark.asyncio
+async def test_iterar_no_banco_fecha_o_iterador(sessao_arquivo):
+    db = sessao_arquivo
+    db.add_all([_operacao(float(i)) for i in range(5)])
+    db.commit()
+    threads = []
+    fechado = threading.Event()
+
+    def linhas():
+        try:
+            for (valor,) in db.query(OperacaoComex.valor_fob).order_by(OperacaoComex.id):
+                threads.append(threading.current_thread().name)
+                yield valor
+        finally:
+            threads.append(threading.current_thread().name)
+            fechado.set()
+
+    lidos = []
+    iterador = iterar_no_banco(linhas(), db)
+    async for valor in iterador:
+        lidos.append(valor)
+        if len(lidos) == 2:
+            break
+    await iterador.aclose()  # consumidor parou antes do fim (cliente desconectou)
+
+    assert lidos == [0.0, 1.0]
+    assert fechado.is_set()
+    assert threads and all(nome.startswith("banco_") for nome in threads)
+
+    # Até o fim: o iterador esgotado também é fechado sem erro
+    assert [v async for v in iterar_no_banco(iter([1, 2]), db)] == [1, 2]
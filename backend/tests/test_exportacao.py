@@ -0,0 +1,91 @@
+import csv
+import io
+from datetime import date, timedelta
+
+import httpx
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import main as backend_main
+from database import get_db
+from database.models import Base, OperacaoComex, TipoOperacao, ViaTransporte
+from services.busca_operacoes import COLUNAS_EXPORTACAO, condicoes_busca
+
+
+@pytest.mark.asyncio
+async def test_exportacao_em_streaming_com_filtros_da_busca(tmp_path):
+    # Banco em arquivo: as linhas são lidas nas threads do executor do banco
+    engine = create_engine(f"sqlite:///{tmp_path / 'export.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    Sessao = sessionmaker(bind=engine)
+    hoje = date.today()
+    with Sessao() as db:
+        db.add_all([
+            OperacaoComex(
+                ncm="01010101" if i % 3 else "02020202",
+                descricao_produto=f"Produto, \"tipo\" {i}",
+                tipo_operacao=TipoOperacao.IMPORTACAO if i % 2 else TipoOperacao.EXPORTACAO,
+                pais_origem_destino="China",
+                uf=("SP", "RJ")[i % 2],
+                via_transporte=ViaTransporte.MARITIMA,
+                valor_fob=float(i),
+                peso_liquido_kg=1.5,
+                data_operacao=hoje - timedelta(days=i % 300),
+                mes_referencia=(hoje - timedelta(days=i % 300)).strftime("%Y-%m"),
+                razao_social_importador=f"EMPRESA {i % 7} LTDA",
+            )
+            for i in range(12000)  # acima do antigo limite de 10000 linhas
+        ])
+        db.commit()
+
+    def _get_db():
+        db = Sessao()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    backend_main.app.dependency_overrides[get_db] = _get_db
+    try:
+        transporte = httpx.ASGITransport(app=backend_main.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://teste") as cliente:
+            resposta = await cliente.post("/export/csv", json={"uf": "SP"})
+            assert resposta.status_code == 200
+            assert resposta.headers["content-disposition"].endswith('.csv"')
+            linhas = list(csv.reader(io.StringIO(resposta.content.decode("utf-8-sig"))))
+
+            filtrado = await cliente.post("/export/csv", json={"ncms": ["02020202"], "tipo_operacao": "Importação"})
+            linhas_filtradas = list(csv.reader(io.StringIO(filtrado.content.decode("utf-8-sig"))))
+
+            excel = await cliente.post("/export/excel", json={"empresa_importadora": "EMPRESA 3"})
+            assert excel.status_code == 200
+
+            invalida = await cliente.post("/export/csv", json={"via_transporte": "teletransporte"})
+            assert invalida.status_code == 400
+    finally:
+        backend_main.app.dependency_overrides.pop(get_db, None)
+
+    with Sessao() as db:
+        def esperado(filtros):
+            return [
+                str(op.id) for op in db.query(OperacaoComex).filter(*condicoes_busca(backend_main.BuscaFiltros(**filtros)))
+                .order_by(OperacaoComex.data_operacao.desc(), OperacaoComex.id.desc())
+            ]
+
+        assert linhas[0] == list(COLUNAS_EXPORTACAO)
+        assert [l[0] for l in linhas[1:]] == esperado({"uf": "SP"})
+        assert len(linhas) - 1 == 6000
+        primeira = db.get(OperacaoComex, int(linhas[1][0]))
+        assert linhas[1][2] == primeira.descricao_produto
+        assert linhas[1][3] == primeira.tipo_operacao.value
+        assert linhas[1][8] == primeira.data_operacao.isoformat()
+
+        assert [l[0] for l in linhas_filtradas[1:]] == esperado({"ncms": ["02020202"], "tipo_operacao": "Importação"})
+        assert len(linhas_filtradas) > 1
+
+        openpyxl = pytest.importorskip("openpyxl")
+        planilha = openpyxl.load_workbook(io.BytesIO(excel.content), read_only=True).active
+        valores = list(planilha.values)
+        assert list(valores[0]) == list(COLUNAS_EXPORTACAO)
+        assert [str(v[0]) for v in valores[1:]] == esperado({"empresa_importadora": "EMPRESA 3"})
@@ -0,0 +1,100 @@
+import asyncio
+import hashlib
+import json
+
+import pytest
+from aiohttp import web
+
+from services.clientes_http import fechar_clientes_http
+from services.gerenciador_downloads import GerenciadorDownloads
+
+
+async def _servidor_stub(arquivos):
+    """
+    Stub de /ncm/<nome>: ETag pelo conteúdo, suporte a HEAD e a Range/If-Range.
+    Registra as requisições e o máximo de downloads simultâneos.
+    """
+    estado = {"requisicoes": [], "em_voo": 0, "max_em_voo": 0}
+
+    async def arquivo(request):
+        nome = request.match_info["nome"]
+        if nome not in arquivos:
+            return web.Response(status=404)
+        corpo = arquivos[nome]
+        etag = '"' + hashlib.md5(corpo).hexdigest() + '"'
+        estado["requisicoes"].append((request.method, nome, request.headers.get("Range")))
+        if request.method == "HEAD":
+            return web.Response(headers={"ETag": etag, "Content-Length": str(len(corpo))})
+
+        estado["em_voo"] += 1
+        estado["max_em_voo"] = max(estado["max_em_voo"], estado["em_voo"])
+        try:
+            await asyncio.sleep(0.05)
+            intervalo = request.headers.get("Range")
+            if intervalo and request.headers.get("If-Range") == etag:
+                inicio = int(intervalo.split("=")[1].rstrip("-"))
+                return web.Response(
+                    status=206, body=corpo[inicio:], content_type="text/csv",
+                    headers={"ETag": etag, "Content-Range": f"bytes {inicio}-{len(corpo) - 1}/{len(corpo)}"},
+                )
+            return web.Response(body=corpo, content_type="text/csv", headers={"ETag": etag})
+        finally:
+            estado["em_voo"] -= 1
+
+    app = web.Application()
+    app.router.add_route("*", "/ncm/{nome}", arquivo)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    porta = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{porta}/ncm", estado
+
+
+@pytest.mark.asyncio
+async def test_downloads_paralelos_retomaveis_e_revalidados(tmp_path):
+    arquivos = {f"IMP_2025_{m:02d}.csv": ("CO_ANO;CO_MES;VL_FOB\n" + f"2025;{m:02d};1000\n" * 400).encode()
+                for m in range(1, 7)}
+    runner, url, estado = await _servidor_stub(arquivos)
+    try:
+        # Formato de URL inexistente primeiro: cai na segunda candidata
+        itens = [([f"{url}/X_{nome}", f"{url}/{nome}"], tmp_path / nome) for nome in arquivos]
+        downloads = GerenciadorDownloads(tmp_path, concorrencia=3, tamanho_bloco=1024)
+        inicio = asyncio.get_running_loop().time()
+        caminhos = await downloads.baixar_varios(itens + itens[:2])  # repetidos baixados uma vez
+        duracao = asyncio.get_running_loop().time() - inicio
+
+        assert [c.name for c in caminhos] == list(arquivos)
+        assert all((tmp_path / nome).read_bytes() == corpo for nome, corpo in arquivos.items())
+        assert estado["max_em_voo"] == 3 and downloads.stats["baixados"] == 6
+        assert duracao < 6 * 0.05  # em série levaria >= 0,3 s
+        assert not list(tmp_path.glob("*.part"))
+
+        # Segunda execução: só HEADs, nada é baixado de novo
+        estado["requisicoes"].clear()
+        de_novo = GerenciadorDownloads(tmp_path, concorrencia=3)
+        assert len(await de_novo.baixar_varios(itens)) == 6
+        assert {metodo for metodo, _, _ in estado["requisicoes"]} == {"HEAD"}
+        assert de_novo.stats["inalterados"] == 6
+
+        # Arquivo alterado no servidor é baixado de novo; download interrompido é retomado
+        alterado, interrompido = list(arquivos)[:2]
+        arquivos[alterado] += b"2025;01;5\n"
+        (tmp_path / interrompido).unlink()
+        (tmp_path / f"{interrompido}.part").write_bytes(arquivos[interrompido][:3000])
+        metadados = json.loads((tmp_path / "downloads.json").read_text(encoding="utf-8"))
+        metadados[interrompido]["completo"] = False
+        (tmp_path / "downloads.json").write_text(json.dumps(metadados), encoding="utf-8")
+
+        estado["requisicoes"].clear()
+        terceira = GerenciadorDownloads(tmp_path, concorrencia=3)
+        assert len(await terceira.baixar_varios(itens)) == 6
+    finally:
+        await fechar_clientes_http()
+        await runner.cleanup()
+
+    assert (tmp_path / alterado).read_bytes() == arquivos[alterado]
+    assert (tmp_path / interrompido).read_bytes() == arquivos[interrompido]
+    assert ("GET", interrompido, "bytes=3000-") in estado["requisicoes"]
+    assert terceira.stats["retomados"] == 1 and terceira.stats["inalterados"] == 4
+    assert terceira.stats["bytes"] == len(arquivos[alterado]) + len(arquivos[interrompido]) - 3000
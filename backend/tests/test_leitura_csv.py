@@ -0,0 +1,40 @@
+import tracemalloc
+
+from data_collector.mdic_csv_collector import MDICCSVCollector
+from services.leitura_csv import detectar_formato_csv, ler_registros_em_lotes
+
+
+def test_csv_mdic_lido_em_lotes_com_memoria_limitada(tmp_path):
+    caminho = tmp_path / "IMP_2025_01.csv"
+    linhas = ["CO_ANO;CO_MES;CO_NCM;CO-PAIS; NO PAIS ;VL_FOB;"]
+    linhas += [f"2025;01;{84713012 + i % 7};{i % 250};São Tomé;{i}.5;" for i in range(60000)]
+    linhas.insert(3, ";;;;;;")  # linha vazia é pulada
+    caminho.write_bytes(("\n".join(linhas) + "\n").encode("latin-1"))
+    assert detectar_formato_csv(caminho) == ("latin-1", ";")
+
+    tracemalloc.start()
+    total = 0
+    primeiro = None
+    for lote in ler_registros_em_lotes(caminho, tamanho_lote=5000):
+        assert len(lote) <= 5000
+        primeiro = primeiro or lote[0]
+        total += len(lote)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert total == 60000
+    # Cabeçalho normalizado uma vez; coluna sem nome descartada; texto preservado (NCM, acentos)
+    assert primeiro == {
+        "co_ano": "2025", "co_mes": "01", "co_ncm": "84713012", "co_pais": "0",
+        "no_pais": "São Tomé", "vl_fob": "0.5",
+    }
+    # Só um lote em memória (a lista inteira de 60 mil dicts passaria de 20 MB)
+    assert pico < 8 * 1024 * 1024
+
+    # parse_csv_file continua devolvendo a lista completa; HTML no lugar do CSV dá lista vazia
+    coletor = MDICCSVCollector()
+    registros = coletor.parse_csv_file(caminho)
+    assert len(registros) == 60000 and registros[-1]["vl_fob"] == "59999.5"
+    html = tmp_path / "EXP_2025_01.csv"
+    html.write_text("<!DOCTYPE html>\n<html><body>Página não encontrada</body></html>\n", encoding="utf-8")
+    assert coletor.parse_csv_file(html) == []
@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+import main as backend_main
+import services.planilha_recomendadas as planilha_recomendadas
+from config import settings
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("openpyxl")
+
+
+def test_planilha_recomendadas_carregada_uma_vez_com_visoes_ordenadas(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "data_dir", tmp_path / "comex_data")
+    monkeypatch.setattr(planilha_recomendadas, "DIRETORIO_DADOS", tmp_path)
+    monkeypatch.setattr(planilha_recomendadas, "_carregada", None)
+    arquivo = tmp_path / "empresas_recomendadas.xlsx"
+    pd.DataFrame({
+        "CNPJ": ["111", "222", "111", "333", "444"],
+        "Razão Social": ["ALFA", "BETA", "ALFA", None, "DELTA"],
+        "Nome Fantasia": ["Alfa", "Beta", "Alfa", "Gama", "Delta"],
+        "Estado": ["SP", "rj", "SP", "MG", "SP"],
+        "Sugestão": ["CLIENTE_POTENCIAL", "FORNECEDOR_POTENCIAL", "CLIENTE_POTENCIAL", "CLIENTE_POTENCIAL", None],
+        "NCM Relacionado": ["01010101", "02020202", "03030303", "01010101", "01010101"],
+        "Importado (R$)": [100.0, 500.0, 50.0, None, 0.0],
+        "Exportado (R$)": [0.0, 10.0, None, 300.0, 20.0],
+        "Peso Participação (0-100)": [10.0, 80.0, 30.0, 50.0, 5.0],
+    }).to_excel(arquivo, index=False)
+
+    planilha = planilha_recomendadas.obter_planilha_recomendadas()
+    assert planilha is planilha_recomendadas.obter_planilha_recomendadas()  # lida uma vez por processo
+
+    # Importadoras agrupadas por CNPJ e ordenadas pelo valor
+    importadoras = backend_main._buscar_empresas_importadoras_recomendadas(10)
+    assert [(e["nome"], e["valor_total"], e["peso_participacao"]) for e in importadoras] == [
+        ("BETA", 100.0, 80.0), ("ALFA", 30.0, 30.0)
+    ]
+    assert [e["valor_total"] for e in backend_main._buscar_empresas_exportadoras_recomendadas(2)] == [60.0, 4.0]
+    importadoras[0]["nome"] = "alterado"
+    assert backend_main._buscar_empresas_importadoras_recomendadas(1)[0]["nome"] == "BETA"
+
+    # Fallback do dashboard: ordem da planilha, filtros por UF, tipo e NCM
+    fallback = backend_main._load_empresas_recomendadas_fallback(10, "importacao", "RJ", None)
+    assert [(e["nome"], e["cnpj"], e["valor_importacao_usd"]) for e in fallback] == [("BETA", 222, 100.0)]
+    assert [e["nome"] for e in backend_main._load_empresas_recomendadas_fallback(10, None, "sp", "1010101")] == [
+        "ALFA", "DELTA"
+    ]
+    assert len(backend_main._load_empresas_recomendadas_fallback(2, None, None, None)) == 2
+    assert backend_main._load_empresas_recomendadas_fallback(10, "exportacao", "SP", None)[0]["nome"] == "DELTA"
+
+    brutos = planilha.filtrar_brutos(10, tipo="CLIENTE_POTENCIAL", uf="SP")
+    assert [r["Importado (R$)"] for r in brutos] == [100.0, 50.0]
+
+    # Outro processo: snapshot colunar, sem abrir o xlsx
+    monkeypatch.setattr(planilha_recomendadas, "_carregada", None)
+    monkeypatch.setattr(pd, "read_excel", lambda *a, **k: pytest.fail("xlsx relido"))
+    copia = planilha_recomendadas.obter_planilha_recomendadas()
+    assert copia is not planilha and copia.importadoras == planilha.importadoras
+    monkeypatch.undo()
+
+    # Arquivo alterado: relido
+    monkeypatch.setattr(settings, "data_dir", tmp_path / "comex_data")
+    monkeypatch.setattr(planilha_recomendadas, "DIRETORIO_DADOS", tmp_path)
+    pd.DataFrame({
+        "CNPJ": ["999"], "Razão Social": ["NOVA"], "Nome Fantasia": ["Nova"], "Estado": ["BA"],
+        "Importado (R$)": [5.0], "Exportado (R$)": [0.0], "Peso Participação (0-100)": [1.0],
+    }).to_excel(arquivo, index=False)
+    info = arquivo.stat()
+    os.utime(arquivo, ns=(info.st_atime_ns, info.st_mtime_ns + 1_000_000_000))
+    assert [e["nome"] for e in backend_main._buscar_empresas_importadoras_recomendadas(10)] == ["NOVA"]
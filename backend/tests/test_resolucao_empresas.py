@@ -0,0 +1,82 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from data_collector.cruzamento_dados import CruzamentoDados
+from database.models import Base, CruzamentoEmpresa, OperacaoComex, TipoOperacao, ViaTransporte
+from services.empresas_mdic import gravar_empresas_mdic
+from services.resolucao_empresas import IndiceNomesEmpresas, resolver_empresas_operacoes
+
+EMPRESAS = {
+    "11111111000111": {"cnpj": "11111111000111", "razao_social": "Guarani Açúcar e Álcool S.A."},
+    "22222222000122": {"cnpj": "22222222000122", "razao_social": "Guarani Açúcar Comercial Exportadora Ltda"},
+    "33333333000133": {"cnpj": "33333333000133", "razao_social": "Vale do Rio Doce Mineração Ltda",
+                       "nome_fantasia": "Vale"},
+    "44444444000144": {"cnpj": "44444444000144", "razao_social": "Metalúrgica Paulista Industrial Ltda"},
+}
+
+
+def test_indice_de_nomes_resolve_por_tokens():
+    indice = IndiceNomesEmpresas(EMPRESAS)
+    # Mesmos tokens (sem sufixo societário, acentos e pontuação)
+    assert indice.resolver("GUARANI ACUCAR E ALCOOL SA") == ("11111111000111", 1.0)
+    assert indice.resolver("vale") == ("33333333000133", 1.0)
+    # Contido no nome: vence o nome mais coberto pela busca
+    cnpj, pontuacao = indice.resolver("guarani acucar")
+    assert cnpj == "11111111000111" and 0 < pontuacao < 1
+    assert indice.resolver("metalurgica paulista")[0] == "44444444000144"
+    # Erro de digitação num token: similaridade acima do limiar
+    assert indice.resolver("Metalurgica Paulista Industrail")[0] == "44444444000144"
+    assert indice.resolver("Empresa Desconhecida") is None
+    assert indice.resolver("Ltda") is None
+
+
+def _operacao(tipo, cnpj=None, razao=None):
+    importacao = tipo == TipoOperacao.IMPORTACAO
+    return OperacaoComex(
+        ncm="01010101", descricao_produto="Produto", tipo_operacao=tipo, pais_origem_destino="China",
+        uf="SP", via_transporte=ViaTransporte.MARITIMA, valor_fob=100.0, data_operacao=date(2025, 1, 1),
+        mes_referencia="2025-01",
+        cnpj_importador=cnpj if importacao else None, razao_social_importador=razao if importacao else None,
+        cnpj_exportador=None if importacao else cnpj, razao_social_exportador=None if importacao else razao,
+    )
+
+
+@pytest.mark.asyncio
+async def test_cruzamento_em_massa_grava_confianca():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    gravar_empresas_mdic(db, [{**e, "tipo_operacao": "Importação"} for e in EMPRESAS.values()])
+
+    for _ in range(3):
+        db.add_all([
+            _operacao(TipoOperacao.IMPORTACAO, cnpj="11.111.111/0001-11"),
+            _operacao(TipoOperacao.IMPORTACAO, razao="Guarani Açúcar Comercial Exportadora"),
+            _operacao(TipoOperacao.EXPORTACAO, razao="VALE DO RIO DOCE MINERACAO LTDA"),
+            _operacao(TipoOperacao.EXPORTACAO, razao="Ninguém Conhecido ME"),
+        ])
+    db.commit()
+
+    stats = resolver_empresas_operacoes(db, tamanho_lote=5)
+    assert stats["total_operacoes"] == 12 and stats["operacoes_identificadas"] == 9
+    assert stats["por_confianca"] == {"alta": 3, "media": 6, "baixa": 3}
+    assert stats["empresas_unicas"] == 3
+
+    gravados = db.query(CruzamentoEmpresa).order_by(CruzamentoEmpresa.operacao_id).all()
+    assert [(c.cnpj, c.metodo, c.confianca, c.papel) for c in gravados[:3]] == [
+        ("11111111000111", "cnpj", "alta", "importador"),
+        ("22222222000122", "nome", "media", "importador"),
+        ("33333333000133", "nome", "media", "exportador"),
+    ]
+    # Reprocessar substitui (não duplica) os cruzamentos
+    resolver_empresas_operacoes(db)
+    assert db.query(CruzamentoEmpresa).count() == 9
+
+    # Cruzamento por operação usa o mesmo índice de nomes
+    cruzamento = CruzamentoDados()
+    resultados = await cruzamento.cruzar_operacoes_bulk(db, limite=4)
+    assert [r["confianca"] for r in resultados] == ["alta", "media", "media", "baixa"]
+    assert resultados[2]["empresa_dados"]["cnpj"] == "33333333000133"
@@ -0,0 +1,175 @@
+import threading
+
+import pytest
+from datetime import date, timedelta
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from config import settings
+from database.models import (
+    Base, OperacaoComex, OperacaoComexMensal, TipoOperacao, ViaTransporte
+)
+from services.rollups import atualizar_rollups, calcular_agregados_dashboard
+import main as backend_main
+
+
+def _make_session():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def _operacao(data_operacao, tipo, ncm, valor, importador=None, exportador=None):
+    return OperacaoComex(
+        ncm=ncm,
+        descricao_produto=f"Produto {ncm}",
+        tipo_operacao=tipo,
+        pais_origem_destino="China" if tipo == TipoOperacao.IMPORTACAO else "EUA",
+        uf="SP",
+        via_transporte=ViaTransporte.MARITIMA,
+        valor_fob=valor,
+        peso_liquido_kg=valor / 10,
+        quantidade_estatistica=None,
+        data_operacao=data_operacao,
+        mes_referencia=data_operacao.strftime("%Y-%m"),
+        arquivo_origem="teste",
+        razao_social_importador=importador,
+        razao_social_exportador=exportador,
+    )
+
+
+def _popular(db):
+    hoje = date.today()
+    db.add_all([
+        _operacao(hoje, TipoOperacao.IMPORTACAO, "01010101", 100.0, importador="IMPORTADORA A"),
+        _operacao(hoje - timedelta(days=40), TipoOperacao.EXPORTACAO, "02020202", 250.0, exportador="EXPORTADORA B"),
+        _operacao(hoje - timedelta(days=75), TipoOperacao.IMPORTACAO, "01010101", 30.0, importador="IMPORTADORA C"),
+        # Fora do período de 3 meses e na borda do período
+        _operacao(hoje - timedelta(days=200), TipoOperacao.IMPORTACAO, "03030303", 999.0),
+        _operacao(hoje - timedelta(days=89), TipoOperacao.EXPORTACAO, "03030303", 7.0),
+    ])
+    db.commit()
+    atualizar_rollups(db)  # como nos fluxos de importação
+
+
+async def _stats(db, **kwargs):
+    backend_main._DASHBOARD_CACHE.clear()
+    params = dict(
+        meses=3, tipo_operacao=None, ncm=None, ncms=None,
+        empresa_importadora=None, empresa_exportadora=None,
+        data_inicio=None, data_fim=None, db=db,
+    )
+    params.update(kwargs)
+    return await backend_main.get_dashboard_stats(**params)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("tipo_operacao", [None, "Importação", "Exportação"])
+async def test_rollups_mesmo_resultado_da_consulta_direta(monkeypatch, tipo_operacao):
+    db = _make_session()
+    _popular(db)
+
+    monkeypatch.setattr(settings, "dashboard_use_rollups", False)
+    direto = await _stats(db, tipo_operacao=tipo_operacao)
+    monkeypatch.setattr(settings, "dashboard_use_rollups", True)
+    via_rollup = await _stats(db, tipo_operacao=tipo_operacao)
+
+    assert db.query(OperacaoComexMensal).count() > 0
+    assert via_rollup == direto
+
+
+@pytest.mark.asyncio
+async def test_rollups_ncm_com_duas_descricoes(monkeypatch):
+    db = _make_session()
+    _popular(db)
+    hoje = date.today()
+    # Mesmo NCM com outra descrição, em meses completos e nas bordas do período
+    for dias, valor in ((0, 40.0), (40, 500.0), (89, 5.0)):
+        operacao = _operacao(hoje - timedelta(days=dias), TipoOperacao.IMPORTACAO, "01010101", valor)
+        operacao.descricao_produto = "Outra descrição"
+        db.add(operacao)
+    db.commit()
+    atualizar_rollups(db)
+
+    monkeypatch.setattr(settings, "dashboard_use_rollups", False)
+    direto = await _stats(db)
+    monkeypatch.setattr(settings, "dashboard_use_rollups", True)
+    via_rollup = await _stats(db)
+
+    assert via_rollup == direto
+    ncms = [(n["ncm"], n["descricao"], n["valor_total"]) for n in via_rollup["principais_ncms"]]
+    assert ("01010101", "Outra descrição", 545.0) in ncms
+    assert ("01010101", "Produto 01010101", 130.0) in ncms
+
+
+def test_agregados_sem_rollups_construidos_usam_linhas_brutas():
+    db = _make_session()
+    hoje = date.today()
+    db.add(_operacao(hoje, TipoOperacao.IMPORTACAO, "01010101", 100.0))
+    db.commit()
+    assert calcular_agregados_dashboard(db, hoje - timedelta(days=90), hoje) is None
+    assert db.query(OperacaoComexMensal).count() == 0
+
+
+def test_rollups_incrementais_absorvem_novas_linhas():
+    db = _make_session()
+    _popular(db)
+    hoje = date.today()
+
+    agregados = calcular_agregados_dashboard(db, hoje - timedelta(days=90), hoje)
+    assert agregados["valor_total_imp"] == 130.0
+
+    # Linha em um mês completo do período (lido só dos rollups)
+    novo = hoje - timedelta(days=40)
+    db.add(_operacao(novo, TipoOperacao.IMPORTACAO, "01010101", 70.0, importador="IMPORTADORA A"))
+    db.commit()
+    # Leitura não atualiza os rollups: a linha nova entra na próxima sincronização
+    assert calcular_agregados_dashboard(db, hoje - timedelta(days=90), hoje)["valor_total_imp"] == 130.0
+    resultado = atualizar_rollups(db)
+    assert resultado["meses_atualizados"] == [novo.strftime("%Y-%m")]
+
+    agregados = calcular_agregados_dashboard(db, hoje - timedelta(days=90), hoje)
+    assert agregados["valor_total_imp"] == 200.0
+    assert agregados["principais_importadores"][0] == {
+        "nome": "IMPORTADORA A", "valor_total": 170.0, "total_operacoes": 2, "peso_total": 17.0,
+    }
+
+
+def test_atualizacoes_concorrentes_nao_duplicam_rollups(tmp_path):
+    # Banco em arquivo: cada thread com sua conexão, como as rotas no executor do banco
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'rollups.db'}",
+        # Espera curta pelo lock do arquivo: contenção entre as threads vira erro, não fila
+        connect_args={"check_same_thread": False, "timeout": 0.01},
+    )
+    Base.metadata.create_all(bind=engine)
+    Sessao = sessionmaker(bind=engine)
+    with Sessao() as db:
+        _popular(db)
+        atualizar_rollups(db)
+        hoje = date.today()
+        db.add_all([
+            _operacao(hoje - timedelta(days=i % 60), TipoOperacao.IMPORTACAO, "01010101", 1.0, importador=f"EMPRESA {i}")
+            for i in range(200)
+        ])
+        db.commit()
+        meses = sorted({(hoje - timedelta(days=i)).strftime("%Y-%m") for i in range(60)})
+
+    barreira = threading.Barrier(4)
+    resultados = []
+
+    def atualizar():
+        with Sessao() as db:
+            barreira.wait()
+            resultados.append(atualizar_rollups(db, meses))
+
+    threads = [threading.Thread(target=atualizar) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(resultados) == 4 and all(r is not None for r in resultados)
+    with Sessao() as db:
+        total_rollup = db.query(func.sum(OperacaoComexMensal.total_operacoes)).scalar()
+        assert total_rollup == db.query(OperacaoComex).count() == 205
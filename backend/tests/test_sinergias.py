@@ -0,0 +1,81 @@
+from datetime import date
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from data_collector.sinergia_analyzer import SinergiaAnalyzer
+from database.models import Base, OperacaoComex, TipoOperacao, ViaTransporte
+from services.empresas_mdic import gravar_empresas_mdic, indice_empresas_mdic
+from services.sinergias import recalcular_sinergias, sinergias_por_empresa, sinergias_por_estado
+
+
+def _operacao(tipo, cnpj, uf, valor, peso=10.0):
+    importacao = tipo == TipoOperacao.IMPORTACAO
+    return OperacaoComex(
+        ncm="01010101", descricao_produto="Produto", tipo_operacao=tipo, pais_origem_destino="China",
+        uf=uf, via_transporte=ViaTransporte.MARITIMA, valor_fob=valor, peso_liquido_kg=peso,
+        data_operacao=date(2025, 1, 1), mes_referencia="2025-01",
+        cnpj_importador=cnpj if importacao else None, cnpj_exportador=None if importacao else cnpj,
+    )
+
+
+def test_sinergias_pre_calculadas_iguais_a_analise_por_empresa():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    empresas = [
+        {"cnpj": f"{n:08d}000100", "razao_social": f"Empresa {n} Ltda", "uf": "SP" if n % 2 else "",
+         "tipo_operacao": "Importação"}
+        for n in range(1, 31)
+    ]
+    gravar_empresas_mdic(db, empresas)
+
+    operacoes = []
+    for n in range(1, 41):  # 31-40 fora da lista do MDIC
+        cnpj = f"{n:08d}000100"
+        uf = ("SP", "RJ", "MG")[n % 3]
+        if n % 3 != 1:
+            operacoes.append(_operacao(TipoOperacao.IMPORTACAO, cnpj, uf, 100.0 * n))
+        if n % 3 != 2:
+            operacoes.append(_operacao(TipoOperacao.EXPORTACAO, cnpj, uf, 50.0 * n))
+    # CNPJ formatado soma na mesma empresa; MG e AM só importam (sem sinergia)
+    operacoes.append(_operacao(TipoOperacao.IMPORTACAO, "00.000.003/0001-00", "RJ", 7.0))
+    operacoes.append(_operacao(TipoOperacao.IMPORTACAO, "00000005000100", "AM", 1.0))
+    db.add_all(operacoes)
+    db.commit()
+
+    consultas = []
+
+    def _registrar(conn, cursor, statement, *args):
+        consultas.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _registrar)
+    stats = recalcular_sinergias(db)
+    event.remove(engine, "before_cursor_execute", _registrar)
+    assert stats["empresas"] == 30 and stats["estados"] == 4 and stats["estados_com_sinergia"] == 2
+    # Número de consultas não depende da quantidade de empresas
+    assert len([c for c in consultas if "operacoes_comex" in c]) == 2
+
+    analyzer = SinergiaAnalyzer()
+    indice = indice_empresas_mdic(db)
+    gravadas = sinergias_por_empresa(db, limite=None)
+    assert [e["cnpj"] for e in gravadas] == [
+        e["cnpj"] for e in analyzer.analisar_sinergias_por_empresa(db, indice, limite=None)
+    ]
+    por_cnpj = {e["cnpj"]: e for e in gravadas}
+    for cnpj in ("00000002000100", "00000004000100", "00000009000100"):
+        individual = analyzer._analisar_empresa_individual(db, cnpj, indice[cnpj], por_cnpj[cnpj]["uf"])
+        assert por_cnpj[cnpj] == individual
+    assert por_cnpj["00000003000100"]["importacoes"] == {"total_operacoes": 2, "valor_total": 307.0}
+    assert por_cnpj["00000003000100"]["potencial_sinergia"] == 1.0
+    assert gravadas[0]["potencial_sinergia"] == 1.0 and gravadas[-1]["potencial_sinergia"] == 0.5
+
+    so_importam = sinergias_por_empresa(db, limite=None, tipo="importacao")
+    assert so_importam and all(e["exportacoes"]["total_operacoes"] == 0 for e in so_importam)
+    assert all(e["uf"] == "SP" for e in sinergias_por_empresa(db, limite=None, uf="sp"))
+
+    esperado = analyzer.analisar_sinergias_por_estado(db)
+    estado = sinergias_por_estado(db)
+    assert estado.pop("atualizado_em") == stats["data_atualizacao"]
+    assert estado == esperado
+    assert sinergias_por_estado(db, "RJ")["sinergias"] == analyzer.analisar_sinergias_por_estado(db, "RJ")["sinergias"]
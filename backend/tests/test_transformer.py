@@ -0,0 +1,63 @@
+from datetime import date, datetime
+
+from data_collector.transformer import DataTransformer
+from database import TipoOperacao, ViaTransporte
+
+
+def _por_registro(transformer, registros, mes, tipo):
+    transformados = (transformer._transform_record(r, mes, tipo) for r in registros)
+    return [t for t in transformados if t]
+
+
+def test_plano_de_colunas_equivale_a_transformacao_por_registro():
+    registros = [
+        # Chaves da API / scraper, com variações de maiúsculas, vazios e datas diversas
+        {"NCM": "0101.21-00", "UF": "sp", "Pais": "China", "valor_fob": "1.234,50", "VALOR": "9",
+         "peso_liquido": None, "PESO_LIQ": "10", "via": "Marítima", "data": "15/03/2025",
+         "cnpj_importador": "12.345.678/0001-90", "importador": "ACME LTDA"},
+        {"NCM": 1012100.0, "UF": None, "Pais": "", "valor_fob": "", "VALOR": "x",
+         "peso_liquido": "5", "PESO_LIQ": None, "via": None, "data": "2025-03-16",
+         "cnpj_importador": None, "importador": " "},
+        {"NCM": "", "UF": "rj", "Pais": float("nan"), "valor_fob": "abc", "VALOR": "7",
+         "peso_liquido": "", "PESO_LIQ": "", "via": "AR", "data": "data inválida",
+         "cnpj_importador": "1", "importador": None},
+        {"ncm": "12345678901", "estado": "MG", "DATA_OPERACAO": datetime(2025, 3, 20, 10, 30),
+         "frete": 12.5, "valor_seguro": "3,5", "modal": "rod", "arquivo_origem": "api.json",
+         "razao_social_exportador": "EXPORTA SA", "cnpj_exp": "98765432000110"},
+        {"ncm": "87032100", "estado": None, "DATA_OPERACAO": "2025-03-21 08:00:00",
+         "frete": None, "valor_seguro": None, "modal": None, "arquivo_origem": None,
+         "razao_social_exportador": None, "cnpj_exp": None},
+    ]
+    for tipo in ("Importação", "Exportação"):
+        for mes in ("2025-03", "mes-invalido"):
+            esperado = _por_registro(DataTransformer(), registros, mes, tipo)
+            assert DataTransformer().transform_api_data(registros, mes, tipo) == esperado
+
+    transformer = DataTransformer()
+    resultado = transformer.transform_api_data(registros, "2025-03", "Importação")
+    # Um plano por conjunto de chaves
+    assert len(transformer._planos) == 2
+    assert resultado[0]["ncm"] == "01012100" and resultado[0]["valor_fob"] == 1234.5
+    assert resultado[0]["cnpj_importador"] == "12345678000190"
+    assert resultado[0]["via_transporte"] == ViaTransporte.MARITIMA
+    assert resultado[2]["data_operacao"] == date(2025, 3, 1)  # data inválida -> mês de referência
+    assert resultado[3]["ncm"] == "12345678" and resultado[3]["data_operacao"] == date(2025, 3, 20)
+
+
+def test_layout_dos_csvs_brutos_do_mdic():
+    # Cabeçalho de IMP_AAAA_MM.csv normalizado por services.leitura_csv
+    registros = [
+        {"co_ano": "2025", "co_mes": "03", "co_ncm": "01012100", "co_unid": "11", "co_pais": "160",
+         "sg_uf_ncm": "SP", "co_via": "01", "co_urf": "0817600", "qt_estat": "12", "kg_liquido": "3400",
+         "vl_fob": "150000", "vl_frete": "2500", "vl_seguro": None},
+    ]
+    transformados = DataTransformer().transform_csv_data(registros, "2025-03", "Importação")
+
+    assert transformados == _por_registro(DataTransformer(), registros, "2025-03", "Importação")
+    operacao = transformados[0]
+    assert operacao["ncm"] == "01012100" and operacao["uf"] == "SP"
+    assert operacao["tipo_operacao"] == TipoOperacao.IMPORTACAO
+    assert operacao["valor_fob"] == 150000.0 and operacao["valor_frete"] == 2500.0
+    assert operacao["valor_seguro"] == 0.0
+    assert operacao["peso_liquido_kg"] == 3400.0 and operacao["quantidade_estatistica"] == 12.0
+    assert operacao["data_operacao"] == date(2025, 3, 1)
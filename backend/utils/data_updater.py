@@ -4,15 +4,17 @@ Atualiza empresas do MDIC, CNAE e cruza com operações.
 """
 import asyncio
 from datetime import datetime, timedelta
+from typing import Optional
 from loguru import logger
 from sqlalchemy.orm import Session
 
 from database import get_db
 from data_collector.empresas_mdic_scraper import EmpresasMDICScraper
 from data_collector.cruzamento_dados import CruzamentoDados
-from data_collector.cnae_analyzer import CNAEAnalyzer
 from data_collector.sinergia_analyzer import SinergiaAnalyzer
-from pathlib import Path
+from services.cnae import obter_cnae_analyzer
+from services.resolucao_empresas import resolver_empresas_operacoes
+from services.sinergias import recalcular_sinergias, sinergias_por_empresa, sinergias_por_estado
 
 
 class DataUpdater:
@@ -26,12 +28,10 @@ class DataUpdater:
         self.cnae_analyzer = None
         self.sinergia_analyzer = None
         
-        # Tentar carregar CNAE
+        # CNAE compartilhado pelo processo (carregado uma vez)
         try:
-            arquivo_cnae = Path("C:/Users/User/Desktop/Cursor/NOVO CNAE.xlsx")
-            if arquivo_cnae.exists():
-                self.cnae_analyzer = CNAEAnalyzer(arquivo_cnae)
-                self.cnae_analyzer.carregar_cnae_excel()
+            self.cnae_analyzer = obter_cnae_analyzer()
+            if self.cnae_analyzer:
                 logger.info("✅ CNAE carregado para atualizações")
         except Exception as e:
             logger.warning(f"Não foi possível carregar CNAE: {e}")
@@ -52,11 +52,19 @@ class DataUpdater:
         logger.info(f"Iniciando atualização de empresas do MDIC (ano: {ano or 'atual'})")
         
         try:
-            empresas = await self.empresas_scraper.coletar_empresas(ano)
+            # Revalida os arquivos (ETag/Last-Modified) e grava a tabela local empresas_mdic,
+            # consultada pelo autocomplete
+            from services.empresas_mdic import sincronizar_empresas_mdic
+            db = next(get_db())
+            try:
+                resultado = await sincronizar_empresas_mdic(db, self.empresas_scraper, ano)
+            finally:
+                db.close()
             
             return {
                 "success": True,
-                "total_empresas": len(empresas),
+                "total_empresas": resultado["total_empresas"],
+                "atualizado": resultado["atualizado"],
                 "ano": ano or datetime.now().year,
                 "timestamp": datetime.now().isoformat()
             }
@@ -68,37 +76,25 @@ class DataUpdater:
                 "timestamp": datetime.now().isoformat()
             }
     
-    async def atualizar_relacionamentos(self, limite: int = 1000) -> dict:
+    async def atualizar_relacionamentos(self, limite: Optional[int] = None) -> dict:
         """
-        Atualiza relacionamentos entre operações e empresas.
+        Atualiza relacionamentos entre operações e empresas (cruzamentos_empresas).
         
         Args:
-            limite: Limite de operações a processar
+            limite: Limite de operações a processar (None = todas)
         
         Returns:
             Estatísticas da atualização
         """
-        logger.info(f"Iniciando atualização de relacionamentos (limite: {limite})")
+        logger.info(f"Iniciando atualização de relacionamentos (limite: {limite or 'todas'})")
         
         try:
+            # Cruzamento em massa por CNPJ e índice de nomes, gravado com a confiança
             db = next(get_db())
-            
-            # Carregar empresas do MDIC
-            empresas_lista = await self.empresas_scraper.coletar_empresas()
-            empresas_mdic = {}
-            for empresa in empresas_lista:
-                cnpj = empresa.get("cnpj")
-                if cnpj:
-                    empresas_mdic[cnpj] = empresa
-            
-            # Cruzar dados
-            resultados = await self.cruzamento.cruzar_operacoes_bulk(
-                db,
-                filtros=None,
-                limite=limite
-            )
-            
-            stats = self.cruzamento.estatisticas_cruzamento(resultados)
+            try:
+                stats = resolver_empresas_operacoes(db, limite=limite)
+            finally:
+                db.close()
             
             return {
                 "success": True,
@@ -120,47 +116,33 @@ class DataUpdater:
     
     async def atualizar_sinergias(self, limite_empresas: int = 100) -> dict:
         """
-        Atualiza análise de sinergias.
+        Recalcula a tabela de sinergias (services.sinergias) e resume o resultado.
         
         Args:
-            limite_empresas: Limite de empresas a analisar
+            limite_empresas: Quantidade de empresas no resumo (a tabela guarda todas)
         
         Returns:
             Estatísticas da atualização
         """
-        logger.info(f"Iniciando atualização de sinergias (limite: {limite_empresas})")
+        logger.info("Iniciando atualização de sinergias")
         
         try:
             db = next(get_db())
             
-            # Carregar empresas
-            empresas_lista = await self.empresas_scraper.coletar_empresas()
-            empresas_mdic = {}
-            for empresa in empresas_lista:
-                cnpj = empresa.get("cnpj")
-                if cnpj:
-                    empresas_mdic[cnpj] = empresa
-            
-            if not self.sinergia_analyzer:
-                self.sinergia_analyzer = SinergiaAnalyzer(self.cnae_analyzer)
-            
-            # Analisar sinergias por estado
-            sinergias_estado = self.sinergia_analyzer.analisar_sinergias_por_estado(db)
-            
-            # Analisar sinergias por empresa
-            sinergias_empresas = self.sinergia_analyzer.analisar_sinergias_por_empresa(
-                db,
-                empresas_mdic,
-                limite_empresas
-            )
+            # Uma consulta agrupada por estado e uma por empresa, gravadas na tabela sinergias
+            stats = recalcular_sinergias(db, self.cnae_analyzer)
+            sinergias_estado = sinergias_por_estado(db, limite=10)
+            sinergias_empresas = sinergias_por_empresa(db, min(limite_empresas, 20))
             
             return {
                 "success": True,
-                "estados_analisados": sinergias_estado["total_estados"],
-                "estados_com_sinergia": sinergias_estado["estados_com_sinergia"],
-                "empresas_analisadas": len(sinergias_empresas),
-                "sinergias_estado": sinergias_estado["sinergias"][:10],  # Top 10
-                "sinergias_empresas": sinergias_empresas[:20],  # Top 20
+                "estados_analisados": stats["estados"],
+                "estados_com_sinergia": stats["estados_com_sinergia"],
+                "empresas_analisadas": stats["empresas"],
+                "sinergias_estado": sinergias_estado["sinergias"],  # Top 10
+                "sinergias_empresas": sinergias_empresas,  # Top 20
+                "atualizado_em": stats["data_atualizacao"],
+                "segundos": stats["segundos"],
                 "timestamp": datetime.now().isoformat()
             }
         except Exception as e:
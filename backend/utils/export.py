@@ -1,8 +1,11 @@
 """
 Utilitários para exportação de relatórios.
 """
+import csv
+import io
+import tempfile
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Sequence
 from datetime import datetime
 from loguru import logger
 
@@ -14,6 +17,15 @@ except ImportError:
     PANDAS_AVAILABLE = False
     logger.warning("pandas não disponível - exportação Excel/CSV limitada")
 
+try:
+    from openpyxl import Workbook
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+
+# Tamanho dos blocos enviados na exportação em streaming
+TAMANHO_BLOCO = 64 * 1024
+
 from config import settings
 
 
@@ -195,3 +207,59 @@ class ReportExporter:
             logger.error(f"Erro ao exportar para PDF: {e}")
             raise
 
+
+def csv_em_blocos(
+    cabecalho: Sequence[str],
+    linhas: Iterable[Sequence[Any]],
+    tamanho_bloco: int = TAMANHO_BLOCO,
+) -> Iterator[bytes]:
+    """
+    CSV (utf-8 com BOM, como export_to_csv) gerado linha a linha, em blocos de bytes.
+
+    Só o bloco atual fica em memória, qualquer que seja o número de linhas.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow(cabecalho)
+    for linha in linhas:
+        writer.writerow(linha)
+        if buffer.tell() >= tamanho_bloco:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def xlsx_em_blocos(
+    cabecalho: Sequence[str],
+    linhas: Iterable[Sequence[Any]],
+    tamanho_bloco: int = TAMANHO_BLOCO,
+    titulo: str = "Operações",
+) -> Iterator[bytes]:
+    """
+    Excel gerado com o modo write-only do openpyxl, em blocos de bytes.
+
+    As linhas vão direto para o XML da planilha (arquivo temporário do openpyxl);
+    o .xlsx é um zip fechado só no fim, então é montado num arquivo temporário
+    (em memória até tamanho_bloco * 16) e então enviado em blocos.
+    """
+    if not OPENPYXL_AVAILABLE:
+        raise ImportError("openpyxl é necessário para exportação em Excel. Instale com: pip install openpyxl")
+
+    workbook = Workbook(write_only=True)
+    planilha = workbook.create_sheet(titulo)
+    planilha.append(list(cabecalho))
+    for linha in linhas:
+        planilha.append(list(linha))
+
+    with tempfile.SpooledTemporaryFile(max_size=tamanho_bloco * 16) as arquivo:
+        workbook.save(arquivo)
+        arquivo.seek(0)
+        while True:
+            bloco = arquivo.read(tamanho_bloco)
+            if not bloco:
+                break
+            yield bloco
+
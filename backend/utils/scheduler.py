@@ -10,6 +10,7 @@ from sqlalchemy.orm import Session
 from config import settings
 from database import get_db
 from data_collector import DataCollector
+from services.clientes_http import com_clientes_http
 
 # Import opcional do atualizador de dados
 try:
@@ -103,6 +104,26 @@ class DataScheduler:
         except Exception as e:
             logger.error(f"Erro na atualização de sinergias: {e}")
     
+    def _sincronizar_rollups_task(self):
+        """
+        Absorve nos rollups e nas versões dos dados as linhas inseridas fora dos fluxos
+        de importação, e reindexa o cadastro/MDIC na busca de empresas se mudaram.
+        """
+        from services.busca_empresas import sincronizar_indices_cadastro
+        from services.rollups import atualizar_rollups
+
+        db_gen = get_db()
+        db = next(db_gen)
+        try:
+            resultado = atualizar_rollups(db)
+            if resultado and (resultado["meses_atualizados"] or resultado["completo"]):
+                logger.info(f"✅ Rollups sincronizados: {resultado['meses_atualizados'] or 'reconstrução completa'}")
+            sincronizar_indices_cadastro(db)
+        except Exception as e:
+            logger.error(f"Erro na sincronização dos rollups: {e}")
+        finally:
+            db.close()
+    
     def start(self):
         """Inicia o agendador."""
         if self.running:
@@ -111,25 +132,29 @@ class DataScheduler:
         
         # Agendar coleta diária às 02:00 da manhã
         schedule.every().day.at("02:00").do(
-            lambda: asyncio.run(self._collect_data_task())
+            lambda: asyncio.run(com_clientes_http(self._collect_data_task()))
         )
         
         # Agendar atualização de empresas MDIC semanalmente (domingo às 03:00)
         if self.updater:
             schedule.every().sunday.at("03:00").do(
-                lambda: asyncio.run(self._update_empresas_task())
+                lambda: asyncio.run(com_clientes_http(self._update_empresas_task()))
             )
             
             # Agendar atualização de relacionamentos diariamente às 03:30
             schedule.every().day.at("03:30").do(
-                lambda: asyncio.run(self._update_relacionamentos_task())
+                lambda: asyncio.run(com_clientes_http(self._update_relacionamentos_task()))
             )
             
             # Agendar atualização de sinergias diariamente às 04:00
             schedule.every().day.at("04:00").do(
-                lambda: asyncio.run(self._update_sinergias_task())
+                lambda: asyncio.run(com_clientes_http(self._update_sinergias_task()))
             )
         
+        # Sincronizar rollups/versões e índice de empresas com linhas inseridas fora das importações
+        if settings.rollups_sync_minutes > 0:
+            schedule.every(settings.rollups_sync_minutes).minutes.do(self._sincronizar_rollups_task)
+        
         self.running = True
         logger.info("Agendador iniciado: coleta diária às 02:00")
         if self.updater: